@@ -0,0 +1,108 @@
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+from time import time
+from typing import Dict, List, Optional
+
+import aiosqlite
+
+from tranzact.full_node.coin_store import CoinStore
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.coin_record import CoinRecord
+from tranzact.util.db_wrapper import DBWrapper
+from tranzact.util.ints import uint32, uint64
+
+NUM_BLOCKS = 100
+COINS_PER_BLOCK = 2000
+# Number of spends of the blocks which are validated, and how many blocks of each size
+BLOCK_SPENDS = [100, 1000, 5000]
+NUM_ITERS = 10
+
+
+def rand_hash() -> bytes32:
+    return bytes32(random.randbytes(32))
+
+
+async def setup_db(db_filename: Path) -> DBWrapper:
+    try:
+        os.unlink(db_filename)
+    except FileNotFoundError:
+        pass
+    connection = await aiosqlite.connect(db_filename)
+    await connection.execute("pragma journal_mode=wal")
+    await connection.execute("pragma synchronous=OFF")
+    return DBWrapper(connection, db_version=2)
+
+
+async def lookup_one_by_one(coin_store: CoinStore, removals: List[bytes32]) -> Dict[bytes32, CoinRecord]:
+    # How validate_block_body looked up the removals before, one query per coin
+    ret: Dict[bytes32, CoinRecord] = {}
+    for rem in removals:
+        record: Optional[CoinRecord] = await coin_store.get_coin_record(rem)
+        assert record is not None
+        ret[rem] = record
+    return ret
+
+
+async def run_block_body_validation_benchmark() -> None:
+    """
+    Times looking up the coin records of the removals of a block in a populated coin store, the part of
+    validate_block_body which queries the database, with a cold coin record cache as for a block from a peer.
+    """
+    verbose: bool = "--verbose" in sys.argv
+    random.seed(1337)
+    db_filename = Path("block-body-validation-benchmark.db")
+    db_wrapper: DBWrapper = await setup_db(db_filename)
+    try:
+        coin_store = await CoinStore.create(db_wrapper)
+        all_coins: List[bytes32] = []
+        if verbose:
+            print("Building database ", end="")
+        for height in range(NUM_BLOCKS):
+            additions = [Coin(rand_hash(), rand_hash(), uint64(1)) for _ in range(COINS_PER_BLOCK)]
+            rewards = set() if height == 0 else {Coin(rand_hash(), rand_hash(), uint64(1)) for _ in range(2)}
+            await coin_store.new_block(uint32(height), uint64(1631794488 + 19 * height), rewards, additions, [])
+            await db_wrapper.db.commit()
+            all_coins += [coin.name() for coin in additions]
+            if verbose:
+                print(".", end="")
+                sys.stdout.flush()
+        if verbose:
+            print("")
+
+        for spends in BLOCK_SPENDS:
+            one_by_one_time = 0.0
+            batched_time = 0.0
+            for _ in range(NUM_ITERS):
+                removals = random.sample(all_coins, spends)
+
+                coin_store = await CoinStore.create(db_wrapper)
+                start = time()
+                expected = await lookup_one_by_one(coin_store, removals)
+                one_by_one_time += time() - start
+
+                coin_store = await CoinStore.create(db_wrapper)
+                start = time()
+                records = await coin_store.get_coin_records(removals)
+                batched_time += time() - start
+                assert records == expected
+
+            print(
+                f"REMOVALS: {NUM_ITERS} blocks of {spends} spends, one by one: "
+                f"{1000 * one_by_one_time / NUM_ITERS:0.2f}ms, batched: {1000 * batched_time / NUM_ITERS:0.2f}ms "
+                f"per block"
+            )
+    finally:
+        await db_wrapper.db.close()
+        for suffix in ["", "-wal", "-shm"]:
+            try:
+                os.unlink(f"{db_filename}{suffix}")
+            except FileNotFoundError:
+                pass
+
+
+if __name__ == "__main__":
+    asyncio.run(run_block_body_validation_benchmark())
@@ -23,8 +23,7 @@ NUM_ITERS = 200
 ph = bytes32(b"a" * 32)
 
 
-async def setup_db() -> DBWrapper:
-    db_filename = Path("coin-store-benchmark.db")
+async def setup_db(db_filename: Path, db_version: int) -> DBWrapper:
     try:
         os.unlink(db_filename)
     except FileNotFoundError:
@@ -32,7 +31,7 @@ async def setup_db() -> DBWrapper:
     connection = await aiosqlite.connect(db_filename)
     await connection.execute("pragma journal_mode=wal")
     await connection.execute("pragma synchronous=FULL")
-    return DBWrapper(connection)
+    return DBWrapper(connection, db_version=db_version)
 
 
 def rand_hash() -> bytes32:
@@ -60,9 +59,10 @@ def rewards(height: uint32) -> Tuple[Coin, Coin]:
     return farmer_coin, pool_coin
 
 
-async def run_new_block_benchmark():
+async def run_new_block_benchmark(db_version: int):
 
-    db_wrapper: DBWrapper = await setup_db()
+    db_filename = Path(f"coin-store-benchmark-v{db_version}.db")
+    db_wrapper: DBWrapper = await setup_db(db_filename, db_version)
 
     verbose: bool = "--verbose" in sys.argv
     try:
@@ -320,9 +320,14 @@ async def run_new_block_benchmark():
             f"found {found_coins} coins in total"
         )
 
+        await db_wrapper.db.execute("pragma wal_checkpoint(TRUNCATE)")
+        print(f"database size: {db_filename.stat().st_size / 1000000:0.1f} MB")
+
     finally:
         await db_wrapper.db.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(run_new_block_benchmark())
+    for version in [1, 2]:
+        print(f"DB version {version}")
+        asyncio.run(run_new_block_benchmark(version))
@@ -0,0 +1,97 @@
+import random
+import sys
+from time import time
+from typing import List
+
+from blspy import G2Element
+
+from tranzact.consensus.cost_calculator import NPCResult
+from tranzact.consensus.default_constants import DEFAULT_CONSTANTS
+from tranzact.full_node.mempool import Mempool
+from tranzact.types.blockchain_format.program import SerializedProgram
+from tranzact.types.mempool_item import MempoolItem
+from tranzact.types.spend_bundle import SpendBundle
+from tranzact.util.ints import uint64
+
+NUM_ITERS = 20000
+
+# Same limit as the MempoolManager
+mempool_max_total_cost = int(DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM * DEFAULT_CONSTANTS.MEMPOOL_BLOCK_BUFFER)
+
+
+def make_item(idx: int) -> MempoolItem:
+    cost = random.randint(2000000, 20000000)
+    fee = random.randint(0, 100) * cost // 10
+    return MempoolItem(
+        SpendBundle([], G2Element()),
+        uint64(fee),
+        NPCResult(None, [], uint64(cost)),
+        uint64(cost),
+        idx.to_bytes(32, "big"),
+        [],
+        [],
+        SerializedProgram(),
+    )
+
+
+def admit(mempool: Mempool, item: MempoolItem) -> bool:
+    # This mirrors the fee checks of MempoolManager.add_spendbundle
+    if mempool.at_full_capacity(item.cost) and item.fee_per_cost <= mempool.get_min_fee_rate(item.cost):
+        return False
+    mempool.add_to_pool(item)
+    return True
+
+
+def print_latencies(title: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    print(
+        f"{title}: {len(latencies)} transactions in {total:0.4f}s, "
+        f"mean: {1000000 * total / len(latencies):0.1f}us "
+        f"p50: {1000000 * latencies[len(latencies) // 2]:0.1f}us "
+        f"p99: {1000000 * latencies[len(latencies) * 99 // 100]:0.1f}us "
+        f"max: {1000000 * latencies[-1]:0.1f}us"
+    )
+
+
+def run_mempool_benchmark() -> None:
+    verbose: bool = "--verbose" in sys.argv
+    random.seed(1337)
+    mempool = Mempool(mempool_max_total_cost)
+
+    print(f"Filling mempool up to {mempool_max_total_cost} cost")
+    idx = 0
+    latencies: List[float] = []
+    while not mempool.at_full_capacity(20000000):
+        item = make_item(idx)
+        idx += 1
+        start = time()
+        admit(mempool, item)
+        latencies.append(time() - start)
+    print_latencies("FILL", latencies)
+
+    if verbose:
+        print(f"Mempool has {len(mempool.spends)} spends, cost: {mempool.total_mempool_cost}")
+
+    latencies = []
+    admitted = 0
+    for i in range(NUM_ITERS):
+        item = make_item(idx)
+        idx += 1
+        start = time()
+        if admit(mempool, item):
+            admitted += 1
+        latencies.append(time() - start)
+    print_latencies(f"FULL MEMPOOL ({admitted} admitted)", latencies)
+
+    latencies = []
+    for i in range(NUM_ITERS):
+        cost = random.randint(2000000, 20000000)
+        start = time()
+        mempool.get_min_fee_rate(cost)
+        latencies.append(time() - start)
+    print_latencies("GET MIN FEE RATE", latencies)
+
+
+if __name__ == "__main__":
+    run_mempool_benchmark()
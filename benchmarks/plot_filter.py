@@ -0,0 +1,68 @@
+import random
+import sys
+from pathlib import Path
+from time import time
+from typing import List
+
+from tranzact.consensus.default_constants import DEFAULT_CONSTANTS
+from tranzact.plotting.plot_filter_index import PlotFilterIndex
+from tranzact.types.blockchain_format.proof_of_space import ProofOfSpace
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+
+NUM_SIGNAGE_POINTS = 20
+PLOT_COUNTS = [1000, 10000, 100000]
+
+
+def rand_hash() -> bytes32:
+    return bytes32(random.getrandbits(256).to_bytes(32, "big"))
+
+
+def print_latencies(title: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    print(
+        f"{title}: mean: {1000 * sum(latencies) / len(latencies):0.2f}ms "
+        f"p50: {1000 * latencies[len(latencies) // 2]:0.2f}ms "
+        f"max: {1000 * latencies[-1]:0.2f}ms"
+    )
+
+
+def run_plot_filter_benchmark() -> None:
+    verbose: bool = "--verbose" in sys.argv
+    random.seed(1337)
+    zero_bits = DEFAULT_CONSTANTS.NUMBER_ZERO_BITS_PLOT_FILTER
+
+    for num_plots in PLOT_COUNTS:
+        plot_ids = [rand_hash() for _ in range(num_plots)]
+        index = PlotFilterIndex()
+        for i, plot_id in enumerate(plot_ids):
+            index.add(Path(f"plot-{i}.plot"), plot_id)
+
+        signage_points = [(rand_hash(), rand_hash()) for _ in range(NUM_SIGNAGE_POINTS)]
+        naive_latencies: List[float] = []
+        index_latencies: List[float] = []
+        passed = 0
+        for challenge_hash, sp_hash in signage_points:
+            start = time()
+            expected = [
+                i
+                for i, plot_id in enumerate(plot_ids)
+                if ProofOfSpace.passes_plot_filter(DEFAULT_CONSTANTS, plot_id, challenge_hash, sp_hash)
+            ]
+            naive_latencies.append(time() - start)
+
+            start = time()
+            paths = index.passing_paths(challenge_hash, sp_hash, zero_bits)
+            index_latencies.append(time() - start)
+
+            assert [Path(f"plot-{i}.plot") for i in expected] == paths
+            passed += len(paths)
+
+        print(f"{num_plots} plots")
+        print_latencies("  PASSES_PLOT_FILTER", naive_latencies)
+        print_latencies("  PLOT FILTER INDEX", index_latencies)
+        if verbose:
+            print(f"  {passed / NUM_SIGNAGE_POINTS:0.1f} plots passed the filter per signage point")
+
+
+if __name__ == "__main__":
+    run_plot_filter_benchmark()
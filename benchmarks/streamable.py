@@ -0,0 +1,110 @@
+import random
+import sys
+from time import time
+from typing import Any, Callable, List, Type
+
+from blspy import AugSchemeMPL, G1Element, G2Element
+from clvm_tools import binutils
+
+from tranzact.types.blockchain_format.program import Program, SerializedProgram
+from tranzact.types.coin_record import CoinRecord
+from tranzact.types.full_block import FullBlock
+from tranzact.types.header_block import HeaderBlock
+from tranzact.types.spend_bundle import SpendBundle
+from tranzact.util.ints import int512, uint128
+from tranzact.util.streamable import Streamable
+from tranzact.util.struct_stream import StructStream
+from tranzact.util.type_checking import is_type_List, is_type_SpecificOptional, is_type_Tuple
+
+if sys.version_info < (3, 8):
+
+    def get_args(t: Type[Any]) -> Any:
+        return getattr(t, "__args__", ())
+
+
+else:
+
+    from typing import get_args
+
+# Number of items in each list, and of coin spends in the spend bundle
+LIST_LENGTH = 4
+SPEND_BUNDLE_SIZE = 50
+DURATION = 2.0
+
+sk = AugSchemeMPL.key_gen(bytes([1] * 32))
+program = Program.to(binutils.assemble("(a (q 2 (i 5 (q 4 (c 2 (c 5 ())) (q 1)) 1) 1) (c (q 0x1337) 1))"))
+
+
+def rand_object(f_type: Type) -> Any:
+    """
+    Creates a random instance of a streamable type, with every optional present.
+    """
+    if f_type is bool:
+        return random.random() < 0.5
+    if is_type_SpecificOptional(f_type):
+        return rand_object(get_args(f_type)[0])
+    if is_type_List(f_type):
+        return [rand_object(get_args(f_type)[0]) for _ in range(LIST_LENGTH)]
+    if is_type_Tuple(f_type):
+        return tuple(rand_object(inner_type) for inner_type in get_args(f_type))
+    if isinstance(f_type, type) and issubclass(f_type, Streamable):
+        return f_type(*[rand_object(t) for t in f_type.__annotations__.values()])
+    if isinstance(f_type, type) and issubclass(f_type, StructStream):
+        bits = 8 * len(bytes(f_type(0)))
+        return f_type(random.getrandbits(bits - 1))
+    if f_type is uint128 or f_type is int512:
+        return f_type(random.getrandbits(127))
+    if hasattr(f_type, "SIZE") and issubclass(f_type, bytes):
+        return f_type(random.getrandbits(8 * f_type.SIZE).to_bytes(f_type.SIZE, "big"))
+    if f_type is bytes:
+        return random.getrandbits(8 * 100).to_bytes(100, "big")
+    if f_type is str:
+        return "streamable"
+    if f_type is G1Element:
+        return sk.get_g1()
+    if f_type is G2Element:
+        return AugSchemeMPL.sign(sk, b"streamable")
+    if f_type is Program:
+        return program
+    if f_type is SerializedProgram:
+        return SerializedProgram.from_program(program)
+    raise NotImplementedError(f"Can not create a {f_type}")
+
+
+def ops_per_second(function: Callable[[], Any]) -> float:
+    count = 0
+    start = time()
+    while time() - start < DURATION:
+        function()
+        count += 1
+    return count / (time() - start)
+
+
+def run_streamable_benchmark() -> None:
+    verbose: bool = "--verbose" in sys.argv
+    random.seed(1337)
+
+    spend_bundle: SpendBundle = rand_object(SpendBundle)
+    objects: List[Streamable] = [
+        rand_object(FullBlock),
+        rand_object(HeaderBlock),
+        SpendBundle(
+            [rand_object(type(spend_bundle.coin_spends[0])) for _ in range(SPEND_BUNDLE_SIZE)],
+            spend_bundle.aggregated_signature,
+        ),
+        rand_object(CoinRecord),
+    ]
+
+    for obj in objects:
+        cls = type(obj)
+        blob = bytes(obj)
+        assert cls.from_bytes(blob) == obj
+        print(f"{cls.__name__} ({len(blob)} bytes)")
+        print(f"  PARSE: {ops_per_second(lambda: cls.from_bytes(blob)):0.0f} ops/s")
+        print(f"  SERIALIZE: {ops_per_second(lambda: bytes(obj)):0.0f} ops/s")
+        if verbose:
+            print(f"  GET HASH: {ops_per_second(lambda: obj.get_hash()):0.0f} ops/s")
+
+
+if __name__ == "__main__":
+    run_streamable_benchmark()
@@ -0,0 +1,104 @@
+import random
+import sys
+import tracemalloc
+from time import time
+from typing import Dict, List, Set, Tuple
+
+from tranzact.full_node.subscriptions import PeerSubscriptions
+from tranzact.protocols.protocol_message_types import ProtocolMessageTypes
+from tranzact.protocols.wallet_protocol import CoinState, CoinStateUpdate
+from tranzact.server.outbound_message import make_msg
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.coin_record import CoinRecord
+from tranzact.util.ints import uint32, uint64
+
+NUM_PEERS = 10000
+# Puzzle hashes and coin ids each peer subscribes to
+NUM_PUZZLE_HASHES = 100
+NUM_COIN_IDS = 20
+NUM_BLOCKS = 50
+# Coins added or spent per block, and the share of them sent to a subscribed puzzle hash
+COINS_PER_BLOCK = 2000
+SUBSCRIBED_SHARE = 0.2
+
+
+def rand_hash() -> bytes32:
+    return bytes32(random.randbytes(32))
+
+
+def make_block(
+    puzzle_hashes: List[bytes32], height: int
+) -> Tuple[List[CoinRecord], Dict[bytes, Dict[bytes32, CoinRecord]]]:
+    records = []
+    for i in range(COINS_PER_BLOCK):
+        if random.random() < SUBSCRIBED_SHARE:
+            puzzle_hash = random.choice(puzzle_hashes)
+        else:
+            puzzle_hash = rand_hash()
+        coin = Coin(rand_hash(), puzzle_hash, uint64(random.randint(1, 10 ** 12)))
+        records.append(CoinRecord(coin, uint32(height), uint32(0), False, False, uint64(0)))
+    return records, {}
+
+
+def run_subscriptions_benchmark() -> None:
+    verbose: bool = "--verbose" in sys.argv
+    random.seed(1337)
+
+    peer_ids = [rand_hash() for _ in range(NUM_PEERS)]
+    subscribed: List[Tuple[bytes32, List[bytes32], List[bytes32]]] = [
+        (peer_id, [rand_hash() for _ in range(NUM_PUZZLE_HASHES)], [rand_hash() for _ in range(NUM_COIN_IDS)])
+        for peer_id in peer_ids
+    ]
+    all_puzzle_hashes = [ph for _, puzzle_hashes, _ in subscribed for ph in puzzle_hashes]
+
+    tracemalloc.start()
+    subscriptions = PeerSubscriptions(100000, 10000000)
+    start = time()
+    for peer_id, puzzle_hashes, coin_ids in subscribed:
+        subscriptions.add_ph_subscriptions(peer_id, puzzle_hashes)
+        subscriptions.add_coin_subscriptions(peer_id, coin_ids)
+    duration = time() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = subscriptions.subscription_count()
+    print(
+        f"SUBSCRIBE: {NUM_PEERS} peers, {total} subscriptions in {duration:0.4f}s, "
+        f"{1000000 * duration / total:0.2f}us and {memory / total:0.0f} bytes per subscription"
+    )
+
+    blocks = [make_block(all_puzzle_hashes, height) for height in range(NUM_BLOCKS)]
+    fan_out_time = 0.0
+    message_time = 0.0
+    notified = 0
+    messages = 0
+    for height, block in enumerate(blocks):
+        start = time()
+        changes_for_peer: Dict[bytes32, Set[CoinState]] = subscriptions.changes_for_peers(block)
+        fan_out_time += time() - start
+        start = time()
+        for peer_id, changes in changes_for_peer.items():
+            update = CoinStateUpdate(uint32(height), uint32(max(0, height - 1)), rand_hash(), list(changes))
+            make_msg(ProtocolMessageTypes.coin_state_update, update)
+            messages += 1
+        message_time += time() - start
+        notified += len(changes_for_peer)
+    print(
+        f"FAN OUT: {NUM_BLOCKS} blocks of {COINS_PER_BLOCK} coins, {notified / NUM_BLOCKS:0.0f} peers notified "
+        f"per block, mean: {1000 * fan_out_time / NUM_BLOCKS:0.2f}ms per block"
+    )
+    print(f"MESSAGES: {messages} coin_state_update messages, mean: {1000 * message_time / NUM_BLOCKS:0.2f}ms per block")
+
+    start = time()
+    for peer_id in peer_ids:
+        subscriptions.remove_peer(peer_id)
+    duration = time() - start
+    assert subscriptions.subscription_count() == 0
+    print(f"UNSUBSCRIBE: {NUM_PEERS} peers in {duration:0.4f}s")
+
+    if verbose:
+        print(f"Subscriptions left: {subscriptions.subscription_count()}")
+
+
+if __name__ == "__main__":
+    run_subscriptions_benchmark()
@@ -0,0 +1,55 @@
+import asyncio
+import sys
+from time import time
+
+from tranzact.full_node.weight_proof import WeightProofHandler
+from tranzact.util.block_cache import BlockCache
+from tests.block_tools import test_constants
+from tests.conftest import block_format_version
+from tests.util.blockchain import persistent_blocks
+from tests.weight_proof.test_weight_proof import load_blocks_dont_validate
+
+NUM_BLOCKS = 10000
+NUM_ITERS = 3
+# Numbers of worker processes validating the weight proof
+NUM_WORKERS = [1, 2, 4, 8]
+
+
+async def run_weight_proof_benchmark() -> None:
+    """
+    Validates the weight proof of the blocks used by the weight proof tests, in one process and with pools of
+    different sizes. The blocks are created by the first run, which takes a while, and cached in ~/.tranzact/blocks
+    """
+    verbose: bool = "--verbose" in sys.argv
+    blocks = persistent_blocks(NUM_BLOCKS, f"test_blocks_{NUM_BLOCKS}_{block_format_version}.db")
+    header_cache, height_to_hash, sub_blocks, summaries = await load_blocks_dont_validate(blocks)
+    wpf = WeightProofHandler(test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, summaries))
+    wp = await wpf.get_proof_of_weight(blocks[-1].header_hash)
+    assert wp is not None
+    if verbose:
+        print(f"weight proof of {len(wp.sub_epochs)} sub epochs, {len(wp.sub_epoch_segments)} segments")
+
+    wpf = WeightProofHandler(test_constants, BlockCache(sub_blocks, {}, height_to_hash, {}))
+    start = time()
+    for _ in range(NUM_ITERS):
+        valid, _ = wpf.validate_weight_proof_single_proc(wp)
+        assert valid
+    print(f"SINGLE PROCESS: {NUM_ITERS} validations, mean: {(time() - start) / NUM_ITERS:0.2f}s")
+
+    for num_workers in NUM_WORKERS:
+        wpf = WeightProofHandler(test_constants, BlockCache(sub_blocks, {}, height_to_hash, {}), num_workers)
+        try:
+            # The first validation starts the worker processes, which are reused by the timed ones
+            valid, _, _ = await wpf.validate_weight_proof(wp)
+            assert valid
+            start = time()
+            for _ in range(NUM_ITERS):
+                valid, _, _ = await wpf.validate_weight_proof(wp)
+                assert valid
+            print(f"POOL: {num_workers} workers, {NUM_ITERS} validations, mean: {(time() - start) / NUM_ITERS:0.2f}s")
+        finally:
+            wpf.shut_down()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_weight_proof_benchmark())
@@ -34,6 +34,11 @@ upnp_dependencies = [
     "miniupnpc==2.2.2",  # Allows users to open ports on their router
 ]
 
+compression_dependencies = [
+    "zstandard==0.16.0",  # zstd compression of large protocol messages
+    "lz4==3.1.3",  # lz4 compression of large protocol messages
+]
+
 dev_dependencies = [
     "pytest",
     "pytest-asyncio",
@@ -60,6 +65,7 @@ kwargs = dict(
         uvloop=["uvloop"],
         dev=dev_dependencies,
         upnp=upnp_dependencies,
+        compression=compression_dependencies,
     ),
     packages=[
         "build_scripts",
@@ -11,9 +11,11 @@ import pytest
 from blspy import AugSchemeMPL, G2Element
 from clvm.casts import int_to_bytes
 
+from tranzact.consensus.augmented_chain import AugmentedBlockchain
 from tranzact.consensus.block_rewards import calculate_base_farmer_reward
 from tranzact.consensus.blockchain import ReceiveBlockResult
 from tranzact.consensus.coinbase import create_farmer_coin
+from tranzact.consensus.full_block_to_block_record import block_to_block_record
 from tranzact.consensus.pot_iterations import is_overflow_block
 from tranzact.full_node.bundle_tools import detect_potential_template_generator
 from tranzact.types.blockchain_format.classgroup import ClassgroupElement
@@ -1620,6 +1622,27 @@ class TestPreValidation:
         log.info(f"Average pv: {sum(times_pv)/(len(blocks)/n_at_a_time)}")
         log.info(f"Average rb: {sum(times_rb)/(len(blocks))}")
 
+    @pytest.mark.asyncio
+    async def test_pre_validation_ahead_of_chain(self, empty_blockchain):
+        blocks = bt.get_consecutive_blocks(20)
+        chain = AugmentedBlockchain(empty_blockchain)
+        res_1 = await empty_blockchain.pre_validate_blocks_multiprocessing(blocks[:10], {})
+        assert res_1 is not None and all(r.error is None for r in res_1)
+        pending_blocks = {}
+        for block, result in zip(blocks[:10], res_1):
+            chain.add_block_record(block_to_block_record(test_constants, chain, result.required_iters, block, None))
+            pending_blocks[block.header_hash] = block
+        # The first batch is only known to the augmented chain
+        assert chain.contains_block(blocks[9].header_hash)
+        assert not empty_blockchain.contains_block(blocks[9].header_hash)
+
+        res_2 = await empty_blockchain.pre_validate_blocks_multiprocessing(
+            blocks[10:], {}, block_records=chain, pending_blocks=pending_blocks
+        )
+        assert res_2 is not None and all(r.error is None for r in res_2)
+        for block, result in zip(blocks, res_1 + res_2):
+            assert (await empty_blockchain.receive_block(block, result))[0] == ReceiveBlockResult.NEW_PEAK
+
 
 class TestBodyValidation:
     @pytest.mark.asyncio
@@ -0,0 +1,49 @@
+from typing import Dict, Optional
+
+from tranzact.consensus.fork_block_cache import ForkBlockCache, ForkBlockChanges
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.util.hash import std_hash
+from tranzact.util.ints import uint32, uint64
+
+
+def make_changes(fork: bytes, height: int) -> ForkBlockChanges:
+    coin = Coin(std_hash(fork + bytes([height])), std_hash(b"puzzle hash"), uint64(height))
+    return ForkBlockChanges(
+        std_hash(fork + bytes([height])),
+        std_hash(fork + bytes([height - 1])),
+        uint32(height),
+        uint64(1000 + height),
+        [std_hash(bytes([height]))],
+        [coin],
+        [],
+    )
+
+
+class TestForkBlockCache:
+    def test_prune(self):
+        cache = ForkBlockCache()
+        fork_a = [make_changes(b"a", height) for height in range(1, 11)]
+        fork_b = [make_changes(b"b", height) for height in range(1, 6)]
+        for changes in fork_a + fork_b:
+            cache.add(changes)
+        assert len(cache) == 15
+        assert cache.get(fork_a[3].header_hash) == fork_a[3]
+        assert cache.get(std_hash(b"unknown")) is None
+
+        # Fork a becomes the peak chain up to height 8
+        peak_chain: Dict[uint32, bytes32] = {changes.height: changes.header_hash for changes in fork_a[:8]}
+
+        def height_to_hash(height: uint32) -> Optional[bytes32]:
+            return peak_chain.get(height)
+
+        cache.prune(uint32(8), 0, height_to_hash)
+        assert len(cache) == 7
+        assert cache.get(fork_a[7].header_hash) is None
+        assert cache.get(fork_a[8].header_hash) == fork_a[8]
+        assert all(cache.get(changes.header_hash) == changes for changes in fork_b)
+
+        # Fork b is too far below the peak to be extended
+        cache.prune(uint32(8), 6, height_to_hash)
+        assert len(cache) == 2
+        assert cache.get(fork_a[9].header_hash) == fork_a[9]
@@ -0,0 +1,36 @@
+import dataclasses
+
+import pytest
+
+from tranzact.types.full_block import FullBlock, LazyFullBlock
+from tests.setup_nodes import bt
+
+
+class TestLazyFullBlock:
+    def test_same_as_full_block(self):
+        blocks = bt.get_consecutive_blocks(5, guarantee_transaction_block=True)
+        blocks = bt.get_consecutive_blocks(3, block_list_input=blocks, guarantee_transaction_block=True)
+        for block in blocks:
+            lazy = LazyFullBlock(bytes(block))
+            assert lazy.header_hash == block.header_hash
+            assert lazy.prev_header_hash == block.prev_header_hash
+            assert lazy.height == block.height
+            assert lazy.weight == block.weight
+            assert lazy.total_iters == block.total_iters
+            assert lazy.is_transaction_block() == block.is_transaction_block()
+            assert lazy.get_included_reward_coins() == block.get_included_reward_coins()
+            assert lazy.foliage_transaction_block == block.foliage_transaction_block
+            assert lazy.transactions_generator == block.transactions_generator
+            assert lazy.full_block() == block
+            assert bytes(lazy) == bytes(block)
+
+            without_generator = dataclasses.replace(block, transactions_generator=None)
+            assert lazy.without_transactions_generator() == bytes(without_generator)
+            assert FullBlock.from_bytes(lazy.without_transactions_generator()) == without_generator
+
+    def test_invalid(self):
+        block_bytes = bytes(bt.get_consecutive_blocks(1)[0])
+        with pytest.raises(AssertionError):
+            LazyFullBlock(block_bytes[:-1])
+        with pytest.raises(AssertionError):
+            LazyFullBlock(block_bytes + b"\x00")
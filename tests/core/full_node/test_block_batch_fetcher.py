@@ -0,0 +1,89 @@
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pytest
+
+from tranzact.full_node.block_batch_fetcher import BlockBatchFetcher
+from tranzact.protocols.full_node_protocol import RequestBlocks, RespondBlocks
+from tranzact.util.ints import uint32
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+@dataclass
+class FakeBlock:
+    height: uint32
+
+
+def respond_blocks(request: RequestBlocks) -> RespondBlocks:
+    # The fetcher only looks at the heights, so skip the type checks of the constructor
+    response = object.__new__(RespondBlocks)
+    object.__setattr__(response, "start_height", request.start_height)
+    object.__setattr__(response, "end_height", request.end_height)
+    blocks = [FakeBlock(uint32(h)) for h in range(request.start_height, request.end_height + 1)]
+    object.__setattr__(response, "blocks", blocks)
+    return response
+
+
+class FakePeer:
+    def __init__(self, node_id: int, delay: float, fail: bool = False):
+        self.peer_node_id = node_id.to_bytes(32, "big")
+        self.peer_host = f"127.0.0.{node_id}"
+        self.delay = delay
+        self.fail = fail
+        self.closed = False
+        self.requests: List[RequestBlocks] = []
+
+    async def request_blocks(self, request: RequestBlocks, timeout: int) -> Optional[RespondBlocks]:
+        self.requests.append(request)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return None
+        return respond_blocks(request)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def fetch_all(fetcher: BlockBatchFetcher) -> List[int]:
+    queue: asyncio.Queue = asyncio.Queue()
+    assert await fetcher.fetch(queue, asyncio.Event(), 2)
+    heights: List[int] = []
+    while not queue.empty():
+        _, blocks = queue.get_nowait()
+        heights += [b.height for b in blocks]
+    return heights
+
+
+class TestBlockBatchFetcher:
+    @pytest.mark.asyncio
+    async def test_in_order_from_many_peers(self):
+        peers = [FakePeer(1, 0.01), FakePeer(2, 0.002), FakePeer(3, 0.005)]
+        fetcher = BlockBatchFetcher(uint32(0), uint32(200), 10, lambda: peers, 6, 2)
+        # the last batch ends at the end height (inclusive), the others overlap by one block
+        heights = await fetch_all(fetcher)
+        batches = [heights[i : i + 11] for i in range(0, 20 * 11, 11)]
+        assert [b[0] for b in batches] == list(range(0, 200, 10))
+        assert all(b == list(range(b[0], b[0] + 11)) for b in batches)
+        assert all(len(p.requests) > 0 for p in peers)
+
+    @pytest.mark.asyncio
+    async def test_failed_peer_is_not_retried(self):
+        bad_peer = FakePeer(1, 0.001, fail=True)
+        good_peer = FakePeer(2, 0.001)
+        fetcher = BlockBatchFetcher(uint32(0), uint32(50), 10, lambda: [bad_peer, good_peer], 4, 2)
+        heights = await fetch_all(fetcher)
+        assert set(heights) == set(range(0, 51))
+        assert bad_peer.closed
+        assert len(bad_peer.requests) <= 2
+
+    @pytest.mark.asyncio
+    async def test_no_peers(self):
+        peer = FakePeer(1, 0.001, fail=True)
+        fetcher = BlockBatchFetcher(uint32(0), uint32(50), 10, lambda: [peer], 4, 2)
+        assert not await fetcher.fetch(asyncio.Queue(), asyncio.Event(), 2)
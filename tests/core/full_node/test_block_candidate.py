@@ -0,0 +1,148 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from blspy import AugSchemeMPL, G2Element
+
+from tranzact.consensus.cost_calculator import NPCResult
+from tranzact.consensus.default_constants import DEFAULT_CONSTANTS
+from tranzact.full_node.bundle_tools import simple_solution_generator
+from tranzact.full_node.mempool_manager import MempoolManager
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.program import Program, SerializedProgram
+from tranzact.types.coin_spend import CoinSpend
+from tranzact.types.mempool_item import MempoolItem
+from tranzact.types.spend_bundle import SpendBundle
+from tranzact.util.hash import std_hash
+from tranzact.util.ints import uint64
+
+PEAK_HASH = std_hash(b"peak")
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+def make_item(idx: int, fee: int, cost: int) -> MempoolItem:
+    coin = Coin(std_hash(bytes([idx])), std_hash(b"puzzle hash"), uint64(1000))
+    coin_spend = CoinSpend(
+        coin, SerializedProgram.from_program(Program.to(1)), SerializedProgram.from_program(Program.to([]))
+    )
+    signature = AugSchemeMPL.sign(AugSchemeMPL.key_gen(bytes([idx]) * 32), bytes([idx]))
+    return MempoolItem(
+        SpendBundle([coin_spend], signature),
+        uint64(fee),
+        NPCResult(None, [], uint64(cost)),
+        uint64(cost),
+        coin.name(),
+        [Coin(coin.name(), std_hash(b"puzzle hash"), uint64(1))],
+        [coin],
+        SerializedProgram(),
+    )
+
+
+def make_manager() -> MempoolManager:
+    manager = MempoolManager(None, DEFAULT_CONSTANTS)
+    manager.peak = SimpleNamespace(header_hash=PEAK_HASH)
+    return manager
+
+
+class TestBlockCandidate:
+    def test_candidate(self):
+        manager = make_manager()
+        try:
+            assert manager.get_block_candidate(std_hash(b"other peak"), None) is None
+            empty = manager.get_block_candidate(PEAK_HASH, None)
+            assert empty is not None
+            assert empty.spend_bundle is None and empty.generator is None and empty.items == []
+
+            high = make_item(1, 3000, 1000)
+            low = make_item(2, 1000, 1000)
+            manager.mempool.add_to_pool(low)
+            manager.mempool.add_to_pool(high)
+            candidate = manager.get_block_candidate(PEAK_HASH, None)
+            assert candidate.items == [high, low]
+            expected = SpendBundle.aggregate([high.spend_bundle, low.spend_bundle])
+            assert candidate.spend_bundle == expected
+            assert candidate.generator == simple_solution_generator(expected)
+            assert candidate.cost == 2000 and candidate.fees == 4000
+            assert candidate.removals == high.removals + low.removals
+            assert candidate.additions == high.additions + low.additions
+            # Up to date until the mempool changes
+            assert manager.get_block_candidate(PEAK_HASH, None) is candidate
+
+            # A lower fee item is added to the candidate
+            lowest = make_item(3, 500, 1000)
+            manager.mempool.add_to_pool(lowest)
+            extended = manager.get_block_candidate(PEAK_HASH, None)
+            assert extended.items == [high, low, lowest]
+            assert extended.spend_bundle.aggregated_signature == AugSchemeMPL.aggregate(
+                [item.spend_bundle.aggregated_signature for item in extended.items]
+            )
+            assert extended.removals == high.removals + low.removals + lowest.removals
+
+            # A higher fee item comes first, so the candidate is made again
+            highest = make_item(4, 10000, 1000)
+            manager.mempool.add_to_pool(highest)
+            rebuilt = manager.get_block_candidate(PEAK_HASH, None)
+            assert rebuilt.items == [highest, high, low, lowest]
+            assert rebuilt.spend_bundle == SpendBundle.aggregate([item.spend_bundle for item in rebuilt.items])
+
+            manager.mempool.remove_from_pool(highest)
+            manager.mempool.remove_from_pool(high)
+            manager.mempool.remove_from_pool(low)
+            manager.mempool.remove_from_pool(lowest)
+            assert manager.get_block_candidate(PEAK_HASH, None).spend_bundle is None
+        finally:
+            manager.shut_down()
+
+    def test_cost_limit(self):
+        manager = make_manager()
+        try:
+            max_cost = int(manager.limit_factor * DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM)
+            first = make_item(1, 2 * max_cost, max_cost - 10)
+            second = make_item(2, 20, 10)
+            third = make_item(3, 10, 10)
+            for item in [first, second, third]:
+                manager.mempool.add_to_pool(item)
+            candidate = manager.get_block_candidate(PEAK_HASH, None)
+            assert candidate.items == [first, second]
+            assert candidate.cost == max_cost
+            assert candidate.spend_bundle.aggregated_signature != G2Element()
+        finally:
+            manager.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_same_as_bundle_from_mempool(self):
+        manager = make_manager()
+        try:
+            for idx in range(10):
+                manager.mempool.add_to_pool(make_item(idx, 100 * (idx % 3 + 1), 1000))
+            candidate = manager.get_block_candidate(PEAK_HASH, None)
+            spend_bundle, additions, removals = await manager.create_bundle_from_mempool(PEAK_HASH)
+            assert candidate.spend_bundle == spend_bundle
+            assert candidate.additions == additions
+            assert candidate.removals == removals
+        finally:
+            manager.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_refresh(self):
+        manager = make_manager()
+        try:
+            await manager.refresh_block_candidate(std_hash(b"other peak"), None)
+            assert manager.block_candidate is None
+            items = [make_item(idx, 100 * (idx + 1), 1000) for idx in range(3)]
+            for item in items:
+                manager.mempool.add_to_pool(item)
+            await manager.refresh_block_candidate(PEAK_HASH, None)
+            candidate = manager.block_candidate
+            assert candidate.items == items[::-1]
+            assert candidate.spend_bundle == SpendBundle.aggregate([item.spend_bundle for item in items[::-1]])
+            assert candidate.generator == simple_solution_generator(candidate.spend_bundle)
+            # The refreshed candidate is current, so it is used as is
+            assert manager.get_block_candidate(PEAK_HASH, None) is candidate
+        finally:
+            manager.shut_down()
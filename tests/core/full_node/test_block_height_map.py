@@ -0,0 +1,137 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from tranzact.full_node.block_height_map import BlockHeightMap
+from tranzact.full_node.block_store import BlockStore
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.blockchain_format.sub_epoch_summary import SubEpochSummary
+from tranzact.util.hash import std_hash
+from tranzact.util.ints import uint8, uint32
+from tests.util.db_connection import DBConnection
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+def gen_block_hash(height: int, chain_id: int = 0) -> bytes32:
+    # heights below the fork of a chain share the hashes of the main chain
+    return std_hash(height.to_bytes(4, "big", signed=True) + chain_id.to_bytes(4, "big"))
+
+
+def gen_ses(height: int) -> SubEpochSummary:
+    prev_hash = std_hash(height.to_bytes(4, "big"))
+    return SubEpochSummary(prev_hash, std_hash(b"reward" + prev_hash), uint8(0), None, None)
+
+
+async def setup_chain(
+    block_store: BlockStore, length: int, chain_id: int = 0, fork_height: int = -1, ses_every: Optional[int] = None
+) -> None:
+    """
+    Adds block records for heights fork_height + 1 to length - 1, built on top of the main chain, and sets the last
+    one as the peak.
+    """
+    for height in range(fork_height + 1, length):
+        header_hash = gen_block_hash(height, chain_id)
+        prev_hash = gen_block_hash(height - 1, chain_id if height - 1 > fork_height else 0)
+        ses = gen_ses(height) if ses_every is not None and height % ses_every == 0 else None
+        cursor = await block_store.db.execute(
+            "INSERT INTO block_records VALUES(?, ?, ?, ?, ?, ?, ?)",
+            (
+                block_store.maybe_to_hex(header_hash),
+                block_store.maybe_to_hex(prev_hash),
+                height,
+                b"",
+                None if ses is None else bytes(ses),
+                0,
+                0,
+            ),
+        )
+        await cursor.close()
+    await block_store.set_peak(gen_block_hash(length - 1, chain_id))
+    await block_store.db.commit()
+
+
+class TestBlockHeightMap:
+    @pytest.mark.asyncio
+    async def test_empty(self, tmp_path: Path):
+        async with DBConnection() as db_wrapper:
+            block_store = await BlockStore.create(db_wrapper)
+            height_map = await BlockHeightMap.create(block_store, tmp_path / "height-to-hash")
+            assert not height_map.contains_height(uint32(0))
+            assert height_map.get_ses_heights() == []
+            assert (tmp_path / "height-to-hash").exists() is False
+
+    @pytest.mark.asyncio
+    async def test_load_and_persist(self, tmp_path: Path):
+        filename = tmp_path / "height-to-hash"
+        async with DBConnection() as db_wrapper:
+            block_store = await BlockStore.create(db_wrapper)
+            await setup_chain(block_store, 2500, ses_every=100)
+
+            height_map = await BlockHeightMap.create(block_store, filename)
+            for height in range(2500):
+                assert height_map.get_hash(uint32(height)) == gen_block_hash(height)
+            assert not height_map.contains_height(uint32(2500))
+            with pytest.raises(KeyError):
+                height_map.get_hash(uint32(2500))
+            assert height_map.get_ses_heights() == list(range(0, 2500, 100))
+            assert height_map.get_ses(uint32(100)) == gen_ses(100)
+            assert filename.read_bytes() == b"".join(gen_block_hash(height) for height in range(2500))
+
+            # the summaries are now stored in their own table
+            assert await block_store.get_sub_epoch_summaries() == {
+                uint32(height): gen_ses(height) for height in range(0, 2500, 100)
+            }
+            height_map = await BlockHeightMap.create(block_store, filename)
+            assert height_map.get_ses_heights() == list(range(0, 2500, 100))
+
+    @pytest.mark.asyncio
+    async def test_repair_after_reorg(self, tmp_path: Path):
+        filename = tmp_path / "height-to-hash"
+        async with DBConnection() as db_wrapper:
+            block_store = await BlockStore.create(db_wrapper)
+            await setup_chain(block_store, 2500)
+            await BlockHeightMap.create(block_store, filename)
+
+            # a reorg to a shorter chain that was not flushed to the file
+            await setup_chain(block_store, 2200, chain_id=1, fork_height=1000)
+            height_map = await BlockHeightMap.create(block_store, filename)
+            for height in range(1001):
+                assert height_map.get_hash(uint32(height)) == gen_block_hash(height)
+            for height in range(1001, 2200):
+                assert height_map.get_hash(uint32(height)) == gen_block_hash(height, 1)
+            assert not height_map.contains_height(uint32(2200))
+            assert len(filename.read_bytes()) == 2200 * 32
+
+            # a corrupt file is rebuilt from the database
+            filename.write_bytes(b"\xff" * 1001)
+            height_map = await BlockHeightMap.create(block_store, filename)
+            for height in range(1001, 2200):
+                assert height_map.get_hash(uint32(height)) == gen_block_hash(height, 1)
+            assert height_map.get_hash(uint32(0)) == gen_block_hash(0)
+
+    @pytest.mark.asyncio
+    async def test_update_and_rollback(self, tmp_path: Path):
+        filename = tmp_path / "height-to-hash"
+        async with DBConnection() as db_wrapper:
+            block_store = await BlockStore.create(db_wrapper)
+            await setup_chain(block_store, 10)
+            height_map = await BlockHeightMap.create(block_store, filename)
+
+            height_map.update_height(uint32(10), gen_block_hash(10), gen_ses(10))
+            assert height_map.get_hash(uint32(10)) == gen_block_hash(10)
+            assert height_map.get_ses_heights() == [10]
+            height_map.rollback(9)
+            assert height_map.get_ses_heights() == []
+
+            # small changes are only written on flush
+            height_map.maybe_flush()
+            assert len(filename.read_bytes()) == 10 * 32
+            height_map.flush()
+            assert len(filename.read_bytes()) == 11 * 32
@@ -68,6 +68,10 @@ class TestBlockStore:
             assert len(await store.get_full_blocks_at([0])) == 1
             assert len(await store.get_full_blocks_at([100])) == 0
 
+            blocks_in_range = await store.get_full_block_bytes_in_range(2, 5)
+            assert blocks_in_range == {block.header_hash: bytes(block) for block in blocks[2:6]}
+            assert await store.get_full_block_bytes_in_range(100, 200) == {}
+
             # Get blocks
             block_record_records = await store.get_block_records_in_range(0, 0xFFFFFFFF)
             assert len(block_record_records) == len(blocks)
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from tranzact.consensus.default_constants import DEFAULT_CONSTANTS
+from tranzact.full_node.bundle_tools import simple_solution_generator
+from tranzact.full_node.coin_spend_store import COIN_IDS_PER_QUERY, CoinSpendStore
+from tranzact.full_node.mempool_check_conditions import get_puzzle_and_solution_for_coin, get_spends_for_block
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.program import Program, SerializedProgram
+from tranzact.types.coin_spend import CoinSpend
+from tranzact.types.spend_bundle import SpendBundle
+from tranzact.util.hash import std_hash
+from tranzact.util.ints import uint64
+from tests.util.db_connection import DBConnection
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+def make_coin_spend(idx: int) -> CoinSpend:
+    puzzle = Program.to([1, idx])
+    coin = Coin(std_hash(idx.to_bytes(4, "big")), puzzle.get_tree_hash(), uint64(idx + 1))
+    return CoinSpend(coin, SerializedProgram.from_program(puzzle), SerializedProgram.from_program(Program.to([idx])))
+
+
+class TestCoinSpendStore:
+    @pytest.mark.asyncio
+    async def test_basic_store(self):
+        async with DBConnection() as db_wrapper:
+            store = await CoinSpendStore.create(db_wrapper)
+            header_hash_0 = 32 * b"\0"
+            header_hash_1 = 32 * b"\1"
+            coin_spends = [make_coin_spend(idx) for idx in range(COIN_IDS_PER_QUERY + 10)]
+            await store.add_coin_spends(header_hash_0, coin_spends)
+
+            coin_ids = [coin_spend.coin.name() for coin_spend in coin_spends]
+            stored = await store.get_coin_spends(coin_ids + coin_ids[:5] + [32 * b"\2"])
+            assert len(stored) == len(coin_spends)
+            for coin_spend in coin_spends:
+                assert stored[coin_spend.coin.name()] == (header_hash_0, coin_spend)
+
+            # The coin was spent again in a block of another chain
+            await store.add_coin_spends(header_hash_1, coin_spends[:1])
+            assert await store.get_coin_spends(coin_ids[:1]) == {coin_ids[0]: (header_hash_1, coin_spends[0])}
+            assert await store.get_coin_spends([]) == {}
+
+    def test_spends_for_block(self):
+        coin_spends = [make_coin_spend(idx) for idx in range(5)]
+        generator = simple_solution_generator(SpendBundle(coin_spends, SpendBundle.aggregate([]).aggregated_signature))
+        error, block_spends = get_spends_for_block(generator, DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM)
+        assert error is None
+        assert block_spends == coin_spends
+        for coin_spend in coin_spends:
+            error, puzzle, solution = get_puzzle_and_solution_for_coin(
+                generator, coin_spend.coin.name(), DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM
+            )
+            assert error is None
+            assert puzzle == coin_spend.puzzle_reveal.to_program()
+            assert solution == coin_spend.solution.to_program()
+
+        error, block_spends = get_spends_for_block(generator, 1)
+        assert error is not None and block_spends == []
@@ -8,7 +8,7 @@ from tranzact.consensus.block_rewards import calculate_base_farmer_reward, calcu
 from tranzact.consensus.blockchain import Blockchain, ReceiveBlockResult
 from tranzact.consensus.coinbase import create_farmer_coin, create_pool_coin
 from tranzact.full_node.block_store import BlockStore
-from tranzact.full_node.coin_store import CoinStore
+from tranzact.full_node.coin_store import COIN_NAMES_PER_QUERY, CoinStore
 from tranzact.full_node.hint_store import HintStore
 from tranzact.full_node.mempool_check_conditions import get_name_puzzle_conditions
 from tranzact.types.blockchain_format.coin import Coin
@@ -16,6 +16,7 @@ from tranzact.types.coin_record import CoinRecord
 from tranzact.types.full_block import FullBlock
 from tranzact.types.generator_types import BlockGenerator
 from tranzact.util.generator_tools import tx_removals_and_additions
+from tranzact.util.hash import std_hash
 from tranzact.util.ints import uint64, uint32
 from tests.wallet_tools import WalletTool
 from tests.setup_nodes import bt, test_constants
@@ -186,6 +187,32 @@ class TestCoinStoreWithBlocks:
                         assert record.spent
                         assert record.spent_block_index == block.height
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cache_size", [0, 10, 100000])
+    async def test_get_coin_records(self, cache_size: uint32):
+        async with DBConnection() as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper, cache_size=cache_size)
+            coins = [
+                Coin(std_hash(i.to_bytes(4, "big")), std_hash(b"puzzle hash"), uint64(i + 1))
+                for i in range(COIN_NAMES_PER_QUERY + 100)
+            ]
+            await coin_store.new_block(uint32(0), uint64(1000), set(), coins, [])
+            await coin_store._set_spent([coin.name() for coin in coins[:10]], uint32(1))
+
+            names = [coin.name() for coin in coins]
+            missing = std_hash(b"missing")
+            records = await coin_store.get_coin_records(names[:20] + names + [missing])
+            assert len(records) == len(coins)
+            for name in names:
+                assert records[name] == await coin_store.get_coin_record(name)
+            assert records[names[0]].spent and not records[names[10]].spent
+
+            by_names = await coin_store.get_coin_records_by_names(True, names + [missing])
+            assert sorted(by_names, key=lambda r: r.name) == sorted(records.values(), key=lambda r: r.name)
+            unspent = await coin_store.get_coin_records_by_names(False, names)
+            assert len(unspent) == len(coins) - 10
+            assert await coin_store.get_coin_records([]) == {}
+
     @pytest.mark.asyncio
     @pytest.mark.parametrize("cache_size", [0, 10, 100000])
     async def test_rollback(self, cache_size: uint32):
@@ -0,0 +1,124 @@
+import asyncio
+import random
+import tempfile
+from pathlib import Path
+from typing import List, Set
+
+import aiosqlite
+import pytest
+
+from tranzact.cmds.db_upgrade_func import convert_v1_to_v2
+from tranzact.consensus.coinbase import create_farmer_coin, create_pool_coin
+from tranzact.consensus.default_constants import DEFAULT_CONSTANTS
+from tranzact.full_node.block_store import BlockStore
+from tranzact.full_node.coin_store import CoinStore
+from tranzact.full_node.hint_store import HintStore
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.util.db_version import lookup_db_version
+from tranzact.util.db_wrapper import DBWrapper
+from tranzact.util.ints import uint32, uint64
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+def rand_bytes(num) -> bytes:
+    ret = bytearray(num)
+    for i in range(num):
+        ret[i] = random.getrandbits(8)
+    return bytes(ret)
+
+
+def rand_coin() -> Coin:
+    return Coin(bytes32(rand_bytes(32)), bytes32(rand_bytes(32)), uint64(random.randint(1, 1000000)))
+
+
+def rewards(height: int) -> Set[Coin]:
+    ph = bytes32(rand_bytes(32))
+    return {
+        create_farmer_coin(uint32(height), ph, uint64(250000000), DEFAULT_CONSTANTS.GENESIS_CHALLENGE),
+        create_pool_coin(uint32(height), ph, uint64(1750000000), DEFAULT_CONSTANTS.GENESIS_CHALLENGE),
+    }
+
+
+class TestDbUpgrade:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("db_version", [1, 2])
+    async def test_coin_store(self, db_version: int):
+        random.seed(db_version)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            async with aiosqlite.connect(Path(tmp_dir) / "db.sqlite") as connection:
+                coin_store = await CoinStore.create(DBWrapper(connection, db_version=db_version))
+                coins: List[Coin] = [rand_coin() for _ in range(10)]
+                await coin_store.new_block(uint32(0), uint64(1000), set(), coins, [])
+                await coin_store.new_block(uint32(1), uint64(1001), rewards(1), [], [coins[0].name()])
+                # bypass the cache, to make sure we're reading from the DB
+                coin_store.coin_record_cache.cache.clear()
+
+                record = await coin_store.get_coin_record(coins[0].name())
+                assert record is not None
+                assert record.coin == coins[0]
+                assert record.spent and record.spent_block_index == 1
+                records = await coin_store.get_coin_records_by_puzzle_hash(True, coins[1].puzzle_hash)
+                assert [r.coin for r in records] == [coins[1]]
+                records = await coin_store.get_coin_records_by_parent_ids(False, [c.parent_coin_info for c in coins])
+                assert set(r.coin for r in records) == set(coins[1:])
+                states = await coin_store.get_coin_state_by_ids(True, [coins[0].name()])
+                assert len(states) == 1 and states[0].spent_height == 1
+
+    @pytest.mark.asyncio
+    async def test_convert_v1_to_v2(self):
+        random.seed(42)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            in_file = Path(tmp_dir) / "blockchain_v1.sqlite"
+            out_file = Path(tmp_dir) / "blockchain_v2.sqlite"
+
+            coins: List[Coin] = []
+            hints = []
+            async with aiosqlite.connect(in_file) as connection:
+                db_wrapper = DBWrapper(connection)
+                await BlockStore.create(db_wrapper)
+                coin_store = await CoinStore.create(db_wrapper)
+                hint_store = await HintStore.create(db_wrapper)
+                unspent: List[Coin] = []
+                for height in range(1, 20):
+                    reward_coins = rewards(height)
+                    additions = [rand_coin() for _ in range(20)]
+                    random.shuffle(unspent)
+                    removals = [c.name() for c in unspent[:5]]
+                    unspent = unspent[5:] + additions
+                    coins += additions + list(reward_coins)
+                    await coin_store.new_block(uint32(height), uint64(height * 19), reward_coins, additions, removals)
+                    new_hints = [(c.name(), rand_bytes(32)) for c in additions[:3]]
+                    await hint_store.add_hints(new_hints)
+                    hints += new_hints
+                await connection.commit()
+
+            await convert_v1_to_v2(in_file, out_file)
+
+            async with aiosqlite.connect(in_file) as in_db, aiosqlite.connect(out_file) as out_db:
+                assert await lookup_db_version(in_db) == 1
+                assert await lookup_db_version(out_db) == 2
+                coin_store1 = await CoinStore.create(DBWrapper(in_db, db_version=1))
+                coin_store2 = await CoinStore.create(DBWrapper(out_db, db_version=2))
+                hint_store2 = await HintStore.create(DBWrapper(out_db, db_version=2))
+
+                names = [c.name() for c in coins]
+                records1 = await coin_store1.get_coin_records_by_names(True, names)
+                records2 = await coin_store2.get_coin_records_by_names(True, names)
+                assert len(records1) == len(coins)
+                assert set(records1) == set(records2)
+                for height in range(1, 20):
+                    assert set(await coin_store1.get_coins_removed_at_height(uint32(height))) == set(
+                        await coin_store2.get_coins_removed_at_height(uint32(height))
+                    )
+                for coin_id, hint in hints:
+                    assert await hint_store2.get_coin_ids(hint) == [coin_id]
+
+            # the output file must not be overwritten
+            with pytest.raises(RuntimeError):
+                await convert_v1_to_v2(in_file, out_file)
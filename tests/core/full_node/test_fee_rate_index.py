@@ -0,0 +1,121 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+from blspy import G2Element
+
+from tranzact.consensus.cost_calculator import NPCResult
+from tranzact.full_node.fee_rate_index import FeeRateIndex
+from tranzact.full_node.mempool import Mempool
+from tranzact.types.blockchain_format.program import SerializedProgram
+from tranzact.types.mempool_item import MempoolItem
+from tranzact.types.spend_bundle import SpendBundle
+from tranzact.util.ints import uint64
+
+
+def make_item(idx: int, fee: int, cost: int) -> MempoolItem:
+    return MempoolItem(
+        SpendBundle([], G2Element()),
+        uint64(fee),
+        NPCResult(None, [], uint64(cost)),
+        uint64(cost),
+        idx.to_bytes(32, "big"),
+        [],
+        [],
+        SerializedProgram(),
+    )
+
+
+def slow_min_fee_rate(mempool: Mempool, cost: int) -> float:
+    # Reference implementation, walking all the spends in increasing fee per cost
+    if not mempool.at_full_capacity(cost):
+        return 0
+    current_cost = mempool.total_mempool_cost
+    for fee_per_cost, spends_with_fpc in mempool.sorted_spends.items():
+        for item in spends_with_fpc.values():
+            current_cost -= item.cost
+            if current_cost + cost <= mempool.max_size_in_cost:
+                return fee_per_cost
+    raise ValueError("does not fit")
+
+
+class TestFeeRateIndex:
+    def test_empty(self):
+        index = FeeRateIndex()
+        assert index.total_cost == 0
+        assert index.fee_per_cost_for_cost(1) is None
+        assert list(index.items()) == []
+
+    def test_add_remove(self):
+        index = FeeRateIndex()
+        index.add(2.0, 100)
+        index.add(1.0, 50)
+        index.add(3.0, 10)
+        index.add(2.0, 20)
+        assert index.total_cost == 180
+        assert list(index.items()) == [(1.0, 50), (2.0, 120), (3.0, 10)]
+        assert index.fee_per_cost_for_cost(1) == 1.0
+        assert index.fee_per_cost_for_cost(50) == 1.0
+        assert index.fee_per_cost_for_cost(51) == 2.0
+        assert index.fee_per_cost_for_cost(170) == 2.0
+        assert index.fee_per_cost_for_cost(180) == 3.0
+        assert index.fee_per_cost_for_cost(181) is None
+
+        index.remove(2.0, 100)
+        assert list(index.items()) == [(1.0, 50), (2.0, 20), (3.0, 10)]
+        index.remove(2.0, 20)
+        assert list(index.items()) == [(1.0, 50), (3.0, 10)]
+        assert index.fee_per_cost_for_cost(51) == 3.0
+        index.remove(1.0, 50)
+        index.remove(3.0, 10)
+        assert index.total_cost == 0
+        assert list(index.items()) == []
+
+    def test_random(self):
+        rng = random.Random(1)
+        index = FeeRateIndex()
+        reference: Dict[float, int] = {}
+        entries: List[Tuple[float, int]] = []
+        for i in range(3000):
+            if len(entries) > 0 and rng.random() < 0.4:
+                fee_per_cost, cost = entries.pop(rng.randrange(len(entries)))
+                index.remove(fee_per_cost, cost)
+                reference[fee_per_cost] -= cost
+                if reference[fee_per_cost] == 0:
+                    del reference[fee_per_cost]
+            else:
+                fee_per_cost = float(rng.randrange(50))
+                cost = rng.randrange(1, 1000)
+                entries.append((fee_per_cost, cost))
+                index.add(fee_per_cost, cost)
+                reference[fee_per_cost] = reference.get(fee_per_cost, 0) + cost
+
+            assert list(index.items()) == sorted(reference.items())
+            assert index.total_cost == sum(reference.values())
+            query = rng.randrange(1, index.total_cost + 2)
+            expected: Optional[float] = None
+            cumulative = 0
+            for fee_per_cost, cost in sorted(reference.items()):
+                cumulative += cost
+                if cumulative >= query:
+                    expected = fee_per_cost
+                    break
+            assert index.fee_per_cost_for_cost(query) == expected
+
+
+class TestMempoolMinFeeRate:
+    def test_matches_reference(self):
+        rng = random.Random(2)
+        mempool = Mempool(100000)
+        for i in range(2000):
+            item = make_item(i, rng.randrange(0, 100000), rng.randrange(1, 2000))
+            if item.fee_per_cost <= mempool.get_min_fee_rate(item.cost):
+                continue
+            mempool.add_to_pool(item)
+            assert mempool.total_mempool_cost <= mempool.max_size_in_cost
+            assert mempool.fee_rate_index.total_cost == mempool.total_mempool_cost
+            for cost in (1, 500, 5000, 100000):
+                assert mempool.get_min_fee_rate(cost) == slow_min_fee_rate(mempool, cost)
+
+        with pytest.raises(ValueError):
+            mempool.get_min_fee_rate(mempool.max_size_in_cost + 1)
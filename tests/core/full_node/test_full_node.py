@@ -1146,10 +1146,17 @@ class TestFullNodeProtocol:
         )
         assert res.type == ProtocolMessageTypes.reject_blocks.value
 
-        # Try fetching more blocks than constants.MAX_BLOCK_COUNT_PER_REQUESTS
-        res = await full_node_1.request_blocks(fnp.RequestBlocks(uint32(0), uint32(33), False))
+        # Try fetching more blocks than the configured max_request_blocks
+        max_request_blocks = full_node_1.full_node.config["max_request_blocks"]
+        res = await full_node_1.request_blocks(fnp.RequestBlocks(uint32(0), uint32(max_request_blocks + 1), False))
         assert res.type == ProtocolMessageTypes.reject_blocks.value
 
+        # More blocks than constants.MAX_BLOCK_COUNT_PER_REQUESTS are served in one response
+        assert peak_height > 33
+        res = await full_node_1.request_blocks(fnp.RequestBlocks(uint32(0), uint32(peak_height), True))
+        fetched_blocks = fnp.RespondBlocks.from_bytes(res.data).blocks
+        assert [b.header_hash for b in fetched_blocks] == [b.header_hash for b in blocks_t[: peak_height + 1]]
+
         # Ask without transactions
         res = await full_node_1.request_blocks(fnp.RequestBlocks(uint32(peak_height - 5), uint32(peak_height), False))
 
@@ -4,7 +4,7 @@ import pytest
 from clvm.casts import int_to_bytes
 
 from tranzact.consensus.blockchain import Blockchain
-from tranzact.full_node.hint_store import HintStore
+from tranzact.full_node.hint_store import HINTS_PER_QUERY, HintStore
 from tranzact.types.blockchain_format.coin import Coin
 from tranzact.types.condition_opcodes import ConditionOpcode
 from tranzact.types.condition_with_args import ConditionWithArgs
@@ -50,6 +50,52 @@ class TestHintStore:
             coins_for_non_hint = await hint_store.get_coin_ids(not_existing_hint)
             assert coins_for_non_hint == []
 
+            coins_for_hints = await hint_store.get_coin_ids_multi([hint_0, hint_1, not_existing_hint])
+            assert set(coins_for_hints) == {coin_id_0, coin_id_1, coin_id_2}
+            assert await hint_store.get_coin_ids_multi([]) == []
+
+    @pytest.mark.asyncio
+    async def test_duplicate_and_many_hints(self):
+        async with DBConnection() as db_wrapper:
+            hint_store = await HintStore.create(db_wrapper)
+            hints = [(i.to_bytes(32, "big"), (i % 1500).to_bytes(32, "big")) for i in range(3000)]
+            await hint_store.add_hints(hints)
+            # adding the same hints again, as when a block is re-added after a reorg, is ignored
+            await hint_store.add_hints(hints[:10])
+            await db_wrapper.commit_transaction()
+
+            assert set(await hint_store.get_coin_ids(hints[0][1])) == {hints[0][0], hints[1500][0]}
+            all_hints = [(i % 1500).to_bytes(32, "big") for i in range(HINTS_PER_QUERY * 2)]
+            coin_ids = await hint_store.get_coin_ids_multi(all_hints)
+            assert len(coin_ids) == len(set(coin_ids)) == 3000
+
+    @pytest.mark.asyncio
+    async def test_migrate_rowid_table(self):
+        async with DBConnection() as db_wrapper:
+            db = db_wrapper.db
+            await db.execute("CREATE TABLE hints(id INTEGER PRIMARY KEY AUTOINCREMENT, coin_id blob,  hint blob)")
+            await db.execute("CREATE INDEX hint_index on hints(hint)")
+            hint_0 = 32 * b"\0"
+            coin_id_0 = 32 * b"\4"
+            coin_id_1 = 32 * b"\5"
+            rows = [(None, coin_id_0, hint_0), (None, coin_id_1, hint_0), (None, coin_id_0, hint_0)]
+            await db.executemany("INSERT INTO hints VALUES(?, ?, ?)", rows)
+            await db.commit()
+
+            hint_store = await HintStore.create(db_wrapper)
+            assert sorted(await hint_store.get_coin_ids(hint_0)) == [coin_id_0, coin_id_1]
+
+            cursor = await db.execute("SELECT type, name, sql from sqlite_master WHERE tbl_name='hints'")
+            schema = await cursor.fetchall()
+            await cursor.close()
+            # hint_index is gone, the primary key is the table itself
+            assert [(row[0], row[1]) for row in schema] == [("table", "hints")]
+            assert "WITHOUT ROWID" in schema[0][2]
+
+            # opening it again leaves it as it is
+            hint_store = await HintStore.create(db_wrapper)
+            assert sorted(await hint_store.get_coin_ids(hint_0)) == [coin_id_0, coin_id_1]
+
     @pytest.mark.asyncio
     async def test_hints_in_blockchain(self, empty_blockchain):  # noqa: F811
         blockchain: Blockchain = empty_blockchain
@@ -0,0 +1,72 @@
+from tranzact.full_node.subscriptions import PeerSubscriptions
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.coin_record import CoinRecord
+from tranzact.util.hash import std_hash
+from tranzact.util.ints import uint32, uint64
+
+peer_1 = std_hash(b"peer 1")
+peer_2 = std_hash(b"peer 2")
+ph_1 = std_hash(b"puzzle hash 1")
+ph_2 = std_hash(b"puzzle hash 2")
+ph_3 = std_hash(b"puzzle hash 3")
+
+
+def make_record(puzzle_hash: bytes32, parent: bytes32 = bytes32(b"\0" * 32)) -> CoinRecord:
+    return CoinRecord(Coin(parent, puzzle_hash, uint64(1)), uint32(1), uint32(0), False, False, uint64(0))
+
+
+class TestPeerSubscriptions:
+    def test_add_and_remove(self):
+        subscriptions = PeerSubscriptions(100, 1000)
+        assert subscriptions.add_ph_subscriptions(peer_1, [ph_1, ph_2, ph_1]) == 2
+        assert subscriptions.add_ph_subscriptions(peer_1, [ph_1]) == 0
+        assert subscriptions.add_ph_subscriptions(peer_2, [ph_2]) == 1
+        assert subscriptions.add_coin_subscriptions(peer_2, [ph_3]) == 1
+        assert subscriptions.subscription_count() == 4
+        assert subscriptions.peer_subscription_count(peer_1) == 2
+        assert subscriptions.peer_subscription_count(peer_2) == 2
+        assert list(subscriptions.peers_for_puzzle_hash(ph_1)) == [peer_1]
+        assert set(subscriptions.peers_for_puzzle_hash(ph_2)) == {peer_1, peer_2}
+        assert list(subscriptions.peers_for_coin_id(ph_3)) == [peer_2]
+        assert not subscriptions.has_coin_subscription(ph_1)
+
+        subscriptions.remove_peer(peer_1)
+        assert not subscriptions.has_ph_subscription(ph_1)
+        assert list(subscriptions.peers_for_puzzle_hash(ph_2)) == [peer_2]
+        assert subscriptions.subscription_count() == 2
+
+        subscriptions.remove_peer(peer_2)
+        assert not subscriptions.has_ph_subscription(ph_2)
+        assert not subscriptions.has_coin_subscription(ph_3)
+        assert subscriptions.subscription_count() == 0
+
+    def test_limits(self):
+        subscriptions = PeerSubscriptions(3, 5)
+        assert subscriptions.add_ph_subscriptions(peer_1, [ph_1, ph_2]) == 2
+        assert subscriptions.add_coin_subscriptions(peer_1, [ph_1, ph_2]) == 1
+        assert subscriptions.peer_subscription_count(peer_1) == 3
+        assert subscriptions.add_ph_subscriptions(peer_2, [ph_1, ph_2, ph_3]) == 2
+        assert subscriptions.subscription_count() == 5
+
+        # Removing a peer makes room for others
+        subscriptions.remove_peer(peer_1)
+        assert subscriptions.add_ph_subscriptions(peer_2, [ph_3]) == 1
+
+    def test_changes_for_peers(self):
+        subscriptions = PeerSubscriptions(100, 1000)
+        subscriptions.add_ph_subscriptions(peer_1, [ph_1])
+        subscriptions.add_ph_subscriptions(peer_2, [ph_1, ph_2])
+
+        record_1 = make_record(ph_1)
+        record_2 = make_record(ph_2)
+        record_3 = make_record(ph_3)
+        subscriptions.add_coin_subscriptions(peer_1, [record_3.name])
+        hinted = make_record(ph_3, std_hash(b"parent"))
+
+        changes = subscriptions.changes_for_peers(([record_1, record_2, record_3], {ph_2: {hinted.name: hinted}}))
+        assert changes == {
+            peer_1: {record_1.coin_state, record_3.coin_state},
+            peer_2: {record_1.coin_state, record_2.coin_state, hinted.coin_state},
+        }
+        assert subscriptions.changes_for_peers(([make_record(std_hash(b"other"))], {})) == {}
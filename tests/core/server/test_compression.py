@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from tranzact.protocols.protocol_message_types import ProtocolMessageTypes
+from tranzact.protocols.shared_protocol import Capability
+from tranzact.server.compression import ALGORITHMS, MAX_DECOMPRESSED_SIZE, RAW_FRAME, MessageCompression
+from tranzact.server.outbound_message import Message, NodeType, make_msg
+from tranzact.server.ws_connection import WSTranzactConnection
+from tranzact.util.ints import uint8, uint16
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+log = logging.getLogger(__name__)
+
+
+def make_connection(compression: MessageCompression) -> WSTranzactConnection:
+    transport = SimpleNamespace(get_extra_info=lambda name: ("127.0.0.1", 8444))
+    ws = SimpleNamespace(_writer=SimpleNamespace(transport=transport))
+    return WSTranzactConnection(
+        NodeType.FULL_NODE,
+        ws,
+        8444,
+        log,
+        True,
+        False,
+        "127.0.0.1",
+        asyncio.Queue(),
+        lambda *args: None,
+        None,
+        100,
+        30,
+        compression=compression,
+    )
+
+
+class TestMessageCompression:
+    def test_negotiate(self):
+        compression = MessageCompression(["zstd", "lz4", "zlib"], 1024)
+        assert compression.algorithms[-1] == "zlib"
+        assert compression.capability() == (
+            uint16(Capability.MESSAGE_COMPRESSION.value),
+            ",".join(compression.algorithms),
+        )
+
+        base = (uint16(Capability.BASE.value), "1")
+        assert compression.negotiate([base]) is None
+        assert compression.negotiate([base, (uint16(Capability.MESSAGE_COMPRESSION.value), "brotli")]) is None
+        negotiated = compression.negotiate([base, (uint16(Capability.MESSAGE_COMPRESSION.value), "brotli,zlib")])
+        assert negotiated is not None and negotiated.name == "zlib"
+
+    def test_from_config(self):
+        assert MessageCompression.from_config({}) is None
+        assert MessageCompression.from_config({"message_compression": {"enabled": False}}) is None
+        compression = MessageCompression.from_config({"message_compression": {"enabled": True, "threshold": 10}})
+        assert compression is not None
+        assert compression.threshold == 10
+
+    @pytest.mark.parametrize("name", sorted(ALGORITHMS.keys()))
+    def test_roundtrip(self, name):
+        algorithm = ALGORITHMS[name]
+        data = bytes(range(256)) * 1000
+        compressed = algorithm.compress(data)
+        assert len(compressed) < len(data)
+        assert algorithm.decompress(compressed) == data
+        with pytest.raises(Exception):
+            algorithm.decompress(compressed[:-10])
+
+    def test_zlib_size_limit(self):
+        with pytest.raises(ValueError):
+            ALGORITHMS["zlib"].decompress(zlib.compress(bytes(MAX_DECOMPRESSED_SIZE + 1)))
+
+    @pytest.mark.asyncio
+    async def test_frames(self):
+        compression = MessageCompression(["zlib"], 1024)
+        connection = make_connection(compression)
+
+        # Without a negotiated algorithm, frames are plain messages
+        small = make_msg(ProtocolMessageTypes.new_peak, bytes(100))
+        large = Message(uint8(ProtocolMessageTypes.respond_blocks.value), uint16(7), bytes(100000))
+        assert await connection._encode_frame(large) == bytes(large)
+        assert await connection._decode_frame(bytes(large)) == large
+
+        connection.peer_compression = ALGORITHMS["zlib"]
+        frame = await connection._encode_frame(small)
+        assert frame == bytes([RAW_FRAME]) + bytes(small)
+        assert await connection._decode_frame(frame) == small
+
+        frame = await connection._encode_frame(large)
+        assert frame[0] == ALGORITHMS["zlib"].frame_id
+        assert len(frame) < len(bytes(large)) // 10
+        assert await connection._decode_frame(frame) == large
+
+        stats = compression.stats.to_json_dict()
+        assert stats["sent"]["respond_blocks"]["messages"] == 1
+        assert stats["sent"]["respond_blocks"]["message_bytes"] == len(bytes(large))
+        assert stats["sent"]["respond_blocks"]["wire_bytes"] == len(frame)
+        for key in ["messages", "message_bytes", "wire_bytes"]:
+            assert stats["received"]["respond_blocks"][key] == stats["sent"]["respond_blocks"][key]
+        assert "new_peak" not in stats["sent"]
+
+        # An algorithm we did not advertise is rejected
+        with pytest.raises(Exception):
+            await connection._decode_frame(bytes([255]) + frame[1:])
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from tranzact.server.metrics import DURATION_BUCKETS, Histogram, P2PMetrics, TimedQueue
+from tranzact.server.outbound_message import NodeType
+from tranzact.server.ws_connection import WSTranzactConnection
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+log = logging.getLogger(__name__)
+
+
+def make_connection(peer_node_id: bytes32) -> WSTranzactConnection:
+    transport = SimpleNamespace(get_extra_info=lambda name: ("127.0.0.1", 8444))
+    ws = SimpleNamespace(_writer=SimpleNamespace(transport=transport))
+    connection = WSTranzactConnection(
+        NodeType.FULL_NODE,
+        ws,
+        8444,
+        log,
+        True,
+        False,
+        "127.0.0.1",
+        asyncio.Queue(),
+        lambda *args: None,
+        peer_node_id,
+        100,
+        30,
+    )
+    connection.connection_type = NodeType.WALLET
+    return connection
+
+
+class TestP2PMetrics:
+    def test_histogram(self):
+        histogram = Histogram((1, 10))
+        for value in [0.5, 1, 2, 10, 11]:
+            histogram.observe(value)
+        assert histogram.cumulative_counts() == [("1", 2), ("10", 4), ("+Inf", 5)]
+        assert histogram.to_json_dict() == {"count": 5, "sum": 24.5, "buckets": {"1": 2, "10": 4, "+Inf": 5}}
+
+    @pytest.mark.asyncio
+    async def test_timed_queue(self):
+        queue = TimedQueue()
+        await queue.put(("message", "connection"))
+        await asyncio.sleep(0.05)
+        item, wait = await queue.get_with_wait()
+        assert item == ("message", "connection")
+        assert wait >= 0.04
+        assert queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_snapshots(self):
+        metrics = P2PMetrics.from_config({"p2p_metrics": {"slow_handler_seconds": 2}})
+        assert not metrics.is_slow(1.9)
+        assert metrics.is_slow(2)
+
+        metrics.observe_message("request_blocks", "full_node", 0.002, 0.3, 1000)
+        metrics.observe_message("request_blocks", "full_node", 0.02, 3, 5000)
+        metrics.observe_message("new_peak", "wallet", 0.0, 0.0005, None)
+
+        connection = make_connection(bytes32(b"\x01" * 32))
+        await connection.outgoing_queue.put(None)
+        data = metrics.to_json_dict(3, [connection])
+        handler = data["histograms"]["handler_seconds"]["request_blocks"]["full_node"]
+        assert handler["count"] == 2
+        assert handler["sum"] == 3.3
+        assert len(handler["buckets"]) == len(DURATION_BUCKETS) + 1
+        assert handler["buckets"]["0.5"] == 1
+        assert handler["buckets"]["+Inf"] == 2
+        assert "new_peak" not in data["histograms"]["response_bytes"]
+        assert data["histograms"]["response_bytes"]["request_blocks"]["full_node"]["sum"] == 6000
+        assert data["incoming_queue_size"] == 3
+        assert data["outgoing_queue_sizes"] == [
+            {"node_id": "01" * 32, "peer_host": "127.0.0.1", "peer_port": 8444, "peer_type": "wallet", "size": 1}
+        ]
+
+        text = metrics.to_prometheus(3, [connection])
+        assert "# TYPE tranzact_p2p_handler_seconds histogram" in text
+        assert (
+            'tranzact_p2p_handler_seconds_bucket{message_type="request_blocks",peer_type="full_node",le="+Inf"} 2'
+            in text
+        )
+        assert 'tranzact_p2p_queue_wait_seconds_count{message_type="new_peak",peer_type="wallet"} 1' in text
+        assert "tranzact_p2p_incoming_queue_size 3" in text
+        assert (
+            f'tranzact_p2p_outgoing_queue_size{{node_id="{"01" * 32}",peer="127.0.0.1:8444",peer_type="wallet"}} 1'
+            in text
+        )
@@ -1,10 +1,13 @@
 import asyncio
+import logging
+from types import SimpleNamespace
 
 import pytest
 
 from tranzact.protocols.protocol_message_types import ProtocolMessageTypes
-from tranzact.server.outbound_message import make_msg
+from tranzact.server.outbound_message import NodeType, make_msg
 from tranzact.server.rate_limits import RateLimiter, NON_TX_FREQ
+from tranzact.server.ws_connection import WSTranzactConnection
 from tests.setup_nodes import test_constants
 
 
@@ -16,6 +19,8 @@ def event_loop():
 
 constants = test_constants
 
+log = logging.getLogger(__name__)
+
 
 class TestRateLimits:
     @pytest.mark.asyncio
@@ -261,3 +266,81 @@ class TestRateLimits:
 
         new_signatures_message = make_msg(ProtocolMessageTypes.respond_signatures, bytes([1]))
         assert not r.process_msg_and_check(new_signatures_message)
+
+    @pytest.mark.asyncio
+    async def test_smooth_refill(self):
+        r = RateLimiter(True, 1)
+        new_peak_message = make_msg(ProtocolMessageTypes.new_peak, bytes([1] * 40))
+        for i in range(200):
+            assert r.process_msg_and_check(new_peak_message)
+        assert not r.process_msg_and_check(new_peak_message)
+
+        # A quarter of the period gives back about a quarter of the budget, not all or nothing
+        await asyncio.sleep(0.25)
+        passed = 0
+        for i in range(200):
+            if r.process_msg_and_check(new_peak_message):
+                passed += 1
+        assert 40 <= passed <= 100
+
+    @pytest.mark.asyncio
+    async def test_multiplier(self):
+        r = RateLimiter(False)
+        r.set_multiplier(4)
+        new_peers_message = make_msg(ProtocolMessageTypes.respond_peers, bytes([1]))
+        passed = 0
+        for i in range(100):
+            if r.process_msg_and_check(new_peers_message):
+                passed += 1
+        assert passed == 40
+
+        # Buckets which already exist are scaled too
+        r.set_multiplier(1)
+        assert not r.process_msg_and_check(new_peers_message)
+        assert r.buckets[ProtocolMessageTypes.respond_peers.value].count_capacity == 10
+
+    @pytest.mark.asyncio
+    async def test_seconds_until_allowed(self):
+        r = RateLimiter(False, 60)
+        new_peers_message = make_msg(ProtocolMessageTypes.respond_peers, bytes([1]))
+        assert r.seconds_until_allowed(new_peers_message) == 0
+        for i in range(10):
+            assert r.process_msg_and_check(new_peers_message)
+        # One message out of 10 per minute
+        assert 5 < r.seconds_until_allowed(new_peers_message) <= 6
+
+        too_large = make_msg(ProtocolMessageTypes.respond_peers, bytes([1] * 2 * 1024 * 1024))
+        assert r.seconds_until_allowed(too_large) is None
+
+    @pytest.mark.asyncio
+    async def test_delayed_send(self):
+        transport = SimpleNamespace(get_extra_info=lambda name: ("1.2.3.4", 8444))
+        ws = SimpleNamespace(_writer=SimpleNamespace(transport=transport))
+        connection = WSTranzactConnection(
+            NodeType.FULL_NODE,
+            ws,
+            8444,
+            log,
+            True,
+            False,
+            "1.2.3.4",
+            asyncio.Queue(),
+            lambda *args: None,
+            None,
+            100,
+            30,
+        )
+        connection.outbound_rate_limiter = RateLimiter(False, 1)
+        message = make_msg(ProtocolMessageTypes.request_mempool_transactions, bytes([1]))
+        for i in range(5):
+            assert connection.outbound_rate_limiter.process_msg_and_check(message)
+
+        # The rate limited messages are put back in the outgoing queue once there is budget for them
+        await connection._send_message(message)
+        await connection._send_message(message)
+        assert len(connection.delayed_messages) == 2
+        assert connection.outgoing_queue.empty()
+        assert await asyncio.wait_for(connection.outgoing_queue.get(), 1) == message
+        assert await asyncio.wait_for(connection.outgoing_queue.get(), 1) == message
+        assert len(connection.delayed_messages) == 0
+        await connection.delayed_send_task
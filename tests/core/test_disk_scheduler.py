@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from tranzact.harvester.disk_scheduler import DiskScheduler, LatencyHistogram, LookupPriority
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+class TestDiskScheduler:
+    @pytest.mark.asyncio
+    async def test_concurrency_per_disk(self):
+        lock = threading.Lock()
+        running = {1: 0, 2: 0}
+        max_running = {1: 0, 2: 0}
+
+        def lookup(device_id: int) -> int:
+            with lock:
+                running[device_id] += 1
+                max_running[device_id] = max(max_running[device_id], running[device_id])
+            time.sleep(0.01)
+            with lock:
+                running[device_id] -= 1
+            return device_id
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            scheduler = DiskScheduler(executor, 2)
+            results = await asyncio.gather(
+                *[scheduler.run(d, LookupPriority.QUALITY, lookup, d) for d in [1, 2] for _ in range(10)]
+            )
+        assert results == [1] * 10 + [2] * 10
+        assert max_running == {1: 2, 2: 2}
+        latencies = scheduler.get_latencies()
+        assert set(latencies.keys()) == {"1", "2"}
+        assert latencies["1"]["quality"]["count"] == 10
+        assert latencies["1"]["full_proof"]["count"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_proofs_first(self):
+        order: List[str] = []
+        release = threading.Event()
+
+        def lookup(name: str) -> None:
+            if name == "blocker":
+                release.wait()
+            order.append(name)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            scheduler = DiskScheduler(executor, 1)
+            tasks = [asyncio.create_task(scheduler.run(0, LookupPriority.QUALITY, lookup, "blocker"))]
+            await asyncio.sleep(0.01)
+            tasks += [asyncio.create_task(scheduler.run(0, LookupPriority.QUALITY, lookup, f"q{i}")) for i in range(3)]
+            tasks.append(asyncio.create_task(scheduler.run(0, LookupPriority.FULL_PROOF, lookup, "proof")))
+            await asyncio.sleep(0.01)
+            release.set()
+            await asyncio.gather(*tasks)
+        assert order == ["blocker", "proof", "q0", "q1", "q2"]
+
+    @pytest.mark.asyncio
+    async def test_exception(self):
+        def lookup() -> None:
+            raise ValueError("bad plot")
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            scheduler = DiskScheduler(executor, 1)
+            with pytest.raises(ValueError):
+                await scheduler.run(0, LookupPriority.QUALITY, lookup)
+            # The slot of the failed lookup is released
+            assert await scheduler.run(0, LookupPriority.QUALITY, lambda: 5) == 5
+
+    def test_histogram(self):
+        histogram = LatencyHistogram()
+        for duration in [0.001, 0.07, 0.07, 100]:
+            histogram.add(duration)
+        data = histogram.to_json_dict()
+        assert data["count"] == 4
+        assert data["counts"][0] == 1
+        assert data["counts"][2] == 2
+        assert data["counts"][-1] == 1
+        assert data["max"] == 100
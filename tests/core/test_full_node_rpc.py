@@ -200,6 +200,11 @@ class TestRpc:
             assert NodeType(connections[0]["type"]) == NodeType.FULL_NODE.value
             assert len(await client.get_connections(NodeType.FULL_NODE)) == 1
             assert len(await client.get_connections(NodeType.FARMER)) == 0
+
+            metrics = await client.get_p2p_metrics()
+            assert set(metrics["histograms"].keys()) == {"queue_wait_seconds", "handler_seconds", "response_bytes"}
+            assert metrics["outgoing_queue_sizes"][0]["node_id"] == connections[0]["node_id"].hex()
+            assert metrics["outgoing_queue_sizes"][0]["peer_type"] == "full_node"
             await client.close_connection(connections[0]["node_id"])
             await time_out_assert(10, num_connections, 0)
         finally:
@@ -0,0 +1,45 @@
+from pathlib import Path
+from secrets import token_bytes
+
+from tranzact.consensus.default_constants import DEFAULT_CONSTANTS
+from tranzact.plotting.plot_filter_index import PlotFilterIndex, filter_plot_ids
+from tranzact.types.blockchain_format.proof_of_space import ProofOfSpace
+
+
+class TestPlotFilterIndex:
+    def test_same_as_passes_plot_filter(self):
+        plot_ids = [token_bytes(32) for _ in range(5000)]
+        for zero_bits in [1, 8, 9, 12]:
+            constants = DEFAULT_CONSTANTS.replace(NUMBER_ZERO_BITS_PLOT_FILTER=zero_bits)
+            challenge_hash = token_bytes(32)
+            sp_hash = token_bytes(32)
+            expected = [
+                i
+                for i, plot_id in enumerate(plot_ids)
+                if ProofOfSpace.passes_plot_filter(constants, plot_id, challenge_hash, sp_hash)
+            ]
+            assert filter_plot_ids(b"".join(plot_ids), challenge_hash, sp_hash, zero_bits) == expected
+
+    def test_add_remove(self):
+        index = PlotFilterIndex()
+        plots = {Path(f"plot-{i}.plot"): token_bytes(32) for i in range(10)}
+        for path, plot_id in plots.items():
+            index.add(path, plot_id)
+        assert len(index) == 10
+        # With no filter bits, every plot passes
+        assert set(index.passing_paths(token_bytes(32), token_bytes(32), 0)) == set(plots.keys())
+
+        for i in [0, 9, 4]:
+            index.remove(Path(f"plot-{i}.plot"))
+            del plots[Path(f"plot-{i}.plot")]
+        index.remove(Path("unknown.plot"))
+        # Adding a known path replaces its plot id
+        plots[Path("plot-5.plot")] = token_bytes(32)
+        index.add(Path("plot-5.plot"), plots[Path("plot-5.plot")])
+        assert len(index) == 7
+
+        paths = list(plots.keys())
+        challenge_hash = token_bytes(32)
+        sp_hash = token_bytes(32)
+        expected = [paths[i] for i in filter_plot_ids(b"".join(plots[p] for p in paths), challenge_hash, sp_hash, 1)]
+        assert set(index.passing_paths(challenge_hash, sp_hash, 1)) == set(expected)
@@ -1,7 +1,47 @@
+import asyncio
 import unittest
-from blspy import AugSchemeMPL, G1Element
+from typing import List
+
+from blspy import AugSchemeMPL, G1Element, G2Element
+from tranzact.consensus.default_constants import DEFAULT_CONSTANTS
+from tranzact.full_node.mempool_manager import MempoolManager, init_validation_process, validate_clvm_and_signature
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.program import Program, SerializedProgram
+from tranzact.types.coin_spend import CoinSpend
+from tranzact.types.condition_opcodes import ConditionOpcode
+from tranzact.types.spend_bundle import SpendBundle
 from tranzact.util import cached_bls
+from tranzact.util.errors import Err
+from tranzact.util.hash import std_hash
+from tranzact.util.ints import uint64
 from tranzact.util.lru_cache import LRUCache
+from tranzact.util.shared_pairing_cache import WAYS, SHARED_MEMORY_AVAILABLE, SharedPairingCache
+
+
+def make_signatures(n_keys: int):
+    sks = [AugSchemeMPL.key_gen(b"b" * 31 + bytes([i])) for i in range(n_keys)]
+    pks = [bytes(sk.get_g1()) for sk in sks]
+    msgs = [("msg-%d" % (i,)).encode() for i in range(n_keys)]
+    sigs = [AugSchemeMPL.sign(sk, msg) for sk, msg in zip(sks, msgs)]
+    return pks, msgs, sigs
+
+
+def make_spend_bundle(pks: List[bytes], msgs: List[bytes], sig: G2Element) -> bytes:
+    # A coin whose puzzle returns an AGG_SIG_UNSAFE condition for each pk and msg
+    conditions = Program.to([[ConditionOpcode.AGG_SIG_UNSAFE, pk, msg] for pk, msg in zip(pks, msgs)])
+    puzzle = Program.to((1, conditions))
+    coin = Coin(std_hash(b"parent"), puzzle.get_tree_hash(), uint64(1))
+    coin_spend = CoinSpend(coin, SerializedProgram.from_program(puzzle), SerializedProgram.from_program(Program.to(0)))
+    return bytes(SpendBundle([coin_spend], sig))
+
+
+def validate_spend_bundle(spend_bundle_bytes: bytes):
+    return validate_clvm_and_signature(
+        spend_bundle_bytes,
+        DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM,
+        DEFAULT_CONSTANTS.COST_PER_BYTE,
+        DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA,
+    )
 
 
 class TestCachedBLS(unittest.TestCase):
@@ -38,3 +78,107 @@ class TestCachedBLS(unittest.TestCase):
         assert cached_bls.aggregate_verify(pks_half, msgs_half, agg_sig_half, False, local_cache)
         # Verify more messages (partial cache hit)
         assert cached_bls.aggregate_verify(pks, msgs, agg_sig, False, local_cache)
+
+
+@unittest.skipUnless(SHARED_MEMORY_AVAILABLE, "requires multiprocessing.shared_memory")
+class TestSharedPairingCache(unittest.TestCase):
+    def test_eviction_and_stats(self):
+        pks, msgs, sigs = make_signatures(1)
+        pairing = G1Element.from_bytes(pks[0]).pair(AugSchemeMPL.g2_from_message(pks[0] + msgs[0]))
+        cache = SharedPairingCache.create(WAYS)
+        try:
+            assert cache.capacity == WAYS and len(cache) == 0
+            keys = [bytes(std_hash(bytes([i]))) for i in range(WAYS + 2)]
+            assert cache.get(keys[0]) is None
+            for key in keys[:WAYS]:
+                cache.put(key, pairing)
+            cache.put(keys[0], pairing)
+            assert len(cache) == WAYS
+            assert cache.get(keys[1]) == pairing
+
+            # keys[0] is evicted, keys[1] was hit so keys[2] is evicted next
+            cache.put(keys[WAYS], pairing)
+            cache.put(keys[WAYS + 1], pairing)
+            assert len(cache) == WAYS
+            assert cache.get(keys[0]) is None
+            assert cache.get(keys[1]) == pairing
+            assert cache.get(keys[2]) is None
+            assert cache.get(keys[WAYS + 1]) == pairing
+
+            stats = cache.stats()
+            assert stats["entries"] == WAYS
+            assert (stats["hits"], stats["misses"]) == (3, 3)
+            assert stats["hit_rate"] == 0.5
+            assert (stats["inserts"], stats["evictions"]) == (WAYS + 2, 2)
+        finally:
+            cache.close()
+
+    def test_shared_with_workers(self):
+        pks, msgs, sigs = make_signatures(6)
+
+        async def validate(manager: MempoolManager, start: int, end: int) -> None:
+            bundle_bytes = make_spend_bundle(pks[start:end], msgs[start:end], AugSchemeMPL.aggregate(sigs[start:end]))
+            bundle = SpendBundle.from_bytes(bundle_bytes)
+            await manager.pre_validate_spendbundle(bundle, bundle_bytes, bundle.name())
+
+        async def run() -> None:
+            # Two full nodes in the same process, each with its own cache
+            caches = [SharedPairingCache.create(100), SharedPairingCache.create(100)]
+            managers = [MempoolManager(None, DEFAULT_CONSTANTS, cache) for cache in caches]
+            try:
+                # The validation processes add the pairings they validate to the cache of their manager
+                for start in range(0, 6, 2):
+                    await validate(managers[0], start, start + 2)
+                assert len(caches[0]) == 6 and len(caches[1]) == 0
+
+                # The parent validates the aggregate of all of them from the cache only
+                stats = caches[0].stats()
+                assert cached_bls.aggregate_verify(pks, msgs, AugSchemeMPL.aggregate(sigs), False, caches[0])
+                assert caches[0].stats()["hits"] == stats["hits"] + 6
+                assert caches[0].stats()["inserts"] == 6
+                assert not cached_bls.aggregate_verify(pks, msgs, sigs[0], False, caches[0])
+
+                # Stopping one node does not affect the cache of the other
+                managers[0].shut_down()
+                caches[0].close()
+                await validate(managers[1], 0, 2)
+                assert len(caches[1]) == 2
+                assert cached_bls.aggregate_verify(
+                    pks[:2], msgs[:2], AugSchemeMPL.aggregate(sigs[:2]), False, caches[1]
+                )
+            finally:
+                managers[1].shut_down()
+                caches[1].close()
+
+        # Not asyncio.run, which unsets the event loop of the thread used by the other test modules
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+    def test_invalid_bundle_not_cached(self):
+        pks, msgs, sigs = make_signatures(4)
+        cache = SharedPairingCache.create(100)
+        # As in a validation process of a MempoolManager
+        init_validation_process(cache.handle())
+        try:
+            # Pairings of a bundle with a bad signature are not added
+            bad_sig = AugSchemeMPL.aggregate(sigs[1:])
+            err, _, new_cache_entries = validate_spend_bundle(make_spend_bundle(pks[:3], msgs[:3], bad_sig))
+            assert err == Err.BAD_AGGREGATE_SIGNATURE
+            assert cache.stats()["inserts"] == 0 and len(cache) == 0
+
+            err, _, new_cache_entries = validate_spend_bundle(
+                make_spend_bundle(pks[:3], msgs[:3], AugSchemeMPL.aggregate(sigs[:3]))
+            )
+            assert err is None and new_cache_entries == {}
+            assert cache.stats()["inserts"] == 3
+
+            # Only the new pairing is added, the others are read from the shared cache
+            err, _, _ = validate_spend_bundle(make_spend_bundle(pks, msgs, AugSchemeMPL.aggregate(sigs)))
+            assert err is None
+            assert cache.stats()["inserts"] == 4 and len(cache) == 4
+        finally:
+            init_validation_process(None)
+            cache.close()
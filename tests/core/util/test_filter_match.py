@@ -0,0 +1,23 @@
+from secrets import token_bytes
+
+from chiabip158 import PyBIP158
+
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.util.filter_match import filter_matches
+
+
+class TestFilterMatch:
+    def test_same_as_match(self):
+        in_filter = [bytes32(token_bytes(32)) for _ in range(50)]
+        tx_filter = PyBIP158([bytearray(item) for item in in_filter])
+        for num_items in [0, 1, 2, 7, 1000]:
+            for num_matching in [0, 1, 3, 50]:
+                items = [bytes32(token_bytes(32)) for _ in range(num_items)]
+                for i, item in enumerate(in_filter[: min(num_matching, num_items)]):
+                    items[(i * 7919) % num_items] = item
+                expected = [item for item in items if tx_filter.Match(bytearray(item))]
+                assert filter_matches(tx_filter, items) == expected
+
+    def test_empty_filter(self):
+        tx_filter = PyBIP158([])
+        assert filter_matches(tx_filter, [bytes32(token_bytes(32)) for _ in range(10)]) == []
@@ -3,18 +3,20 @@ from dataclasses import dataclass
 from typing import List, Optional, Tuple
 import io
 
+from blspy import AugSchemeMPL, G1Element, G2Element
 from clvm_tools import binutils
 from pytest import raises
 
 from tranzact.protocols.wallet_protocol import RespondRemovals
 from tranzact.types.blockchain_format.coin import Coin
-from tranzact.types.blockchain_format.program import Program
+from tranzact.types.blockchain_format.program import Program, SerializedProgram
 from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.types.full_block import FullBlock
 from tranzact.types.weight_proof import SubEpochChallengeSegment
-from tranzact.util.ints import uint8, uint32
+from tranzact.util.ints import int8, int64, int512, uint8, uint32, uint128
 from tranzact.util.streamable import (
     Streamable,
+    get_field_offsets_function,
     streamable,
     parse_bool,
     parse_uint32,
@@ -206,6 +208,104 @@ class TestStreamable(unittest.TestCase):
 
         assert A.from_bytes(bytes(A())) == A()
 
+    def test_compiled_same_as_generic(self):
+        @dataclass(frozen=True)
+        @streamable
+        class TestClassAll(Streamable):
+            a: uint8
+            b: int8
+            c: int64
+            d: uint128
+            e: int512
+            f: bool
+            g: bytes32
+            h: bytes
+            i: str
+            j: G1Element
+            k: G2Element
+            m: Optional[List[Tuple[uint32, bytes32]]]
+            n: Program
+            o: SerializedProgram
+            p: Coin
+            q: List[Optional[Coin]]
+            r: List[List[uint32]]
+
+        sk = AugSchemeMPL.key_gen(bytes([7] * 32))
+        program = Program.to(binutils.assemble("(q . (1 2 (3 4)))"))
+        coin = Coin(bytes32([1] * 32), bytes32([2] * 32), 1000)
+        values = [
+            TestClassAll(
+                uint8(255),
+                int8(-128),
+                int64(-(2 ** 63)),
+                uint128(2 ** 128 - 1),
+                int512(-(2 ** 511)),
+                True,
+                bytes32([3] * 32),
+                b"\x00\x01",
+                "hello \u00e9",
+                sk.get_g1(),
+                AugSchemeMPL.sign(sk, b"message"),
+                [(uint32(1), bytes32([4] * 32)), (uint32(2), bytes32([5] * 32))],
+                program,
+                SerializedProgram.from_program(program),
+                coin,
+                [None, coin],
+                [[], [uint32(1), uint32(2)]],
+            ),
+            TestClassAll(
+                uint8(0),
+                int8(0),
+                int64(0),
+                uint128(0),
+                int512(0),
+                False,
+                bytes32([0] * 32),
+                b"",
+                "",
+                G1Element(),
+                G2Element(),
+                None,
+                Program.to([]),
+                SerializedProgram.from_bytes(b"\x80"),
+                coin,
+                [],
+                [],
+            ),
+        ]
+
+        class GenericBytesIO(io.BytesIO):
+            # parse only uses the generated functions for a plain BytesIO
+            pass
+
+        for value in values:
+            generic = io.BytesIO()
+            generic_offsets = []
+            for f_name, f_type in TestClassAll.__annotations__.items():
+                generic_offsets.append(generic.tell())
+                value.stream_one_item(f_type, getattr(value, f_name), generic)
+            generic_offsets.append(generic.tell())
+            blob = bytes(value)
+            assert blob == generic.getvalue()
+            assert get_field_offsets_function(TestClassAll)(blob) == generic_offsets
+
+            parsed = TestClassAll.from_bytes(blob)
+            assert parsed == value
+            assert bytes(parsed) == blob
+            assert TestClassAll.parse(GenericBytesIO(blob)) == parsed
+            # Parses starting from the position of the stream, and leaves it after the object
+            f = io.BytesIO(b"\x01" + blob + b"\x02")
+            f.seek(1)
+            assert TestClassAll.parse(f) == parsed
+            assert f.read() == b"\x02"
+
+            # Truncated data fails the same way as with the generic parse functions
+            for length in range(len(blob)):
+                with raises(Exception) as generic_error:
+                    TestClassAll.parse(GenericBytesIO(blob[:length]))
+                with raises(generic_error.type):
+                    TestClassAll.from_bytes(blob[:length])
+
     def test_parse_bool(self):
         assert not parse_bool(io.BytesIO(b"\x00"))
         assert parse_bool(io.BytesIO(b"\x01"))
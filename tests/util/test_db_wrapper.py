@@ -0,0 +1,80 @@
+import asyncio
+import tempfile
+from pathlib import Path
+
+import aiosqlite
+import pytest
+
+from tranzact.full_node.hint_store import HintStore
+from tranzact.util.db_wrapper import DBWrapper
+
+
+class TestDBWrapper:
+    @pytest.mark.asyncio
+    async def test_readers(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(tmp_dir) / "blockchain.sqlite"
+            connection = await aiosqlite.connect(db_path)
+            await connection.execute("pragma journal_mode=wal")
+            db_wrapper = DBWrapper(connection, db_version=2)
+            try:
+                hint_store = await HintStore.create(db_wrapper)
+                async with db_wrapper.reader() as conn:
+                    assert conn is db_wrapper.db
+
+                await db_wrapper.open_readers(db_path, 2)
+                async with db_wrapper.reader() as conn_1:
+                    async with db_wrapper.reader() as conn_2:
+                        assert conn_1 is not db_wrapper.db
+                        assert conn_2 is not db_wrapper.db
+                        assert conn_1 is not conn_2
+                with pytest.raises(aiosqlite.OperationalError):
+                    async with db_wrapper.reader() as conn:
+                        await conn.execute("DELETE FROM hints")
+
+                hint = 32 * b"\1"
+                coin_id = 32 * b"\2"
+                assert db_wrapper.committed_state() == 0
+                await db_wrapper.begin_transaction()
+                await hint_store.add_hints([(coin_id, hint)])
+                assert db_wrapper.committed_state() is None
+                # The task writing sees its changes, the others only once they are committed
+                assert await hint_store.get_coin_ids(hint) == [coin_id]
+                assert await asyncio.create_task(hint_store.get_coin_ids(hint)) == []
+                await db_wrapper.commit_transaction()
+                assert db_wrapper.committed_state() == 1
+                assert await asyncio.create_task(hint_store.get_coin_ids(hint)) == [coin_id]
+                assert await hint_store.get_coin_ids_multi([hint]) == [coin_id]
+
+                # Without begin_transaction, the writer is used for all reads until the write is committed
+                await hint_store.add_hints([(32 * b"\3", hint)])
+                assert len(await asyncio.create_task(hint_store.get_coin_ids(hint))) == 2
+                await db_wrapper.rollback_transaction()
+                assert await asyncio.create_task(hint_store.get_coin_ids(hint)) == [coin_id]
+            finally:
+                await db_wrapper.close_readers()
+                await connection.close()
+
+    @pytest.mark.asyncio
+    async def test_readers_path_quoting(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Characters with a meaning in a URI, and a file the unquoted URI would open instead
+            db_path = Path(tmp_dir) / "db?mode=rw#%41 x.sqlite"
+            other_path = Path(tmp_dir) / "db"
+            connection = await aiosqlite.connect(db_path)
+            await connection.execute("pragma journal_mode=wal")
+            db_wrapper = DBWrapper(connection, db_version=2)
+            try:
+                await HintStore.create(db_wrapper)
+                await db_wrapper.open_readers(db_path, 1)
+                async with db_wrapper.reader() as conn:
+                    assert conn is not db_wrapper.db
+                    async with conn.execute("SELECT COUNT(*) FROM hints") as cursor:
+                        assert (await cursor.fetchone())[0] == 0
+                    # Still read-only
+                    with pytest.raises(aiosqlite.OperationalError):
+                        await conn.execute("DELETE FROM hints")
+                assert not other_path.exists()
+            finally:
+                await db_wrapper.close_readers()
+                await connection.close()
@@ -39,6 +39,7 @@ from tranzact.full_node.weight_proof import (  # type: ignore
 )
 from tranzact.types.full_block import FullBlock
 from tranzact.types.header_block import HeaderBlock
+from tranzact.types.weight_proof import WeightProof
 from tranzact.util.ints import uint32, uint64
 
 
@@ -342,6 +343,56 @@ class TestWeightProof:
         assert valid
         assert fork_point == 0
 
+    @pytest.mark.asyncio
+    async def test_weight_proof1000_parallel(self, default_1000_blocks):
+        blocks = default_1000_blocks
+        header_cache, height_to_hash, sub_blocks, summaries = await load_blocks_dont_validate(blocks)
+        wpf = WeightProofHandler(test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, summaries))
+        wp = await wpf.get_proof_of_weight(blocks[-1].header_hash)
+        assert wp is not None
+        wpf = WeightProofHandler(test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, {}), 3)
+        try:
+            # The second validation reuses the worker processes of the first
+            for _ in range(2):
+                valid, fork_point, _ = await wpf.validate_weight_proof(wp)
+                assert valid
+                assert fork_point == 0
+            assert wpf._executor is not None
+        finally:
+            wpf.shut_down()
+        assert wpf._executor is None
+
+    @pytest.mark.asyncio
+    async def test_weight_proof_extend_incrementally(self, default_1000_blocks):
+        blocks = default_1000_blocks
+        header_cache, height_to_hash, sub_blocks, summaries = await load_blocks_dont_validate(blocks)
+        block_cache = BlockCache(sub_blocks, header_cache, height_to_hash, summaries)
+        wpf = WeightProofHandler(test_constants, block_cache)
+        for tip in [blocks[-300], blocks[-250], blocks[-1]]:
+            wp = await wpf.get_proof_of_weight(tip.header_hash)
+            assert wp is not None
+            # The same as a proof created from scratch
+            wpf_new = WeightProofHandler(
+                test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, summaries)
+            )
+            assert wp == await wpf_new._create_proof_of_weight(tip.header_hash)
+            wpf_not_synced = WeightProofHandler(
+                test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, {})
+            )
+            valid, fork_point = wpf_not_synced.validate_weight_proof_single_proc(wp)
+            assert valid
+            assert fork_point == 0
+
+        # The last proof is written when the node stops. Concurrent requests share one proof, and a restarted handler
+        # starts from the persisted one
+        await wpf.persist_proof()
+        assert WeightProof.from_bytes(await block_cache.get_weight_proof()) == wp
+        wpf_restarted = WeightProofHandler(test_constants, block_cache)
+        proofs = await asyncio.gather(*[wpf_restarted.get_proof_of_weight(blocks[-1].header_hash) for _ in range(3)])
+        assert proofs[0] == wp
+        assert proofs[0] is proofs[1] is proofs[2]
+        assert wpf_restarted._proof_tasks == {}
+
     @pytest.mark.asyncio
     async def test_weight_proof1000_pre_genesis_empty_slots(self, pre_genesis_empty_slots_1000_blocks):
         blocks = pre_genesis_empty_slots_1000_blocks
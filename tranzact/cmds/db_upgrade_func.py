@@ -0,0 +1,148 @@
+import asyncio
+from pathlib import Path
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from tranzact.full_node.block_store import BlockStore
+from tranzact.full_node.coin_store import CoinStore
+from tranzact.full_node.hint_store import HintStore
+from tranzact.util.config import load_config, save_config
+from tranzact.util.db_version import lookup_db_version, set_db_version
+from tranzact.util.db_wrapper import DBWrapper
+from tranzact.util.path import mkdir, path_from_root
+
+# Number of rows read from the v1 database and inserted into the v2 database at a time
+BATCH_SIZE = 10000
+
+# table name -> indices of the columns holding hex encoded hashes, which are stored as blobs in v2
+HEX_COLUMNS: Dict[str, Tuple[int, ...]] = {
+    "full_blocks": (0,),
+    "block_records": (0, 1),
+    "sub_epoch_segments_v3": (0,),
+    "coin_record": (0, 5, 6),
+    "hints": (),
+}
+
+# table name -> columns to copy, for tables whose layout changed within version 1 databases. Old hints tables have an
+# extra id column, and may contain duplicate rows, which are skipped
+SELECT_COLUMNS: Dict[str, str] = {"hints": "coin_id, hint"}
+
+
+def db_upgrade_func(
+    root_path: Path,
+    in_db_path: Optional[Path] = None,
+    out_db_path: Optional[Path] = None,
+    no_update_config: bool = False,
+) -> None:
+
+    update_config: bool = in_db_path is None and out_db_path is None and not no_update_config
+
+    config: Dict
+    selected_network: str
+    db_pattern: str
+    if in_db_path is None or out_db_path is None:
+        config = load_config(root_path, "config.yaml")["full_node"]
+        selected_network = config["selected_network"]
+        db_pattern = config["database_path"]
+
+    if in_db_path is None:
+        db_path_replaced: str = db_pattern.replace("CHALLENGE", selected_network)
+        in_db_path = path_from_root(root_path, db_path_replaced)
+
+    if out_db_path is None:
+        db_path_replaced = db_pattern.replace("CHALLENGE", selected_network).replace("_v1_", "_v2_")
+        out_db_path = path_from_root(root_path, db_path_replaced)
+        mkdir(out_db_path.parent)
+
+    if in_db_path == out_db_path:
+        print(f"input and output database are the same file: {in_db_path}")
+        return
+
+    asyncio.run(convert_v1_to_v2(in_db_path, out_db_path))
+
+    if update_config:
+        print("updating config.yaml")
+        config = load_config(root_path, "config.yaml")
+        new_db_path = db_pattern.replace("_v1_", "_v2_")
+        config["full_node"]["database_path"] = new_db_path
+        print(f"database_path: {new_db_path}")
+        save_config(root_path, "config.yaml", config)
+
+    print(f"\n\nLEAVING PREVIOUS DB FILE UNTOUCHED {in_db_path}\n")
+
+
+def convert_row(row: Tuple[Any, ...], hex_columns: Tuple[int, ...]) -> Tuple[Any, ...]:
+    if len(hex_columns) == 0:
+        return row
+    converted = list(row)
+    for index in hex_columns:
+        if converted[index] is not None:
+            converted[index] = bytes.fromhex(converted[index])
+    return tuple(converted)
+
+
+async def convert_v1_to_v2(in_path: Path, out_path: Path) -> None:
+    """
+    Copies all the blocks, coins and hints of a version 1 database into a new version 2 database. The input is only
+    read, inside a single read transaction, so this can be run while a full node is using the input database. The
+    new database is a snapshot of the chain at the time of the conversion, and the node catches up from there once it
+    is switched to the new database.
+    """
+
+    if out_path.exists():
+        print(f"output file already exists. {out_path}")
+        raise RuntimeError("already exists")
+
+    print(f"opening file for reading: {in_path}")
+    async with aiosqlite.connect(in_path) as in_db:
+        if await lookup_db_version(in_db) != 1:
+            raise RuntimeError(f"input database is not a version 1 database: {in_path}")
+
+        print(f"opening file for writing: {out_path}")
+        async with aiosqlite.connect(out_path) as out_db:
+            await out_db.execute("pragma journal_mode=OFF")
+            await out_db.execute("pragma synchronous=OFF")
+            await out_db.execute("pragma cache_size=1000000")
+            await out_db.execute("pragma locking_mode=exclusive")
+
+            await set_db_version(out_db, 2)
+            out_wrapper = DBWrapper(out_db, db_version=2)
+            # creates the version 2 tables and indices
+            await BlockStore.create(out_wrapper)
+            await CoinStore.create(out_wrapper)
+            await HintStore.create(out_wrapper)
+
+            # all the tables are read from the same snapshot of the input database
+            await in_db.execute("BEGIN DEFERRED TRANSACTION")
+            cursor = await in_db.execute("SELECT name from sqlite_master WHERE type='table'")
+            in_tables = set(row[0] for row in await cursor.fetchall())
+            await cursor.close()
+            for table, hex_columns in HEX_COLUMNS.items():
+                if table not in in_tables:
+                    print(f"skipping {table}, not in input database")
+                    continue
+                await convert_table(in_db, out_db, table, hex_columns)
+            await in_db.execute("ROLLBACK")
+
+
+async def convert_table(
+    in_db: aiosqlite.Connection, out_db: aiosqlite.Connection, table: str, hex_columns: Tuple[int, ...]
+) -> None:
+    start_time = time()
+    print(f"[1/2] converting {table}")
+    count = 0
+    cursor = await in_db.execute(f"SELECT {SELECT_COLUMNS.get(table, '*')} from {table}")
+    while True:
+        rows: List[Tuple[Any, ...]] = list(await cursor.fetchmany(BATCH_SIZE))
+        if len(rows) == 0:
+            break
+        values = [convert_row(row, hex_columns) for row in rows]
+        await out_db.executemany(f"INSERT OR IGNORE INTO {table} VALUES({', '.join('?' * len(values[0]))})", values)
+        count += len(rows)
+        print(f"\r{count:10d} rows", end="")
+    await cursor.close()
+    print(f"\n[2/2] committing {table}")
+    await out_db.commit()
+    print(f"converted {count} rows of {table} in {time() - start_time:.2f} seconds")
@@ -3,6 +3,7 @@ import click
 
 from tranzact import __version__
 from tranzact.cmds.configure import configure_cmd
+from tranzact.cmds.db import db_cmd
 from tranzact.cmds.farm import farm_cmd
 from tranzact.cmds.init import init_cmd
 from tranzact.cmds.keys import keys_cmd
@@ -120,6 +121,7 @@ cli.add_command(stop_cmd)
 cli.add_command(netspace_cmd)
 cli.add_command(farm_cmd)
 cli.add_command(plotters_cmd)
+cli.add_command(db_cmd)
 
 if supports_keyring_passphrase():
     cli.add_command(passphrase_cmd)
@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional
+
+from tranzact.consensus.block_record import BlockRecord
+from tranzact.consensus.blockchain_interface import BlockchainInterface
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.blockchain_format.sub_epoch_summary import SubEpochSummary
+from tranzact.types.blockchain_format.vdf import VDFInfo
+from tranzact.types.header_block import HeaderBlock
+from tranzact.types.weight_proof import SubEpochChallengeSegment
+from tranzact.util.ints import uint32
+
+
+class AugmentedBlockchain(BlockchainInterface):
+    """
+    A view of the blockchain which also contains the block records of blocks that have been pre-validated, but not
+    yet added to the chain. This allows pre-validating a batch of blocks while the previous batch is still being
+    added. Block records added with add_block_record are only kept in this view, the underlying blockchain is not
+    modified. Heights are not overlaid, so code walking the pending blocks falls back to following prev hashes.
+    """
+
+    def __init__(self, underlying: BlockchainInterface):
+        self._underlying = underlying
+        self._extra_blocks: Dict[bytes32, BlockRecord] = {}
+
+    def get_peak(self) -> Optional[BlockRecord]:
+        return self._underlying.get_peak()
+
+    def get_peak_height(self) -> Optional[uint32]:
+        return self._underlying.get_peak_height()
+
+    def block_record(self, header_hash: bytes32) -> BlockRecord:
+        block_record = self._extra_blocks.get(header_hash)
+        if block_record is not None:
+            return block_record
+        return self._underlying.block_record(header_hash)
+
+    def height_to_block_record(self, height: uint32) -> BlockRecord:
+        return self._underlying.height_to_block_record(height)
+
+    def get_ses_heights(self) -> List[uint32]:
+        return self._underlying.get_ses_heights()
+
+    def get_ses(self, height: uint32) -> SubEpochSummary:
+        return self._underlying.get_ses(height)
+
+    def height_to_hash(self, height: uint32) -> Optional[bytes32]:
+        return self._underlying.height_to_hash(height)
+
+    def contains_block(self, header_hash: bytes32) -> bool:
+        return header_hash in self._extra_blocks or self._underlying.contains_block(header_hash)
+
+    def remove_block_record(self, header_hash: bytes32):
+        del self._extra_blocks[header_hash]
+
+    def add_block_record(self, block_record: BlockRecord):
+        self._extra_blocks[block_record.header_hash] = block_record
+
+    def contains_height(self, height: uint32) -> bool:
+        return self._underlying.contains_height(height)
+
+    async def warmup(self, fork_point: uint32):
+        await self._underlying.warmup(fork_point)
+
+    async def get_block_record_from_db(self, header_hash: bytes32) -> Optional[BlockRecord]:
+        if header_hash in self._extra_blocks:
+            return self._extra_blocks[header_hash]
+        return await self._underlying.get_block_record_from_db(header_hash)
+
+    async def get_block_records_in_range(self, start: int, stop: int) -> Dict[bytes32, BlockRecord]:
+        return await self._underlying.get_block_records_in_range(start, stop)
+
+    async def get_header_blocks_in_range(
+        self, start: int, stop: int, tx_filter: bool = True
+    ) -> Dict[bytes32, HeaderBlock]:
+        return await self._underlying.get_header_blocks_in_range(start, stop, tx_filter)
+
+    async def get_header_block_by_height(
+        self, height: int, header_hash: bytes32, tx_filter: bool = True
+    ) -> Optional[HeaderBlock]:
+        return await self._underlying.get_header_block_by_height(height, header_hash, tx_filter)
+
+    async def get_block_records_at(self, heights: List[uint32]) -> List[BlockRecord]:
+        return await self._underlying.get_block_records_at(heights)
+
+    async def persist_sub_epoch_challenge_segments(
+        self, sub_epoch_summary_height: uint32, segments: List[SubEpochChallengeSegment]
+    ):
+        await self._underlying.persist_sub_epoch_challenge_segments(sub_epoch_summary_height, segments)
+
+    async def get_sub_epoch_challenge_segments(
+        self,
+        sub_epoch_summary_height: uint32,
+    ) -> Optional[List[SubEpochChallengeSegment]]:
+        return await self._underlying.get_sub_epoch_challenge_segments(sub_epoch_summary_height)
+
+    async def persist_weight_proof(self, weight_proof_bytes: bytes):
+        await self._underlying.persist_weight_proof(weight_proof_bytes)
+
+    async def get_weight_proof(self) -> Optional[bytes]:
+        return await self._underlying.get_weight_proof()
+
+    def seen_compact_proofs(self, vdf_info: VDFInfo, height: uint32) -> bool:
+        return self._underlying.seen_compact_proofs(vdf_info, height)
@@ -14,6 +14,7 @@ from tranzact.consensus.coinbase import create_farmer_coin, create_pool_coin
 from tranzact.consensus.constants import ConsensusConstants
 from tranzact.consensus.cost_calculator import NPCResult, calculate_cost_of_program
 from tranzact.consensus.find_fork_point import find_fork_point_in_chain
+from tranzact.consensus.fork_block_cache import ForkBlockCache, ForkBlockChanges, fork_block_changes
 from tranzact.full_node.block_store import BlockStore
 from tranzact.full_node.coin_store import CoinStore
 from tranzact.full_node.mempool_check_conditions import get_name_puzzle_conditions
@@ -27,12 +28,10 @@ from tranzact.types.generator_types import BlockGenerator
 from tranzact.types.name_puzzle_condition import NPC
 from tranzact.types.unfinished_block import UnfinishedBlock
 from tranzact.util import cached_bls
+from tranzact.util.cached_bls import PairingCache
 from tranzact.util.condition_tools import pkm_pairs
 from tranzact.util.errors import Err
-from tranzact.util.generator_tools import (
-    additions_for_npc,
-    tx_removals_and_additions,
-)
+from tranzact.util.generator_tools import additions_for_npc
 from tranzact.util.hash import std_hash
 from tranzact.util.ints import uint32, uint64, uint128
 
@@ -51,6 +50,8 @@ async def validate_block_body(
     fork_point_with_peak: Optional[uint32],
     get_block_generator: Callable,
     validate_signature=True,
+    fork_block_cache: Optional[ForkBlockCache] = None,
+    pairing_cache: Optional[PairingCache] = None,
 ) -> Tuple[Optional[Err], Optional[NPCResult]]:
     """
     This assumes the header block has been completely validated.
@@ -58,7 +59,9 @@ async def validate_block_body(
     validates correctly, or an Err if something does not validate. For the second value, returns a CostResult
     only if validation succeeded, and there are transactions. In other cases it returns None. The NPC result is
     the result of running the generator with the previous generators refs. It is only present for transaction
-    blocks which have spent coins.
+    blocks which have spent coins. The changes of the fork blocks between the fork point and the block are taken
+    from, and added to, fork_block_cache if given. The signature is validated with pairing_cache, or the process local
+    pairing cache if None.
     """
     if isinstance(block, FullBlock):
         assert height == block.height
@@ -290,60 +293,49 @@ async def validate_block_body(
 
     # For height 0, there are no additions and removals before this block, so we can skip
     if height > 0:
-        # First, get all the blocks in the fork > fork_h, < block.height
-        prev_block: Optional[FullBlock] = await block_store.get_full_block(block.prev_header_hash)
-        reorg_blocks: Dict[uint32, FullBlock] = {}
-        curr: Optional[FullBlock] = prev_block
-        assert curr is not None
-        while curr.height > fork_h:
-            if curr.height == 0:
-                break
-            curr = await block_store.get_full_block(curr.prev_header_hash)
-            assert curr is not None
-            reorg_blocks[curr.height] = curr
-        if fork_h != -1:
-            assert len(reorg_blocks) == height - fork_h - 1
-
-        curr = prev_block
-        assert curr is not None
-        while curr.height > fork_h:
-            # Coin store doesn't contain coins from fork, we have to run generator for each block in fork
-            if curr.transactions_generator is not None:
-                # These blocks are in the past and therefore assumed to be valid, so get_block_generator won't raise
-                curr_block_generator: Optional[BlockGenerator] = await get_block_generator(curr)
-                assert curr_block_generator is not None and curr.transactions_info is not None
-                curr_npc_result = get_name_puzzle_conditions(
-                    curr_block_generator,
-                    min(constants.MAX_BLOCK_COST_CLVM, curr.transactions_info.cost),
-                    cost_per_byte=constants.COST_PER_BYTE,
-                    safe_mode=False,
-                )
-                removals_in_curr, additions_in_curr = tx_removals_and_additions(curr_npc_result.npc_list)
-            else:
-                removals_in_curr = []
-                additions_in_curr = []
+        # Walk back from the previous block to the fork point. The coin store doesn't contain coins from the fork, so
+        # the generator of each fork block is run, unless its changes are in fork_block_cache
+        curr_hash: bytes32 = block.prev_header_hash
+        curr_height: int = height - 1
+        while curr_height > fork_h:
+            changes: Optional[ForkBlockChanges] = None
+            if fork_block_cache is not None:
+                changes = fork_block_cache.get(curr_hash)
+            if changes is None:
+                curr: Optional[FullBlock] = await block_store.get_full_block(curr_hash)
+                assert curr is not None and curr.height == curr_height
+                curr_npc_result: Optional[NPCResult] = None
+                if curr.transactions_generator is not None:
+                    # These blocks are in the past and therefore assumed to be valid, so get_block_generator won't
+                    # raise
+                    curr_block_generator: Optional[BlockGenerator] = await get_block_generator(curr)
+                    assert curr_block_generator is not None and curr.transactions_info is not None
+                    curr_npc_result = get_name_puzzle_conditions(
+                        curr_block_generator,
+                        min(constants.MAX_BLOCK_COST_CLVM, curr.transactions_info.cost),
+                        cost_per_byte=constants.COST_PER_BYTE,
+                        safe_mode=False,
+                    )
+                changes = fork_block_changes(curr, curr_npc_result)
+                if fork_block_cache is not None:
+                    fork_block_cache.add(changes)
 
-            for c_name in removals_in_curr:
+            for c_name in changes.removals:
                 assert c_name not in removals_since_fork
                 removals_since_fork.add(c_name)
-            for c in additions_in_curr:
+            for c in changes.additions + changes.reward_coins:
                 assert c.name() not in additions_since_fork
-                assert curr.foliage_transaction_block is not None
-                additions_since_fork[c.name()] = (c, curr.height, curr.foliage_transaction_block.timestamp)
-
-            for coinbase_coin in curr.get_included_reward_coins():
-                assert coinbase_coin.name() not in additions_since_fork
-                assert curr.foliage_transaction_block is not None
-                additions_since_fork[coinbase_coin.name()] = (
-                    coinbase_coin,
-                    curr.height,
-                    curr.foliage_transaction_block.timestamp,
-                )
-            if curr.height == 0:
+                assert changes.timestamp is not None
+                additions_since_fork[c.name()] = (c, changes.height, changes.timestamp)
+            if curr_height == 0:
                 break
-            curr = reorg_blocks[curr.height - 1]
-            assert curr is not None
+            curr_hash = changes.prev_header_hash
+            curr_height -= 1
 
+    # The removals which are not ephemeral are looked up in the coin store at once, rather than one query per coin
+    removals_in_store: Dict[bytes32, CoinRecord] = await coin_store.get_coin_records(
+        [rem for rem in removals if rem not in additions_dic]
+    )
     removal_coin_records: Dict[bytes32, CoinRecord] = {}
     for rem in removals:
         if rem in additions_dic:
@@ -359,7 +351,7 @@ async def validate_block_body(
             )
             removal_coin_records[new_unspent.name] = new_unspent
         else:
-            unspent = await coin_store.get_coin_record(rem)
+            unspent = removals_in_store.get(rem)
             if unspent is not None and unspent.confirmed_block_index <= fork_h:
                 # Spending something in the current chain, confirmed before fork
                 # (We ignore all coins confirmed after fork)
@@ -461,7 +453,7 @@ async def validate_block_body(
     if validate_signature:
         force_cache: bool = isinstance(block, UnfinishedBlock)
         if not cached_bls.aggregate_verify(
-            pairs_pks, pairs_msgs, block.transactions_info.aggregated_signature, force_cache
+            pairs_pks, pairs_msgs, block.transactions_info.aggregated_signature, force_cache, pairing_cache
         ):
             return Err.BAD_AGGREGATE_SIGNATURE, None
 
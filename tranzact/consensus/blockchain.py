@@ -4,6 +4,7 @@ import logging
 import multiprocessing
 from concurrent.futures.process import ProcessPoolExecutor
 from enum import Enum
+from pathlib import Path
 from typing import Dict, List, Optional, Set, Tuple, Union
 
 from clvm.casts import int_from_bytes
@@ -16,16 +17,19 @@ from tranzact.consensus.constants import ConsensusConstants
 from tranzact.consensus.cost_calculator import NPCResult
 from tranzact.consensus.difficulty_adjustment import get_next_sub_slot_iters_and_difficulty
 from tranzact.consensus.find_fork_point import find_fork_point_in_chain
+from tranzact.consensus.fork_block_cache import ForkBlockCache, fork_block_changes
 from tranzact.consensus.full_block_to_block_record import block_to_block_record
 from tranzact.consensus.multiprocess_validation import (
     PreValidationResult,
     pre_validate_blocks_multiprocessing,
     _run_generator,
 )
+from tranzact.full_node.block_height_map import BlockHeightMap
 from tranzact.full_node.block_store import BlockStore
+from tranzact.full_node.coin_spend_store import CoinSpendStore
 from tranzact.full_node.coin_store import CoinStore
 from tranzact.full_node.hint_store import HintStore
-from tranzact.full_node.mempool_check_conditions import get_name_puzzle_conditions
+from tranzact.full_node.mempool_check_conditions import get_name_puzzle_conditions, get_spends_for_block
 from tranzact.types.blockchain_format.coin import Coin
 from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.types.blockchain_format.sub_epoch_summary import SubEpochSummary
@@ -42,6 +46,7 @@ from tranzact.types.weight_proof import SubEpochChallengeSegment
 from tranzact.util.errors import Err, ConsensusError
 from tranzact.util.generator_tools import get_block_header, tx_removals_and_additions
 from tranzact.util.ints import uint16, uint32, uint64, uint128
+from tranzact.util.shared_pairing_cache import SharedPairingCache
 from tranzact.util.streamable import recurse_jsonify
 
 log = logging.getLogger(__name__)
@@ -71,11 +76,8 @@ class Blockchain(BlockchainInterface):
     __block_records: Dict[bytes32, BlockRecord]
     # all hashes of blocks in block_record by height, used for garbage collection
     __heights_in_cache: Dict[uint32, Set[bytes32]]
-    # Defines the path from genesis to the peak, no orphan blocks
-    __height_to_hash: Dict[uint32, bytes32]
-    # All sub-epoch summaries that have been included in the blockchain from the beginning until and including the peak
-    # (height_included, SubEpochSummary). Note: ONLY for the blocks in the path to the peak
-    __sub_epoch_summaries: Dict[uint32, SubEpochSummary] = {}
+    # Defines the path from genesis to the peak, no orphan blocks, and the sub-epoch summaries included in it
+    __height_map: BlockHeightMap
     # Unspent Store
     coin_store: CoinStore
     # Store
@@ -92,15 +94,28 @@ class Blockchain(BlockchainInterface):
     lock: asyncio.Lock
     compact_proof_lock: asyncio.Lock
     hint_store: HintStore
+    # Optional, stores the puzzle and solution of the coins spent by the blocks added to the chain
+    coin_spend_store: Optional[CoinSpendStore]
+    # The coins spent and created by blocks outside the peak chain, used when validating blocks of forks
+    _fork_block_cache: ForkBlockCache
+    # The BLS pairing cache shared with the mempool validation processes of the full node
+    pairing_cache: Optional[SharedPairingCache]
 
     @staticmethod
     async def create(
-        coin_store: CoinStore, block_store: BlockStore, consensus_constants: ConsensusConstants, hint_store: HintStore
+        coin_store: CoinStore,
+        block_store: BlockStore,
+        consensus_constants: ConsensusConstants,
+        hint_store: HintStore,
+        height_to_hash_filename: Optional[Path] = None,
+        coin_spend_store: Optional[CoinSpendStore] = None,
+        pairing_cache: Optional[SharedPairingCache] = None,
     ):
         """
         Initializes a blockchain with the BlockRecords from disk, assuming they have all been
         validated. Uses the genesis block given in override_constants, or as a fallback,
-        in the consensus constants config.
+        in the consensus constants config. The height to hash map is persisted to
+        height_to_hash_filename, if given. Signatures are validated with pairing_cache, if given.
         """
         self = Blockchain()
         self.lock = asyncio.Lock()  # External lock handled by full node
@@ -117,22 +132,24 @@ class Blockchain(BlockchainInterface):
         self.block_store = block_store
         self.constants_json = recurse_jsonify(dataclasses.asdict(self.constants))
         self._shut_down = False
-        await self._load_chain_from_store()
+        await self._load_chain_from_store(height_to_hash_filename)
         self._seen_compact_proofs = set()
         self.hint_store = hint_store
+        self.coin_spend_store = coin_spend_store
+        self._fork_block_cache = ForkBlockCache()
+        self.pairing_cache = pairing_cache
         return self
 
     def shut_down(self):
         self._shut_down = True
+        self.__height_map.flush()
         self.pool.shutdown(wait=True)
 
-    async def _load_chain_from_store(self) -> None:
+    async def _load_chain_from_store(self, height_to_hash_filename: Optional[Path]) -> None:
         """
         Initializes the state of the Blockchain class from the database.
         """
-        height_to_hash, sub_epoch_summaries = await self.block_store.get_peak_height_dicts()
-        self.__height_to_hash = height_to_hash
-        self.__sub_epoch_summaries = sub_epoch_summaries
+        self.__height_map = await BlockHeightMap.create(self.block_store, height_to_hash_filename)
         self.__block_records = {}
         self.__heights_in_cache = {}
         block_records, peak = await self.block_store.get_block_records_close_to_peak(self.constants.BLOCKS_CACHE_SIZE)
@@ -146,7 +163,8 @@ class Blockchain(BlockchainInterface):
 
         assert peak is not None
         self._peak_height = self.block_record(peak).height
-        assert len(self.__height_to_hash) == self._peak_height + 1
+        assert self.__height_map.contains_height(self._peak_height)
+        assert not self.__height_map.contains_height(uint32(self._peak_height + 1))
 
     def get_peak(self) -> Optional[BlockRecord]:
         """
@@ -253,6 +271,8 @@ class Blockchain(BlockchainInterface):
             npc_result,
             fork_point_with_peak,
             self.get_block_generator,
+            fork_block_cache=self._fork_block_cache,
+            pairing_cache=self.pairing_cache,
         )
         if error_code is not None:
             return ReceiveBlockResult.INVALID_BLOCK, error_code, None, ([], {})
@@ -279,11 +299,12 @@ class Blockchain(BlockchainInterface):
                 # Then update the memory cache. It is important that this task is not cancelled and does not throw
                 self.add_block_record(block_record)
                 for fetched_block_record in records:
-                    self.__height_to_hash[fetched_block_record.height] = fetched_block_record.header_hash
-                    if fetched_block_record.sub_epoch_summary_included is not None:
-                        self.__sub_epoch_summaries[
-                            fetched_block_record.height
-                        ] = fetched_block_record.sub_epoch_summary_included
+                    self.__height_map.update_height(
+                        fetched_block_record.height,
+                        fetched_block_record.header_hash,
+                        fetched_block_record.sub_epoch_summary_included,
+                    )
+                self.__height_map.maybe_flush()
                 if peak_height is not None:
                     self._peak_height = peak_height
             except BaseException:
@@ -292,10 +313,18 @@ class Blockchain(BlockchainInterface):
                 raise
 
         if fork_height is not None:
+            # The blocks of the fork which became the peak chain, and forks too old to be extended, are not needed
+            assert peak_height is not None
+            self._fork_block_cache.prune(
+                peak_height, peak_height - self.constants.BLOCKS_CACHE_SIZE, self.height_to_hash
+            )
             # new coin records added
             assert coin_record_change is not None
             return ReceiveBlockResult.NEW_PEAK, None, fork_height, (coin_record_change, hint_changes)
         else:
+            # Blocks on top of this one are validated with its changes, without running its generator again
+            if block.transactions_generator is None or npc_result is not None:
+                self._fork_block_cache.add(fork_block_changes(block, npc_result))
             return ReceiveBlockResult.ADDED_AS_ORPHAN, None, None, ([], {})
 
     def get_hint_list(self, npc_result: NPCResult) -> List[Tuple[bytes32, bytes]]:
@@ -353,6 +382,10 @@ class Blockchain(BlockchainInterface):
                     )
                 else:
                     added, _ = [], []
+                if block_record.sub_epoch_summary_included is not None:
+                    await self.block_store.add_sub_epoch_summaries(
+                        [(block_record.height, block_record.sub_epoch_summary_included)]
+                    )
                 await self.block_store.set_peak(block_record.header_hash)
                 return uint32(0), uint32(0), [block_record], (added, {})
             return None, None, [], ([], {})
@@ -374,13 +407,8 @@ class Blockchain(BlockchainInterface):
                     lastest_coin_state[coin_record.name] = coin_record
 
             # Rollback sub_epoch_summaries
-            heights_to_delete = []
-            for ses_included_height in self.__sub_epoch_summaries.keys():
-                if ses_included_height > fork_height:
-                    heights_to_delete.append(ses_included_height)
-            for height in heights_to_delete:
-                log.info(f"delete ses at height {height}")
-                del self.__sub_epoch_summaries[height]
+            self.__height_map.rollback(fork_height)
+            await self.block_store.rollback_sub_epoch_summaries(fork_height)
 
             # Collect all blocks from fork point to new peak
             blocks_to_add: List[Tuple[FullBlock, BlockRecord]] = []
@@ -442,6 +470,16 @@ class Blockchain(BlockchainInterface):
                                 hint_coin_state[key] = {}
                             hint_coin_state[key][coin_id] = lastest_coin_state[coin_id]
 
+                    if self.coin_spend_store is not None and fetched_full_block.transactions_generator is not None:
+                        await self._add_coin_spends(fetched_full_block)
+
+            await self.block_store.add_sub_epoch_summaries(
+                [
+                    (record.height, record.sub_epoch_summary_included)
+                    for record in records_to_add
+                    if record.sub_epoch_summary_included is not None
+                ]
+            )
             # Changes the peak to be the new peak
             await self.block_store.set_peak(block_record.header_hash)
             return (
@@ -454,6 +492,17 @@ class Blockchain(BlockchainInterface):
         # This is not a heavier block than the heaviest we have seen, so we don't change the coin set
         return None, None, [], ([], {})
 
+    async def _add_coin_spends(self, block: FullBlock) -> None:
+        assert self.coin_spend_store is not None
+        block_generator: Optional[BlockGenerator] = await self.get_block_generator(block)
+        assert block_generator is not None
+        error, coin_spends = get_spends_for_block(block_generator, self.constants.MAX_BLOCK_COST_CLVM)
+        if error is not None:
+            # The block is valid, so this only means the spends are looked up from the generator when requested
+            log.error(f"Failed to get the coin spends of block {block.header_hash} at height {block.height}: {error}")
+            return None
+        await self.coin_spend_store.add_coin_spends(block.header_hash, coin_spends)
+
     async def get_tx_removals_and_additions(
         self, block: FullBlock, npc_result: Optional[NPCResult] = None
     ) -> Tuple[List[bytes32], List[Coin], Optional[NPCResult]]:
@@ -617,6 +666,7 @@ class Blockchain(BlockchainInterface):
             None,
             self.get_block_generator,
             False,
+            fork_block_cache=self._fork_block_cache,
         )
 
         if error_code is not None:
@@ -630,11 +680,13 @@ class Blockchain(BlockchainInterface):
         npc_results: Dict[uint32, NPCResult],
         batch_size: int = 4,
         wp_summaries: Optional[List[SubEpochSummary]] = None,
+        block_records: Optional[BlockchainInterface] = None,
+        pending_blocks: Optional[Dict[bytes32, Union[FullBlock, HeaderBlock]]] = None,
     ) -> Optional[List[PreValidationResult]]:
         return await pre_validate_blocks_multiprocessing(
             self.constants,
             self.constants_json,
-            self,
+            self if block_records is None else block_records,
             blocks,
             self.pool,
             True,
@@ -642,6 +694,7 @@ class Blockchain(BlockchainInterface):
             self.get_block_generator,
             batch_size,
             wp_summaries,
+            pending_blocks,
         )
 
     async def run_generator(self, unfinished_block: bytes, generator: BlockGenerator) -> NPCResult:
@@ -674,16 +727,16 @@ class Blockchain(BlockchainInterface):
         return self.block_record(header_hash)
 
     def get_ses_heights(self) -> List[uint32]:
-        return sorted(self.__sub_epoch_summaries.keys())
+        return self.__height_map.get_ses_heights()
 
     def get_ses(self, height: uint32) -> SubEpochSummary:
-        return self.__sub_epoch_summaries[height]
+        return self.__height_map.get_ses(height)
 
     def height_to_hash(self, height: uint32) -> Optional[bytes32]:
-        return self.__height_to_hash[height]
+        return self.__height_map.get_hash(height)
 
     def contains_height(self, height: uint32) -> bool:
-        return height in self.__height_to_hash
+        return self.__height_map.contains_height(height)
 
     def get_peak_height(self) -> Optional[uint32]:
         return self._peak_height
@@ -843,6 +896,12 @@ class Blockchain(BlockchainInterface):
             return None
         return segments
 
+    async def persist_weight_proof(self, weight_proof_bytes: bytes):
+        await self.block_store.persist_weight_proof(weight_proof_bytes)
+
+    async def get_weight_proof(self) -> Optional[bytes]:
+        return await self.block_store.get_weight_proof()
+
     # Returns 'True' if the info is already in the set, otherwise returns 'False' and stores it.
     def seen_compact_proofs(self, vdf_info: VDFInfo, height: uint32) -> bool:
         pot_tuple = (vdf_info, height)
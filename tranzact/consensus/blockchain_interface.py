@@ -81,5 +81,11 @@ class BlockchainInterface:
     ) -> Optional[List[SubEpochChallengeSegment]]:
         pass
 
+    async def persist_weight_proof(self, weight_proof_bytes: bytes):
+        pass
+
+    async def get_weight_proof(self) -> Optional[bytes]:
+        pass
+
     def seen_compact_proofs(self, vdf_info: VDFInfo, height: uint32) -> bool:
         pass
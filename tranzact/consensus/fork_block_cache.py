@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from tranzact.consensus.cost_calculator import NPCResult
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.full_block import FullBlock
+from tranzact.util.generator_tools import tx_removals_and_additions
+from tranzact.util.ints import uint32, uint64
+
+
+@dataclass(frozen=True)
+class ForkBlockChanges:
+    """
+    The coins spent and created by a block, which validate_block_body needs for each block of a fork between the fork
+    point and the block it validates, since the coin store only has the coins of the peak chain.
+    """
+
+    header_hash: bytes32
+    prev_header_hash: bytes32
+    height: uint32
+    # None for blocks which are not transaction blocks, which have no removals or additions
+    timestamp: Optional[uint64]
+    removals: List[bytes32]
+    # Additions of the transactions, and the reward coins included in the block
+    additions: List[Coin]
+    reward_coins: List[Coin]
+
+
+def fork_block_changes(block: FullBlock, npc_result: Optional[NPCResult]) -> ForkBlockChanges:
+    """
+    npc_result is the result of running the generator of block, or None if it has no generator
+    """
+    if npc_result is not None:
+        removals, additions = tx_removals_and_additions(npc_result.npc_list)
+    else:
+        assert block.transactions_generator is None
+        removals, additions = [], []
+    timestamp = None if block.foliage_transaction_block is None else block.foliage_transaction_block.timestamp
+    return ForkBlockChanges(
+        block.header_hash,
+        block.prev_header_hash,
+        block.height,
+        timestamp,
+        removals,
+        additions,
+        list(block.get_included_reward_coins()),
+    )
+
+
+class ForkBlockCache:
+    """
+    The changes of blocks which are not in the peak chain, by header hash. Without it, validating each block of a
+    fork runs the generators of all the fork blocks before it again. Blocks are added when they are added as orphans
+    or first needed by a validation, and removed once they are part of the peak chain, or too far below the peak to
+    be extended.
+    """
+
+    _changes: Dict[bytes32, ForkBlockChanges]
+
+    def __init__(self) -> None:
+        self._changes = {}
+
+    def get(self, header_hash: bytes32) -> Optional[ForkBlockChanges]:
+        return self._changes.get(header_hash)
+
+    def add(self, changes: ForkBlockChanges) -> None:
+        self._changes[changes.header_hash] = changes
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def prune(self, peak_height: uint32, min_height: int, height_to_hash: Callable[[uint32], Optional[bytes32]]):
+        """
+        Removes the blocks which are in the peak chain up to peak_height, and the blocks lower than min_height
+        """
+        for header_hash, changes in list(self._changes.items()):
+            if changes.height < min_height or (
+                changes.height <= peak_height and height_to_hash(changes.height) == header_hash
+            ):
+                del self._changes[header_hash]
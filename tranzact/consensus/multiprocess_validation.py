@@ -138,6 +138,7 @@ async def pre_validate_blocks_multiprocessing(
     get_block_generator: Optional[Callable],
     batch_size: int,
     wp_summaries: Optional[List[SubEpochSummary]] = None,
+    pending_blocks: Optional[Dict[bytes32, Union[FullBlock, HeaderBlock]]] = None,
 ) -> Optional[List[PreValidationResult]]:
     """
     This method must be called under the blockchain lock
@@ -153,6 +154,7 @@ async def pre_validate_blocks_multiprocessing(
         blocks: list of full blocks to validate (must be connected to current chain)
         npc_results
         get_block_generator
+        pending_blocks: blocks which precede blocks, but are not added to the chain yet (used for generator refs)
     """
     prev_b: Optional[BlockRecord] = None
     # Collects all the recent blocks (up to the previous sub-epoch)
@@ -246,6 +248,8 @@ async def pre_validate_blocks_multiprocessing(
         diff_ssis.append((difficulty, sub_slot_iters))
 
     block_dict: Dict[bytes32, Union[FullBlock, HeaderBlock]] = {}
+    if pending_blocks is not None:
+        block_dict.update(pending_blocks)
     for i, block in enumerate(blocks):
         block_dict[block.header_hash] = block
         if not block_record_was_present[i]:
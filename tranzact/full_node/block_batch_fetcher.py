@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from tranzact.protocols.full_node_protocol import RequestBlocks, RespondBlocks
+from tranzact.server.ws_connection import WSTranzactConnection
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.full_block import FullBlock
+from tranzact.util.ints import uint32
+
+log = logging.getLogger(__name__)
+
+
+class PeerDownloadStats:
+    """
+    Download statistics of one peer during a long sync, used to give more work to fast peers.
+    """
+
+    # Weight of the latest measurement in the moving average of the throughput
+    SMOOTHING = 0.3
+
+    def __init__(self) -> None:
+        self.in_flight: int = 0
+        self.blocks_per_second: Optional[float] = None
+        self.blocks_received: int = 0
+        self.failures: int = 0
+
+    def add_measurement(self, num_blocks: int, duration: float) -> None:
+        throughput = num_blocks / max(duration, 0.001)
+        if self.blocks_per_second is None:
+            self.blocks_per_second = throughput
+        else:
+            self.blocks_per_second = self.SMOOTHING * throughput + (1 - self.SMOOTHING) * self.blocks_per_second
+        self.blocks_received += num_blocks
+
+
+class BlockBatchFetcher:
+    """
+    Downloads the blocks between start_height and end_height for a long sync, keeping several batch requests in
+    flight across all the peers that have the sync target peak. Requests that fail or time out are requested again
+    from a different peer, and the batches are delivered to the output queue in height order.
+    """
+
+    def __init__(
+        self,
+        start_height: uint32,
+        end_height: uint32,
+        batch_size: int,
+        get_peers: Callable[[], List[WSTranzactConnection]],
+        max_in_flight: int,
+        max_in_flight_per_peer: int,
+        request_timeout: int = 10,
+    ):
+        self.start_height = start_height
+        self.end_height = end_height
+        self.batch_size = batch_size
+        self.get_peers = get_peers
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_peer = max_in_flight_per_peer
+        self.request_timeout = request_timeout
+        self.peers: List[WSTranzactConnection] = get_peers()
+        self.peer_stats: Dict[bytes32, PeerDownloadStats] = {}
+        # Ranges to request, by start height, so the oldest missing range is always requested first
+        self.pending: List[int] = list(range(start_height, end_height, batch_size))
+        heapq.heapify(self.pending)
+        # Start height -> peers which failed to send us this range
+        self.failed_peers: Dict[int, Set[bytes32]] = {}
+
+    def refresh_peers(self) -> None:
+        self.peers = self.get_peers()
+
+    def stats(self, peer: WSTranzactConnection) -> PeerDownloadStats:
+        if peer.peer_node_id not in self.peer_stats:
+            self.peer_stats[peer.peer_node_id] = PeerDownloadStats()
+        return self.peer_stats[peer.peer_node_id]
+
+    def select_peer(self, start_height: int) -> Optional[WSTranzactConnection]:
+        """
+        Returns the peer with the highest expected throughput for one more request, or None if all the peers that
+        can serve this range are busy.
+        """
+        known = [s.blocks_per_second for s in self.peer_stats.values() if s.blocks_per_second is not None]
+        # Peers we have not downloaded from yet are assumed to be as fast as the fastest one, so they get tried
+        default_throughput = max(known) if len(known) > 0 else 1.0
+        best: Optional[WSTranzactConnection] = None
+        best_score = 0.0
+        for peer in self.peers:
+            if peer.closed or peer.peer_node_id in self.failed_peers.get(start_height, set()):
+                continue
+            stats = self.stats(peer)
+            if stats.in_flight >= self.max_in_flight_per_peer:
+                continue
+            throughput = stats.blocks_per_second if stats.blocks_per_second is not None else default_throughput
+            score = throughput / (stats.in_flight + 1)
+            if best is None or score > best_score:
+                best, best_score = peer, score
+        return best
+
+    def can_serve(self, start_height: int) -> bool:
+        failed = self.failed_peers.get(start_height, set())
+        return any(not peer.closed and peer.peer_node_id not in failed for peer in self.peers)
+
+    async def request_batch(
+        self, peer: WSTranzactConnection, start_height: int
+    ) -> Tuple[WSTranzactConnection, int, Optional[List[FullBlock]]]:
+        end_height = min(self.end_height, start_height + self.batch_size)
+        request = RequestBlocks(uint32(start_height), uint32(end_height), True)
+        stats = self.stats(peer)
+        request_start = time.time()
+        try:
+            response = await peer.request_blocks(request, timeout=self.request_timeout)
+        except Exception as e:
+            log.warning(f"Exception requesting blocks {start_height} to {end_height} from {peer.peer_host}: {e}")
+            response = None
+        finally:
+            stats.in_flight -= 1
+
+        if response is None:
+            # The peer timed out, it's too slow to sync from
+            await peer.close()
+            return peer, start_height, None
+        if not isinstance(response, RespondBlocks):
+            return peer, start_height, None
+        blocks: List[FullBlock] = response.blocks
+        if len(blocks) != end_height - start_height + 1 or any(
+            block.height != start_height + i for i, block in enumerate(blocks)
+        ):
+            log.warning(f"Peer {peer.peer_host} sent the wrong blocks for {start_height} to {end_height}")
+            return peer, start_height, None
+        stats.add_measurement(len(blocks), time.time() - request_start)
+        return peer, start_height, blocks
+
+    async def fetch(self, batch_queue: asyncio.Queue, peers_changed: asyncio.Event, buffer_size: int) -> bool:
+        """
+        Puts (peer, blocks) on batch_queue in height order, until all the blocks are downloaded. Returns False if
+        a range could not be fetched from any peer.
+        """
+        in_flight: Dict[asyncio.Task, int] = {}
+        # Start height -> downloaded batch, waiting for the batches before it
+        ready: Dict[int, Tuple[WSTranzactConnection, List[FullBlock]]] = {}
+        next_height = self.start_height
+        # Do not download too far ahead of the batch we are waiting for, to bound memory usage
+        window = (self.max_in_flight + buffer_size) * self.batch_size
+        try:
+            while next_height < self.end_height:
+                while next_height in ready:
+                    await batch_queue.put(ready.pop(next_height))
+                    next_height += self.batch_size
+                if next_height >= self.end_height:
+                    break
+
+                if peers_changed.is_set():
+                    self.refresh_peers()
+                    peers_changed.clear()
+
+                deferred: List[int] = []
+                while (
+                    len(self.pending) > 0
+                    and len(in_flight) < self.max_in_flight
+                    and self.pending[0] < next_height + window
+                ):
+                    start_height = heapq.heappop(self.pending)
+                    peer = self.select_peer(start_height)
+                    if peer is None:
+                        if not self.can_serve(start_height):
+                            log.error(f"failed fetching blocks starting at {start_height} from peers")
+                            return False
+                        deferred.append(start_height)
+                        break
+                    # Count the request right away, so the next selection in this loop sees it
+                    self.stats(peer).in_flight += 1
+                    task = asyncio.create_task(self.request_batch(peer, start_height))
+                    in_flight[task] = start_height
+                for start_height in deferred:
+                    heapq.heappush(self.pending, start_height)
+
+                if len(in_flight) == 0:
+                    log.error(f"failed fetching blocks starting at {next_height}, no peers to fetch from")
+                    return False
+
+                done, _ = await asyncio.wait(in_flight.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    del in_flight[task]
+                    peer, start_height, blocks = task.result()
+                    if blocks is None:
+                        self.stats(peer).failures += 1
+                        self.failed_peers.setdefault(start_height, set()).add(peer.peer_node_id)
+                        heapq.heappush(self.pending, start_height)
+                        continue
+                    ready[start_height] = (peer, blocks)
+            return True
+        finally:
+            for task in in_flight.keys():
+                task.cancel()
+            for node_id, stats in self.peer_stats.items():
+                if stats.blocks_received > 0 or stats.failures > 0:
+                    log.info(
+                        f"Sync download from peer {node_id}: {stats.blocks_received} blocks, "
+                        f"{stats.blocks_per_second or 0:0.1f} blocks/s, {stats.failures} failed requests"
+                    )
@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from tranzact.full_node.bundle_tools import best_solution_generator_from_template, simple_solution_generator
+from tranzact.full_node.mempool import Mempool
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.generator_types import BlockGenerator, CompressorArg
+from tranzact.types.mempool_item import MempoolItem
+from tranzact.types.spend_bundle import SpendBundle
+
+# Seconds the full node waits after a mempool change before refreshing the block candidate, so transactions arriving
+# together are added in one refresh
+BLOCK_CANDIDATE_REFRESH_DELAY = 0.5
+
+
+@dataclass(frozen=True)
+class BlockCandidate:
+    """
+    The transactions of the mempool which go into the next block on top of a transaction block, with the aggregated
+    spend bundle and the block generator already built. The full node keeps it up to date as the mempool changes, so
+    a block can be made as soon as a proof of space arrives.
+    """
+
+    peak_header_hash: bytes32
+    # The mempool and its version the candidate was made from, it is out of date once either changed
+    mempool: Mempool
+    mempool_version: int
+    # In the order they were selected, by decreasing fee per cost
+    items: List[MempoolItem]
+    # None if there are no items
+    spend_bundle: Optional[SpendBundle]
+    additions: List[Coin]
+    removals: List[Coin]
+    cost: int
+    fees: int
+    # The template the generator was compressed with
+    previous_generator: Optional[CompressorArg]
+    generator: Optional[BlockGenerator]
+
+    def is_current(self, peak_header_hash: bytes32, mempool: Mempool) -> bool:
+        return (
+            self.peak_header_hash == peak_header_hash
+            and self.mempool is mempool
+            and self.mempool_version == mempool.version
+        )
+
+
+def make_block_generator(spend_bundle: SpendBundle, previous_generator: Optional[CompressorArg]) -> BlockGenerator:
+    if previous_generator is not None:
+        return best_solution_generator_from_template(previous_generator, spend_bundle)
+    return simple_solution_generator(spend_bundle)
@@ -0,0 +1,180 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from tranzact.full_node.block_store import BlockStore
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.blockchain_format.sub_epoch_summary import SubEpochSummary
+from tranzact.util.ints import uint32
+
+log = logging.getLogger(__name__)
+
+# Number of heights fetched from the database at a time, while walking back from the peak on startup
+WINDOW_SIZE = 1000
+# Number of heights that have to change before the height-to-hash file is rewritten. Anything not flushed when the
+# node stops is recovered from the database on the next startup
+FLUSH_THRESHOLD = 1000
+
+
+class BlockHeightMap:
+    """
+    Maps each height in the path from genesis to the peak (no orphan blocks) to the header hash at that height, and
+    holds the sub epoch summaries included in that path.
+
+    The header hashes are kept in a flat bytearray, 32 bytes per height, which is persisted to a file next to the
+    database. On startup the file is loaded in one read, and only the heights that disagree with the block records
+    (because of a reorg or crash after the last flush) are walked back from the peak and fixed. The sub epoch
+    summaries are stored in their own table, which is updated in the same transaction as the peak.
+    """
+
+    # Header hashes of the chain, 32 bytes per height. Heights above the peak may be stale after a reorg to a
+    # shorter chain, they are overwritten as the chain grows again
+    __height_to_hash: bytearray
+    # All sub-epoch summaries that have been included in the blockchain from the beginning until and including the peak
+    # (height_included, SubEpochSummary). Note: ONLY for the blocks in the path to the peak
+    __sub_epoch_summaries: Dict[uint32, SubEpochSummary]
+    # File the height-to-hash map is persisted to, or None to keep it in memory only
+    __height_to_hash_filename: Optional[Path]
+    # Lowest height that changed since the file was last written
+    __first_dirty: Optional[int]
+    block_store: BlockStore
+
+    @classmethod
+    async def create(cls, block_store: BlockStore, height_to_hash_filename: Optional[Path] = None):
+        self = cls()
+        self.block_store = block_store
+        self.__height_to_hash = bytearray()
+        self.__sub_epoch_summaries = {}
+        self.__height_to_hash_filename = height_to_hash_filename
+        self.__first_dirty = None
+
+        if height_to_hash_filename is not None and height_to_hash_filename.exists():
+            self.__height_to_hash = bytearray(height_to_hash_filename.read_bytes())
+
+        peak = await block_store.get_peak()
+        if peak is None:
+            self._resize(0)
+            self.flush()
+            return self
+
+        peak_hash, peak_height = peak
+        self._resize(peak_height + 1)
+        self.__sub_epoch_summaries = await block_store.get_sub_epoch_summaries()
+        # The summaries table is new for databases created before it existed, in which case the whole chain has to
+        # be walked to fill it in. Chains shorter than one sub epoch are cheap to walk anyway
+        await self._walk_back_from_peak(peak_hash, peak_height, len(self.__sub_epoch_summaries) == 0)
+        self.flush()
+        return self
+
+    def _resize(self, num_heights: int) -> None:
+        """
+        Truncates the map to num_heights, or pads it with zero hashes, which never match a block.
+        """
+        size = num_heights * 32
+        if len(self.__height_to_hash) == size:
+            return
+        self._mark_dirty(min(len(self.__height_to_hash) // 32, num_heights))
+        if len(self.__height_to_hash) > size:
+            del self.__height_to_hash[size:]
+        else:
+            self.__height_to_hash.extend(bytes(size - len(self.__height_to_hash)))
+
+    def _mark_dirty(self, height: int) -> None:
+        if self.__first_dirty is None or height < self.__first_dirty:
+            self.__first_dirty = height
+
+    async def _walk_back_from_peak(self, peak_hash: bytes32, peak_height: uint32, rebuild_summaries: bool) -> None:
+        """
+        Walks back from the peak, setting every height whose hash disagrees with the block records. Stops at the
+        first height that agrees, since a header hash commits to all of its ancestors. If rebuild_summaries is True,
+        walks all the way to genesis and stores the sub epoch summaries found along the way.
+        """
+        summaries: List[Tuple[uint32, SubEpochSummary]] = []
+        curr_hash = peak_hash
+        height: int = peak_height
+        fixed = 0
+        done = False
+        while height >= 0 and not done:
+            window_start = max(height - WINDOW_SIZE + 1, 0)
+            records = await self.block_store.get_prev_hash_and_summaries(uint32(window_start), uint32(height + 1))
+            while height >= window_start:
+                if not rebuild_summaries and self.get_hash(uint32(height)) == curr_hash:
+                    done = True
+                    break
+                record_height, prev_hash, summary = records[curr_hash]
+                assert record_height == height
+                if self.get_hash(uint32(height)) != curr_hash:
+                    self._set_hash(height, curr_hash)
+                    fixed += 1
+                if summary is not None:
+                    summaries.append((uint32(height), SubEpochSummary.from_bytes(summary)))
+                curr_hash = prev_hash
+                height -= 1
+
+        if fixed > 0:
+            log.info(f"Updated {fixed} heights of the height-to-hash map from the database")
+        if rebuild_summaries and len(summaries) > 0:
+            log.info(f"Stored {len(summaries)} sub epoch summaries")
+            self.__sub_epoch_summaries = dict(summaries)
+            await self.block_store.add_sub_epoch_summaries(summaries)
+            await self.block_store.db.commit()
+
+    def _set_hash(self, height: int, header_hash: bytes32) -> None:
+        idx = height * 32
+        assert idx <= len(self.__height_to_hash)
+        self.__height_to_hash[idx : idx + 32] = header_hash
+        self._mark_dirty(height)
+
+    def update_height(self, height: uint32, header_hash: bytes32, ses: Optional[SubEpochSummary]) -> None:
+        self._set_hash(height, header_hash)
+        if ses is not None:
+            self.__sub_epoch_summaries[height] = ses
+
+    def get_hash(self, height: uint32) -> bytes32:
+        idx = height * 32
+        if idx + 32 > len(self.__height_to_hash):
+            raise KeyError(height)
+        return bytes32(self.__height_to_hash[idx : idx + 32])
+
+    def contains_height(self, height: uint32) -> bool:
+        return height * 32 < len(self.__height_to_hash)
+
+    def rollback(self, fork_height: int) -> None:
+        """
+        Removes the sub epoch summaries above fork_height. The hashes above it are overwritten by update_height as
+        the new chain is added.
+        """
+        heights_to_delete = []
+        for ses_included_height in self.__sub_epoch_summaries.keys():
+            if ses_included_height > fork_height:
+                heights_to_delete.append(ses_included_height)
+        for height in heights_to_delete:
+            log.info(f"delete ses at height {height}")
+            del self.__sub_epoch_summaries[height]
+
+    def get_ses(self, height: uint32) -> SubEpochSummary:
+        return self.__sub_epoch_summaries[height]
+
+    def get_ses_heights(self) -> List[uint32]:
+        return sorted(self.__sub_epoch_summaries.keys())
+
+    def maybe_flush(self) -> None:
+        if self.__first_dirty is None:
+            return
+        if len(self.__height_to_hash) // 32 - self.__first_dirty < FLUSH_THRESHOLD:
+            return
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the heights that changed since the last flush to the height-to-hash file.
+        """
+        if self.__first_dirty is None:
+            return
+        if self.__height_to_hash_filename is not None:
+            mode = "r+b" if self.__height_to_hash_filename.exists() else "wb"
+            with open(self.__height_to_hash_filename, mode) as f:
+                f.seek(self.__first_dirty * 32)
+                f.write(self.__height_to_hash[self.__first_dirty * 32 :])
+                f.truncate()
+        self.__first_dirty = None
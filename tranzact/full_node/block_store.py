@@ -1,12 +1,12 @@
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import aiosqlite
 
 from tranzact.consensus.block_record import BlockRecord
 from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.types.blockchain_format.sub_epoch_summary import SubEpochSummary
-from tranzact.types.full_block import FullBlock
+from tranzact.types.full_block import FullBlock, LazyFullBlock
 from tranzact.types.weight_proof import SubEpochChallengeSegment, SubEpochSegments
 from tranzact.util.db_wrapper import DBWrapper
 from tranzact.util.ints import uint32
@@ -28,24 +28,53 @@ class BlockStore:
         # All full blocks which have been added to the blockchain. Header_hash -> block
         self.db_wrapper = db_wrapper
         self.db = db_wrapper.db
-        await self.db.execute(
-            "CREATE TABLE IF NOT EXISTS full_blocks(header_hash text PRIMARY KEY, height bigint,"
-            "  is_block tinyint, is_fully_compactified tinyint, block blob)"
-        )
+        if self.db_wrapper.db_version == 2:
+            await self.db.execute(
+                "CREATE TABLE IF NOT EXISTS full_blocks(header_hash blob PRIMARY KEY, height bigint,"
+                "  is_block tinyint, is_fully_compactified tinyint, block blob)"
+            )
 
-        # Block records
-        await self.db.execute(
-            "CREATE TABLE IF NOT EXISTS block_records(header_hash "
-            "text PRIMARY KEY, prev_hash text, height bigint,"
-            "block blob, sub_epoch_summary blob, is_peak tinyint, is_block tinyint)"
-        )
+            # Block records
+            await self.db.execute(
+                "CREATE TABLE IF NOT EXISTS block_records(header_hash "
+                "blob PRIMARY KEY, prev_hash blob, height bigint,"
+                "block blob, sub_epoch_summary blob, is_peak tinyint, is_block tinyint)"
+            )
 
-        # todo remove in v1.2
-        await self.db.execute("DROP TABLE IF EXISTS sub_epoch_segments_v2")
+            # Sub epoch segments for weight proofs
+            await self.db.execute(
+                "CREATE TABLE IF NOT EXISTS sub_epoch_segments_v3(ses_block_hash blob PRIMARY KEY,"
+                " challenge_segments blob)"
+            )
+        else:
+            await self.db.execute(
+                "CREATE TABLE IF NOT EXISTS full_blocks(header_hash text PRIMARY KEY, height bigint,"
+                "  is_block tinyint, is_fully_compactified tinyint, block blob)"
+            )
 
-        # Sub epoch segments for weight proofs
+            # Block records
+            await self.db.execute(
+                "CREATE TABLE IF NOT EXISTS block_records(header_hash "
+                "text PRIMARY KEY, prev_hash text, height bigint,"
+                "block blob, sub_epoch_summary blob, is_peak tinyint, is_block tinyint)"
+            )
+
+            # todo remove in v1.2
+            await self.db.execute("DROP TABLE IF EXISTS sub_epoch_segments_v2")
+
+            # Sub epoch segments for weight proofs
+            await self.db.execute(
+                "CREATE TABLE IF NOT EXISTS sub_epoch_segments_v3(ses_block_hash text PRIMARY KEY,"
+                " challenge_segments blob)"
+            )
+
+        # The last weight proof created, so it is extended rather than created from scratch after a restart
+        await self.db.execute("CREATE TABLE IF NOT EXISTS weight_proof(id tinyint PRIMARY KEY, weight_proof blob)")
+
+        # Sub epoch summaries included in the current chain, by the height of the including block. This is kept
+        # in the same transaction as the peak, so it never needs to be rebuilt by walking block_records
         await self.db.execute(
-            "CREATE TABLE IF NOT EXISTS sub_epoch_segments_v3(ses_block_hash text PRIMARY KEY, challenge_segments blob)"
+            "CREATE TABLE IF NOT EXISTS sub_epoch_summaries(height bigint PRIMARY KEY, sub_epoch_summary blob)"
         )
 
         # Height index so we can look up in order of height for sync purposes
@@ -57,7 +86,10 @@ class BlockStore:
 
         await self.db.execute("CREATE INDEX IF NOT EXISTS height on block_records(height)")
 
-        await self.db.execute("CREATE INDEX IF NOT EXISTS hh on block_records(header_hash)")
+        if self.db_wrapper.db_version == 1:
+            # this index duplicates the primary key. It's not created for
+            # version 2 databases
+            await self.db.execute("CREATE INDEX IF NOT EXISTS hh on block_records(header_hash)")
         await self.db.execute("CREATE INDEX IF NOT EXISTS peak on block_records(is_peak)")
 
         # this index is not used by any queries, don't create it for new
@@ -69,12 +101,24 @@ class BlockStore:
         self.ses_challenge_cache = LRUCache(50)
         return self
 
+    def maybe_from_hex(self, field: Any) -> bytes32:
+        if self.db_wrapper.db_version == 2:
+            return bytes32(field)
+        else:
+            return bytes32(bytes.fromhex(field))
+
+    def maybe_to_hex(self, field: bytes) -> Any:
+        if self.db_wrapper.db_version == 2:
+            return field
+        else:
+            return field.hex()
+
     async def add_full_block(self, header_hash: bytes32, block: FullBlock, block_record: BlockRecord) -> None:
         self.block_cache.put(header_hash, block)
         cursor_1 = await self.db.execute(
             "INSERT OR REPLACE INTO full_blocks VALUES(?, ?, ?, ?, ?)",
             (
-                header_hash.hex(),
+                self.maybe_to_hex(header_hash),
                 block.height,
                 int(block.is_transaction_block()),
                 int(block.is_fully_compactified()),
@@ -87,8 +131,8 @@ class BlockStore:
         cursor_2 = await self.db.execute(
             "INSERT OR REPLACE INTO block_records VALUES(?, ?, ?, ?,?, ?, ?)",
             (
-                header_hash.hex(),
-                block.prev_header_hash.hex(),
+                self.maybe_to_hex(header_hash),
+                self.maybe_to_hex(block.prev_header_hash),
                 block.height,
                 bytes(block_record),
                 None
@@ -106,7 +150,7 @@ class BlockStore:
         async with self.db_wrapper.lock:
             cursor_1 = await self.db.execute(
                 "INSERT OR REPLACE INTO sub_epoch_segments_v3 VALUES(?, ?)",
-                (ses_block_hash.hex(), bytes(SubEpochSegments(segments))),
+                (self.maybe_to_hex(ses_block_hash), bytes(SubEpochSegments(segments))),
             )
             await cursor_1.close()
             await self.db.commit()
@@ -118,17 +162,34 @@ class BlockStore:
         cached = self.ses_challenge_cache.get(ses_block_hash)
         if cached is not None:
             return cached
-        cursor = await self.db.execute(
-            "SELECT challenge_segments from sub_epoch_segments_v3 WHERE ses_block_hash=?", (ses_block_hash.hex(),)
-        )
-        row = await cursor.fetchone()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT challenge_segments from sub_epoch_segments_v3 WHERE ses_block_hash=?",
+                (self.maybe_to_hex(ses_block_hash),),
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
         if row is not None:
             challenge_segments = SubEpochSegments.from_bytes(row[0]).challenge_segments
             self.ses_challenge_cache.put(ses_block_hash, challenge_segments)
             return challenge_segments
         return None
 
+    async def persist_weight_proof(self, weight_proof_bytes: bytes) -> None:
+        async with self.db_wrapper.lock:
+            cursor = await self.db.execute("INSERT OR REPLACE INTO weight_proof VALUES(0, ?)", (weight_proof_bytes,))
+            await cursor.close()
+            await self.db.commit()
+
+    async def get_weight_proof(self) -> Optional[bytes]:
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute("SELECT weight_proof from weight_proof WHERE id=0")
+            row = await cursor.fetchone()
+            await cursor.close()
+        if row is None:
+            return None
+        return row[0]
+
     def rollback_cache_block(self, header_hash: bytes32):
         try:
             self.block_cache.remove(header_hash)
@@ -143,9 +204,12 @@ class BlockStore:
             log.debug(f"cache hit for block {header_hash.hex()}")
             return cached
         log.debug(f"cache miss for block {header_hash.hex()}")
-        cursor = await self.db.execute("SELECT block from full_blocks WHERE header_hash=?", (header_hash.hex(),))
-        row = await cursor.fetchone()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT block from full_blocks WHERE header_hash=?", (self.maybe_to_hex(header_hash),)
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
         if row is not None:
             block = FullBlock.from_bytes(row[0])
             self.block_cache.put(header_hash, block)
@@ -158,22 +222,55 @@ class BlockStore:
             log.debug(f"cache hit for block {header_hash.hex()}")
             return bytes(cached)
         log.debug(f"cache miss for block {header_hash.hex()}")
-        cursor = await self.db.execute("SELECT block from full_blocks WHERE header_hash=?", (header_hash.hex(),))
-        row = await cursor.fetchone()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT block from full_blocks WHERE header_hash=?", (self.maybe_to_hex(header_hash),)
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
         if row is not None:
             return row[0]
         return None
 
+    async def get_full_block_bytes_in_range(self, start_height: int, stop_height: int) -> Dict[bytes32, bytes]:
+        """
+        Returns the serialized blocks with start_height <= height <= stop_height, keyed by header hash, in a single
+        query. This includes orphan blocks, callers pick the ones in the chain by their header hash.
+        """
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT header_hash, block FROM full_blocks WHERE height >= ? AND height <= ?",
+                (start_height, stop_height),
+            )
+            ret: Dict[bytes32, bytes] = {}
+            async for row in cursor:
+                ret[self.maybe_from_hex(row[0])] = row[1]
+            await cursor.close()
+        return ret
+
+    async def get_lazy_full_block(self, header_hash: bytes32) -> Optional[Union[FullBlock, LazyFullBlock]]:
+        """
+        Returns the cached block, or a view of the stored block which only parses the fields that are used.
+        """
+        cached = self.block_cache.get(header_hash)
+        if cached is not None:
+            log.debug(f"cache hit for block {header_hash.hex()}")
+            return cached
+        block_bytes = await self.get_full_block_bytes(header_hash)
+        if block_bytes is not None:
+            return LazyFullBlock(block_bytes)
+        return None
+
     async def get_full_blocks_at(self, heights: List[uint32]) -> List[FullBlock]:
         if len(heights) == 0:
             return []
 
         heights_db = tuple(heights)
         formatted_str = f'SELECT block from full_blocks WHERE height in ({"?," * (len(heights_db) - 1)}?)'
-        cursor = await self.db.execute(formatted_str, heights_db)
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(formatted_str, heights_db)
+            rows = await cursor.fetchall()
+            await cursor.close()
         return [FullBlock.from_bytes(row[0]) for row in rows]
 
     async def get_block_records_by_hash(self, header_hashes: List[bytes32]):
@@ -184,11 +281,12 @@ class BlockStore:
         if len(header_hashes) == 0:
             return []
 
-        header_hashes_db = tuple([hh.hex() for hh in header_hashes])
+        header_hashes_db = tuple([self.maybe_to_hex(hh) for hh in header_hashes])
         formatted_str = f'SELECT block from block_records WHERE header_hash in ({"?," * (len(header_hashes_db) - 1)}?)'
-        cursor = await self.db.execute(formatted_str, header_hashes_db)
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(formatted_str, header_hashes_db)
+            rows = await cursor.fetchall()
+            await cursor.close()
         all_blocks: Dict[bytes32, BlockRecord] = {}
         for row in rows:
             block_rec: BlockRecord = BlockRecord.from_bytes(row[0])
@@ -209,16 +307,17 @@ class BlockStore:
         if len(header_hashes) == 0:
             return []
 
-        header_hashes_db = tuple([hh.hex() for hh in header_hashes])
+        header_hashes_db = tuple([self.maybe_to_hex(hh) for hh in header_hashes])
         formatted_str = (
             f'SELECT header_hash, block from full_blocks WHERE header_hash in ({"?," * (len(header_hashes_db) - 1)}?)'
         )
-        cursor = await self.db.execute(formatted_str, header_hashes_db)
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(formatted_str, header_hashes_db)
+            rows = await cursor.fetchall()
+            await cursor.close()
         all_blocks: Dict[bytes32, FullBlock] = {}
         for row in rows:
-            header_hash = bytes.fromhex(row[0])
+            header_hash = self.maybe_from_hex(row[0])
             full_block: FullBlock = FullBlock.from_bytes(row[1])
             all_blocks[header_hash] = full_block
             self.block_cache.put(header_hash, full_block)
@@ -230,12 +329,13 @@ class BlockStore:
         return ret
 
     async def get_block_record(self, header_hash: bytes32) -> Optional[BlockRecord]:
-        cursor = await self.db.execute(
-            "SELECT block from block_records WHERE header_hash=?",
-            (header_hash.hex(),),
-        )
-        row = await cursor.fetchone()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT block from block_records WHERE header_hash=?",
+                (self.maybe_to_hex(header_hash),),
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
         if row is not None:
             return BlockRecord.from_bytes(row[0])
         return None
@@ -252,12 +352,13 @@ class BlockStore:
 
         formatted_str = f"SELECT header_hash, block from block_records WHERE height >= {start} and height <= {stop}"
 
-        cursor = await self.db.execute(formatted_str)
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(formatted_str)
+            rows = await cursor.fetchall()
+            await cursor.close()
         ret: Dict[bytes32, BlockRecord] = {}
         for row in rows:
-            header_hash = bytes.fromhex(row[0])
+            header_hash = self.maybe_from_hex(row[0])
             ret[header_hash] = BlockRecord.from_bytes(row[1])
 
         return ret
@@ -270,62 +371,71 @@ class BlockStore:
         peak header hash.
         """
 
-        res = await self.db.execute("SELECT * from block_records WHERE is_peak = 1")
-        peak_row = await res.fetchone()
-        await res.close()
-        if peak_row is None:
-            return {}, None
-
-        formatted_str = f"SELECT header_hash, block  from block_records WHERE height >= {peak_row[2] - blocks_n}"
-        cursor = await self.db.execute(formatted_str)
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            res = await conn.execute("SELECT * from block_records WHERE is_peak = 1")
+            peak_row = await res.fetchone()
+            await res.close()
+            if peak_row is None:
+                return {}, None
+
+            formatted_str = f"SELECT header_hash, block  from block_records WHERE height >= {peak_row[2] - blocks_n}"
+            cursor = await conn.execute(formatted_str)
+            rows = await cursor.fetchall()
+            await cursor.close()
         ret: Dict[bytes32, BlockRecord] = {}
         for row in rows:
-            header_hash = bytes.fromhex(row[0])
+            header_hash = self.maybe_from_hex(row[0])
             ret[header_hash] = BlockRecord.from_bytes(row[1])
-        return ret, bytes.fromhex(peak_row[0])
+        return ret, self.maybe_from_hex(peak_row[0])
 
-    async def get_peak_height_dicts(self) -> Tuple[Dict[uint32, bytes32], Dict[uint32, SubEpochSummary]]:
+    async def get_peak(self) -> Optional[Tuple[bytes32, uint32]]:
         """
-        Returns a dictionary with all blocks, as well as the header hash of the peak,
-        if present.
+        Returns the header hash and height of the peak, if present.
         """
-
-        res = await self.db.execute("SELECT * from block_records WHERE is_peak = 1")
-        row = await res.fetchone()
-        await res.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute("SELECT header_hash, height FROM block_records WHERE is_peak = 1")
+            row = await cursor.fetchone()
+            await cursor.close()
         if row is None:
-            return {}, {}
+            return None
+        return self.maybe_from_hex(row[0]), uint32(row[1])
 
-        peak: bytes32 = bytes.fromhex(row[0])
-        cursor = await self.db.execute("SELECT header_hash,prev_hash,height,sub_epoch_summary from block_records")
-        rows = await cursor.fetchall()
+    async def get_prev_hash_and_summaries(
+        self, start_height: uint32, end_height: uint32
+    ) -> Dict[bytes32, Tuple[uint32, bytes32, Optional[bytes]]]:
+        """
+        Returns the height, previous hash and serialized sub epoch summary of every block record (including
+        orphans) with start_height <= height < end_height, keyed by header hash.
+        """
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT header_hash, prev_hash, height, sub_epoch_summary FROM block_records "
+                "WHERE height >= ? AND height < ?",
+                (start_height, end_height),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
+        return {self.maybe_from_hex(row[0]): (uint32(row[2]), self.maybe_from_hex(row[1]), row[3]) for row in rows}
+
+    async def get_sub_epoch_summaries(self) -> Dict[uint32, SubEpochSummary]:
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute("SELECT height, sub_epoch_summary FROM sub_epoch_summaries")
+            rows = await cursor.fetchall()
+            await cursor.close()
+        return {uint32(row[0]): SubEpochSummary.from_bytes(row[1]) for row in rows}
+
+    async def add_sub_epoch_summaries(self, summaries: List[Tuple[uint32, SubEpochSummary]]) -> None:
+        # We need to be in a sqlite transaction here, together with set_peak
+        cursor = await self.db.executemany(
+            "INSERT OR REPLACE INTO sub_epoch_summaries VALUES(?, ?)",
+            [(height, bytes(summary)) for height, summary in summaries],
+        )
         await cursor.close()
-        hash_to_prev_hash: Dict[bytes32, bytes32] = {}
-        hash_to_height: Dict[bytes32, uint32] = {}
-        hash_to_summary: Dict[bytes32, SubEpochSummary] = {}
 
-        for row in rows:
-            hash_to_prev_hash[bytes.fromhex(row[0])] = bytes.fromhex(row[1])
-            hash_to_height[bytes.fromhex(row[0])] = row[2]
-            if row[3] is not None:
-                hash_to_summary[bytes.fromhex(row[0])] = SubEpochSummary.from_bytes(row[3])
-
-        height_to_hash: Dict[uint32, bytes32] = {}
-        sub_epoch_summaries: Dict[uint32, SubEpochSummary] = {}
-
-        curr_header_hash = peak
-        curr_height = hash_to_height[curr_header_hash]
-        while True:
-            height_to_hash[curr_height] = curr_header_hash
-            if curr_header_hash in hash_to_summary:
-                sub_epoch_summaries[curr_height] = hash_to_summary[curr_header_hash]
-            if curr_height == 0:
-                break
-            curr_header_hash = hash_to_prev_hash[curr_header_hash]
-            curr_height = hash_to_height[curr_header_hash]
-        return height_to_hash, sub_epoch_summaries
+    async def rollback_sub_epoch_summaries(self, fork_height: int) -> None:
+        # We need to be in a sqlite transaction here, together with set_peak
+        cursor = await self.db.execute("DELETE FROM sub_epoch_summaries WHERE height > ?", (fork_height,))
+        await cursor.close()
 
     async def set_peak(self, header_hash: bytes32) -> None:
         # We need to be in a sqlite transaction here.
@@ -334,16 +444,17 @@ class BlockStore:
         await cursor_1.close()
         cursor_2 = await self.db.execute(
             "UPDATE block_records SET is_peak=1 WHERE header_hash=?",
-            (header_hash.hex(),),
+            (self.maybe_to_hex(header_hash),),
         )
         await cursor_2.close()
 
     async def is_fully_compactified(self, header_hash: bytes32) -> Optional[bool]:
-        cursor = await self.db.execute(
-            "SELECT is_fully_compactified from full_blocks WHERE header_hash=?", (header_hash.hex(),)
-        )
-        row = await cursor.fetchone()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT is_fully_compactified from full_blocks WHERE header_hash=?", (self.maybe_to_hex(header_hash),)
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
         if row is None:
             return None
         return bool(row[0])
@@ -352,12 +463,13 @@ class BlockStore:
         # Since orphan blocks do not get compactified, we need to check whether all blocks with a
         # certain height are not compact. And if we do have compact orphan blocks, then all that
         # happens is that the occasional chain block stays uncompact - not ideal, but harmless.
-        cursor = await self.db.execute(
-            f"SELECT height FROM full_blocks GROUP BY height HAVING sum(is_fully_compactified)=0 "
-            f"ORDER BY RANDOM() LIMIT {number}"
-        )
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                f"SELECT height FROM full_blocks GROUP BY height HAVING sum(is_fully_compactified)=0 "
+                f"ORDER BY RANDOM() LIMIT {number}"
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
 
         heights = []
         for row in rows:
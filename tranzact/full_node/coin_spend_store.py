@@ -0,0 +1,60 @@
+from typing import Dict, List, Tuple
+
+import aiosqlite
+
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.coin_spend import CoinSpend
+from tranzact.util.db_wrapper import DBWrapper
+
+# Number of coin ids looked up per query by get_coin_spends
+COIN_IDS_PER_QUERY = 999
+
+
+class CoinSpendStore:
+    """
+    The puzzle and solution of every spent coin, with the header hash of the block which spent it. This is optional,
+    it saves running the generator of a block to answer puzzle and solution requests. Rows of blocks which are no
+    longer in the chain are not removed, callers check the header hash against the chain instead.
+    """
+
+    db: aiosqlite.Connection
+    db_wrapper: DBWrapper
+
+    @classmethod
+    async def create(cls, db_wrapper: DBWrapper):
+        self = cls()
+        self.db_wrapper = db_wrapper
+        self.db = db_wrapper.db
+        await self.db.execute(
+            "CREATE TABLE IF NOT EXISTS coin_spends(coin_id blob PRIMARY KEY, header_hash blob, coin_spend blob)"
+        )
+        await self.db.commit()
+        return self
+
+    async def add_coin_spends(self, header_hash: bytes32, coin_spends: List[CoinSpend]) -> None:
+        # A coin spent again in a block of another chain replaces the row of the old block
+        cursor = await self.db.executemany(
+            "INSERT OR REPLACE INTO coin_spends VALUES(?, ?, ?)",
+            [(coin_spend.coin.name(), header_hash, bytes(coin_spend)) for coin_spend in coin_spends],
+        )
+        await cursor.close()
+
+    async def get_coin_spends(self, coin_ids: List[bytes32]) -> Dict[bytes32, Tuple[bytes32, CoinSpend]]:
+        """
+        Returns the header hash of the spending block and the coin spend of the coins which are present, by coin id
+        """
+        ret: Dict[bytes32, Tuple[bytes32, CoinSpend]] = {}
+        coin_ids = list(dict.fromkeys(coin_ids))
+        async with self.db_wrapper.reader() as conn:
+            for i in range(0, len(coin_ids), COIN_IDS_PER_QUERY):
+                chunk = coin_ids[i : i + COIN_IDS_PER_QUERY]
+                cursor = await conn.execute(
+                    "SELECT coin_id, header_hash, coin_spend FROM coin_spends "
+                    f'WHERE coin_id in ({"?," * (len(chunk) - 1)}?)',
+                    tuple(chunk),
+                )
+                rows = await cursor.fetchall()
+                await cursor.close()
+                for row in rows:
+                    ret[bytes32(row[0])] = (bytes32(row[1]), CoinSpend.from_bytes(row[2]))
+        return ret
@@ -1,4 +1,4 @@
-from typing import List, Optional, Set, Dict
+from typing import Any, List, Optional, Set, Dict
 import aiosqlite
 from tranzact.protocols.wallet_protocol import CoinState
 from tranzact.types.blockchain_format.coin import Coin
@@ -12,6 +12,10 @@ import logging
 
 log = logging.getLogger(__name__)
 
+# Number of coin names looked up per query by get_coin_records and get_coin_records_by_names. SQLite versions before
+# 3.32 allow at most 999 host parameters, and two are taken by the height range
+COIN_NAMES_PER_QUERY = 997
+
 
 class CoinStore:
     """
@@ -33,20 +37,36 @@ class CoinStore:
         self.coin_record_db = db_wrapper.db
         # the coin_name is unique in this table because the CoinStore always
         # only represent a single peak
-        await self.coin_record_db.execute(
-            (
-                "CREATE TABLE IF NOT EXISTS coin_record("
-                "coin_name text PRIMARY KEY,"
-                " confirmed_index bigint,"
-                " spent_index bigint,"
-                " spent int,"
-                " coinbase int,"
-                " puzzle_hash text,"
-                " coin_parent text,"
-                " amount blob,"
-                " timestamp bigint)"
+        if self.db_wrapper.db_version == 2:
+            await self.coin_record_db.execute(
+                (
+                    "CREATE TABLE IF NOT EXISTS coin_record("
+                    "coin_name blob PRIMARY KEY,"
+                    " confirmed_index bigint,"
+                    " spent_index bigint,"
+                    " spent int,"
+                    " coinbase int,"
+                    " puzzle_hash blob,"
+                    " coin_parent blob,"
+                    " amount blob,"
+                    " timestamp bigint)"
+                )
+            )
+        else:
+            await self.coin_record_db.execute(
+                (
+                    "CREATE TABLE IF NOT EXISTS coin_record("
+                    "coin_name text PRIMARY KEY,"
+                    " confirmed_index bigint,"
+                    " spent_index bigint,"
+                    " spent int,"
+                    " coinbase int,"
+                    " puzzle_hash text,"
+                    " coin_parent text,"
+                    " amount blob,"
+                    " timestamp bigint)"
+                )
             )
-        )
 
         # Useful for reorg lookups
         await self.coin_record_db.execute(
@@ -130,20 +150,68 @@ class CoinStore:
         cached = self.coin_record_cache.get(coin_name)
         if cached is not None:
             return cached
-        cursor = await self.coin_record_db.execute("SELECT * from coin_record WHERE coin_name=?", (coin_name.hex(),))
-        row = await cursor.fetchone()
-        await cursor.close()
+        committed_state = self.db_wrapper.committed_state()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute("SELECT * from coin_record WHERE coin_name=?", (self.maybe_to_hex(coin_name),))
+            row = await cursor.fetchone()
+            await cursor.close()
         if row is not None:
             coin = self.row_to_coin(row)
             record = CoinRecord(coin, row[1], row[2], row[3], row[4], row[8])
-            self.coin_record_cache.put(record.coin.name(), record)
+            # A reader does not see the changes of a transaction in progress, so its records are only cached if no
+            # transaction overlapped the read
+            if conn is self.db_wrapper.db or (
+                committed_state is not None and committed_state == self.db_wrapper.committed_state()
+            ):
+                self.coin_record_cache.put(record.coin.name(), record)
             return record
         return None
 
+    async def get_coin_records(self, coin_names: List[bytes32]) -> Dict[bytes32, CoinRecord]:
+        """
+        Returns the records of the coins which are present, by coin name. Like get_coin_record, but the coins missing
+        from the cache are looked up COIN_NAMES_PER_QUERY at a time instead of one query per coin.
+        """
+        ret: Dict[bytes32, CoinRecord] = {}
+        missing: List[bytes32] = []
+        for coin_name in dict.fromkeys(coin_names):
+            cached = self.coin_record_cache.get(coin_name)
+            if cached is not None:
+                ret[coin_name] = cached
+            else:
+                missing.append(coin_name)
+        if len(missing) == 0:
+            return ret
+
+        committed_state = self.db_wrapper.committed_state()
+        records: List[CoinRecord] = []
+        async with self.db_wrapper.reader() as conn:
+            for i in range(0, len(missing), COIN_NAMES_PER_QUERY):
+                chunk = missing[i : i + COIN_NAMES_PER_QUERY]
+                cursor = await conn.execute(
+                    f'SELECT * from coin_record WHERE coin_name in ({"?," * (len(chunk) - 1)}?)',
+                    tuple([self.maybe_to_hex(coin_name) for coin_name in chunk]),
+                )
+                rows = await cursor.fetchall()
+                await cursor.close()
+                for row in rows:
+                    coin = self.row_to_coin(row)
+                    records.append(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
+        # Same as get_coin_record, records read while a transaction overlapped are not cached
+        cache = conn is self.db_wrapper.db or (
+            committed_state is not None and committed_state == self.db_wrapper.committed_state()
+        )
+        for record in records:
+            ret[record.name] = record
+            if cache:
+                self.coin_record_cache.put(record.name, record)
+        return ret
+
     async def get_coins_added_at_height(self, height: uint32) -> List[CoinRecord]:
-        cursor = await self.coin_record_db.execute("SELECT * from coin_record WHERE confirmed_index=?", (height,))
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute("SELECT * from coin_record WHERE confirmed_index=?", (height,))
+            rows = await cursor.fetchall()
+            await cursor.close()
         coins = []
         for row in rows:
             coin = self.row_to_coin(row)
@@ -154,9 +222,10 @@ class CoinStore:
         # Special case to avoid querying all unspent coins (spent_index=0)
         if height == 0:
             return []
-        cursor = await self.coin_record_db.execute("SELECT * from coin_record WHERE spent_index=?", (height,))
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute("SELECT * from coin_record WHERE spent_index=?", (height,))
+            rows = await cursor.fetchall()
+            await cursor.close()
         coins = []
         for row in rows:
             spent: bool = bool(row[3])
@@ -176,15 +245,15 @@ class CoinStore:
     ) -> List[CoinRecord]:
 
         coins = set()
-        cursor = await self.coin_record_db.execute(
-            f"SELECT * from coin_record INDEXED BY coin_puzzle_hash WHERE puzzle_hash=? "
-            f"AND confirmed_index>=? AND confirmed_index<? "
-            f"{'' if include_spent_coins else 'AND spent=0'}",
-            (puzzle_hash.hex(), start_height, end_height),
-        )
-        rows = await cursor.fetchall()
-
-        await cursor.close()
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                f"SELECT * from coin_record INDEXED BY coin_puzzle_hash WHERE puzzle_hash=? "
+                f"AND confirmed_index>=? AND confirmed_index<? "
+                f"{'' if include_spent_coins else 'AND spent=0'}",
+                (self.maybe_to_hex(puzzle_hash), start_height, end_height),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
         for row in rows:
             coin = self.row_to_coin(row)
             coins.add(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
@@ -201,18 +270,17 @@ class CoinStore:
             return []
 
         coins = set()
-        puzzle_hashes_db = tuple([ph.hex() for ph in puzzle_hashes])
-        cursor = await self.coin_record_db.execute(
-            f"SELECT * from coin_record INDEXED BY coin_puzzle_hash "
-            f'WHERE puzzle_hash in ({"?," * (len(puzzle_hashes) - 1)}?) '
-            f"AND confirmed_index>=? AND confirmed_index<? "
-            f"{'' if include_spent_coins else 'AND spent=0'}",
-            puzzle_hashes_db + (start_height, end_height),
-        )
-
-        rows = await cursor.fetchall()
-
-        await cursor.close()
+        puzzle_hashes_db = tuple([self.maybe_to_hex(ph) for ph in puzzle_hashes])
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                f"SELECT * from coin_record INDEXED BY coin_puzzle_hash "
+                f'WHERE puzzle_hash in ({"?," * (len(puzzle_hashes) - 1)}?) '
+                f"AND confirmed_index>=? AND confirmed_index<? "
+                f"{'' if include_spent_coins else 'AND spent=0'}",
+                puzzle_hashes_db + (start_height, end_height),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
         for row in rows:
             coin = self.row_to_coin(row)
             coins.add(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
@@ -229,24 +297,38 @@ class CoinStore:
             return []
 
         coins = set()
-        names_db = tuple([name.hex() for name in names])
-        cursor = await self.coin_record_db.execute(
-            f'SELECT * from coin_record WHERE coin_name in ({"?," * (len(names) - 1)}?) '
-            f"AND confirmed_index>=? AND confirmed_index<? "
-            f"{'' if include_spent_coins else 'AND spent=0'}",
-            names_db + (start_height, end_height),
-        )
-        rows = await cursor.fetchall()
-
-        await cursor.close()
-        for row in rows:
-            coin = self.row_to_coin(row)
-            coins.add(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
+        names_db = [self.maybe_to_hex(name) for name in names]
+        async with self.db_wrapper.reader() as conn:
+            for i in range(0, len(names_db), COIN_NAMES_PER_QUERY):
+                chunk = names_db[i : i + COIN_NAMES_PER_QUERY]
+                cursor = await conn.execute(
+                    f'SELECT * from coin_record WHERE coin_name in ({"?," * (len(chunk) - 1)}?) '
+                    f"AND confirmed_index>=? AND confirmed_index<? "
+                    f"{'' if include_spent_coins else 'AND spent=0'}",
+                    tuple(chunk) + (start_height, end_height),
+                )
+                rows = await cursor.fetchall()
+                await cursor.close()
+                for row in rows:
+                    coin = self.row_to_coin(row)
+                    coins.add(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
 
         return list(coins)
 
+    def maybe_from_hex(self, field: Any) -> bytes32:
+        if self.db_wrapper.db_version == 2:
+            return bytes32(field)
+        else:
+            return bytes32(bytes.fromhex(field))
+
+    def maybe_to_hex(self, field: bytes) -> Any:
+        if self.db_wrapper.db_version == 2:
+            return field
+        else:
+            return field.hex()
+
     def row_to_coin(self, row) -> Coin:
-        return Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+        return Coin(self.maybe_from_hex(row[6]), self.maybe_from_hex(row[5]), uint64.from_bytes(row[7]))
 
     def row_to_coin_state(self, row):
         coin = self.row_to_coin(row)
@@ -266,17 +348,16 @@ class CoinStore:
             return []
 
         coins = set()
-        puzzle_hashes_db = tuple([ph.hex() for ph in puzzle_hashes])
-        cursor = await self.coin_record_db.execute(
-            f'SELECT * from coin_record WHERE puzzle_hash in ({"?," * (len(puzzle_hashes) - 1)}?) '
-            f"AND confirmed_index>=? AND confirmed_index<? "
-            f"{'' if include_spent_coins else 'AND spent=0'}",
-            puzzle_hashes_db + (start_height, end_height),
-        )
-
-        rows = await cursor.fetchall()
-
-        await cursor.close()
+        puzzle_hashes_db = tuple([self.maybe_to_hex(ph) for ph in puzzle_hashes])
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                f'SELECT * from coin_record WHERE puzzle_hash in ({"?," * (len(puzzle_hashes) - 1)}?) '
+                f"AND confirmed_index>=? AND confirmed_index<? "
+                f"{'' if include_spent_coins else 'AND spent=0'}",
+                puzzle_hashes_db + (start_height, end_height),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
         for row in rows:
             coins.add(self.row_to_coin_state(row))
 
@@ -293,17 +374,16 @@ class CoinStore:
             return []
 
         coins = set()
-        parent_ids_db = tuple([pid.hex() for pid in parent_ids])
-        cursor = await self.coin_record_db.execute(
-            f'SELECT * from coin_record WHERE coin_parent in ({"?," * (len(parent_ids) - 1)}?) '
-            f"AND confirmed_index>=? AND confirmed_index<? "
-            f"{'' if include_spent_coins else 'AND spent=0'}",
-            parent_ids_db + (start_height, end_height),
-        )
-
-        rows = await cursor.fetchall()
-
-        await cursor.close()
+        parent_ids_db = tuple([self.maybe_to_hex(pid) for pid in parent_ids])
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                f'SELECT * from coin_record WHERE coin_parent in ({"?," * (len(parent_ids) - 1)}?) '
+                f"AND confirmed_index>=? AND confirmed_index<? "
+                f"{'' if include_spent_coins else 'AND spent=0'}",
+                parent_ids_db + (start_height, end_height),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
         for row in rows:
             coin = self.row_to_coin(row)
             coins.add(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
@@ -320,17 +400,16 @@ class CoinStore:
             return []
 
         coins = set()
-        coin_ids_db = tuple([pid.hex() for pid in coin_ids])
-        cursor = await self.coin_record_db.execute(
-            f'SELECT * from coin_record WHERE coin_name in ({"?," * (len(coin_ids) - 1)}?) '
-            f"AND confirmed_index>=? AND confirmed_index<? "
-            f"{'' if include_spent_coins else 'AND spent=0'}",
-            coin_ids_db + (start_height, end_height),
-        )
-
-        rows = await cursor.fetchall()
-
-        await cursor.close()
+        coin_ids_db = tuple([self.maybe_to_hex(pid) for pid in coin_ids])
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute(
+                f'SELECT * from coin_record WHERE coin_name in ({"?," * (len(coin_ids) - 1)}?) '
+                f"AND confirmed_index>=? AND confirmed_index<? "
+                f"{'' if include_spent_coins else 'AND spent=0'}",
+                coin_ids_db + (start_height, end_height),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
         for row in rows:
             coins.add(self.row_to_coin_state(row))
         return list(coins)
@@ -400,13 +479,13 @@ class CoinStore:
             self.coin_record_cache.put(record.coin.name(), record)
             values.append(
                 (
-                    record.coin.name().hex(),
+                    self.maybe_to_hex(record.coin.name()),
                     record.confirmed_block_index,
                     record.spent_block_index,
                     int(record.spent),
                     int(record.coinbase),
-                    record.coin.puzzle_hash.hex(),
-                    record.coin.parent_coin_info.hex(),
+                    self.maybe_to_hex(record.coin.puzzle_hash),
+                    self.maybe_to_hex(record.coin.parent_coin_info),
                     bytes(record.coin.amount),
                     record.timestamp,
                 )
@@ -429,7 +508,7 @@ class CoinStore:
                 self.coin_record_cache.put(
                     r.name, CoinRecord(r.coin, r.confirmed_block_index, index, True, r.coinbase, r.timestamp)
                 )
-            updates.append((index, coin_name.hex()))
+            updates.append((index, self.maybe_to_hex(coin_name)))
 
         await self.coin_record_db.executemany(
             "UPDATE OR FAIL coin_record SET spent=1,spent_index=? WHERE coin_name=?", updates
@@ -0,0 +1,137 @@
+import random
+from typing import Iterator, Optional, Tuple
+
+# Separate generator for the node priorities, so the global random state is not affected
+_priority_rng = random.Random()
+
+
+class _Node:
+    __slots__ = ("fee_per_cost", "cost", "total_cost", "priority", "left", "right")
+
+    def __init__(self, fee_per_cost: float, cost: int):
+        self.fee_per_cost: float = fee_per_cost
+        self.cost: int = cost
+        self.total_cost: int = cost
+        self.priority: float = _priority_rng.random()
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+    def update(self) -> None:
+        total = self.cost
+        if self.left is not None:
+            total += self.left.total_cost
+        if self.right is not None:
+            total += self.right.total_cost
+        self.total_cost = total
+
+
+def _rotate_right(node: _Node) -> _Node:
+    left = node.left
+    assert left is not None
+    node.left = left.right
+    left.right = node
+    node.update()
+    left.update()
+    return left
+
+
+def _rotate_left(node: _Node) -> _Node:
+    right = node.right
+    assert right is not None
+    node.right = right.left
+    right.left = node
+    node.update()
+    right.update()
+    return right
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    # All keys in left are smaller than all keys in right
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+def _add(node: Optional[_Node], fee_per_cost: float, cost: int) -> Optional[_Node]:
+    if node is None:
+        assert cost > 0
+        return _Node(fee_per_cost, cost)
+    if fee_per_cost == node.fee_per_cost:
+        node.cost += cost
+        assert node.cost >= 0
+        if node.cost == 0:
+            return _merge(node.left, node.right)
+        node.update()
+        return node
+    if fee_per_cost < node.fee_per_cost:
+        node.left = _add(node.left, fee_per_cost, cost)
+        if node.left is not None and node.left.priority > node.priority:
+            return _rotate_right(node)
+    else:
+        node.right = _add(node.right, fee_per_cost, cost)
+        if node.right is not None and node.right.priority > node.priority:
+            return _rotate_left(node)
+    node.update()
+    return node
+
+
+class FeeRateIndex:
+    """
+    Ordered index of the total cost of the mempool per fee per cost, augmented with the cumulative cost of each
+    subtree (a treap). This allows finding the fee per cost at which a certain amount of cost is freed up, by
+    removing the cheapest transactions first, in O(log n) instead of walking all the items.
+    """
+
+    def __init__(self) -> None:
+        self._root: Optional[_Node] = None
+
+    @property
+    def total_cost(self) -> int:
+        if self._root is None:
+            return 0
+        return self._root.total_cost
+
+    def add(self, fee_per_cost: float, cost: int) -> None:
+        self._root = _add(self._root, fee_per_cost, cost)
+
+    def remove(self, fee_per_cost: float, cost: int) -> None:
+        self._root = _add(self._root, fee_per_cost, -cost)
+
+    def fee_per_cost_for_cost(self, cost: int) -> Optional[float]:
+        """
+        Returns the smallest fee per cost such that the total cost of all the entries with a fee per cost lower or
+        equal to it is at least cost, or None if the index does not contain that much cost.
+        """
+        node = self._root
+        while node is not None:
+            left_cost = node.left.total_cost if node.left is not None else 0
+            if cost <= left_cost:
+                node = node.left
+            elif cost <= left_cost + node.cost:
+                return node.fee_per_cost
+            else:
+                cost -= left_cost + node.cost
+                node = node.right
+        return None
+
+    def items(self) -> Iterator[Tuple[float, int]]:
+        """
+        Yields (fee_per_cost, cost) in increasing fee per cost.
+        """
+        stack = []
+        node = self._root
+        while len(stack) > 0 or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.fee_per_cost, node.cost
+            node = node.right
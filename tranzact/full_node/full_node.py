@@ -4,13 +4,15 @@ import logging
 import random
 import time
 import traceback
+from collections import deque
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Callable, Deque, Dict, FrozenSet, List, Optional, Set, Tuple, Union
 
 import aiosqlite
 from blspy import AugSchemeMPL
 
 import tranzact.server.ws_connection as ws  # lgtm [py/import-and-import-from]
+from tranzact.consensus.augmented_chain import AugmentedBlockchain
 from tranzact.consensus.block_creation import unfinished_block_to_full_block
 from tranzact.consensus.block_record import BlockRecord
 from tranzact.consensus.blockchain import Blockchain, ReceiveBlockResult
@@ -18,24 +20,29 @@ from tranzact.consensus.blockchain_interface import BlockchainInterface
 from tranzact.consensus.constants import ConsensusConstants
 from tranzact.consensus.cost_calculator import NPCResult
 from tranzact.consensus.difficulty_adjustment import get_next_sub_slot_iters_and_difficulty
+from tranzact.consensus.full_block_to_block_record import block_to_block_record
 from tranzact.consensus.make_sub_epoch_summary import next_sub_epoch_summary
 from tranzact.consensus.multiprocess_validation import PreValidationResult
 from tranzact.consensus.pot_iterations import calculate_sp_iters
+from tranzact.full_node.block_batch_fetcher import BlockBatchFetcher
+from tranzact.full_node.block_candidate import BLOCK_CANDIDATE_REFRESH_DELAY
 from tranzact.full_node.block_store import BlockStore
 from tranzact.full_node.lock_queue import LockQueue, LockClient
 from tranzact.full_node.bundle_tools import detect_potential_template_generator
+from tranzact.full_node.coin_spend_store import CoinSpendStore
 from tranzact.full_node.coin_store import CoinStore
 from tranzact.full_node.full_node_store import FullNodeStore, FullNodeStorePeakResult
 from tranzact.full_node.hint_store import HintStore
+from tranzact.full_node.mempool_check_conditions import get_spends_for_block
 from tranzact.full_node.mempool_manager import MempoolManager
 from tranzact.full_node.signage_point import SignagePoint
+from tranzact.full_node.subscriptions import PeerSubscriptions
 from tranzact.full_node.sync_store import SyncStore
 from tranzact.full_node.weight_proof import WeightProofHandler
 from tranzact.protocols import farmer_protocol, full_node_protocol, timelord_protocol, wallet_protocol
 from tranzact.protocols.full_node_protocol import (
     RequestBlocks,
     RespondBlock,
-    RespondBlocks,
     RespondSignagePoint,
 )
 from tranzact.protocols.protocol_message_types import ProtocolMessageTypes
@@ -49,6 +56,7 @@ from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.types.blockchain_format.sub_epoch_summary import SubEpochSummary
 from tranzact.types.blockchain_format.vdf import CompressibleVDFField, VDFInfo, VDFProof
 from tranzact.types.coin_record import CoinRecord
+from tranzact.types.coin_spend import CoinSpend
 from tranzact.types.end_of_slot_bundle import EndOfSubSlotBundle
 from tranzact.types.full_block import FullBlock
 from tranzact.types.generator_types import BlockGenerator
@@ -61,11 +69,14 @@ from tranzact.util import cached_bls
 from tranzact.util.bech32m import encode_puzzle_hash
 from tranzact.util.check_fork_next_block import check_fork_next_block
 from tranzact.util.condition_tools import pkm_pairs
+from tranzact.util.db_version import lookup_db_version, set_db_version
 from tranzact.util.db_wrapper import DBWrapper
 from tranzact.util.errors import ConsensusError, Err, ValidationError
 from tranzact.util.ints import uint8, uint32, uint64, uint128
+from tranzact.util.lru_cache import LRUCache
 from tranzact.util.path import mkdir, path_from_root
 from tranzact.util.safe_cancel_task import cancel_task_safe
+from tranzact.util.shared_pairing_cache import SHARED_MEMORY_AVAILABLE, SharedPairingCache
 from tranzact.util.profiler import profile_task
 from datetime import datetime
 from tranzact.util.db_synchronous import db_synchronous_on
@@ -92,6 +103,7 @@ class FullNode:
     timelord_lock: asyncio.Lock
     initialized: bool
     weight_proof_handler: Optional[WeightProofHandler]
+    pairing_cache: Optional[SharedPairingCache]
     _ui_tasks: Set[asyncio.Task]
     _blockchain_lock_queue: LockQueue
     _blockchain_lock_ultra_priority: LockClient
@@ -111,12 +123,12 @@ class FullNode:
         self.server = None
         self._shut_down = False  # Set to true to close all infinite loops
         self.constants = consensus_constants
-        self.pow_creation: Dict[uint32, asyncio.Event] = {}
         self.state_changed_callback: Optional[Callable] = None
         self.full_node_peers = None
         self.sync_store = None
         self.signage_point_times = [time.time() for _ in range(self.constants.NUM_SPS_SUB_SLOT)]
         self.full_node_store = FullNodeStore(self.constants)
+        self.pairing_cache = None
         self.uncompact_task = None
         self.compact_vdf_requests: Set[bytes32] = set()
         self.log = logging.getLogger(name if name else __name__)
@@ -129,11 +141,12 @@ class FullNode:
 
         db_path_replaced: str = config["database_path"].replace("CHALLENGE", config["selected_network"])
         self.db_path = path_from_root(root_path, db_path_replaced)
-        self.coin_subscriptions: Dict[bytes32, Set[bytes32]] = {}  # Puzzle Hash : Set[Peer ID]
-        self.ph_subscriptions: Dict[bytes32, Set[bytes32]] = {}  # Puzzle Hash : Set[Peer ID]
-        self.peer_coin_ids: Dict[bytes32, Set[bytes32]] = {}  # Peer ID: Set[Coin ids]
-        self.peer_puzzle_hash: Dict[bytes32, Set[bytes32]] = {}  # Peer ID: Set[puzzle_hash]
-        self.peer_sub_counter: Dict[bytes32, int] = {}  # Peer ID: int (subscription count)
+        # header hash -> coin id -> CoinSpend, of the blocks puzzles and solutions were last requested from
+        self.block_spends_cache = LRUCache(config.get("block_spends_cache_size", 50))
+        # Puzzle hashes and coin ids wallet peers subscribed to for coin state updates
+        self.subscriptions = PeerSubscriptions(
+            config.get("max_subscribe_items", 100000), config.get("max_subscriptions", 5000000)
+        )
         mkdir(self.db_path.parent)
 
     def _set_state_changed_callback(self, callback: Callable):
@@ -150,6 +163,7 @@ class FullNode:
         # These many respond_transaction tasks can be active at any point in time
         self.respond_transaction_semaphore = asyncio.Semaphore(200)
         # create the store (db) and full node instance
+        db_exists: bool = self.db_path.exists()
         self.connection = await aiosqlite.connect(self.db_path)
         await self.connection.execute("pragma journal_mode=wal")
 
@@ -168,15 +182,39 @@ class FullNode:
                 log.close()
 
             await self.connection.set_trace_callback(sql_trace_callback)
-        self.db_wrapper = DBWrapper(self.connection)
+        if not db_exists:
+            # new databases are created with the binary (version 2) schema
+            await set_db_version(self.connection, 2)
+        db_version: int = await lookup_db_version(self.connection)
+        self.log.info(f"Using blockchain database schema version {db_version}")
+        self.db_wrapper = DBWrapper(self.connection, db_version=db_version)
         self.block_store = await BlockStore.create(self.db_wrapper)
         self.sync_store = await SyncStore.create()
         self.hint_store = await HintStore.create(self.db_wrapper)
         self.coin_store = await CoinStore.create(self.db_wrapper)
+        self.coin_spend_store: Optional[CoinSpendStore] = None
+        if self.config.get("store_coin_spends", False):
+            self.coin_spend_store = await CoinSpendStore.create(self.db_wrapper)
+        # The readers are opened once the stores created their tables
+        await self.db_wrapper.open_readers(self.db_path, self.config.get("db_readers", 4))
+        # Owned by this node, several nodes in one process each have their own
+        if self.config.get("shared_bls_cache", True) and SHARED_MEMORY_AVAILABLE:
+            try:
+                self.pairing_cache = SharedPairingCache.create(self.config.get("bls_cache_size", 50000))
+            except OSError as e:
+                self.log.warning(f"Could not create the shared BLS pairing cache, using a local one: {e}")
         self.log.info("Initializing blockchain from disk")
         start_time = time.time()
-        self.blockchain = await Blockchain.create(self.coin_store, self.block_store, self.constants, self.hint_store)
-        self.mempool_manager = MempoolManager(self.coin_store, self.constants)
+        self.blockchain = await Blockchain.create(
+            self.coin_store,
+            self.block_store,
+            self.constants,
+            self.hint_store,
+            self.db_path.with_suffix(".height-to-hash"),
+            self.coin_spend_store,
+            self.pairing_cache,
+        )
+        self.mempool_manager = MempoolManager(self.coin_store, self.constants, self.pairing_cache)
 
         # Blocks are validated under high priority, and transactions under low priority. This guarantees blocks will
         # be validated first.
@@ -189,6 +227,7 @@ class FullNode:
         self.transaction_queue = asyncio.PriorityQueue(10000)
         self._transaction_queue_task = asyncio.create_task(self._handle_transactions())
         self.transaction_responses: List[Tuple[bytes32, MempoolInclusionStatus, Optional[Err]]] = []
+        self._block_candidate_task = asyncio.create_task(self._refresh_block_candidate())
 
         self.weight_proof_handler = None
         self._init_weight_proof = asyncio.create_task(self.initialize_weight_proof())
@@ -265,8 +304,85 @@ class FullNode:
         except asyncio.CancelledError:
             raise
 
+    async def _refresh_block_candidate(self):
+        """
+        Keeps the block candidate of the mempool up to date, so it does not have to be made when a proof of space
+        arrives
+        """
+        while not self._shut_down:
+            await self.mempool_manager.mempool_changed.wait()
+            await asyncio.sleep(BLOCK_CANDIDATE_REFRESH_DELAY)
+            self.mempool_manager.mempool_changed.clear()
+            peak: Optional[BlockRecord] = self.blockchain.get_peak()
+            if peak is None:
+                continue
+            try:
+                curr_l_tb: BlockRecord = peak
+                while not curr_l_tb.is_transaction_block:
+                    curr_l_tb = self.blockchain.block_record(curr_l_tb.prev_hash)
+                await self.mempool_manager.refresh_block_candidate(
+                    curr_l_tb.header_hash, self.full_node_store.previous_generator
+                )
+            except Exception:
+                self.log.error(f"Error refreshing the block candidate: {traceback.format_exc()}")
+
+    async def get_block_spends(self, height: uint32) -> Optional[Dict[bytes32, CoinSpend]]:
+        """
+        Returns the coin spends of the block at height in the chain, by coin id. None if the block has no generator
+        or running it failed.
+        """
+        header_hash: Optional[bytes32] = self.blockchain.height_to_hash(height)
+        if header_hash is None:
+            return None
+        cached: Optional[Dict[bytes32, CoinSpend]] = self.block_spends_cache.get(header_hash)
+        if cached is not None:
+            return cached
+        block: Optional[FullBlock] = await self.block_store.get_full_block(header_hash)
+        if block is None or block.transactions_generator is None:
+            return None
+        block_generator: Optional[BlockGenerator] = await self.blockchain.get_block_generator(block)
+        assert block_generator is not None
+        error, coin_spends = get_spends_for_block(block_generator, self.constants.MAX_BLOCK_COST_CLVM)
+        if error is not None:
+            self.log.error(f"Failed to get the coin spends of block {header_hash} at height {height}: {error}")
+            return None
+        spends: Dict[bytes32, CoinSpend] = {coin_spend.coin.name(): coin_spend for coin_spend in coin_spends}
+        self.block_spends_cache.put(header_hash, spends)
+        return spends
+
+    async def get_coin_spends(self, coin_records: List[CoinRecord]) -> Dict[bytes32, CoinSpend]:
+        """
+        Returns the puzzle and solution of the spent coins, by coin id. Coins found in the coin spend store are not
+        looked up in their blocks, and each other block is only run once, for all its coins.
+        """
+        ret: Dict[bytes32, CoinSpend] = {}
+        spent: List[CoinRecord] = [record for record in coin_records if record.spent]
+        if self.coin_spend_store is not None and len(spent) > 0:
+            stored = await self.coin_spend_store.get_coin_spends([record.name for record in spent])
+            for record in spent:
+                entry = stored.get(record.name)
+                # Rows of blocks which were reorged out are not removed from the store
+                if entry is not None and entry[0] == self.blockchain.height_to_hash(record.spent_block_index):
+                    ret[record.name] = entry[1]
+
+        records_by_height: Dict[uint32, List[CoinRecord]] = {}
+        for record in spent:
+            if record.name not in ret:
+                records_by_height.setdefault(record.spent_block_index, []).append(record)
+        for height, records in records_by_height.items():
+            spends = await self.get_block_spends(height)
+            if spends is None:
+                continue
+            for record in records:
+                coin_spend = spends.get(record.name)
+                if coin_spend is not None:
+                    ret[record.name] = coin_spend
+        return ret
+
     async def initialize_weight_proof(self):
-        self.weight_proof_handler = WeightProofHandler(self.constants, self.blockchain)
+        self.weight_proof_handler = WeightProofHandler(
+            self.constants, self.blockchain, self.config.get("weight_proof_validation_workers", 0)
+        )
         peak = self.blockchain.get_peak()
         if peak is not None:
             await self.weight_proof_handler.create_sub_epoch_segments()
@@ -661,23 +777,7 @@ class FullNode:
 
     def remove_subscriptions(self, peer: ws.WSTranzactConnection):
         # Remove all ph | coin id subscription for this peer
-        node_id = peer.peer_node_id
-        if node_id in self.peer_puzzle_hash:
-            puzzle_hashes = self.peer_puzzle_hash[node_id]
-            for ph in puzzle_hashes:
-                if ph in self.ph_subscriptions:
-                    if node_id in self.ph_subscriptions[ph]:
-                        self.ph_subscriptions[ph].remove(node_id)
-
-        if node_id in self.peer_coin_ids:
-            coin_ids = self.peer_coin_ids[node_id]
-            for coin_id in coin_ids:
-                if coin_id in self.coin_subscriptions:
-                    if node_id in self.coin_subscriptions[coin_id]:
-                        self.coin_subscriptions[coin_id].remove(node_id)
-
-        if peer.peer_node_id in self.peer_sub_counter:
-            self.peer_sub_counter.pop(peer.peer_node_id)
+        self.subscriptions.remove_peer(peer.peer_node_id)
 
     def _num_needed_peers(self) -> int:
         assert self.server is not None
@@ -696,21 +796,38 @@ class FullNode:
         # same for mempool_manager
         if hasattr(self, "mempool_manager"):
             self.mempool_manager.shut_down()
+        # after the mempool validation processes attached to it exit
+        if self.pairing_cache is not None:
+            if hasattr(self, "blockchain"):
+                self.blockchain.pairing_cache = None
+            self.pairing_cache.close()
+            self.pairing_cache = None
+        # weight_proof_handler is set in _start
+        if getattr(self, "weight_proof_handler", None) is not None:
+            self.weight_proof_handler.shut_down()
 
         if self.full_node_peers is not None:
             asyncio.create_task(self.full_node_peers.close())
         if self.uncompact_task is not None:
             self.uncompact_task.cancel()
         self._transaction_queue_task.cancel()
+        self._block_candidate_task.cancel()
         self._blockchain_lock_queue.close()
 
     async def _await_closed(self):
         cancel_task_safe(self._sync_task, self.log)
         for task_id, task in list(self.full_node_store.tx_fetch_tasks.items()):
             cancel_task_safe(task, self.log)
-        await self.connection.close()
         if self._init_weight_proof is not None:
             await asyncio.wait([self._init_weight_proof])
+        if getattr(self, "weight_proof_handler", None) is not None:
+            # The proof is only written at new sub epochs while running
+            try:
+                await self.weight_proof_handler.persist_proof()
+            except Exception as e:
+                self.log.warning(f"Could not persist the weight proof: {e}")
+        await self.db_wrapper.close_readers()
+        await self.connection.close()
         await self._blockchain_lock_queue.await_closed()
 
     async def _sync(self):
@@ -861,67 +978,133 @@ class FullNode:
         )
         batch_size = self.constants.MAX_BLOCK_COUNT_PER_REQUESTS
 
-        async def fetch_block_batches(batch_queue, peers_with_peak: List[ws.WSTranzactConnection]):
+        async def fetch_block_batches(batch_queue):
+            def get_peers() -> List[ws.WSTranzactConnection]:
+                return self.get_peers_with_peak(peak_hash)
+
+            fetcher = BlockBatchFetcher(
+                fork_point_height,
+                target_peak_sb_height,
+                batch_size,
+                get_peers,
+                self.config.get("sync_max_batches_in_flight", 8),
+                self.config.get("sync_max_batches_in_flight_per_peer", 2),
+            )
             try:
-                for start_height in range(fork_point_height, target_peak_sb_height, batch_size):
-                    end_height = min(target_peak_sb_height, start_height + batch_size)
-                    request = RequestBlocks(uint32(start_height), uint32(end_height), True)
-                    fetched = False
-                    for peer in random.sample(peers_with_peak, len(peers_with_peak)):
-                        if peer.closed:
-                            peers_with_peak.remove(peer)
-                            continue
-                        response = await peer.request_blocks(request, timeout=10)
-                        if response is None:
-                            await peer.close()
-                            peers_with_peak.remove(peer)
-                        elif isinstance(response, RespondBlocks):
-                            await batch_queue.put((peer, response.blocks))
-                            fetched = True
-                            break
-                    if fetched is False:
-                        self.log.error(f"failed fetching {start_height} to {end_height} from peers")
-                        await batch_queue.put(None)
-                        return
-                    if self.sync_store.peers_changed.is_set():
-                        peers_with_peak = self.get_peers_with_peak(peak_hash)
-                        self.sync_store.peers_changed.clear()
+                await fetcher.fetch(batch_queue, self.sync_store.peers_changed, buffer_size)
             except Exception as e:
-                self.log.error(f"Exception fetching {start_height} to {end_height} from peer {e}")
+                self.log.error(f"Exception fetching blocks from peers {e}")
             finally:
                 # finished signal with None
                 await batch_queue.put(None)
 
+        async def pre_validate_batch(
+            peer: ws.WSTranzactConnection,
+            blocks: List[FullBlock],
+            chain: AugmentedBlockchain,
+            pending_blocks: Dict[bytes32, FullBlock],
+            prev_task: Optional[asyncio.Task],
+        ) -> Tuple[ws.WSTranzactConnection, List[FullBlock], Optional[List[PreValidationResult]]]:
+            if prev_task is not None:
+                # The block records of the previous batch are needed to pre-validate this one
+                await asyncio.wait([prev_task])
+                if prev_task.cancelled() or prev_task.exception() is not None or prev_task.result()[2] is None:
+                    return peer, blocks, None
+            blocks_to_validate: List[FullBlock] = []
+            for i, block in enumerate(blocks):
+                if not chain.contains_block(block.header_hash):
+                    blocks_to_validate = blocks[i:]
+                    break
+            if len(blocks_to_validate) == 0:
+                return peer, blocks_to_validate, []
+            pre_validation_results = await self.pre_validate_block_batch(
+                blocks_to_validate, peer, summaries, chain, pending_blocks
+            )
+            if pre_validation_results is None:
+                return peer, blocks_to_validate, None
+            for block, result in zip(blocks_to_validate, pre_validation_results):
+                assert result.required_iters is not None
+                chain.add_block_record(block_to_block_record(self.constants, chain, result.required_iters, block, None))
+                pending_blocks[block.header_hash] = block
+            return peer, blocks_to_validate, pre_validation_results
+
         async def validate_block_batches(batch_queue):
+            # Batches are pre-validated ahead of the batch being added to the chain, so the worker processes are busy
+            # while the blocks are written to the DB. The records of the blocks which are pre-validated but not added
+            # yet are kept in an AugmentedBlockchain.
+            pipeline_depth = max(1, self.config.get("sync_pipeline_depth", 2))
+            chain = AugmentedBlockchain(self.blockchain)
+            pending_blocks: Dict[bytes32, FullBlock] = {}
+            pipeline: Deque[asyncio.Task] = deque()
+            done_fetching = False
             advanced_peak = False
-            while True:
-                res = await batch_queue.get()
-                if res is None:
-                    self.log.debug("done fetching blocks")
-                    return
-                peer, blocks = res
-                start_height = blocks[0].height
-                end_height = blocks[-1].height
-                success, advanced_peak, fork_height, coin_states = await self.receive_block_batch(
-                    blocks, peer, None if advanced_peak else uint32(fork_point_height), summaries
-                )
-                if success is False:
-                    if peer in peers_with_peak:
-                        peers_with_peak.remove(peer)
-                    await peer.close(600)
-                    raise ValueError(f"Failed to validate block batch {start_height} to {end_height}")
-                self.log.info(f"Added blocks {start_height} to {end_height}")
-                await self.send_peak_to_wallets()
-                peak = self.blockchain.get_peak()
-                if len(coin_states) > 0 and fork_height is not None:
-                    await self.update_wallets(peak.height, fork_height, peak.header_hash, coin_states)
-                self.blockchain.clean_block_record(end_height - self.constants.BLOCKS_CACHE_SIZE)
+            sync_start = time.time()
+            blocks_added = 0
+            try:
+                while True:
+                    while not done_fetching and len(pipeline) < pipeline_depth:
+                        if len(pipeline) > 0 and batch_queue.empty():
+                            break
+                        res = await batch_queue.get()
+                        if res is None:
+                            self.log.debug("done fetching blocks")
+                            done_fetching = True
+                            break
+                        peer, blocks = res
+                        prev_task = pipeline[-1] if len(pipeline) > 0 else None
+                        pipeline.append(
+                            asyncio.create_task(pre_validate_batch(peer, blocks, chain, pending_blocks, prev_task))
+                        )
+                    if len(pipeline) == 0:
+                        break
+
+                    peer, blocks_to_validate, pre_validation_results = await pipeline.popleft()
+                    if len(blocks_to_validate) == 0:
+                        continue
+                    start_height = blocks_to_validate[0].height
+                    end_height = blocks_to_validate[-1].height
+                    if pre_validation_results is None:
+                        success = False
+                    else:
+                        success, advanced_peak, fork_height, coin_states = await self.add_pre_validated_block_batch(
+                            blocks_to_validate,
+                            pre_validation_results,
+                            peer,
+                            None if advanced_peak else uint32(fork_point_height),
+                        )
+                    # These blocks are now in the blockchain (or invalid), no need to keep them in the overlay
+                    for block in blocks_to_validate:
+                        if pending_blocks.pop(block.header_hash, None) is not None:
+                            chain.remove_block_record(block.header_hash)
+                    if success is False:
+                        if peer in peers_with_peak:
+                            peers_with_peak.remove(peer)
+                        await peer.close(600)
+                        raise ValueError(f"Failed to validate block batch {start_height} to {end_height}")
+                    blocks_added += len(blocks_to_validate)
+                    self.log.info(
+                        f"Added blocks {start_height} to {end_height}, "
+                        f"sync speed: {blocks_added / max(time.time() - sync_start, 0.001):0.1f} blocks/s"
+                    )
+                    await self.send_peak_to_wallets()
+                    peak = self.blockchain.get_peak()
+                    if len(coin_states) > 0 and fork_height is not None:
+                        await self.update_wallets(peak.height, fork_height, peak.header_hash, coin_states)
+                    self.blockchain.clean_block_record(end_height - self.constants.BLOCKS_CACHE_SIZE)
+            finally:
+                for task in pipeline:
+                    task.cancel()
+                if blocks_added > 0:
+                    self.log.info(
+                        f"Synced {blocks_added} blocks in {time.time() - sync_start:0.1f} seconds, "
+                        f"{blocks_added / max(time.time() - sync_start, 0.001):0.1f} blocks/s"
+                    )
 
         loop = asyncio.get_event_loop()
         batch_queue: asyncio.Queue[Tuple[ws.WSTranzactConnection, List[FullBlock]]] = asyncio.Queue(
             loop=loop, maxsize=buffer_size
         )
-        fetch_task = asyncio.Task(fetch_block_batches(batch_queue, peers_with_peak))
+        fetch_task = asyncio.Task(fetch_block_batches(batch_queue))
         validate_task = asyncio.Task(validate_block_batches(batch_queue))
         try:
             await asyncio.gather(fetch_task, validate_task)
@@ -956,40 +1139,20 @@ class FullNode:
         peak_hash: bytes32,
         state_update: Tuple[List[CoinRecord], Dict[bytes, Dict[bytes32, CoinRecord]]],
     ):
-        changes_for_peer: Dict[bytes32, Set[CoinState]] = {}
-
-        states, hint_state = state_update
-
-        for coin_record in states:
-            if coin_record.name in self.coin_subscriptions:
-                subscribed_peers = self.coin_subscriptions[coin_record.name]
-                for peer in subscribed_peers:
-                    if peer not in changes_for_peer:
-                        changes_for_peer[peer] = set()
-                    changes_for_peer[peer].add(coin_record.coin_state)
-
-            if coin_record.coin.puzzle_hash in self.ph_subscriptions:
-                subscribed_peers = self.ph_subscriptions[coin_record.coin.puzzle_hash]
-                for peer in subscribed_peers:
-                    if peer not in changes_for_peer:
-                        changes_for_peer[peer] = set()
-                    changes_for_peer[peer].add(coin_record.coin_state)
-
-        for hint, records in hint_state.items():
-            if hint in self.ph_subscriptions:
-                subscribed_peers = self.ph_subscriptions[hint]
-                for peer in subscribed_peers:
-                    if peer not in changes_for_peer:
-                        changes_for_peer[peer] = set()
-                    for record in records.values():
-                        changes_for_peer[peer].add(record.coin_state)
+        changes_for_peer: Dict[bytes32, Set[CoinState]] = self.subscriptions.changes_for_peers(state_update)
 
+        # Peers with the same changes, such as several wallets subscribed to the same puzzle hashes, share one message
+        messages: Dict[FrozenSet[CoinState], Message] = {}
         for peer, changes in changes_for_peer.items():
             if peer not in self.server.all_connections:
                 continue
             ws_peer: ws.WSTranzactConnection = self.server.all_connections[peer]
-            state = CoinStateUpdate(height, fork_height, peak_hash, list(changes))
-            msg = make_msg(ProtocolMessageTypes.coin_state_update, state)
+            key = frozenset(changes)
+            msg = messages.get(key)
+            if msg is None:
+                state = CoinStateUpdate(height, fork_height, peak_hash, list(changes))
+                msg = make_msg(ProtocolMessageTypes.coin_state_update, state)
+                messages[key] = msg
             await ws_peer.send_message(msg)
 
     async def receive_block_batch(
@@ -999,7 +1162,6 @@ class FullNode:
         fork_point: Optional[uint32],
         wp_summaries: Optional[List[SubEpochSummary]] = None,
     ) -> Tuple[bool, bool, Optional[uint32], Tuple[List[CoinRecord], Dict[bytes, Dict[bytes, CoinRecord]]]]:
-        advanced_peak = False
         fork_height: Optional[uint32] = uint32(0)
 
         blocks_to_validate: List[FullBlock] = []
@@ -1010,23 +1172,58 @@ class FullNode:
         if len(blocks_to_validate) == 0:
             return True, False, fork_height, ([], {})
 
+        pre_validation_results = await self.pre_validate_block_batch(blocks_to_validate, peer, wp_summaries)
+        if pre_validation_results is None:
+            return False, False, None, ([], {})
+        return await self.add_pre_validated_block_batch(blocks_to_validate, pre_validation_results, peer, fork_point)
+
+    async def pre_validate_block_batch(
+        self,
+        blocks_to_validate: List[FullBlock],
+        peer: ws.WSTranzactConnection,
+        wp_summaries: Optional[List[SubEpochSummary]] = None,
+        block_records: Optional[BlockchainInterface] = None,
+        pending_blocks: Optional[Dict[bytes32, FullBlock]] = None,
+    ) -> Optional[List[PreValidationResult]]:
+        """
+        Pre-validates the blocks, returns None if any of them is invalid. block_records and pending_blocks are used
+        to pre-validate blocks which build on blocks that are pre-validated, but not added to the chain yet.
+        """
         pre_validate_start = time.time()
         pre_validation_results: Optional[
             List[PreValidationResult]
-        ] = await self.blockchain.pre_validate_blocks_multiprocessing(blocks_to_validate, {}, wp_summaries=wp_summaries)
+        ] = await self.blockchain.pre_validate_blocks_multiprocessing(
+            blocks_to_validate,
+            {},
+            wp_summaries=wp_summaries,
+            block_records=block_records,
+            pending_blocks=pending_blocks,
+        )
         pre_validate_end = time.time()
         if pre_validate_end - pre_validate_start > 10:
             self.log.warning(f"Block pre-validation time: {pre_validate_end - pre_validate_start:0.2f} seconds")
         else:
             self.log.debug(f"Block pre-validation time: {pre_validate_end - pre_validate_start:0.2f} seconds")
         if pre_validation_results is None:
-            return False, False, None, ([], {})
+            return None
         for i, block in enumerate(blocks_to_validate):
             if pre_validation_results[i].error is not None:
                 self.log.error(
                     f"Invalid block from peer: {peer.get_peer_logging()} {Err(pre_validation_results[i].error)}"
                 )
-                return False, advanced_peak, fork_height, ([], {})
+                return None
+        return pre_validation_results
+
+    async def add_pre_validated_block_batch(
+        self,
+        blocks_to_validate: List[FullBlock],
+        pre_validation_results: List[PreValidationResult],
+        peer: ws.WSTranzactConnection,
+        fork_point: Optional[uint32],
+    ) -> Tuple[bool, bool, Optional[uint32], Tuple[List[CoinRecord], Dict[bytes, Dict[bytes, CoinRecord]]]]:
+        advanced_peak = False
+        fork_height: Optional[uint32] = uint32(0)
+        add_start = time.time()
 
         # Dicts because deduping
         all_coin_changes: Dict[bytes32, CoinRecord] = {}
@@ -1061,7 +1258,7 @@ class FullNode:
         if advanced_peak:
             self._state_changed("new_peak")
             self.log.debug(
-                f"Total time for {len(blocks_to_validate)} blocks: {time.time() - pre_validate_start}, "
+                f"Total time for adding {len(blocks_to_validate)} blocks: {time.time() - add_start}, "
                 f"advanced: {advanced_peak}"
             )
         return True, advanced_peak, fork_height, (list(all_coin_changes.values()), all_hint_changes)
@@ -1610,7 +1807,7 @@ class FullNode:
 
             pairs_pks, pairs_msgs = pkm_pairs(npc_result.npc_list, self.constants.AGG_SIG_ME_ADDITIONAL_DATA)
             if not cached_bls.aggregate_verify(
-                pairs_pks, pairs_msgs, block.transactions_info.aggregated_signature, True
+                pairs_pks, pairs_msgs, block.transactions_info.aggregated_signature, True, self.pairing_cache
             ):
                 raise ConsensusError(Err.BAD_AGGREGATE_SIGNATURE)
 
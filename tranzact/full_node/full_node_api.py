@@ -12,9 +12,7 @@ import tranzact.server.ws_connection as ws
 from tranzact.consensus.block_creation import create_unfinished_block
 from tranzact.consensus.block_record import BlockRecord
 from tranzact.consensus.pot_iterations import calculate_ip_iters, calculate_iterations_quality, calculate_sp_iters
-from tranzact.full_node.bundle_tools import best_solution_generator_from_template, simple_solution_generator
 from tranzact.full_node.full_node import FullNode
-from tranzact.full_node.mempool_check_conditions import get_puzzle_and_solution_for_coin
 from tranzact.full_node.signage_point import SignagePoint
 from tranzact.protocols import farmer_protocol, full_node_protocol, introducer_protocol, timelord_protocol, wallet_protocol
 from tranzact.protocols.full_node_protocol import RejectBlock, RejectBlocks
@@ -27,14 +25,15 @@ from tranzact.protocols.wallet_protocol import (
     RespondSESInfo,
 )
 from tranzact.server.outbound_message import Message, make_msg
+from tranzact.server.rate_limits import rate_limits_other
 from tranzact.types.blockchain_format.coin import Coin, hash_coin_list
 from tranzact.types.blockchain_format.pool_target import PoolTarget
-from tranzact.types.blockchain_format.program import Program
 from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.types.blockchain_format.sub_epoch_summary import SubEpochSummary
 from tranzact.types.coin_record import CoinRecord
+from tranzact.types.coin_spend import CoinSpend
 from tranzact.types.end_of_slot_bundle import EndOfSubSlotBundle
-from tranzact.types.full_block import FullBlock
+from tranzact.types.full_block import FullBlock, LazyFullBlock
 from tranzact.types.generator_types import BlockGenerator
 from tranzact.types.mempool_inclusion_status import MempoolInclusionStatus
 from tranzact.types.mempool_item import MempoolItem
@@ -264,22 +263,8 @@ class FullNodeAPI:
         if not self.full_node.blockchain.contains_block(request.tip):
             self.log.error(f"got weight proof request for unknown peak {request.tip}")
             return None
-        if request.tip in self.full_node.pow_creation:
-            event = self.full_node.pow_creation[request.tip]
-            await event.wait()
-            wp = await self.full_node.weight_proof_handler.get_proof_of_weight(request.tip)
-        else:
-            event = asyncio.Event()
-            self.full_node.pow_creation[request.tip] = event
-            wp = await self.full_node.weight_proof_handler.get_proof_of_weight(request.tip)
-            event.set()
-        tips = list(self.full_node.pow_creation.keys())
-
-        if len(tips) > 4:
-            # Remove old from cache
-            for i in range(0, 4):
-                self.full_node.pow_creation.pop(tips[i])
-
+        # Concurrent requests for the same tip share one proof creation
+        wp = await self.full_node.weight_proof_handler.get_proof_of_weight(request.tip)
         if wp is None:
             self.log.error(f"failed creating weight proof for peak {request.tip}")
             return None
@@ -310,11 +295,12 @@ class FullNodeAPI:
             msg = make_msg(ProtocolMessageTypes.reject_block, reject)
             return msg
         header_hash = self.full_node.blockchain.height_to_hash(request.height)
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash)
-        if block is not None:
-            if not request.include_transaction_block and block.transactions_generator is not None:
-                block = dataclasses.replace(block, transactions_generator=None)
-            return make_msg(ProtocolMessageTypes.respond_block, full_node_protocol.RespondBlock(block))
+        block_bytes: Optional[bytes] = await self.full_node.block_store.get_full_block_bytes(header_hash)
+        if block_bytes is not None:
+            if not request.include_transaction_block:
+                block_bytes = LazyFullBlock(block_bytes).without_transactions_generator()
+            # RespondBlock only contains the block, so the stored bytes are sent without parsing them
+            return make_msg(ProtocolMessageTypes.respond_block, block_bytes)
         reject = RejectBlock(request.height)
         msg = make_msg(ProtocolMessageTypes.reject_block, reject)
         return msg
@@ -322,53 +308,44 @@ class FullNodeAPI:
     @api_request
     @reply_type([ProtocolMessageTypes.respond_blocks, ProtocolMessageTypes.reject_blocks])
     async def request_blocks(self, request: full_node_protocol.RequestBlocks) -> Optional[Message]:
-        if request.end_height < request.start_height or request.end_height - request.start_height > 32:
+        max_request_blocks: int = self.full_node.config.get("max_request_blocks", 32)
+        if (
+            request.end_height < request.start_height
+            or request.end_height - request.start_height > max_request_blocks
+            or not self.full_node.blockchain.contains_height(request.end_height)
+        ):
             reject = RejectBlocks(request.start_height, request.end_height)
             msg: Message = make_msg(ProtocolMessageTypes.reject_blocks, reject)
             return msg
+
+        # The heights in the chain are contiguous, so all heights up to end_height are present as well
+        blocks_in_range: Dict[bytes32, bytes] = await self.full_node.block_store.get_full_block_bytes_in_range(
+            request.start_height, request.end_height
+        )
+        blocks_bytes: List[bytes] = [
+            bytes(uint32(request.start_height)),
+            bytes(uint32(request.end_height)),
+            bytes(uint32(request.end_height - request.start_height + 1)),
+        ]
         for i in range(request.start_height, request.end_height + 1):
-            if not self.full_node.blockchain.contains_height(uint32(i)):
+            block_bytes: Optional[bytes] = blocks_in_range.get(self.full_node.blockchain.height_to_hash(uint32(i)))
+            if block_bytes is None:
                 reject = RejectBlocks(request.start_height, request.end_height)
                 msg = make_msg(ProtocolMessageTypes.reject_blocks, reject)
                 return msg
+            if not request.include_transaction_block:
+                block_bytes = LazyFullBlock(block_bytes).without_transactions_generator()
 
-        if not request.include_transaction_block:
-            blocks: List[FullBlock] = []
-            for i in range(request.start_height, request.end_height + 1):
-                block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(
-                    self.full_node.blockchain.height_to_hash(uint32(i))
-                )
-                if block is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    msg = make_msg(ProtocolMessageTypes.reject_blocks, reject)
-                    return msg
-                block = dataclasses.replace(block, transactions_generator=None)
-                blocks.append(block)
-            msg = make_msg(
-                ProtocolMessageTypes.respond_blocks,
-                full_node_protocol.RespondBlocks(request.start_height, request.end_height, blocks),
-            )
-        else:
-            blocks_bytes: List[bytes] = []
-            for i in range(request.start_height, request.end_height + 1):
-                block_bytes: Optional[bytes] = await self.full_node.block_store.get_full_block_bytes(
-                    self.full_node.blockchain.height_to_hash(uint32(i))
-                )
-                if block_bytes is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    msg = make_msg(ProtocolMessageTypes.reject_blocks, reject)
-                    return msg
-
-                blocks_bytes.append(block_bytes)
+            blocks_bytes.append(block_bytes)
 
-            respond_blocks_manually_streamed: bytes = (
-                bytes(uint32(request.start_height))
-                + bytes(uint32(request.end_height))
-                + len(blocks_bytes).to_bytes(4, "big", signed=False)
-            )
-            for block_bytes in blocks_bytes:
-                respond_blocks_manually_streamed += block_bytes
-            msg = make_msg(ProtocolMessageTypes.respond_blocks, respond_blocks_manually_streamed)
+        # join sizes the response once and copies each block into it, instead of reallocating for every block
+        respond_blocks_manually_streamed: bytes = b"".join(blocks_bytes)
+        if len(respond_blocks_manually_streamed) > rate_limits_other[ProtocolMessageTypes.respond_blocks].max_size:
+            # The response would be dropped by our own rate limiter
+            reject = RejectBlocks(request.start_height, request.end_height)
+            msg = make_msg(ProtocolMessageTypes.reject_blocks, reject)
+            return msg
+        msg = make_msg(ProtocolMessageTypes.respond_blocks, respond_blocks_manually_streamed)
 
         return msg
 
@@ -744,30 +721,23 @@ class FullNodeAPI:
                     curr_l_tb: BlockRecord = peak
                     while not curr_l_tb.is_transaction_block:
                         curr_l_tb = self.full_node.blockchain.block_record(curr_l_tb.prev_hash)
+                    # The candidate is usually made already, when the mempool last changed
                     try:
-                        mempool_bundle = await self.full_node.mempool_manager.create_bundle_from_mempool(
-                            curr_l_tb.header_hash
+                        candidate = self.full_node.mempool_manager.get_block_candidate(
+                            curr_l_tb.header_hash, self.full_node.full_node_store.previous_generator
                         )
                     except Exception as e:
                         self.log.error(f"Traceback: {traceback.format_exc()}")
                         self.full_node.log.error(f"Error making spend bundle {e} peak: {peak}")
-                        mempool_bundle = None
-                    if mempool_bundle is not None:
-                        spend_bundle = mempool_bundle[0]
-                        additions = mempool_bundle[1]
-                        removals = mempool_bundle[2]
+                        candidate = None
+                    if candidate is not None and candidate.spend_bundle is not None:
+                        additions = candidate.additions
+                        removals = candidate.removals
                         self.full_node.log.info(f"Add rem: {len(additions)} {len(removals)}")
-                        aggregate_signature = spend_bundle.aggregated_signature
-                        if self.full_node.full_node_store.previous_generator is not None:
-                            self.log.info(
-                                f"Using previous generator for height "
-                                f"{self.full_node.full_node_store.previous_generator}"
-                            )
-                            block_generator = best_solution_generator_from_template(
-                                self.full_node.full_node_store.previous_generator, spend_bundle
-                            )
-                        else:
-                            block_generator = simple_solution_generator(spend_bundle)
+                        aggregate_signature = candidate.spend_bundle.aggregated_signature
+                        if candidate.previous_generator is not None:
+                            self.log.info(f"Using previous generator for height {candidate.previous_generator}")
+                        block_generator = candidate.generator
 
             def get_plot_sig(to_sign, _) -> G2Element:
                 if to_sign == request.challenge_chain_sp:
@@ -1101,7 +1071,8 @@ class FullNodeAPI:
 
     @api_request
     async def request_additions(self, request: wallet_protocol.RequestAdditions) -> Optional[Message]:
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(request.header_hash)
+        # Only the height, header hash and transaction fields are used, so the block is not parsed fully
+        block = await self.full_node.block_store.get_lazy_full_block(request.header_hash)
 
         # We lock so that the coin store does not get modified
         if (
@@ -1164,7 +1135,8 @@ class FullNodeAPI:
 
     @api_request
     async def request_removals(self, request: wallet_protocol.RequestRemovals) -> Optional[Message]:
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(request.header_hash)
+        # Only the height, header hash and transaction fields are used, so the block is not parsed fully
+        block = await self.full_node.block_store.get_lazy_full_block(request.header_hash)
 
         # We lock so that the coin store does not get modified
         if (
@@ -1271,23 +1243,12 @@ class FullNodeAPI:
         if coin_record is None or coin_record.spent_block_index != height:
             return reject_msg
 
-        header_hash = self.full_node.blockchain.height_to_hash(height)
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash)
-
-        if block is None or block.transactions_generator is None:
-            return reject_msg
-
-        block_generator: Optional[BlockGenerator] = await self.full_node.blockchain.get_block_generator(block)
-        assert block_generator is not None
-        error, puzzle, solution = get_puzzle_and_solution_for_coin(
-            block_generator, coin_name, self.full_node.constants.MAX_BLOCK_COST_CLVM
-        )
-
-        if error is not None:
+        coin_spend: Optional[CoinSpend] = (await self.full_node.get_coin_spends([coin_record])).get(coin_name)
+        if coin_spend is None:
             return reject_msg
 
-        pz = Program.to(puzzle)
-        sol = Program.to(solution)
+        pz = coin_spend.puzzle_reveal.to_program()
+        sol = coin_spend.solution.to_program()
 
         wrapper = PuzzleSolutionResponse(coin_name, height, pz, sol)
         response = wallet_protocol.RespondPuzzleSolution(wrapper)
@@ -1377,26 +1338,9 @@ class FullNodeAPI:
     async def register_interest_in_puzzle_hash(
         self, request: wallet_protocol.RegisterForPhUpdates, peer: ws.WSTranzactConnection
     ):
-        if peer.peer_node_id not in self.full_node.peer_puzzle_hash:
-            self.full_node.peer_puzzle_hash[peer.peer_node_id] = set()
-
-        if peer.peer_node_id not in self.full_node.peer_sub_counter:
-            self.full_node.peer_sub_counter[peer.peer_node_id] = 0
-
-        hint_coin_ids = []
         # Add peer to the "Subscribed" dictionary
-        for puzzle_hash in request.puzzle_hashes:
-            ph_hint_coins = await self.full_node.hint_store.get_coin_ids(puzzle_hash)
-            hint_coin_ids.extend(ph_hint_coins)
-            if puzzle_hash not in self.full_node.ph_subscriptions:
-                self.full_node.ph_subscriptions[puzzle_hash] = set()
-            if (
-                peer.peer_node_id not in self.full_node.ph_subscriptions[puzzle_hash]
-                and self.full_node.peer_sub_counter[peer.peer_node_id] < 100000
-            ):
-                self.full_node.ph_subscriptions[puzzle_hash].add(peer.peer_node_id)
-                self.full_node.peer_puzzle_hash[peer.peer_node_id].add(puzzle_hash)
-                self.full_node.peer_sub_counter[peer.peer_node_id] += 1
+        self.full_node.subscriptions.add_ph_subscriptions(peer.peer_node_id, request.puzzle_hashes)
+        hint_coin_ids: List[bytes32] = await self.full_node.hint_store.get_coin_ids_multi(request.puzzle_hashes)
 
         # Send all coins with requested puzzle hash that have been created after the specified height
         states: List[CoinState] = await self.full_node.coin_store.get_coin_states_by_puzzle_hashes(
@@ -1418,22 +1362,7 @@ class FullNodeAPI:
     async def register_interest_in_coin(
         self, request: wallet_protocol.RegisterForCoinUpdates, peer: ws.WSTranzactConnection
     ):
-        if peer.peer_node_id not in self.full_node.peer_coin_ids:
-            self.full_node.peer_coin_ids[peer.peer_node_id] = set()
-
-        if peer.peer_node_id not in self.full_node.peer_sub_counter:
-            self.full_node.peer_sub_counter[peer.peer_node_id] = 0
-
-        for coin_id in request.coin_ids:
-            if coin_id not in self.full_node.coin_subscriptions:
-                self.full_node.coin_subscriptions[coin_id] = set()
-            if (
-                peer.peer_node_id not in self.full_node.coin_subscriptions[coin_id]
-                and self.full_node.peer_sub_counter[peer.peer_node_id] < 100000
-            ):
-                self.full_node.coin_subscriptions[coin_id].add(peer.peer_node_id)
-                self.full_node.peer_coin_ids[peer.peer_node_id].add(coin_id)
-                self.full_node.peer_sub_counter[peer.peer_node_id] += 1
+        self.full_node.subscriptions.add_coin_subscriptions(peer.peer_node_id, request.coin_ids)
 
         states: List[CoinState] = await self.full_node.coin_store.get_coin_state_by_ids(
             include_spent_coins=True, coin_ids=request.coin_ids, start_height=request.min_height
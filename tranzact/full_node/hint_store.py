@@ -6,6 +6,10 @@ import logging
 
 log = logging.getLogger(__name__)
 
+# Number of hints looked up per query by get_coin_ids_multi. SQLite versions before 3.32 allow at most 999 host
+# parameters in a statement
+HINTS_PER_QUERY = 999
+
 
 class HintStore:
     coin_record_db: aiosqlite.Connection
@@ -16,25 +20,68 @@ class HintStore:
         self = cls()
         self.db_wrapper = db_wrapper
         self.coin_record_db = db_wrapper.db
+        await self._migrate_rowid_table()
+        # The coin ids of a hint are stored together in the primary key, so looking up a hint is a single range
+        # scan, without an index to maintain next to the table
         await self.coin_record_db.execute(
-            "CREATE TABLE IF NOT EXISTS hints(id INTEGER PRIMARY KEY AUTOINCREMENT, coin_id blob,  hint blob)"
+            "CREATE TABLE IF NOT EXISTS hints(coin_id blob, hint blob, PRIMARY KEY (hint, coin_id)) WITHOUT ROWID"
         )
-        await self.coin_record_db.execute("CREATE INDEX IF NOT EXISTS hint_index on hints(hint)")
         await self.coin_record_db.commit()
         return self
 
-    async def get_coin_ids(self, hint: bytes) -> List[bytes32]:
-        cursor = await self.coin_record_db.execute("SELECT * from hints WHERE hint=?", (hint,))
-        rows = await cursor.fetchall()
+    async def _migrate_rowid_table(self) -> None:
+        """
+        Converts a hints table created by older versions, with an AUTOINCREMENT id and a separate index on the hint,
+        to the WITHOUT ROWID layout keyed on (hint, coin_id). Duplicate rows, which the old layout allowed, are
+        dropped.
+        """
+        cursor = await self.coin_record_db.execute("PRAGMA table_info(hints)")
+        columns = [row[1] for row in await cursor.fetchall()]
         await cursor.close()
-        coin_ids = []
-        for row in rows:
-            coin_ids.append(row[1])
+        if "id" not in columns:
+            return None
+
+        log.info("Migrating the hints table to the WITHOUT ROWID layout, this may take a while")
+        await self.coin_record_db.execute("DROP TABLE IF EXISTS hints_v2")
+        await self.coin_record_db.execute(
+            "CREATE TABLE hints_v2(coin_id blob, hint blob, PRIMARY KEY (hint, coin_id)) WITHOUT ROWID"
+        )
+        await self.coin_record_db.execute("INSERT OR IGNORE INTO hints_v2 SELECT coin_id, hint FROM hints")
+        # also drops hint_index
+        await self.coin_record_db.execute("DROP TABLE hints")
+        await self.coin_record_db.execute("ALTER TABLE hints_v2 RENAME TO hints")
+        await self.coin_record_db.commit()
+
+    async def get_coin_ids(self, hint: bytes) -> List[bytes32]:
+        async with self.db_wrapper.reader() as conn:
+            cursor = await conn.execute("SELECT coin_id from hints WHERE hint=?", (hint,))
+            rows = await cursor.fetchall()
+            await cursor.close()
+        return [bytes32(row[0]) for row in rows]
+
+    async def get_coin_ids_multi(self, hints: List[bytes]) -> List[bytes32]:
+        """
+        Returns the ids of the coins created with any of the hints. The hints are looked up HINTS_PER_QUERY at a time,
+        each chunk in a single query.
+        """
+        coin_ids: List[bytes32] = []
+        # a hint repeated in different chunks would return its coins twice
+        hints = list(dict.fromkeys(hints))
+        async with self.db_wrapper.reader() as conn:
+            for i in range(0, len(hints), HINTS_PER_QUERY):
+                chunk = hints[i : i + HINTS_PER_QUERY]
+                cursor = await conn.execute(
+                    f'SELECT coin_id from hints WHERE hint in ({"?," * (len(chunk) - 1)}?)', tuple(chunk)
+                )
+                rows = await cursor.fetchall()
+                await cursor.close()
+                coin_ids.extend(bytes32(row[0]) for row in rows)
         return coin_ids
 
     async def add_hints(self, coin_hint_list: List[Tuple[bytes32, bytes]]) -> None:
         cursor = await self.coin_record_db.executemany(
-            "INSERT INTO hints VALUES(?, ?, ?)",
-            [(None,) + record for record in coin_hint_list],
+            # The same hints are added again when a block is re-added after a reorg
+            "INSERT OR IGNORE INTO hints VALUES(?, ?)",
+            coin_hint_list,
         )
         await cursor.close()
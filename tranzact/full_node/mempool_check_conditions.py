@@ -1,11 +1,13 @@
 import logging
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from clvm_rs import STRICT_MODE
 
 from tranzact.consensus.cost_calculator import NPCResult
 from tranzact.full_node.generator import create_generator_args, setup_generator_args
-from tranzact.types.blockchain_format.program import NIL
+from tranzact.types.blockchain_format.coin import Coin
+from tranzact.types.blockchain_format.program import NIL, SerializedProgram
+from tranzact.types.coin_spend import CoinSpend
 from tranzact.types.coin_record import CoinRecord
 from tranzact.types.condition_with_args import ConditionWithArgs
 from tranzact.types.generator_types import BlockGenerator
@@ -14,7 +16,7 @@ from tranzact.util.clvm import int_from_bytes
 from tranzact.util.condition_tools import ConditionOpcode
 from tranzact.util.errors import Err
 from tranzact.util.ints import uint32, uint64, uint16
-from tranzact.wallet.puzzles.generator_loader import GENERATOR_FOR_SINGLE_COIN_MOD
+from tranzact.wallet.puzzles.generator_loader import DESERIALIZE_MOD, GENERATOR_FOR_SINGLE_COIN_MOD
 from tranzact.wallet.puzzles.rom_bootstrap_generator import get_generator
 
 GENERATOR_MOD = get_generator()
@@ -135,6 +137,26 @@ def get_puzzle_and_solution_for_coin(generator: BlockGenerator, coin_name: bytes
         return e, None, None
 
 
+def get_spends_for_block(generator: BlockGenerator, max_cost: int) -> Tuple[Optional[Exception], List[CoinSpend]]:
+    """
+    Runs the block program once, and returns all the coin spends of the block, with their puzzles and solutions.
+    This is cheaper than calling get_puzzle_and_solution_for_coin for more than one coin of a block.
+    """
+    try:
+        block_program_args = [bytes(g) for g in generator.generator_refs()]
+        cost, result = generator.program.run_with_cost(max_cost, DESERIALIZE_MOD, block_program_args)
+        coin_spends: List[CoinSpend] = []
+        for spend in result.first().as_iter():
+            parent, puzzle, amount, solution = spend.as_iter()
+            coin = Coin(parent.atom, puzzle.get_tree_hash(), uint64(amount.as_int()))
+            coin_spends.append(
+                CoinSpend(coin, SerializedProgram.from_program(puzzle), SerializedProgram.from_program(solution))
+            )
+        return None, coin_spends
+    except Exception as e:
+        return e, []
+
+
 def mempool_check_conditions_dict(
     unspent: CoinRecord,
     conditions_dict: Dict[ConditionOpcode, List[ConditionWithArgs]],
@@ -4,14 +4,16 @@ import dataclasses
 import logging
 import time
 from concurrent.futures.process import ProcessPoolExecutor
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from blspy import G1Element, GTElement
 from chiabip158 import PyBIP158
 
 from tranzact.util import cached_bls
+from tranzact.util.cached_bls import LOCAL_CACHE, PairingCache
 from tranzact.consensus.block_record import BlockRecord
 from tranzact.consensus.constants import ConsensusConstants
 from tranzact.consensus.cost_calculator import NPCResult, calculate_cost_of_program
+from tranzact.full_node.block_candidate import BlockCandidate, make_block_generator
 from tranzact.full_node.bundle_tools import simple_solution_generator
 from tranzact.full_node.coin_store import CoinStore
 from tranzact.full_node.mempool import Mempool
@@ -23,20 +25,42 @@ from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.types.coin_record import CoinRecord
 from tranzact.types.condition_opcodes import ConditionOpcode
 from tranzact.types.condition_with_args import ConditionWithArgs
+from tranzact.types.generator_types import BlockGenerator, CompressorArg
 from tranzact.types.mempool_inclusion_status import MempoolInclusionStatus
 from tranzact.types.mempool_item import MempoolItem
 from tranzact.types.spend_bundle import SpendBundle
-from tranzact.util.cached_bls import LOCAL_CACHE
 from tranzact.util.clvm import int_from_bytes
 from tranzact.util.condition_tools import pkm_pairs
 from tranzact.util.errors import Err, ValidationError
 from tranzact.util.generator_tools import additions_for_npc
+from tranzact.util.hash import std_hash
 from tranzact.util.ints import uint32, uint64
 from tranzact.util.lru_cache import LRUCache
+from tranzact.util.shared_pairing_cache import SharedPairingCache, SharedPairingCacheHandle
 from tranzact.util.streamable import recurse_jsonify
 
 log = logging.getLogger(__name__)
 
+TIME_LOCK_CONDITIONS = {
+    ConditionOpcode.ASSERT_HEIGHT_RELATIVE,
+    ConditionOpcode.ASSERT_HEIGHT_ABSOLUTE,
+    ConditionOpcode.ASSERT_SECONDS_RELATIVE,
+    ConditionOpcode.ASSERT_SECONDS_ABSOLUTE,
+}
+
+# The pairing cache of the full node, in the validation processes of its MempoolManager
+_process_pairing_cache: Optional[SharedPairingCache] = None
+
+
+def init_validation_process(pairing_cache_handle: Optional[SharedPairingCacheHandle]) -> None:
+    """
+    Initializer of the validation processes of a MempoolManager, which attaches to the pairing cache of the full node
+    """
+    global _process_pairing_cache
+    if _process_pairing_cache is not None:
+        _process_pairing_cache.close()
+    _process_pairing_cache = None if pairing_cache_handle is None else SharedPairingCache.attach(pairing_cache_handle)
+
 
 def validate_clvm_and_signature(
     spend_bundle_bytes: bytes, max_cost: int, cost_per_byte: int, additional_data: bytes
@@ -44,7 +68,8 @@ def validate_clvm_and_signature(
     """
     Validates CLVM and aggregate signature for a spendbundle. This is meant to be called under a ProcessPoolExecutor
     in order to validate the heavy parts of a transction in a different thread. Returns an optional error,
-    the NPCResult and a cache of the new pairings validated (if not error)
+    the NPCResult and a cache of the new pairings validated (if not error), which is empty when the process uses the
+    shared pairing cache
     """
     try:
         bundle: SpendBundle = SpendBundle.from_bytes(spend_bundle_bytes)
@@ -60,12 +85,28 @@ def validate_clvm_and_signature(
         pks, msgs = pkm_pairs(result.npc_list, additional_data)
 
         # Verify aggregated signature
+        new_cache_entries: Dict[bytes, bytes] = {}
         cache: LRUCache = LRUCache(10000)
+        shared_cache = _process_pairing_cache
+        cached_keys: Set[bytes] = set()
+        if shared_cache is not None:
+            for pk, msg in zip(pks, msgs):
+                key = bytes(std_hash(pk + msg))
+                pairing = shared_cache.get(key)
+                if pairing is not None:
+                    cache.put(key, pairing)
+                    cached_keys.add(key)
         if not cached_bls.aggregate_verify(pks, msgs, bundle.aggregated_signature, True, cache):
             return Err.BAD_AGGREGATE_SIGNATURE, b"", {}
-        new_cache_entries: Dict[bytes, bytes] = {}
-        for k, v in cache.cache.items():
-            new_cache_entries[k] = bytes(v)
+        if shared_cache is not None:
+            # The new pairings are added to the cache shared with the parent process instead of returned, once the
+            # signature is valid, so invalid bundles can not evict the pairings of the mempool
+            for k, v in cache.cache.items():
+                if k not in cached_keys:
+                    shared_cache.put(k, v)
+        else:
+            for k, v in cache.cache.items():
+                new_cache_entries[k] = bytes(v)
     except ValidationError as e:
         return e.code, b"", {}
     except Exception:
@@ -75,7 +116,12 @@ def validate_clvm_and_signature(
 
 
 class MempoolManager:
-    def __init__(self, coin_store: CoinStore, consensus_constants: ConsensusConstants):
+    def __init__(
+        self,
+        coin_store: CoinStore,
+        consensus_constants: ConsensusConstants,
+        pairing_cache: Optional[SharedPairingCache] = None,
+    ):
         self.constants: ConsensusConstants = consensus_constants
         self.constants_json = recurse_jsonify(dataclasses.asdict(self.constants))
 
@@ -96,59 +142,175 @@ class MempoolManager:
         # Transactions that were unable to enter mempool, used for retry. (they were invalid)
         self.potential_cache = PendingTxCache(self.constants.MAX_BLOCK_COST_CLVM * 5)
         self.seen_cache_size = 10000
-        self.pool = ProcessPoolExecutor(max_workers=2)
+        # Pairings validated by the processes of the pool are added to it, or to the process local cache if None
+        self.pairing_cache = pairing_cache
+        if pairing_cache is None:
+            self.pool = ProcessPoolExecutor(max_workers=2)
+        else:
+            # The validation processes read and add to the pairing cache of the full node
+            self.pool = ProcessPoolExecutor(
+                max_workers=2, initializer=init_validation_process, initargs=(pairing_cache.handle(),)
+            )
 
         # The mempool will correspond to a certain peak
         self.peak: Optional[BlockRecord] = None
         self.mempool: Mempool = Mempool(self.mempool_max_total_cost)
 
+        # The next block made from the mempool, refreshed by the full node when mempool_changed is set
+        self.block_candidate: Optional[BlockCandidate] = None
+        self.mempool_changed = asyncio.Event()
+
     def shut_down(self):
         self.pool.shutdown(wait=True)
 
-    async def create_bundle_from_mempool(
-        self, last_tb_header_hash: bytes32
-    ) -> Optional[Tuple[SpendBundle, List[Coin], List[Coin]]]:
+    def select_items_for_block(self) -> Tuple[List[MempoolItem], int, int]:
         """
-        Returns aggregated spendbundle that can be used for creating new block,
-        additions and removals in that spend_bundle
+        Returns the items which go into a new block, by decreasing fee per cost, and their total cost and fees
         """
-        if self.peak is None or self.peak.header_hash != last_tb_header_hash:
-            return None
-
         cost_sum = 0  # Checks that total cost does not exceed block maximum
         fee_sum = 0  # Checks that total fees don't exceed 64 bits
-        spend_bundles: List[SpendBundle] = []
-        removals = []
-        additions = []
-        broke_from_inner_loop = False
-        log.info(f"Starting to make block, max cost: {self.constants.MAX_BLOCK_COST_CLVM}")
+        items: List[MempoolItem] = []
         for dic in reversed(self.mempool.sorted_spends.values()):
-            if broke_from_inner_loop:
-                break
             for item in dic.values():
-                log.info(f"Cumulative cost: {cost_sum}, fee per cost: {item.fee / item.cost}")
                 if (
                     item.cost + cost_sum <= self.limit_factor * self.constants.MAX_BLOCK_COST_CLVM
                     and item.fee + fee_sum <= self.constants.MAX_COIN_AMOUNT
                 ):
-                    spend_bundles.append(item.spend_bundle)
+                    items.append(item)
                     cost_sum += item.cost
                     fee_sum += item.fee
-                    removals.extend(item.removals)
-                    additions.extend(item.additions)
                 else:
-                    broke_from_inner_loop = True
-                    break
-        if len(spend_bundles) > 0:
+                    return items, cost_sum, fee_sum
+        return items, cost_sum, fee_sum
+
+    async def create_bundle_from_mempool(
+        self, last_tb_header_hash: bytes32
+    ) -> Optional[Tuple[SpendBundle, List[Coin], List[Coin]]]:
+        """
+        Returns aggregated spendbundle that can be used for creating new block,
+        additions and removals in that spend_bundle
+        """
+        if self.peak is None or self.peak.header_hash != last_tb_header_hash:
+            return None
+
+        log.info(f"Starting to make block, max cost: {self.constants.MAX_BLOCK_COST_CLVM}")
+        items, cost_sum, _ = self.select_items_for_block()
+        if len(items) > 0:
             log.info(
                 f"Cumulative cost of block (real cost should be less) {cost_sum}. Proportion "
                 f"full: {cost_sum / self.constants.MAX_BLOCK_COST_CLVM}"
             )
-            agg = SpendBundle.aggregate(spend_bundles)
+            agg = SpendBundle.aggregate([item.spend_bundle for item in items])
+            additions: List[Coin] = [coin for item in items for coin in item.additions]
+            removals: List[Coin] = [coin for item in items for coin in item.removals]
             return agg, additions, removals
         else:
             return None
 
+    def get_block_candidate(
+        self, last_tb_header_hash: bytes32, previous_generator: Optional[CompressorArg]
+    ) -> Optional[BlockCandidate]:
+        """
+        Returns the block candidate for a block on top of last_tb_header_hash, with the generator compressed with
+        previous_generator, or None if the mempool is for another peak. The candidate is only rebuilt if the mempool
+        changed since it was made: if the items selected before are still selected first, only the signatures of the
+        new items are aggregated.
+        """
+        if self.peak is None or self.peak.header_hash != last_tb_header_hash:
+            return None
+        candidate = self._block_candidate_builder(last_tb_header_hash, previous_generator)()
+        self.block_candidate = candidate
+        return candidate
+
+    async def refresh_block_candidate(
+        self, last_tb_header_hash: bytes32, previous_generator: Optional[CompressorArg]
+    ) -> None:
+        """
+        Like get_block_candidate, but aggregates the signatures and compresses the generator in a thread, from a
+        snapshot of the selected items, so the event loop keeps handling peers and blocks meanwhile
+        """
+        if self.peak is None or self.peak.header_hash != last_tb_header_hash:
+            return
+        old = self.block_candidate
+        build = self._block_candidate_builder(last_tb_header_hash, previous_generator)
+        candidate = await asyncio.get_running_loop().run_in_executor(None, build)
+        # get_block_candidate may have made a newer one while it was built
+        if self.block_candidate is old:
+            self.block_candidate = candidate
+
+    def _block_candidate_builder(
+        self, last_tb_header_hash: bytes32, previous_generator: Optional[CompressorArg]
+    ) -> Callable[[], BlockCandidate]:
+        """
+        Selects the items of the block candidate, and returns a function making it which only uses that selection,
+        and not the mempool, so it can run in another thread
+        """
+        old = self.block_candidate
+        mempool = self.mempool
+        if old is not None and old.is_current(last_tb_header_hash, mempool):
+            if old.previous_generator is previous_generator:
+                return lambda: old
+
+            def replace_template() -> BlockCandidate:
+                # Only the template changed
+                assert old is not None
+                generator = None
+                if old.spend_bundle is not None:
+                    generator = make_block_generator(old.spend_bundle, previous_generator)
+                return dataclasses.replace(old, previous_generator=previous_generator, generator=generator)
+
+            return replace_template
+
+        items, cost_sum, fee_sum = self.select_items_for_block()
+        version = mempool.version
+        reused = 0
+        if (
+            old is not None
+            and old.peak_header_hash == last_tb_header_hash
+            and old.mempool is mempool
+            and len(old.items) <= len(items)
+            and all(old_item is item for old_item, item in zip(old.items, items))
+        ):
+            reused = len(old.items)
+
+        def build() -> BlockCandidate:
+            new_items = items[reused:]
+            bundles: List[SpendBundle] = [item.spend_bundle for item in new_items]
+            additions: List[Coin] = [coin for item in new_items for coin in item.additions]
+            removals: List[Coin] = [coin for item in new_items for coin in item.removals]
+            if reused > 0:
+                assert old is not None and old.spend_bundle is not None
+                bundles.insert(0, old.spend_bundle)
+                additions = old.additions + additions
+                removals = old.removals + removals
+
+            spend_bundle: Optional[SpendBundle] = None
+            generator: Optional[BlockGenerator] = None
+            if len(bundles) == 1:
+                spend_bundle = bundles[0]
+            elif len(bundles) > 1:
+                spend_bundle = SpendBundle.aggregate(bundles)
+            if old is not None and 0 < reused == len(items) and old.previous_generator is previous_generator:
+                # None of the selected items changed
+                generator = old.generator
+            elif spend_bundle is not None:
+                generator = make_block_generator(spend_bundle, previous_generator)
+            return BlockCandidate(
+                last_tb_header_hash,
+                mempool,
+                version,
+                items,
+                spend_bundle,
+                additions,
+                removals,
+                cost_sum,
+                fee_sum,
+                previous_generator,
+                generator,
+            )
+
+        return build
+
     def get_filter(self) -> bytes:
         all_transactions: Set[bytes32] = set()
         byte_array_list = []
@@ -251,8 +413,9 @@ class MempoolManager:
         )
         if err is not None:
             raise ValidationError(err)
+        pairing_cache: PairingCache = self.pairing_cache if self.pairing_cache is not None else LOCAL_CACHE
         for cache_entry_key, cached_entry_value in new_cache_entries.items():
-            LOCAL_CACHE.put(cache_entry_key, GTElement.from_bytes(cached_entry_value))
+            pairing_cache.put(cache_entry_key, GTElement.from_bytes(cached_entry_value))
         ret = NPCResult.from_bytes(cached_result_bytes)
         end_time = time.time()
         log.debug(f"pre_validate_spendbundle took {end_time - start_time:0.4f} seconds for {spend_name}")
@@ -454,6 +617,7 @@ class MempoolManager:
 
         new_item = MempoolItem(new_spend, uint64(fees), npc_result, cost, spend_name, additions, removals, program)
         self.mempool.add_to_pool(new_item)
+        self.mempool_changed.set()
         now = time.time()
         log.log(
             logging.DEBUG,
@@ -504,6 +668,8 @@ class MempoolManager:
     ) -> List[Tuple[SpendBundle, NPCResult, bytes32]]:
         """
         Called when a new peak is available, we try to recreate a mempool for the new tip.
+        The mempool is updated in place: items are only removed (and, after a reorg, re-validated) if they are
+        affected by the coin changes of the new peak.
         """
         if new_peak is None:
             return []
@@ -512,44 +678,62 @@ class MempoolManager:
         if self.peak == new_peak:
             return []
         assert new_peak.timestamp is not None
+        start_time = time.time()
 
-        use_optimization: bool = self.peak is not None and new_peak.prev_transaction_block_hash == self.peak.header_hash
+        if self.peak is None:
+            mode = "rebuild"
+        elif new_peak.prev_transaction_block_hash == self.peak.header_hash:
+            mode = "incremental"
+        else:
+            mode = "reorg"
         self.peak = new_peak
+        self.block_candidate = None
+        self.mempool_changed.set()
 
-        if use_optimization:
-            changed_coins_set: Set[bytes32] = set()
-            for coin_record in coin_changes:
-                changed_coins_set.add(coin_record.coin.name())
-
-        old_pool = self.mempool
-        self.mempool = Mempool(self.mempool_max_total_cost)
-
-        for item in old_pool.spends.values():
-            if use_optimization:
-                # If use_optimization, we will automatically re-add all bundles where none of it's removals were
-                # spend (since we only advanced 1 transaction block). This is a nice benefit of the coin set model
-                # vs account model, all spends are guaranteed to succeed.
-                failed = False
-                for removed_coin in item.removals:
-                    if removed_coin.name() in changed_coins_set:
-                        failed = True
-                        break
-                if not failed:
-                    self.mempool.add_to_pool(item)
-                else:
-                    # If the spend bundle was confirmed or conflicting (can no longer be in mempool), it won't be
-                    # successfully added to the new mempool. In this case, remove it from seen, so in the case of a
-                    # reorg, it can be resubmitted
+        changed_coins_set: Set[bytes32] = set(coin_record.name for coin_record in coin_changes)
+        removed_count = 0
+        revalidated: List[MempoolItem] = []
+
+        if mode == "rebuild":
+            revalidated = list(self.mempool.spends.values())
+            self.mempool = Mempool(self.mempool_max_total_cost)
+        else:
+            affected: Dict[bytes32, MempoolItem] = {}
+            for coin_name in changed_coins_set:
+                if coin_name in self.mempool.removals:
+                    item = self.mempool.removals[coin_name]
+                    affected[item.name] = item
+            if mode == "reorg":
+                # After a reorg the height and timestamp of the peak can go backwards, so items with time locks
+                # need to be checked again, even if none of their coins changed.
+                for item in self.mempool.spends.values():
+                    if item.name not in affected and self.has_time_lock_conditions(item):
+                        affected[item.name] = item
+            for item in affected.values():
+                self.mempool.remove_from_pool(item)
+            if mode == "incremental":
+                # We only advanced one transaction block, so all the bundles where none of it's removals were spent
+                # are still valid and stay in the mempool. This is a nice benefit of the coin set model vs account
+                # model, all spends are guaranteed to succeed.
+                for item in affected.values():
+                    # If the spend bundle was confirmed or conflicting (can no longer be in mempool), remove it from
+                    # seen, so in the case of a reorg, it can be resubmitted
                     self.remove_seen(item.spend_bundle_name)
+                removed_count = len(affected)
             else:
-                _, result, _ = await self.add_spendbundle(
-                    item.spend_bundle, item.npc_result, item.spend_bundle_name, item.program
-                )
-                # If the spend bundle was confirmed or conflicting (can no longer be in mempool), it won't be
-                # successfully added to the new mempool. In this case, remove it from seen, so in the case of a reorg,
-                # it can be resubmitted
-                if result != MempoolInclusionStatus.SUCCESS:
-                    self.remove_seen(item.spend_bundle_name)
+                revalidated = sorted(affected.values(), reverse=True)
+
+        for item in revalidated:
+            _, result, _ = await self.add_spendbundle(
+                item.spend_bundle, item.npc_result, item.spend_bundle_name, item.program
+            )
+            # If the spend bundle was confirmed or conflicting (can no longer be in mempool), it won't be
+            # successfully added to the new mempool. In this case, remove it from seen, so in the case of a reorg,
+            # it can be resubmitted
+            if result != MempoolInclusionStatus.SUCCESS:
+                self.remove_seen(item.spend_bundle_name)
+                removed_count += 1
+        update_time = time.time() - start_time
 
         potential_txs = self.potential_cache.drain()
         txs_added = []
@@ -563,8 +747,26 @@ class MempoolManager:
             f"Size of mempool: {len(self.mempool.spends)} spends, cost: {self.mempool.total_mempool_cost} "
             f"minimum fee to get in: {self.mempool.get_min_fee_rate(100000)}"
         )
+        log.info(
+            f"Mempool new_peak ({mode}) at height {new_peak.height}: {len(coin_changes)} coin changes, "
+            f"revalidated {len(revalidated)} items, removed {removed_count} items, "
+            f"retried {len(potential_txs)} pending items ({len(txs_added)} added). "
+            f"Update took {update_time:0.4f} seconds, total {time.time() - start_time:0.4f} seconds"
+        )
         return txs_added
 
+    @staticmethod
+    def has_time_lock_conditions(item: MempoolItem) -> bool:
+        """
+        Returns True if any of the spends in the item asserts a height or a timestamp, which can stop being valid
+        when the peak moves backwards.
+        """
+        for npc in item.npc_result.npc_list:
+            for opcode, _ in npc.conditions:
+                if opcode in TIME_LOCK_CONDITIONS:
+                    return True
+        return False
+
     async def get_items_not_in_filter(self, mempool_filter: PyBIP158, limit: int = 100) -> List[MempoolItem]:
         items: List[MempoolItem] = []
         counter = 0
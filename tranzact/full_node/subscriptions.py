@@ -0,0 +1,194 @@
+import logging
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+from tranzact.protocols.wallet_protocol import CoinState
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+from tranzact.types.coin_record import CoinRecord
+
+log = logging.getLogger(__name__)
+
+
+class SubscriptionIndex:
+    """
+    Maps each subscribed item (puzzle hash or coin id) to the ids of the peers subscribed to it. Most items have a
+    single subscriber, so those map to the peer id itself, and only items with several subscribers use a set. This
+    saves the size of a set (over 200 bytes) per subscription.
+    """
+
+    _peers: Dict[bytes32, Union[bytes32, Set[bytes32]]]
+
+    def __init__(self):
+        self._peers = {}
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    def __contains__(self, item: bytes32) -> bool:
+        return item in self._peers
+
+    def add(self, item: bytes32, peer_id: bytes32) -> bool:
+        """
+        Returns False if the peer was already subscribed to item.
+        """
+        peers = self._peers.get(item)
+        if peers is None:
+            self._peers[item] = peer_id
+        elif isinstance(peers, set):
+            if peer_id in peers:
+                return False
+            peers.add(peer_id)
+        elif peers == peer_id:
+            return False
+        else:
+            self._peers[item] = {peers, peer_id}
+        return True
+
+    def remove(self, item: bytes32, peer_id: bytes32) -> None:
+        peers = self._peers.get(item)
+        if peers is None:
+            return None
+        if isinstance(peers, set):
+            peers.discard(peer_id)
+            if len(peers) == 1:
+                self._peers[item] = peers.pop()
+        elif peers == peer_id:
+            del self._peers[item]
+
+    def get(self, item: bytes) -> Iterable[bytes32]:
+        peers = self._peers.get(item)
+        if peers is None:
+            return ()
+        if isinstance(peers, set):
+            return peers
+        return (peers,)
+
+
+class PeerSubscriptions:
+    """
+    The puzzle hashes and coin ids that wallet peers subscribed to for coin state updates, indexed both by item, to
+    find the peers to notify when a coin changes, and by peer, to remove the subscriptions of a peer when it
+    disconnects. The number of subscriptions is limited per peer and in total, so the memory used is bounded.
+    """
+
+    _ph_subscriptions: SubscriptionIndex
+    _coin_subscriptions: SubscriptionIndex
+    _peer_puzzle_hashes: Dict[bytes32, Set[bytes32]]
+    _peer_coin_ids: Dict[bytes32, Set[bytes32]]
+    _total: int
+    max_subscriptions_per_peer: int
+    max_subscriptions: int
+
+    def __init__(self, max_subscriptions_per_peer: int, max_subscriptions: int):
+        self._ph_subscriptions = SubscriptionIndex()
+        self._coin_subscriptions = SubscriptionIndex()
+        self._peer_puzzle_hashes = {}
+        self._peer_coin_ids = {}
+        self._total = 0
+        self.max_subscriptions_per_peer = max_subscriptions_per_peer
+        self.max_subscriptions = max_subscriptions
+
+    def _add(
+        self,
+        index: SubscriptionIndex,
+        by_peer: Dict[bytes32, Set[bytes32]],
+        peer_id: bytes32,
+        items: List[bytes32],
+    ) -> int:
+        peer_items = by_peer.get(peer_id)
+        if peer_items is None:
+            peer_items = set()
+            by_peer[peer_id] = peer_items
+        added = 0
+        for item in items:
+            if (
+                self.peer_subscription_count(peer_id) >= self.max_subscriptions_per_peer
+                or self._total >= self.max_subscriptions
+            ):
+                log.info(f"Subscription limit reached, ignoring {len(items) - added} subscriptions of {peer_id}")
+                break
+            if item in peer_items:
+                continue
+            index.add(item, peer_id)
+            peer_items.add(item)
+            self._total += 1
+            added += 1
+        return added
+
+    def add_ph_subscriptions(self, peer_id: bytes32, puzzle_hashes: List[bytes32]) -> int:
+        """
+        Subscribes the peer to the puzzle hashes, as far as the limits allow. Returns the number of new subscriptions.
+        """
+        return self._add(self._ph_subscriptions, self._peer_puzzle_hashes, peer_id, puzzle_hashes)
+
+    def add_coin_subscriptions(self, peer_id: bytes32, coin_ids: List[bytes32]) -> int:
+        """
+        Subscribes the peer to the coin ids, as far as the limits allow. Returns the number of new subscriptions.
+        """
+        return self._add(self._coin_subscriptions, self._peer_coin_ids, peer_id, coin_ids)
+
+    def remove_peer(self, peer_id: bytes32) -> None:
+        for index, by_peer in [
+            (self._ph_subscriptions, self._peer_puzzle_hashes),
+            (self._coin_subscriptions, self._peer_coin_ids),
+        ]:
+            items = by_peer.pop(peer_id, set())
+            for item in items:
+                index.remove(item, peer_id)
+            self._total -= len(items)
+
+    def peer_subscription_count(self, peer_id: bytes32) -> int:
+        return len(self._peer_puzzle_hashes.get(peer_id, ())) + len(self._peer_coin_ids.get(peer_id, ()))
+
+    def subscription_count(self) -> int:
+        return self._total
+
+    def has_ph_subscription(self, puzzle_hash: bytes32) -> bool:
+        return puzzle_hash in self._ph_subscriptions
+
+    def has_coin_subscription(self, coin_id: bytes32) -> bool:
+        return coin_id in self._coin_subscriptions
+
+    def peers_for_puzzle_hash(self, puzzle_hash: bytes32) -> Iterable[bytes32]:
+        return self._ph_subscriptions.get(puzzle_hash)
+
+    def peers_for_coin_id(self, coin_id: bytes32) -> Iterable[bytes32]:
+        return self._coin_subscriptions.get(coin_id)
+
+    def changes_for_peers(
+        self, state_update: Tuple[List[CoinRecord], Dict[bytes, Dict[bytes32, CoinRecord]]]
+    ) -> Dict[bytes32, Set[CoinState]]:
+        """
+        Returns the coin states each subscribed peer has to be notified of, given the coin records changed by a new
+        peak and the records of the coins created with a hint. Every coin state is created once, and shared by all the
+        peers notified of it.
+        """
+        changes_for_peer: Dict[bytes32, Set[CoinState]] = {}
+        states, hint_state = state_update
+
+        for coin_record in states:
+            coin_peers = self._coin_subscriptions.get(coin_record.name)
+            ph_peers = self._ph_subscriptions.get(coin_record.coin.puzzle_hash)
+            if not coin_peers and not ph_peers:
+                continue
+            coin_state = coin_record.coin_state
+            for peers in (coin_peers, ph_peers):
+                for peer in peers:
+                    peer_changes = changes_for_peer.get(peer)
+                    if peer_changes is None:
+                        peer_changes = set()
+                        changes_for_peer[peer] = peer_changes
+                    peer_changes.add(coin_state)
+
+        for hint, records in hint_state.items():
+            hint_peers = self._ph_subscriptions.get(hint)
+            if not hint_peers:
+                continue
+            hint_states = [record.coin_state for record in records.values()]
+            for peer in hint_peers:
+                peer_changes = changes_for_peer.get(peer)
+                if peer_changes is None:
+                    peer_changes = set()
+                    changes_for_peer[peer] = peer_changes
+                peer_changes.update(hint_states)
+
+        return changes_for_peer
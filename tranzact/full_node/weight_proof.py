@@ -2,6 +2,7 @@ import asyncio
 import dataclasses
 import logging
 import math
+import multiprocessing
 import random
 from concurrent.futures.process import ProcessPoolExecutor
 from typing import Dict, List, Optional, Tuple
@@ -52,12 +53,34 @@ class WeightProofHandler:
         self,
         constants: ConsensusConstants,
         blockchain: BlockchainInterface,
+        num_workers: Optional[int] = None,
     ):
         self.tip: Optional[bytes32] = None
         self.proof: Optional[WeightProof] = None
+        # The block records of the sub epoch summary blocks of the chain of proof, up to its tip
+        self._ses_blocks: List[BlockRecord] = []
+        self._proof_loaded = False
+        # The tip and number of sub epochs of the proof in the database. A new proof is only written when it has more
+        # sub epochs, and the last one when the node stops, since the proof is large and changes with every block
+        self._persisted_tip: Optional[bytes32] = None
+        self._persisted_sub_epochs = 0
+        self._persist_lock = asyncio.Lock()
+        # The proofs being created, by tip. Requests for the same tip wait for the same task
+        self._proof_tasks: Dict[bytes32, asyncio.Task] = {}
         self.constants = constants
         self.blockchain = blockchain
         self.lock = asyncio.Lock()
+        # Processes validating weight proofs, by default two fewer than the CPUs. The pool is started by the first
+        # validation and reused for the next ones
+        if num_workers is None or num_workers <= 0:
+            num_workers = max(min(multiprocessing.cpu_count(), 61) - 2, 1)
+        self.num_workers = num_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def shut_down(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     async def get_proof_of_weight(self, tip: bytes32) -> Optional[WeightProof]:
 
@@ -70,16 +93,62 @@ class WeightProofHandler:
             log.debug("chain to short for weight proof")
             return None
 
+        if self.proof is not None and self.proof.recent_chain_data[-1].header_hash == tip:
+            return self.proof
+        task = self._proof_tasks.get(tip)
+        if task is None:
+            task = asyncio.create_task(self._get_or_create_proof_of_weight(tip))
+            self._proof_tasks[tip] = task
+            task.add_done_callback(lambda _: self._proof_tasks.pop(tip, None))
+        # A request which is cancelled, for example when the peer disconnects, does not cancel the others
+        return await asyncio.shield(task)
+
+    async def _get_or_create_proof_of_weight(self, tip: bytes32) -> Optional[WeightProof]:
         async with self.lock:
-            if self.proof is not None:
-                if self.proof.recent_chain_data[-1].header_hash == tip:
-                    return self.proof
+            if not self._proof_loaded:
+                self._proof_loaded = True
+                proof_bytes: Optional[bytes] = await self.blockchain.get_weight_proof()
+                if proof_bytes is not None:
+                    self.proof = WeightProof.from_bytes(proof_bytes)
+                    self.tip = self.proof.recent_chain_data[-1].header_hash
+                    self._persisted_tip = self.tip
+                    self._persisted_sub_epochs = len(self.proof.sub_epochs)
+            if self.proof is not None and self.proof.recent_chain_data[-1].header_hash == tip:
+                return self.proof
             wp = await self._create_proof_of_weight(tip)
             if wp is None:
                 return None
             self.proof = wp
             self.tip = tip
-            return wp
+        # Outside of the lock, so requests for the next tips do not wait for the write
+        if len(wp.sub_epochs) > self._persisted_sub_epochs:
+            await self.persist_proof()
+        return wp
+
+    async def persist_proof(self) -> None:
+        """
+        Writes the last proof to the database, so it is extended after a restart instead of created again
+        """
+        async with self._persist_lock:
+            wp = self.proof
+            if wp is None or wp.recent_chain_data[-1].header_hash == self._persisted_tip:
+                return
+            await self.blockchain.persist_weight_proof(bytes(wp))
+            self._persisted_tip = wp.recent_chain_data[-1].header_hash
+            self._persisted_sub_epochs = len(wp.sub_epochs)
+
+    def _extends_proof(self, tip_rec: BlockRecord) -> bool:
+        """
+        Whether the chain of tip_rec includes the tip of the current proof, so its sub epochs are the same up to there
+        """
+        if self.proof is None:
+            return False
+        proof_tip = self.proof.recent_chain_data[-1]
+        return (
+            proof_tip.height <= tip_rec.height
+            and self.blockchain.height_to_hash(tip_rec.height) == tip_rec.header_hash
+            and self.blockchain.height_to_hash(proof_tip.height) == proof_tip.header_hash
+        )
 
     def get_sub_epoch_data(self, tip_height: uint32, summary_heights: List[uint32]) -> List[SubEpochData]:
         sub_epoch_data: List[SubEpochData] = []
@@ -102,11 +171,26 @@ class WeightProofHandler:
             log.error("failed not tip in cache")
             return None
         log.info(f"create weight proof peak {tip} {tip_rec.height}")
-        recent_chain = await self._get_recent_chain(tip_rec.height)
+        summary_heights = self.blockchain.get_ses_heights()
+        # If the tip is on top of the tip of the last proof, the sub epochs sampled by both are the same, and only the
+        # blocks after the last tip are fetched
+        prev_proof: Optional[WeightProof] = self.proof if self._extends_proof(tip_rec) else None
+        prev_segments: Dict[int, List[SubEpochChallengeSegment]] = {}
+        ses_blocks: List[BlockRecord] = []
+        recent_chain: Optional[List[HeaderBlock]] = None
+        if prev_proof is not None:
+            prev_tip_height = prev_proof.recent_chain_data[-1].height
+            prev_segments = map_segments_by_sub_epoch(prev_proof.sub_epoch_segments)
+            ses_blocks = [block for block in self._ses_blocks if block.height <= prev_tip_height]
+            # The recent chain starts one block before the second to last sub epoch summary, which only changes if a
+            # new summary was included after the last tip
+            if not any(prev_tip_height < ses_height <= tip_rec.height for ses_height in summary_heights):
+                recent_chain = await self._extend_recent_chain(prev_proof.recent_chain_data, tip_rec.height)
+        if recent_chain is None:
+            recent_chain = await self._get_recent_chain(tip_rec.height)
         if recent_chain is None:
             return None
 
-        summary_heights = self.blockchain.get_ses_heights()
         prev_ses_block = await self.blockchain.get_block_record_from_db(self.blockchain.height_to_hash(uint32(0)))
         if prev_ses_block is None:
             return None
@@ -116,9 +200,11 @@ class WeightProofHandler:
         rng = random.Random(seed)
         weight_to_check = _get_weights_for_sampling(rng, tip_rec.weight, recent_chain)
         sample_n = 0
-        ses_blocks = await self.blockchain.get_block_records_at(summary_heights)
-        if ses_blocks is None:
-            return None
+        if len(ses_blocks) < len(summary_heights):
+            new_ses_blocks = await self.blockchain.get_block_records_at(summary_heights[len(ses_blocks) :])
+            if new_ses_blocks is None:
+                return None
+            ses_blocks = ses_blocks + new_ses_blocks
 
         for sub_epoch_n, ses_height in enumerate(summary_heights):
             if ses_height > tip_rec.height:
@@ -137,7 +223,9 @@ class WeightProofHandler:
 
             if _sample_sub_epoch(prev_ses_block.weight, ses_block.weight, weight_to_check):  # type: ignore
                 sample_n += 1
-                segments = await self.blockchain.get_sub_epoch_challenge_segments(ses_block.header_hash)
+                segments = prev_segments.get(sub_epoch_n)
+                if segments is None:
+                    segments = await self.blockchain.get_sub_epoch_challenge_segments(ses_block.header_hash)
                 if segments is None:
                     segments = await self.__create_sub_epoch_segments(ses_block, prev_ses_block, uint32(sub_epoch_n))
                     if segments is None:
@@ -150,6 +238,7 @@ class WeightProofHandler:
                 sub_epoch_segments.extend(segments)
             prev_ses_block = ses_block
         log.debug(f"sub_epochs: {len(sub_epoch_data)}")
+        self._ses_blocks = [block for block in ses_blocks if block.height <= tip_rec.height]
         return WeightProof(sub_epoch_data, sub_epoch_segments, recent_chain)
 
     def get_seed_for_proof(self, summary_heights: List[uint32], tip_height) -> bytes32:
@@ -207,6 +296,25 @@ class WeightProofHandler:
         )
         return recent_chain
 
+    async def _extend_recent_chain(
+        self, recent_chain: List[HeaderBlock], tip_height: uint32
+    ) -> Optional[List[HeaderBlock]]:
+        """
+        Returns recent_chain followed by the header blocks after its last block up to tip_height
+        """
+        start = recent_chain[-1].height + 1
+        if start > tip_height:
+            return recent_chain
+        headers = await self.blockchain.get_header_blocks_in_range(start, tip_height, tx_filter=False)
+        new_blocks: List[HeaderBlock] = []
+        for height in range(start, tip_height + 1):
+            header_block = headers.get(self.blockchain.height_to_hash(uint32(height)))
+            if header_block is None:
+                log.error("extending recent chain failed")
+                return None
+            new_blocks.append(header_block)
+        return recent_chain + new_blocks
+
     async def create_prev_sub_epoch_segments(self):
         log.debug("create prev sub_epoch_segments")
         heights = self.blockchain.get_ses_heights()
@@ -589,26 +697,44 @@ class WeightProofHandler:
             log.error("failed weight proof sub epoch sample validation")
             return False, uint32(0), []
 
-        executor = ProcessPoolExecutor(1)
-        constants, summary_bytes, wp_segment_bytes, wp_recent_chain_bytes = vars_to_bytes(
-            self.constants, summaries, weight_proof
-        )
-        segment_validation_task = asyncio.get_running_loop().run_in_executor(
-            executor, _validate_sub_epoch_segments, constants, rng, wp_segment_bytes, summary_bytes
-        )
-
-        recent_blocks_validation_task = asyncio.get_running_loop().run_in_executor(
-            executor, _validate_recent_blocks, constants, wp_recent_chain_bytes, summary_bytes
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.num_workers)
+        loop = asyncio.get_running_loop()
+        constants = recurse_jsonify(dataclasses.asdict(self.constants))
+        summary_bytes = [bytes(summary) for summary in summaries]
+        recent_blocks_validation_task = loop.run_in_executor(
+            self._executor,
+            _validate_recent_blocks,
+            constants,
+            bytes(RecentChainData(weight_proof.recent_chain_data)),
+            summary_bytes,
         )
+        # The sub epochs are validated in parallel, and each worker only parses the segments of its sub epoch
+        segments_by_sub_epoch = map_segments_by_sub_epoch(weight_proof.sub_epoch_segments)
+        segment_validation_tasks = [
+            loop.run_in_executor(
+                self._executor,
+                _validate_sub_epoch_segments_bytes,
+                constants,
+                summary_bytes,
+                sub_epoch_n,
+                bytes(SubEpochSegments(segments_by_sub_epoch[sub_epoch_n])),
+                sampled_seg_index,
+                prev_ssi,
+            )
+            for sub_epoch_n, sampled_seg_index, prev_ssi in _sample_sub_epoch_segments(
+                self.constants, rng, summaries, segments_by_sub_epoch
+            )
+        ]
 
-        valid_segment_task = segment_validation_task
-        valid_recent_blocks_task = recent_blocks_validation_task
-        valid_recent_blocks = await valid_recent_blocks_task
+        valid_recent_blocks = await recent_blocks_validation_task
         if not valid_recent_blocks:
             log.error("failed validating weight proof recent blocks")
+            for task in segment_validation_tasks:
+                task.cancel()
             return False, uint32(0), []
 
-        valid_segments = await valid_segment_task
+        valid_segments = all(await asyncio.gather(*segment_validation_tasks))
         if not valid_segments:
             log.error("failed validating weight proof sub epoch segments")
             return False, uint32(0), []
@@ -924,38 +1050,81 @@ def _validate_sub_epoch_segments(
 ):
     constants, summaries = bytes_to_vars(constants_dict, summaries_bytes)
     sub_epoch_segments: SubEpochSegments = SubEpochSegments.from_bytes(weight_proof_bytes)
-    rc_sub_slot_hash = constants.GENESIS_CHALLENGE
-    total_blocks, total_ip_iters = 0, 0
-    total_slot_iters, total_slots = 0, 0
-    total_ip_iters = 0
-    prev_ses: Optional[SubEpochSummary] = None
     segments_by_sub_epoch = map_segments_by_sub_epoch(sub_epoch_segments.challenge_segments)
+    for sub_epoch_n, sampled_seg_index, prev_ssi in _sample_sub_epoch_segments(
+        constants, rng, summaries, segments_by_sub_epoch
+    ):
+        if not _validate_sub_epoch(
+            constants, summaries, sub_epoch_n, segments_by_sub_epoch[sub_epoch_n], sampled_seg_index, prev_ssi
+        ):
+            return False
+    return True
+
+
+def _validate_sub_epoch_segments_bytes(
+    constants_dict: Dict,
+    summaries_bytes: List[bytes],
+    sub_epoch_n: int,
+    segments_bytes: bytes,
+    sampled_seg_index: int,
+    prev_ssi: uint64,
+) -> bool:
+    """
+    Validates the segments of a single sub epoch in a worker process, see _sample_sub_epoch_segments
+    """
+    constants, summaries = bytes_to_vars(constants_dict, summaries_bytes)
+    segments: List[SubEpochChallengeSegment] = SubEpochSegments.from_bytes(segments_bytes).challenge_segments
+    return _validate_sub_epoch(constants, summaries, sub_epoch_n, segments, sampled_seg_index, prev_ssi)
+
+
+def _sample_sub_epoch_segments(
+    constants: ConsensusConstants,
+    rng: random.Random,
+    summaries: List[SubEpochSummary],
+    segments_by_sub_epoch: Dict[int, List[SubEpochChallengeSegment]],
+) -> List[Tuple[int, int, uint64]]:
+    """
+    Returns the sub epoch number, the index of the segment whose proofs are validated, and the sub slot iters of the
+    previous sub epoch with segments, for each sub epoch in segments_by_sub_epoch. These are the only values carried
+    from one sub epoch to the next, so once they are known the sub epochs can be validated independently.
+    """
+    ret: List[Tuple[int, int, uint64]] = []
     curr_ssi = constants.SUB_SLOT_ITERS_STARTING
     for sub_epoch_n, segments in segments_by_sub_epoch.items():
         prev_ssi = curr_ssi
-        curr_difficulty, curr_ssi = _get_curr_diff_ssi(constants, sub_epoch_n, summaries)
-        log.debug(f"validate sub epoch {sub_epoch_n}")
-        # recreate RewardChainSubSlot for next ses rc_hash
-        sampled_seg_index = rng.choice(range(len(segments)))
-        if sub_epoch_n > 0:
-            rc_sub_slot = __get_rc_sub_slot(constants, segments[0], summaries, curr_ssi)
-            prev_ses = summaries[sub_epoch_n - 1]
-            rc_sub_slot_hash = rc_sub_slot.get_hash()
-        if not summaries[sub_epoch_n].reward_chain_hash == rc_sub_slot_hash:
-            log.error(f"failed reward_chain_hash validation sub_epoch {sub_epoch_n}")
+        _, curr_ssi = _get_curr_diff_ssi(constants, sub_epoch_n, summaries)
+        ret.append((sub_epoch_n, rng.choice(range(len(segments))), prev_ssi))
+    return ret
+
+
+def _validate_sub_epoch(
+    constants: ConsensusConstants,
+    summaries: List[SubEpochSummary],
+    sub_epoch_n: int,
+    segments: List[SubEpochChallengeSegment],
+    sampled_seg_index: int,
+    prev_ssi: uint64,
+) -> bool:
+    curr_difficulty, curr_ssi = _get_curr_diff_ssi(constants, sub_epoch_n, summaries)
+    log.debug(f"validate sub epoch {sub_epoch_n}")
+    # recreate RewardChainSubSlot for next ses rc_hash
+    rc_sub_slot_hash = constants.GENESIS_CHALLENGE
+    prev_ses: Optional[SubEpochSummary] = None
+    if sub_epoch_n > 0:
+        rc_sub_slot = __get_rc_sub_slot(constants, segments[0], summaries, curr_ssi)
+        prev_ses = summaries[sub_epoch_n - 1]
+        rc_sub_slot_hash = rc_sub_slot.get_hash()
+    if not summaries[sub_epoch_n].reward_chain_hash == rc_sub_slot_hash:
+        log.error(f"failed reward_chain_hash validation sub_epoch {sub_epoch_n}")
+        return False
+    for idx, segment in enumerate(segments):
+        valid_segment, ip_iters, slot_iters, slots = _validate_segment(
+            constants, segment, curr_ssi, prev_ssi, curr_difficulty, prev_ses, idx == 0, sampled_seg_index == idx
+        )
+        if not valid_segment:
+            log.error(f"failed to validate sub_epoch {segment.sub_epoch_n} segment {idx} slots")
             return False
-        for idx, segment in enumerate(segments):
-            valid_segment, ip_iters, slot_iters, slots = _validate_segment(
-                constants, segment, curr_ssi, prev_ssi, curr_difficulty, prev_ses, idx == 0, sampled_seg_index == idx
-            )
-            if not valid_segment:
-                log.error(f"failed to validate sub_epoch {segment.sub_epoch_n} segment {idx} slots")
-                return False
-            prev_ses = None
-            total_blocks += 1
-            total_slot_iters += slot_iters
-            total_slots += slots
-            total_ip_iters += ip_iters
+        prev_ses = None
     return True
 
 
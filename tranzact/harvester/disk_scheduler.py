@@ -0,0 +1,130 @@
+import asyncio
+import heapq
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class LookupPriority(IntEnum):
+    # Lower values run first. Full proofs are only fetched for qualities which pass, and are time critical
+    FULL_PROOF = 0
+    QUALITY = 1
+
+
+class LatencyHistogram:
+    """
+    Counts durations in fixed buckets, the last bucket has no upper bound.
+    """
+
+    BUCKETS: List[float] = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(self.BUCKETS) + 1)
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def add(self, duration: float) -> None:
+        index = len(self.BUCKETS)
+        for i, upper_bound in enumerate(self.BUCKETS):
+            if duration <= upper_bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        count = sum(self.counts)
+        return {
+            "buckets": self.BUCKETS,
+            "counts": self.counts,
+            "count": count,
+            "average": self.total / count if count > 0 else 0.0,
+            "max": self.max,
+        }
+
+
+class DiskQueue:
+    """
+    Lookups for the plots of one device. At most max_concurrency of them run at once, in priority order, so a slow
+    disk only holds up its own lookups and does not take all the threads of the executor.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, max_concurrency: int):
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.running: int = 0
+        # (priority, sequence number, function, args, future)
+        self.pending: List[Tuple[int, int, Callable, Tuple, asyncio.Future]] = []
+        self.sequence: int = 0
+        self.latencies: Dict[LookupPriority, LatencyHistogram] = {p: LatencyHistogram() for p in LookupPriority}
+
+    def submit(self, priority: LookupPriority, function: Callable, *args) -> asyncio.Future:
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.pending, (priority, self.sequence, function, args, future))
+        self.sequence += 1
+        self._start_next()
+        return future
+
+    def _start_next(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.running < self.max_concurrency and len(self.pending) > 0:
+            priority, _, function, args, future = heapq.heappop(self.pending)
+            if future.cancelled():
+                continue
+            self.running += 1
+            # Filled in by the worker thread, the histogram is only updated from the event loop
+            elapsed: List[float] = []
+
+            def timed_call(function=function, args=args, elapsed=elapsed) -> Any:
+                start = time.time()
+                try:
+                    return function(*args)
+                finally:
+                    elapsed.append(time.time() - start)
+
+            loop.run_in_executor(self.executor, timed_call).add_done_callback(
+                lambda result, future=future, priority=priority, elapsed=elapsed: self._on_done(
+                    result, future, LookupPriority(priority), elapsed
+                )
+            )
+
+    def _on_done(
+        self, result: asyncio.Future, future: asyncio.Future, priority: LookupPriority, elapsed: List[float]
+    ) -> None:
+        self.running -= 1
+        if len(elapsed) > 0:
+            self.latencies[priority].add(elapsed[0])
+        if not future.cancelled():
+            if result.cancelled():
+                future.cancel()
+            elif result.exception() is not None:
+                future.set_exception(result.exception())
+            else:
+                future.set_result(result.result())
+        self._start_next()
+
+
+class DiskScheduler:
+    """
+    Runs blocking plot lookups in the executor, with one DiskQueue per device (st_dev of the plot file).
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, max_concurrency_per_disk: int):
+        self.executor = executor
+        self.max_concurrency_per_disk = max_concurrency_per_disk
+        self.queues: Dict[int, DiskQueue] = {}
+
+    async def run(self, device_id: int, priority: LookupPriority, function: Callable, *args) -> Any:
+        queue = self.queues.get(device_id)
+        if queue is None:
+            queue = DiskQueue(self.executor, self.max_concurrency_per_disk)
+            self.queues[device_id] = queue
+        return await queue.submit(priority, function, *args)
+
+    def get_latencies(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            str(device_id): {priority.name.lower(): h.to_json_dict() for priority, h in queue.latencies.items()}
+            for device_id, queue in self.queues.items()
+        }
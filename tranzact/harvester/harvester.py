@@ -7,6 +7,7 @@ from typing import Callable, Dict, List, Optional, Tuple
 
 import tranzact.server.ws_connection as ws  # lgtm [py/import-and-import-from]
 from tranzact.consensus.constants import ConsensusConstants
+from tranzact.harvester.disk_scheduler import DiskScheduler
 from tranzact.plotting.manager import PlotManager
 from tranzact.plotting.util import (
     add_plot_directory,
@@ -27,6 +28,7 @@ class Harvester:
     root_path: Path
     _is_shutdown: bool
     executor: ThreadPoolExecutor
+    disk_scheduler: DiskScheduler
     state_changed_callback: Optional[Callable]
     cached_challenges: List
     constants: ConsensusConstants
@@ -51,6 +53,7 @@ class Harvester:
         )
         self._is_shutdown = False
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=config["num_threads"])
+        self.disk_scheduler = DiskScheduler(self.executor, config.get("max_concurrent_lookups_per_disk", 4))
         self.state_changed_callback = None
         self.server = None
         self.constants = constants
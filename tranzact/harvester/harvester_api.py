@@ -1,11 +1,12 @@
 import asyncio
 import time
 from pathlib import Path
-from typing import Callable, List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 from blspy import AugSchemeMPL, G2Element, G1Element
 
 from tranzact.consensus.pot_iterations import calculate_iterations_quality, calculate_sp_interval_iters
+from tranzact.harvester.disk_scheduler import LookupPriority
 from tranzact.harvester.harvester import Harvester
 from tranzact.plotting.util import PlotInfo, parse_plot_info
 from tranzact.protocols import harvester_protocol
@@ -67,11 +68,9 @@ class HarvesterAPI:
         start = time.time()
         assert len(new_challenge.challenge_hash) == 32
 
-        loop = asyncio.get_running_loop()
-
-        def blocking_lookup(filename: Path, plot_info: PlotInfo) -> List[Tuple[bytes32, ProofOfSpace]]:
-            # Uses the DiskProver object to lookup qualities. This is a blocking call,
-            # so it should be run in a thread pool.
+        def blocking_lookup_qualities(filename: Path, plot_info: PlotInfo) -> List[Tuple[int, bytes32]]:
+            # Uses the DiskProver object to lookup qualities, and returns the ones which are good enough for a
+            # proof of space, with their index. This is a blocking call, so it should be run in a thread pool.
             try:
                 plot_id = plot_info.prover.get_id()
                 sp_challenge_hash = ProofOfSpace.calculate_pos_challenge(
@@ -89,7 +88,7 @@ class HarvesterAPI:
                     )
                     return []
 
-                responses: List[Tuple[bytes32, ProofOfSpace]] = []
+                good_qualities: List[Tuple[int, bytes32]] = []
                 if quality_strings is not None:
                     difficulty = new_challenge.difficulty
                     sub_slot_iters = new_challenge.sub_slot_iters
@@ -113,60 +112,80 @@ class HarvesterAPI:
                         )
                         sp_interval_iters = calculate_sp_interval_iters(self.harvester.constants, sub_slot_iters)
                         if required_iters < sp_interval_iters:
-                            # Found a very good proof of space! will fetch the whole proof from disk,
-                            # then send to farmer
-                            try:
-                                proof_xs = plot_info.prover.get_full_proof(
-                                    sp_challenge_hash, index, self.harvester.parallel_read
-                                )
-                            except Exception as e:
-                                self.harvester.log.error(f"Exception fetching full proof for {filename}. {e}")
-                                self.harvester.log.error(
-                                    f"File: {filename} Plot ID: {plot_id.hex()}, challenge: {sp_challenge_hash}, "
-                                    f"plot_info: {plot_info}"
-                                )
-                                continue
-
-                            # Look up local_sk from plot to save locked memory
-                            (
-                                pool_public_key_or_puzzle_hash,
-                                farmer_public_key,
-                                local_master_sk,
-                            ) = parse_plot_info(plot_info.prover.get_memo())
-                            local_sk = master_sk_to_local_sk(local_master_sk)
-                            include_taproot = plot_info.pool_contract_puzzle_hash is not None
-                            plot_public_key = ProofOfSpace.generate_plot_public_key(
-                                local_sk.get_g1(), farmer_public_key, include_taproot
-                            )
-                            responses.append(
-                                (
-                                    quality_str,
-                                    ProofOfSpace(
-                                        sp_challenge_hash,
-                                        plot_info.pool_public_key,
-                                        plot_info.pool_contract_puzzle_hash,
-                                        plot_public_key,
-                                        uint8(plot_info.prover.get_size()),
-                                        proof_xs,
-                                    ),
-                                )
-                            )
-                return responses
+                            good_qualities.append((index, quality_str))
+                return good_qualities
             except Exception as e:
                 self.harvester.log.error(f"Unknown error: {e}")
                 return []
 
+        def blocking_lookup_full_proof(filename: Path, plot_info: PlotInfo, index: int) -> Optional[ProofOfSpace]:
+            # Found a very good proof of space! will fetch the whole proof from disk. This is a blocking call,
+            # so it should be run in a thread pool.
+            try:
+                plot_id = plot_info.prover.get_id()
+                sp_challenge_hash = ProofOfSpace.calculate_pos_challenge(
+                    plot_id,
+                    new_challenge.challenge_hash,
+                    new_challenge.sp_hash,
+                )
+                try:
+                    proof_xs = plot_info.prover.get_full_proof(sp_challenge_hash, index, self.harvester.parallel_read)
+                except Exception as e:
+                    self.harvester.log.error(f"Exception fetching full proof for {filename}. {e}")
+                    self.harvester.log.error(
+                        f"File: {filename} Plot ID: {plot_id.hex()}, challenge: {sp_challenge_hash}, "
+                        f"plot_info: {plot_info}"
+                    )
+                    return None
+
+                # Look up local_sk from plot to save locked memory
+                (
+                    pool_public_key_or_puzzle_hash,
+                    farmer_public_key,
+                    local_master_sk,
+                ) = parse_plot_info(plot_info.prover.get_memo())
+                local_sk = master_sk_to_local_sk(local_master_sk)
+                include_taproot = plot_info.pool_contract_puzzle_hash is not None
+                plot_public_key = ProofOfSpace.generate_plot_public_key(
+                    local_sk.get_g1(), farmer_public_key, include_taproot
+                )
+                return ProofOfSpace(
+                    sp_challenge_hash,
+                    plot_info.pool_public_key,
+                    plot_info.pool_contract_puzzle_hash,
+                    plot_public_key,
+                    uint8(plot_info.prover.get_size()),
+                    proof_xs,
+                )
+            except Exception as e:
+                self.harvester.log.error(f"Unknown error: {e}")
+                return None
+
         async def lookup_challenge(
             filename: Path, plot_info: PlotInfo
         ) -> Tuple[Path, List[harvester_protocol.NewProofOfSpace]]:
-            # Executes a DiskProverLookup in a thread pool, and returns responses
+            # Executes a DiskProverLookup in the queue of the disk of the plot, and returns responses. Full proof
+            # lookups go ahead of the quality lookups of other plots on the same disk.
             all_responses: List[harvester_protocol.NewProofOfSpace] = []
             if self.harvester._is_shutdown:
                 return filename, []
-            proofs_of_space_and_q: List[Tuple[bytes32, ProofOfSpace]] = await loop.run_in_executor(
-                self.harvester.executor, blocking_lookup, filename, plot_info
+            scheduler = self.harvester.disk_scheduler
+            good_qualities: List[Tuple[int, bytes32]] = await scheduler.run(
+                plot_info.device_id, LookupPriority.QUALITY, blocking_lookup_qualities, filename, plot_info
             )
-            for quality_str, proof_of_space in proofs_of_space_and_q:
+            for index, quality_str in good_qualities:
+                if self.harvester._is_shutdown:
+                    break
+                proof_of_space: Optional[ProofOfSpace] = await scheduler.run(
+                    plot_info.device_id,
+                    LookupPriority.FULL_PROOF,
+                    blocking_lookup_full_proof,
+                    filename,
+                    plot_info,
+                    index,
+                )
+                if proof_of_space is None:
+                    continue
                 all_responses.append(
                     harvester_protocol.NewProofOfSpace(
                         new_challenge.challenge_hash,
@@ -180,24 +199,15 @@ class HarvesterAPI:
 
         awaitables = []
         passed = 0
-        total = 0
         with self.harvester.plot_manager:
-            for try_plot_filename, try_plot_info in self.harvester.plot_manager.plots.items():
-                try:
-                    if try_plot_filename.exists():
-                        # Passes the plot filter (does not check sp filter yet though, since we have not reached sp)
-                        # This is being executed at the beginning of the slot
-                        total += 1
-                        if ProofOfSpace.passes_plot_filter(
-                            self.harvester.constants,
-                            try_plot_info.prover.get_id(),
-                            new_challenge.challenge_hash,
-                            new_challenge.sp_hash,
-                        ):
-                            passed += 1
-                            awaitables.append(lookup_challenge(try_plot_filename, try_plot_info))
-                except Exception as e:
-                    self.harvester.log.error(f"Error plot file {try_plot_filename} may no longer exist {e}")
+            # Passes the plot filter (does not check sp filter yet though, since we have not reached sp)
+            # This is being executed at the beginning of the slot
+            total = len(self.harvester.plot_manager.plots)
+            for try_plot_filename, try_plot_info in self.harvester.plot_manager.plots_passing_filter(
+                self.harvester.constants, new_challenge.challenge_hash, new_challenge.sp_hash
+            ):
+                passed += 1
+                awaitables.append(lookup_challenge(try_plot_filename, try_plot_info))
 
         # Concurrently executes all lookups on disk, to take advantage of multiple disk parallelism
         total_proofs_found = 0
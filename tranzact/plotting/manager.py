@@ -10,7 +10,9 @@ from concurrent.futures.thread import ThreadPoolExecutor
 from blspy import G1Element
 from chiapos import DiskProver
 
+from tranzact.consensus.constants import ConsensusConstants
 from tranzact.consensus.pos_quality import UI_ACTUAL_SPACE_CONSTANT_FACTOR, _expected_plot_size
+from tranzact.plotting.plot_filter_index import PlotFilterIndex
 from tranzact.plotting.util import (
     PlotInfo,
     PlotRefreshResult,
@@ -116,6 +118,7 @@ class Cache:
 
 class PlotManager:
     plots: Dict[Path, PlotInfo]
+    plot_filter_index: PlotFilterIndex
     plot_filename_paths: Dict[str, Tuple[str, Set[str]]]
     plot_filename_paths_lock: threading.Lock
     failed_to_open_filenames: Dict[Path, int]
@@ -145,6 +148,7 @@ class PlotManager:
     ):
         self.root_path = root_path
         self.plots = {}
+        self.plot_filter_index = PlotFilterIndex()
         self.plot_filename_paths = {}
         self.plot_filename_paths_lock = threading.Lock()
         self.failed_to_open_filenames = {}
@@ -183,6 +187,16 @@ class PlotManager:
         with self:
             return len(self.plots)
 
+    def plots_passing_filter(
+        self, constants: ConsensusConstants, challenge_hash: bytes32, sp_hash: bytes32
+    ) -> List[Tuple[Path, PlotInfo]]:
+        """
+        Returns the plots which pass the plot filter for this signage point. Must be called with the lock held.
+        Plots which were deleted are dropped by the refresh task, so this does not check the files.
+        """
+        paths = self.plot_filter_index.passing_paths(challenge_hash, sp_hash, constants.NUMBER_ZERO_BITS_PLOT_FILTER)
+        return [(path, self.plots[path]) for path in paths]
+
     def get_duplicates(self):
         result = []
         for plot_filename, paths_entry in self.plot_filename_paths.items():
@@ -242,7 +256,9 @@ class PlotManager:
                 if plot_removed(loaded_plot):
                     filenames_to_remove.append(plot_filename)
                     if loaded_plot in self.plots:
-                        del self.plots[loaded_plot]
+                        with self:
+                            del self.plots[loaded_plot]
+                            self.plot_filter_index.remove(loaded_plot)
                     total_result.removed += 1
                     # No need to check the duplicates here since we drop the whole entry
                     continue
@@ -413,6 +429,7 @@ class PlotManager:
                     cache_entry.plot_public_key,
                     stat_info.st_size,
                     stat_info.st_mtime,
+                    stat_info.st_dev,
                 )
 
                 with counter_lock:
@@ -445,6 +462,8 @@ class PlotManager:
                 if new_plot is not None:
                     plots_refreshed[Path(new_plot.prover.get_filename())] = new_plot
             self.plots.update(plots_refreshed)
+            for path, plot_info in plots_refreshed.items():
+                self.plot_filter_index.add(path, plot_info.prover.get_id())
 
         result.duration = time.time() - start_time
 
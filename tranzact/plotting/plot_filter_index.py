@@ -0,0 +1,69 @@
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, List
+
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+
+
+def filter_plot_ids(plot_ids: bytes, challenge_hash: bytes32, sp_hash: bytes32, zero_bits: int) -> List[int]:
+    """
+    Applies the plot filter to the concatenated 32 byte plot ids, and returns the indexes of the ones which pass.
+    This gives the same results as ProofOfSpace.passes_plot_filter, but only looks at the first bytes of each hash
+    instead of building a bit array for every plot.
+    """
+    suffix = challenge_hash + sp_hash
+    zero_bytes, remaining_bits = divmod(zero_bits, 8)
+    # The byte after the zero bytes must be below this value, so that its first remaining_bits bits are 0
+    max_next_byte = 1 << (8 - remaining_bits)
+    view = memoryview(plot_ids)
+    passed: List[int] = []
+    for index, offset in enumerate(range(0, len(plot_ids), 32)):
+        digest = sha256(view[offset : offset + 32].tobytes() + suffix).digest()
+        if any(digest[:zero_bytes]):
+            continue
+        if remaining_bits > 0 and digest[zero_bytes] >= max_next_byte:
+            continue
+        passed.append(index)
+    return passed
+
+
+class PlotFilterIndex:
+    """
+    Compact array of the ids of the loaded plots, so the plot filter can be applied to all of them for each signage
+    point without going through the DiskProver objects. Removing a plot moves the last entry into its slot, so adding
+    and removing are O(1).
+    """
+
+    def __init__(self) -> None:
+        self._plot_ids = bytearray()
+        self._paths: List[Path] = []
+        self._slots: Dict[Path, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def add(self, path: Path, plot_id: bytes32) -> None:
+        assert len(plot_id) == 32
+        slot = self._slots.get(path)
+        if slot is not None:
+            self._plot_ids[slot * 32 : (slot + 1) * 32] = plot_id
+            return
+        self._slots[path] = len(self._paths)
+        self._paths.append(path)
+        self._plot_ids += plot_id
+
+    def remove(self, path: Path) -> None:
+        slot = self._slots.pop(path, None)
+        if slot is None:
+            return
+        last = len(self._paths) - 1
+        if slot != last:
+            last_path = self._paths[last]
+            self._paths[slot] = last_path
+            self._slots[last_path] = slot
+            self._plot_ids[slot * 32 : (slot + 1) * 32] = self._plot_ids[last * 32 :]
+        self._paths.pop()
+        del self._plot_ids[last * 32 :]
+
+    def passing_paths(self, challenge_hash: bytes32, sp_hash: bytes32, zero_bits: int) -> List[Path]:
+        return [self._paths[index] for index in filter_plot_ids(self._plot_ids, challenge_hash, sp_hash, zero_bits)]
@@ -30,6 +30,7 @@ class PlotInfo:
     plot_public_key: G1Element
     file_size: int
     time_modified: float
+    device_id: int  # st_dev of the plot file, lookups are scheduled per device
 
 
 class PlotRefreshEvents(Enum):
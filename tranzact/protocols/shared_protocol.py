@@ -17,6 +17,9 @@ Note: When changing this file, also change protocol_message_types.py
 # These are passed in as uint16 into the Handshake
 class Capability(IntEnum):
     BASE = 1  # Base capability just means it supports the tranzact protocol at mainnet
+    # Supports compressed message frames. The value is the comma separated list of supported algorithms, in order
+    # of preference
+    MESSAGE_COMPRESSION = 2
 
 
 @dataclass(frozen=True)
@@ -3,13 +3,10 @@ from typing import Any, Callable, Dict, List, Optional
 from tranzact.consensus.block_record import BlockRecord
 from tranzact.consensus.pos_quality import UI_ACTUAL_SPACE_CONSTANT_FACTOR
 from tranzact.full_node.full_node import FullNode
-from tranzact.full_node.mempool_check_conditions import get_puzzle_and_solution_for_coin
-from tranzact.types.blockchain_format.program import Program, SerializedProgram
 from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.types.coin_record import CoinRecord
 from tranzact.types.coin_spend import CoinSpend
 from tranzact.types.full_block import FullBlock
-from tranzact.types.generator_types import BlockGenerator
 from tranzact.types.mempool_inclusion_status import MempoolInclusionStatus
 from tranzact.types.spend_bundle import SpendBundle
 from tranzact.types.unfinished_header_block import UnfinishedHeaderBlock
@@ -41,6 +38,8 @@ class FullNodeRpcApi:
             "/get_initial_freeze_period": self.get_initial_freeze_period,
             "/get_network_info": self.get_network_info,
             "/get_recent_signage_point_or_eos": self.get_recent_signage_point_or_eos,
+            "/get_p2p_metrics": self.get_p2p_metrics,
+            "/get_bls_cache_stats": self.get_bls_cache_stats,
             # Coins
             "/get_coin_records_by_puzzle_hash": self.get_coin_records_by_puzzle_hash,
             "/get_coin_records_by_puzzle_hashes": self.get_coin_records_by_puzzle_hashes,
@@ -49,6 +48,7 @@ class FullNodeRpcApi:
             "/get_coin_records_by_parent_ids": self.get_coin_records_by_parent_ids,
             "/push_tx": self.push_tx,
             "/get_puzzle_and_solution": self.get_puzzle_and_solution,
+            "/get_puzzles_and_solutions": self.get_puzzles_and_solutions,
             # Mempool
             "/get_all_mempool_tx_ids": self.get_all_mempool_tx_ids,
             "/get_all_mempool_items": self.get_all_mempool_items,
@@ -173,6 +173,24 @@ class FullNodeRpcApi:
         address_prefix = self.service.config["network_overrides"]["config"][network_name]["address_prefix"]
         return {"network_name": network_name, "network_prefix": address_prefix}
 
+    async def get_p2p_metrics(self, request: Dict) -> Optional[Dict]:
+        """
+        Returns the queue wait, handler time and response size histograms per message type and peer type, and the
+        current depths of the incoming queue and of the outgoing queue of each connection.
+        """
+        if self.service.server is None:
+            raise ValueError("Global connections is not set")
+        return {"metrics": self.service.server.get_p2p_metrics()}
+
+    async def get_bls_cache_stats(self, request: Dict) -> Optional[Dict]:
+        """
+        Returns the size, hit rate and evictions of the BLS pairing cache shared with the mempool validation processes.
+        Empty if the shared cache is disabled.
+        """
+        if self.service.pairing_cache is None:
+            return {"enabled": False, "stats": {}}
+        return {"enabled": True, "stats": self.service.pairing_cache.stats()}
+
     async def get_recent_signage_point_or_eos(self, request: Dict):
         if "sp_hash" not in request:
             challenge_hash: bytes32 = hexstr_to_bytes(request["challenge_hash"])
@@ -545,23 +563,25 @@ class FullNodeRpcApi:
         if coin_record is None or not coin_record.spent or coin_record.spent_block_index != height:
             raise ValueError(f"Invalid height {height}. coin record {coin_record}")
 
-        header_hash = self.service.blockchain.height_to_hash(height)
-        block: Optional[FullBlock] = await self.service.block_store.get_full_block(header_hash)
-
-        if block is None or block.transactions_generator is None:
+        coin_spend: Optional[CoinSpend] = (await self.service.get_coin_spends([coin_record])).get(coin_name)
+        if coin_spend is None:
             raise ValueError("Invalid block or block generator")
+        return {"coin_solution": coin_spend}
 
-        block_generator: Optional[BlockGenerator] = await self.service.blockchain.get_block_generator(block)
-        assert block_generator is not None
-        error, puzzle, solution = get_puzzle_and_solution_for_coin(
-            block_generator, coin_name, self.service.constants.MAX_BLOCK_COST_CLVM
-        )
-        if error is not None:
-            raise ValueError(f"Error: {error}")
-
-        puzzle_ser: SerializedProgram = SerializedProgram.from_program(Program.to(puzzle))
-        solution_ser: SerializedProgram = SerializedProgram.from_program(Program.to(solution))
-        return {"coin_solution": CoinSpend(coin_record.coin, puzzle_ser, solution_ser)}
+    async def get_puzzles_and_solutions(self, request: Dict) -> Optional[Dict]:
+        """
+        Returns the puzzles and solutions of many spent coins at once. Coins which are unknown or not spent are left
+        out of the response.
+        """
+        if "coin_ids" not in request:
+            raise ValueError("No coin_ids in request")
+        coin_ids: List[bytes32] = [bytes32(hexstr_to_bytes(coin_id)) for coin_id in request["coin_ids"]]
+        max_coin_ids = self.service.config.get("max_puzzle_solution_coin_ids", 500)
+        if len(coin_ids) > max_coin_ids:
+            raise ValueError(f"Too many coin_ids, at most {max_coin_ids} are allowed")
+        coin_records: List[CoinRecord] = await self.service.coin_store.get_coin_records_by_names(True, coin_ids)
+        coin_spends: Dict[bytes32, CoinSpend] = await self.service.get_coin_spends(coin_records)
+        return {"coin_solutions": [coin_spends[coin_id] for coin_id in coin_ids if coin_id in coin_spends]}
 
     async def get_additions_and_removals(self, request: Dict) -> Optional[Dict]:
         if "header_hash" not in request:
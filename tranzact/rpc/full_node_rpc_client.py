@@ -186,6 +186,10 @@ class FullNodeRpcClient(RpcClient):
         except Exception:
             return None
 
+    async def get_puzzles_and_solutions(self, coin_ids: List[bytes32]) -> List[CoinSpend]:
+        response = await self.fetch("get_puzzles_and_solutions", {"coin_ids": [coin_id.hex() for coin_id in coin_ids]})
+        return [CoinSpend.from_json_dict(coin_spend) for coin_spend in response["coin_solutions"]]
+
     async def get_all_mempool_tx_ids(self) -> List[bytes32]:
         response = await self.fetch("get_all_mempool_tx_ids", {})
         return [bytes32(hexstr_to_bytes(tx_id_hex)) for tx_id_hex in response["tx_ids"]]
@@ -226,3 +230,10 @@ class FullNodeRpcClient(RpcClient):
                 }
         except Exception:
             return None
+
+    async def get_p2p_metrics(self) -> Dict:
+        response = await self.fetch("get_p2p_metrics", {})
+        return response["metrics"]
+
+    async def get_bls_cache_stats(self) -> Dict:
+        return await self.fetch("get_bls_cache_stats", {})
@@ -64,6 +64,9 @@ class RpcClient:
     async def close_connection(self, node_id: bytes32) -> Dict:
         return await self.fetch("close_connection", {"node_id": node_id.hex()})
 
+    async def get_message_compression_stats(self) -> Dict:
+        return await self.fetch("get_message_compression_stats", {})
+
     async def stop_node(self) -> Dict:
         return await self.fetch("stop_node", {})
 
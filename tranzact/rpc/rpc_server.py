@@ -177,6 +177,22 @@ class RpcServer:
             await connection.close()
         return {}
 
+    async def get_message_compression_stats(self, request: Dict) -> Dict:
+        """
+        Returns the bytes before and after compression and the time spent, per message type, for the messages sent
+        and received compressed. Empty if message compression is disabled.
+        """
+        server = self.rpc_api.service.server
+        if server is None:
+            raise ValueError("Global connections is not set")
+        if server.compression is None:
+            return {"enabled": False, "algorithms": [], "stats": {"sent": {}, "received": {}}}
+        return {
+            "enabled": True,
+            "algorithms": server.compression.algorithms,
+            "stats": server.compression.stats.to_json_dict(),
+        }
+
     async def stop_node(self, request):
         """
         Shuts down the node.
@@ -321,6 +337,10 @@ async def start_rpc_server(
             "/close_connection",
             rpc_server._wrap_http_handler(rpc_server.close_connection),
         ),
+        aiohttp.web.post(
+            "/get_message_compression_stats",
+            rpc_server._wrap_http_handler(rpc_server.get_message_compression_stats),
+        ),
         aiohttp.web.post("/stop_node", rpc_server._wrap_http_handler(rpc_server.stop_node)),
     ]
 
@@ -0,0 +1,172 @@
+import dataclasses
+import logging
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+from tranzact.protocols.shared_protocol import Capability
+from tranzact.util.ints import uint16
+
+log = logging.getLogger(__name__)
+
+# Must not be larger than the max_msg_size of the websockets, so compression can not be used to send larger messages
+MAX_DECOMPRESSED_SIZE = 50 * 1024 * 1024
+
+# Once compression has been negotiated, each websocket frame starts with one byte, which is the id of the
+# algorithm the rest of the frame is compressed with, or RAW_FRAME if it is a plain serialized Message
+RAW_FRAME = 0
+
+
+def _zlib_decompress(data: bytes) -> bytes:
+    decompressor = zlib.decompressobj()
+    ret = decompressor.decompress(data, MAX_DECOMPRESSED_SIZE + 1)
+    if len(ret) > MAX_DECOMPRESSED_SIZE or decompressor.unconsumed_tail or not decompressor.eof:
+        raise ValueError("Invalid or oversized zlib frame")
+    return ret
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    # The content size is always written by our compressor, and checked before anything is allocated
+    size = zstandard.frame_content_size(data)
+    if size < 0 or size > MAX_DECOMPRESSED_SIZE:
+        raise ValueError(f"Invalid zstd frame content size {size}")
+    return zstandard.ZstdDecompressor().decompress(data, max_output_size=MAX_DECOMPRESSED_SIZE)
+
+
+def _lz4_compress(data: bytes) -> bytes:
+    return lz4.frame.compress(data, store_size=True)
+
+
+def _lz4_decompress(data: bytes) -> bytes:
+    size = lz4.frame.get_frame_info(data)["content_size"]
+    if size <= 0 or size > MAX_DECOMPRESSED_SIZE:
+        raise ValueError(f"Invalid lz4 frame content size {size}")
+    return lz4.frame.decompress(data)
+
+
+@dataclasses.dataclass(frozen=True)
+class CompressionAlgorithm:
+    name: str
+    frame_id: int
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+# The algorithms that are installed, by name. zlib is part of the standard library, zstd and lz4 are optional
+ALGORITHMS: Dict[str, CompressionAlgorithm] = {"zlib": CompressionAlgorithm("zlib", 1, zlib.compress, _zlib_decompress)}
+if zstandard is not None:
+    ALGORITHMS["zstd"] = CompressionAlgorithm("zstd", 2, _zstd_compress, _zstd_decompress)
+if lz4 is not None:
+    ALGORITHMS["lz4"] = CompressionAlgorithm("lz4", 3, _lz4_compress, _lz4_decompress)
+
+ALGORITHMS_BY_FRAME_ID: Dict[int, CompressionAlgorithm] = {a.frame_id: a for a in ALGORITHMS.values()}
+
+
+@dataclasses.dataclass
+class CompressionCounters:
+    messages: int = 0
+    # Size of the serialized messages, and of what was actually sent or received over the connection
+    message_bytes: int = 0
+    wire_bytes: int = 0
+    # Time spent compressing or decompressing
+    seconds: float = 0.0
+
+
+class CompressionStats:
+    """
+    Byte counters and time spent per message type, for the messages sent and received compressed. Shared by all
+    the connections of a server.
+    """
+
+    sent: Dict[str, CompressionCounters]
+    received: Dict[str, CompressionCounters]
+
+    def __init__(self):
+        self.sent = {}
+        self.received = {}
+
+    @staticmethod
+    def _add(
+        counters: Dict[str, CompressionCounters], message_type: str, message_bytes: int, wire_bytes: int, seconds: float
+    ):
+        entry = counters.get(message_type)
+        if entry is None:
+            entry = CompressionCounters()
+            counters[message_type] = entry
+        entry.messages += 1
+        entry.message_bytes += message_bytes
+        entry.wire_bytes += wire_bytes
+        entry.seconds += seconds
+
+    def add_sent(self, message_type: str, message_bytes: int, wire_bytes: int, seconds: float) -> None:
+        self._add(self.sent, message_type, message_bytes, wire_bytes, seconds)
+
+    def add_received(self, message_type: str, message_bytes: int, wire_bytes: int, seconds: float) -> None:
+        self._add(self.received, message_type, message_bytes, wire_bytes, seconds)
+
+    def to_json_dict(self) -> Dict:
+        return {
+            "sent": {k: dataclasses.asdict(v) for k, v in self.sent.items()},
+            "received": {k: dataclasses.asdict(v) for k, v in self.received.items()},
+        }
+
+
+class MessageCompression:
+    """
+    The compression settings of a server. The algorithms are advertised in the handshake, in order of preference,
+    and a message is compressed when its serialized size is at least threshold bytes.
+    """
+
+    algorithms: List[str]
+    threshold: int
+    stats: CompressionStats
+
+    def __init__(self, algorithms: List[str], threshold: int):
+        self.algorithms = []
+        for name in algorithms:
+            if name in ALGORITHMS:
+                self.algorithms.append(name)
+            else:
+                log.info(f"Message compression algorithm {name} is not installed, ignoring it")
+        self.threshold = threshold
+        self.stats = CompressionStats()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["MessageCompression"]:
+        compression_config: Dict = config.get("message_compression", {})
+        if not compression_config.get("enabled", False):
+            return None
+        return cls(
+            compression_config.get("algorithms", ["zstd", "lz4", "zlib"]), compression_config.get("threshold", 16384)
+        )
+
+    def capability(self) -> Tuple[uint16, str]:
+        return uint16(Capability.MESSAGE_COMPRESSION.value), ",".join(self.algorithms)
+
+    def negotiate(self, capabilities: List[Tuple[uint16, str]]) -> Optional[CompressionAlgorithm]:
+        """
+        Returns the algorithm to compress messages to a peer with, given the capabilities in its handshake, or None
+        if the peer does not support any of ours. Frames are only prefixed when both sides support a common
+        algorithm, which both sides determine the same way.
+        """
+        for capability, value in capabilities:
+            if capability != Capability.MESSAGE_COMPRESSION.value:
+                continue
+            peer_algorithms = value.split(",")
+            for name in self.algorithms:
+                if name in peer_algorithms:
+                    return ALGORITHMS[name]
+        return None
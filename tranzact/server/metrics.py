@@ -0,0 +1,194 @@
+import asyncio
+import collections
+import time
+from bisect import bisect_left
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from tranzact.server.outbound_message import NodeType
+from tranzact.server.ws_connection import WSTranzactConnection
+
+# Upper bounds of the histogram buckets. Values above the last bound are only counted in the +Inf bucket
+DURATION_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 600.0)
+SIZE_BUCKETS: Tuple[float, ...] = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 52428800)
+
+# name: (description, buckets)
+HISTOGRAMS: Dict[str, Tuple[str, Tuple[float, ...]]] = {
+    "queue_wait_seconds": ("Time messages waited in the incoming queue", DURATION_BUCKETS),
+    "handler_seconds": ("Time spent in the API handler, including sending the response", DURATION_BUCKETS),
+    "response_bytes": ("Size of the responses sent by the API handlers", SIZE_BUCKETS),
+}
+
+PROMETHEUS_PREFIX = "tranzact_p2p_"
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets, in the same form as a Prometheus histogram.
+    """
+
+    buckets: Tuple[float, ...]
+    # One counter per bucket, plus one for the values above the last bucket. Not cumulative
+    counts: List[int]
+    count: int
+    sum: float
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> List[Tuple[str, int]]:
+        ret = []
+        total = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            ret.append((str(bound), total))
+        return ret
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "sum": self.sum, "buckets": dict(self.cumulative_counts())}
+
+
+class TimedQueue(asyncio.Queue):
+    """
+    An asyncio.Queue which remembers when each item was put, so the consumer can tell how long it waited. Items are
+    the same as in a plain queue, get_with_wait also returns the seconds the item spent in the queue.
+    """
+
+    def _init(self, maxsize):
+        self._queue: Deque[Tuple[float, Any]] = collections.deque()
+        self._last_wait = 0.0
+
+    def _put(self, item):
+        self._queue.append((time.monotonic(), item))
+
+    def _get(self):
+        put_time, item = self._queue.popleft()
+        self._last_wait = time.monotonic() - put_time
+        return item
+
+    async def get_with_wait(self) -> Tuple[Any, float]:
+        item = await self.get()
+        return item, self._last_wait
+
+
+def peer_type_name(connection: WSTranzactConnection) -> str:
+    if connection.connection_type is None:
+        return "unknown"
+    return NodeType(connection.connection_type).name.lower()
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+
+
+class P2PMetrics:
+    """
+    Latency and size histograms of the messages handled by a server, per message type and peer type. The queue
+    depths are not stored, they are read from the server and its connections when a snapshot is taken.
+    """
+
+    # name -> (message_type, peer_type) -> Histogram
+    histograms: Dict[str, Dict[Tuple[str, str], Histogram]]
+    # Handlers which take longer than this are logged as warnings
+    slow_handler_seconds: float
+
+    def __init__(self, slow_handler_seconds: float = 5):
+        self.histograms = {name: {} for name in HISTOGRAMS.keys()}
+        self.slow_handler_seconds = slow_handler_seconds
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "P2PMetrics":
+        metrics_config: Dict = config.get("p2p_metrics", {})
+        return cls(metrics_config.get("slow_handler_seconds", 5))
+
+    def observe(self, name: str, message_type: str, peer_type: str, value: float) -> None:
+        histograms = self.histograms[name]
+        key = (message_type, peer_type)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = Histogram(HISTOGRAMS[name][1])
+            histograms[key] = histogram
+        histogram.observe(value)
+
+    def observe_message(
+        self,
+        message_type: str,
+        peer_type: str,
+        queue_wait: float,
+        handler_seconds: float,
+        response_bytes: Optional[int],
+    ) -> None:
+        self.observe("queue_wait_seconds", message_type, peer_type, queue_wait)
+        self.observe("handler_seconds", message_type, peer_type, handler_seconds)
+        if response_bytes is not None:
+            self.observe("response_bytes", message_type, peer_type, response_bytes)
+
+    def is_slow(self, handler_seconds: float) -> bool:
+        return handler_seconds >= self.slow_handler_seconds
+
+    def to_json_dict(self, incoming_queue_size: int, connections: List[WSTranzactConnection]) -> Dict[str, Any]:
+        histograms: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for name, by_key in self.histograms.items():
+            histograms[name] = {}
+            for (message_type, peer_type), histogram in sorted(by_key.items()):
+                histograms[name].setdefault(message_type, {})[peer_type] = histogram.to_json_dict()
+        return {
+            "histograms": histograms,
+            "incoming_queue_size": incoming_queue_size,
+            "outgoing_queue_sizes": [
+                {
+                    "node_id": connection.peer_node_id.hex(),
+                    "peer_host": connection.peer_host,
+                    "peer_port": connection.peer_port,
+                    "peer_type": peer_type_name(connection),
+                    "size": connection.outgoing_queue.qsize(),
+                }
+                for connection in connections
+            ],
+        }
+
+    def to_prometheus(self, incoming_queue_size: int, connections: List[WSTranzactConnection]) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        for name, by_key in self.histograms.items():
+            metric = PROMETHEUS_PREFIX + name
+            lines.append(f"# HELP {metric} {HISTOGRAMS[name][0]}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (message_type, peer_type), histogram in sorted(by_key.items()):
+                labels = _labels({"message_type": message_type, "peer_type": peer_type})
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+
+        metric = PROMETHEUS_PREFIX + "incoming_queue_size"
+        lines.append(f"# HELP {metric} Messages waiting to be handled")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {incoming_queue_size}")
+
+        metric = PROMETHEUS_PREFIX + "outgoing_queue_size"
+        lines.append(f"# HELP {metric} Messages waiting to be sent, per connection")
+        lines.append(f"# TYPE {metric} gauge")
+        for connection in connections:
+            labels = _labels(
+                {
+                    "node_id": connection.peer_node_id.hex(),
+                    "peer": f"{connection.peer_host}:{connection.peer_port}",
+                    "peer_type": peer_type_name(connection),
+                }
+            )
+            lines.append(f"{metric}{{{labels}}} {connection.outgoing_queue.qsize()}")
+        return "\n".join(lines) + "\n"
@@ -1,8 +1,7 @@
 import dataclasses
 import logging
 import time
-from collections import Counter
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from tranzact.protocols.protocol_message_types import ProtocolMessageTypes
 from tranzact.server.outbound_message import Message
@@ -109,97 +108,183 @@ rate_limits_other = {
 }
 
 
+def _with_total_size(limits: RLSettings) -> RLSettings:
+    if limits.max_total_size is not None:
+        return limits
+    return dataclasses.replace(limits, max_total_size=limits.frequency * limits.max_size)
+
+
+# The limits of each message type, by the integer message type, with max_total_size always filled in, and whether
+# the type also counts towards the aggregate non-transaction limits. Computed once, so checking a message does no
+# allocations or enum lookups
+LIMITS_BY_TYPE: Dict[int, Tuple[RLSettings, bool]] = {}
+for _message_type, _limits in rate_limits_tx.items():
+    LIMITS_BY_TYPE[_message_type.value] = (_with_total_size(_limits), False)
+for _message_type, _limits in rate_limits_other.items():
+    LIMITS_BY_TYPE[_message_type.value] = (_with_total_size(_limits), True)
+_DEFAULT_LIMITS: Tuple[RLSettings, bool] = (_with_total_size(DEFAULT_SETTINGS), False)
+
+
+class TokenBucket:
+    """
+    Allows bursts of up to count_capacity messages and size_capacity bytes, and refills continuously, so that the
+    full capacity is regained after period seconds.
+    """
+
+    __slots__ = ("count_capacity", "size_capacity", "count_tokens", "size_tokens", "period", "last_refill")
+
+    def __init__(self, count_capacity: float, size_capacity: float, period: float, now: float):
+        self.count_capacity = count_capacity
+        self.size_capacity = size_capacity
+        self.count_tokens = count_capacity
+        self.size_tokens = size_capacity
+        self.period = period
+        self.last_refill = now
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.last_refill
+        if elapsed <= 0:
+            return
+        self.last_refill = now
+        fraction = elapsed / self.period
+        self.count_tokens = min(self.count_capacity, self.count_tokens + fraction * self.count_capacity)
+        self.size_tokens = min(self.size_capacity, self.size_tokens + fraction * self.size_capacity)
+
+    def allows(self, size: int) -> bool:
+        return self.count_tokens >= 1 and self.size_tokens >= size
+
+    def take(self, size: int) -> None:
+        # Never goes negative, so a peer which was over the limit regains its budget at the normal rate
+        self.count_tokens = max(0.0, self.count_tokens - 1)
+        self.size_tokens = max(0.0, self.size_tokens - size)
+
+    def seconds_until_allowed(self, size: int) -> Optional[float]:
+        """
+        Returns how long until allows(size) is True, if nothing else is taken, or None if it never will be.
+        """
+        if self.count_capacity < 1 or size > self.size_capacity:
+            return None
+        count_wait = (1 - self.count_tokens) / self.count_capacity
+        size_wait = (size - self.size_tokens) / self.size_capacity if size > 0 else 0
+        return max(0.0, count_wait, size_wait) * self.period
+
+    def scale(self, factor: float) -> None:
+        self.count_capacity *= factor
+        self.size_capacity *= factor
+        self.count_tokens *= factor
+        self.size_tokens *= factor
+
+
 # TODO: only full node disconnects based on rate limits
 
 
 class RateLimiter:
     incoming: bool
     reset_seconds: int
-    current_minute: int
-    message_counts: Counter
-    message_cumulative_sizes: Counter
     percentage_of_limit: int
-    non_tx_message_counts: int = 0
-    non_tx_cumulative_size: int = 0
+    # Applied on top of percentage_of_limit, raised for trusted peers
+    multiplier: float
+    # One bucket per message type, created on the first message of that type
+    buckets: Dict[int, TokenBucket]
+    non_tx_bucket: TokenBucket
 
     def __init__(self, incoming: bool, reset_seconds=60, percentage_of_limit=100):
         """
-        The incoming parameter affects whether counters are incremented
-        unconditionally or not. For incoming messages, the counters are always
-        incremeneted. For outgoing messages, the counters are only incremented
-        if they are allowed to be sent by the rate limiter, since we won't send
-        the messages otherwise.
+        The incoming parameter affects whether the buckets are drawn from
+        unconditionally or not. For incoming messages, tokens are always
+        taken. For outgoing messages, tokens are only taken if the message is
+        allowed to be sent by the rate limiter, since we won't send the
+        messages otherwise.
+
+        Each limit can be used up all at once, and is refilled gradually over
+        reset_seconds, so there is no point in time where all limits reset.
         """
         self.incoming = incoming
         self.reset_seconds = reset_seconds
-        self.current_minute = time.time() // reset_seconds
-        self.message_counts = Counter()
-        self.message_cumulative_sizes = Counter()
         self.percentage_of_limit = percentage_of_limit
-        self.non_tx_message_counts = 0
-        self.non_tx_cumulative_size = 0
+        self.multiplier = 1
+        self.buckets = {}
+        proportion_of_limit: float = self.percentage_of_limit / 100
+        self.non_tx_bucket = TokenBucket(
+            NON_TX_FREQ * proportion_of_limit,
+            NON_TX_MAX_TOTAL_SIZE * proportion_of_limit,
+            reset_seconds,
+            time.monotonic(),
+        )
+
+    def set_multiplier(self, multiplier: float) -> None:
+        """
+        Scales all the limits, and the tokens currently available, by multiplier relative to percentage_of_limit.
+        """
+        factor = multiplier / self.multiplier
+        self.multiplier = multiplier
+        for bucket in self.buckets.values():
+            bucket.scale(factor)
+        self.non_tx_bucket.scale(factor)
+
+    def _limits_and_bucket(self, message: Message, now: float) -> Optional[Tuple[RLSettings, bool, TokenBucket]]:
+        entry = LIMITS_BY_TYPE.get(message.type)
+        if entry is None:
+            try:
+                message_type = ProtocolMessageTypes(message.type)
+            except Exception as e:
+                log.warning(f"Invalid message: {message.type}, {e}")
+                return None
+            log.warning(f"Message type {message_type} not found in rate limits")
+            entry = _DEFAULT_LIMITS
+        limits, non_tx = entry
+
+        bucket = self.buckets.get(message.type)
+        if bucket is None:
+            scale: float = self.percentage_of_limit / 100 * self.multiplier
+            assert limits.max_total_size is not None
+            bucket = TokenBucket(limits.frequency * scale, limits.max_total_size * scale, self.reset_seconds, now)
+            self.buckets[message.type] = bucket
+        else:
+            bucket.refill(now)
+        return limits, non_tx, bucket
 
     def process_msg_and_check(self, message: Message) -> bool:
         """
         Returns True if message can be processed successfully, false if a rate limit is passed.
         """
-
-        current_minute = int(time.time() // self.reset_seconds)
-        if current_minute != self.current_minute:
-            self.current_minute = current_minute
-            self.message_counts = Counter()
-            self.message_cumulative_sizes = Counter()
-            self.non_tx_message_counts = 0
-            self.non_tx_cumulative_size = 0
-        try:
-            message_type = ProtocolMessageTypes(message.type)
-        except Exception as e:
-            log.warning(f"Invalid message: {message.type}, {e}")
+        now = time.monotonic()
+        entry = self._limits_and_bucket(message, now)
+        if entry is None:
             return True
+        limits, non_tx, bucket = entry
+        size = len(message.data)
 
-        new_message_counts: int = self.message_counts[message_type] + 1
-        new_cumulative_size: int = self.message_cumulative_sizes[message_type] + len(message.data)
-        new_non_tx_count: int = self.non_tx_message_counts
-        new_non_tx_size: int = self.non_tx_cumulative_size
-        proportion_of_limit: float = self.percentage_of_limit / 100
-
-        ret: bool = False
-        try:
-
-            limits = DEFAULT_SETTINGS
-            if message_type in rate_limits_tx:
-                limits = rate_limits_tx[message_type]
-            elif message_type in rate_limits_other:
-                limits = rate_limits_other[message_type]
-                new_non_tx_count = self.non_tx_message_counts + 1
-                new_non_tx_size = self.non_tx_cumulative_size + len(message.data)
-                if new_non_tx_count > NON_TX_FREQ * proportion_of_limit:
-                    return False
-                if new_non_tx_size > NON_TX_MAX_TOTAL_SIZE * proportion_of_limit:
-                    return False
-            else:
-                log.warning(f"Message type {message_type} not found in rate limits")
-
-            if limits.max_total_size is None:
-                limits = dataclasses.replace(limits, max_total_size=limits.frequency * limits.max_size)
-            assert limits.max_total_size is not None
+        ret = size <= limits.max_size and bucket.allows(size)
+        if non_tx:
+            self.non_tx_bucket.refill(now)
+            ret = ret and self.non_tx_bucket.allows(size)
 
-            if new_message_counts > limits.frequency * proportion_of_limit:
-                return False
-            if len(message.data) > limits.max_size:
-                return False
-            if new_cumulative_size > limits.max_total_size * proportion_of_limit:
-                return False
+        if self.incoming or ret:
+            # now that we determined that it's OK to send the message, take the
+            # tokens. Alternatively, if this was an incoming message, we already
+            # received it and it should use up the budget unconditionally
+            bucket.take(size)
+            if non_tx:
+                self.non_tx_bucket.take(size)
+        return ret
 
-            ret = True
-            return True
-        finally:
-            if self.incoming or ret:
-                # now that we determined that it's OK to send the message, commit the
-                # updates to the counters. Alternatively, if this was an
-                # incoming message, we already received it and it should
-                # increment the counters unconditionally
-                self.message_counts[message_type] = new_message_counts
-                self.message_cumulative_sizes[message_type] = new_cumulative_size
-                self.non_tx_message_counts = new_non_tx_count
-                self.non_tx_cumulative_size = new_non_tx_size
+    def seconds_until_allowed(self, message: Message) -> Optional[float]:
+        """
+        Returns how long until process_msg_and_check would accept message, or None if it never would, because it
+        is larger than the limits.
+        """
+        now = time.monotonic()
+        entry = self._limits_and_bucket(message, now)
+        if entry is None:
+            return 0
+        limits, non_tx, bucket = entry
+        size = len(message.data)
+        if size > limits.max_size:
+            return None
+        wait = bucket.seconds_until_allowed(size)
+        if non_tx and wait is not None:
+            self.non_tx_bucket.refill(now)
+            non_tx_wait = self.non_tx_bucket.seconds_until_allowed(size)
+            wait = None if non_tx_wait is None else max(wait, non_tx_wait)
+        return wait
@@ -21,7 +21,9 @@ from tranzact.protocols.protocol_message_types import ProtocolMessageTypes
 from tranzact.protocols.protocol_state_machine import message_requires_reply
 from tranzact.protocols.protocol_timing import INVALID_PROTOCOL_BAN_SECONDS, API_EXCEPTION_BAN_SECONDS
 from tranzact.protocols.shared_protocol import protocol_version
+from tranzact.server.compression import MessageCompression
 from tranzact.server.introducer_peers import IntroducerPeers
+from tranzact.server.metrics import P2PMetrics, TimedQueue, peer_type_name
 from tranzact.server.outbound_message import Message, NodeType
 from tranzact.server.ssl_context import private_ssl_paths, public_ssl_paths
 from tranzact.server.ws_connection import WSTranzactConnection
@@ -120,6 +122,8 @@ class TranzactServer:
         self._network_id = network_id
         self._inbound_rate_limit_percent = inbound_rate_limit_percent
         self._outbound_rate_limit_percent = outbound_rate_limit_percent
+        # None if message compression is disabled in the config
+        self.compression: Optional[MessageCompression] = MessageCompression.from_config(config)
 
         # Task list to keep references to tasks, so they don't get GCd
         self._tasks: List[asyncio.Task] = []
@@ -132,7 +136,8 @@ class TranzactServer:
         self.root_path = root_path
         self.config = config
         self.on_connect: Optional[Callable] = None
-        self.incoming_messages: asyncio.Queue = asyncio.Queue()
+        self.incoming_messages: TimedQueue = TimedQueue()
+        self.metrics: P2PMetrics = P2PMetrics.from_config(config)
         self.shut_down_event = asyncio.Event()
 
         if self._local_type is NodeType.INTRODUCER:
@@ -153,9 +158,12 @@ class TranzactServer:
         self.app: Optional[Application] = None
         self.runner: Optional[web.AppRunner] = None
         self.site: Optional[TCPSite] = None
+        # Serves the metrics in the Prometheus text format, if enabled in the config
+        self.metrics_runner: Optional[web.AppRunner] = None
 
         self.connection_close_task: Optional[asyncio.Task] = None
         self.site_shutdown_task: Optional[asyncio.Task] = None
+        self.metrics_shutdown_task: Optional[asyncio.Task] = None
         self.app_shut_down_task: Optional[asyncio.Task] = None
         self.received_message_callback: Optional[Callable] = None
         self.api_tasks: Dict[bytes32, asyncio.Task] = {}
@@ -242,6 +250,24 @@ class TranzactServer:
         await self.site.start()
         self.log.info(f"Started listening on port: {self._port}")
 
+        metrics_config: Dict = self.config.get("p2p_metrics", {})
+        if metrics_config.get("prometheus_enabled", False):
+            metrics_app = web.Application()
+            metrics_app.add_routes([web.get("/metrics", self.prometheus_metrics)])
+            self.metrics_runner = web.AppRunner(metrics_app, access_log=None, logger=self.log)
+            await self.metrics_runner.setup()
+            host = metrics_config.get("prometheus_host", "127.0.0.1")
+            port = metrics_config.get("prometheus_port", 8656)
+            await web.TCPSite(self.metrics_runner, host, port, shutdown_timeout=3).start()
+            self.log.info(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+
+    def get_p2p_metrics(self) -> Dict[str, Any]:
+        return self.metrics.to_json_dict(self.incoming_messages.qsize(), list(self.all_connections.values()))
+
+    async def prometheus_metrics(self, request: web.Request) -> web.Response:
+        text = self.metrics.to_prometheus(self.incoming_messages.qsize(), list(self.all_connections.values()))
+        return web.Response(text=text, content_type="text/plain")
+
     async def incoming_connection(self, request):
         if request.remote in self.banned_peers and time.time() < self.banned_peers[request.remote]:
             self.log.warning(f"Peer {request.remote} is banned, refusing connection")
@@ -270,6 +296,7 @@ class TranzactServer:
                 self._inbound_rate_limit_percent,
                 self._outbound_rate_limit_percent,
                 close_event,
+                compression=self.compression,
             )
             handshake = await connection.perform_handshake(
                 self._network_id,
@@ -329,6 +356,11 @@ class TranzactServer:
             con = self.all_connections[connection.peer_node_id]
             await con.close()
         self.all_connections[connection.peer_node_id] = connection
+        if self.is_trusted_peer(connection, self.config.get("trusted_peers")) or is_in_network(
+            connection.peer_host, self.exempt_peer_networks
+        ):
+            # Localhost peers are already exempt from our outbound limits, and are never disconnected for theirs
+            connection.set_rate_limit_multiplier(self.config.get("trusted_peer_rate_limit_multiplier", 4))
         if connection.connection_type is not None:
             self.connection_by_type[connection.connection_type][connection.peer_node_id] = connection
             if on_connect is not None:
@@ -426,6 +458,7 @@ class TranzactServer:
                 self._inbound_rate_limit_percent,
                 self._outbound_rate_limit_percent,
                 session=session,
+                compression=self.compression,
             )
             handshake = await connection.perform_handshake(
                 self._network_id,
@@ -515,14 +548,15 @@ class TranzactServer:
         self.tasks = set()
         message_types: typing_Counter[str] = Counter()  # Used for debugging information.
         while True:
-            payload_inc, connection_inc = await self.incoming_messages.get()
+            (payload_inc, connection_inc), queue_wait = await self.incoming_messages.get_with_wait()
             if payload_inc is None or connection_inc is None:
                 continue
 
-            async def api_call(full_message: Message, connection: WSTranzactConnection, task_id):
+            async def api_call(full_message: Message, connection: WSTranzactConnection, task_id, queue_wait: float):
                 nonlocal message_types
                 start_time = time.time()
                 message_type = ""
+                response_bytes: Optional[int] = None
                 try:
                     if self.received_message_callback is not None:
                         await self.received_message_callback(connection)
@@ -581,6 +615,7 @@ class TranzactServer:
 
                     if response is not None:
                         response_message = Message(response.type, full_message.id, response.data)
+                        response_bytes = len(response.data)
                         await connection.reply_to_request(response_message)
                 except TimeoutError:
                     connection.log.error(f"Timeout error for: {message_type}")
@@ -596,6 +631,16 @@ class TranzactServer:
                     await connection.close(self.api_exception_ban_seconds, WSCloseCode.PROTOCOL_ERROR, Err.UNKNOWN)
                 finally:
                     message_types[message_type] -= 1
+                    if message_type != "":
+                        handler_seconds = time.time() - start_time
+                        self.metrics.observe_message(
+                            message_type, peer_type_name(connection), queue_wait, handler_seconds, response_bytes
+                        )
+                        if self.metrics.is_slow(handler_seconds):
+                            connection.log.warning(
+                                f"Slow handler: {message_type} from {connection.get_peer_logging()} took "
+                                f"{handler_seconds:.3f} seconds, after waiting {queue_wait:.3f} seconds in the queue"
+                            )
                     if task_id in self.api_tasks:
                         self.api_tasks.pop(task_id)
                     if task_id in self.tasks_from_peer[connection.peer_node_id]:
@@ -604,7 +649,7 @@ class TranzactServer:
                         self.execute_tasks.remove(task_id)
 
             task_id = token_bytes()
-            api_task = asyncio.create_task(api_call(payload_inc, connection_inc, task_id))
+            api_task = asyncio.create_task(api_call(payload_inc, connection_inc, task_id, queue_wait))
             self.api_tasks[task_id] = api_task
             if connection_inc.peer_node_id not in self.tasks_from_peer:
                 self.tasks_from_peer[connection_inc.peer_node_id] = set()
@@ -699,6 +744,8 @@ class TranzactServer:
             self.site_shutdown_task = asyncio.create_task(self.runner.cleanup())
         if self.app is not None:
             self.app_shut_down_task = asyncio.create_task(self.app.shutdown())
+        if self.metrics_runner is not None:
+            self.metrics_shutdown_task = asyncio.create_task(self.metrics_runner.cleanup())
         for task_id, task in self.api_tasks.items():
             task.cancel()
 
@@ -715,6 +762,8 @@ class TranzactServer:
             await self.app_shut_down_task
         if self.site_shutdown_task is not None:
             await self.site_shutdown_task
+        if self.metrics_shutdown_task is not None:
+            await self.metrics_shutdown_task
 
     async def get_peer_info(self) -> Optional[PeerInfo]:
         ip = None
@@ -1,8 +1,10 @@
 import asyncio
+import heapq
+import itertools
 import logging
 import time
 import traceback
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from aiohttp import WSCloseCode, WSMessage, WSMsgType
 
@@ -11,6 +13,12 @@ from tranzact.protocols.protocol_message_types import ProtocolMessageTypes
 from tranzact.protocols.protocol_state_machine import message_response_ok
 from tranzact.protocols.protocol_timing import INTERNAL_PROTOCOL_ERROR_BAN_SECONDS
 from tranzact.protocols.shared_protocol import Capability, Handshake
+from tranzact.server.compression import (
+    ALGORITHMS_BY_FRAME_ID,
+    RAW_FRAME,
+    CompressionAlgorithm,
+    MessageCompression,
+)
 from tranzact.server.outbound_message import Message, NodeType, make_msg
 from tranzact.server.rate_limits import RateLimiter
 from tranzact.types.blockchain_format.sized_bytes import bytes32
@@ -24,6 +32,10 @@ from tranzact.util.network import class_for_type, is_localhost
 # Max size 2^(8*4) which is around 4GiB
 LENGTH_BYTES: int = 4
 
+# Bounds on how long a message we rate limited ourselves on waits before it is tried again
+MIN_RETRY_SECONDS: float = 0.1
+MAX_RETRY_SECONDS: float = 60
+
 
 class WSTranzactConnection:
     """
@@ -48,6 +60,7 @@ class WSTranzactConnection:
         outbound_rate_limit_percent: int,
         close_event=None,
         session=None,
+        compression: Optional[MessageCompression] = None,
     ):
         # Local properties
         self.ws: Any = ws
@@ -104,10 +117,33 @@ class WSTranzactConnection:
         # disconnect. Also it allows a little flexibility.
         self.outbound_rate_limiter = RateLimiter(incoming=False, percentage_of_limit=outbound_rate_limit_percent)
         self.inbound_rate_limiter = RateLimiter(incoming=True, percentage_of_limit=inbound_rate_limit_percent)
+        # Messages we rate limited ourselves on, as a heap of (time to retry, sequence number, message). They are
+        # put back in the outgoing queue by a single task, which only runs while there are delayed messages
+        self.delayed_messages: List[Tuple[float, int, Message]] = []
+        self.delayed_messages_counter = itertools.count()
+        self.delayed_messages_changed = asyncio.Event()
+        self.delayed_send_task: Optional[asyncio.Task] = None
 
         # Used by crawler/dns introducer
         self.version = None
 
+        # Our compression settings, and the algorithm negotiated with the peer during the handshake. Once an
+        # algorithm is negotiated, every frame in both directions is prefixed with the id of its compression
+        self.compression: Optional[MessageCompression] = compression
+        self.peer_compression: Optional[CompressionAlgorithm] = None
+
+    def _capabilities(self) -> List[Tuple[uint16, str]]:
+        capabilities = [(uint16(Capability.BASE.value), "1")]
+        if self.compression is not None:
+            capabilities.append(self.compression.capability())
+        return capabilities
+
+    def _negotiate_compression(self, handshake: Handshake) -> None:
+        if self.compression is not None:
+            self.peer_compression = self.compression.negotiate(handshake.capabilities)
+            if self.peer_compression is not None:
+                self.log.debug(f"Using {self.peer_compression.name} compression with {self.peer_host}")
+
     async def perform_handshake(self, network_id: str, protocol_version: str, server_port: int, local_type: NodeType):
         if self.is_outbound:
             outbound_handshake = make_msg(
@@ -118,7 +154,7 @@ class WSTranzactConnection:
                     tranzact_full_version_str(),
                     uint16(server_port),
                     uint8(local_type.value),
-                    [(uint16(Capability.BASE.value), "1")],
+                    self._capabilities(),
                 ),
             )
             assert outbound_handshake is not None
@@ -144,6 +180,7 @@ class WSTranzactConnection:
 
             self.peer_server_port = inbound_handshake.server_port
             self.connection_type = NodeType(inbound_handshake.node_type)
+            self._negotiate_compression(inbound_handshake)
 
         else:
             try:
@@ -174,12 +211,13 @@ class WSTranzactConnection:
                     tranzact_full_version_str(),
                     uint16(server_port),
                     uint8(local_type.value),
-                    [(uint16(Capability.BASE.value), "1")],
+                    self._capabilities(),
                 ),
             )
             await self._send_message(outbound_handshake)
             self.peer_server_port = inbound_handshake.server_port
             self.connection_type = NodeType(inbound_handshake.node_type)
+            self._negotiate_compression(inbound_handshake)
 
         self.outbound_task = asyncio.create_task(self.outbound_handler())
         self.inbound_task = asyncio.create_task(self.inbound_handler())
@@ -205,6 +243,8 @@ class WSTranzactConnection:
                 self.inbound_task.cancel()
             if self.outbound_task is not None:
                 self.outbound_task.cancel()
+            if self.delayed_send_task is not None:
+                self.delayed_send_task.cancel()
             if self.ws is not None and self.ws._closed is False:
                 await self.ws.close(code=ws_close_code, message=message)
             if self.session is not None:
@@ -380,18 +420,84 @@ class WSTranzactConnection:
         for message in messages:
             await self.outgoing_queue.put(message)
 
-    async def _wait_and_retry(self, msg: Message, queue: asyncio.Queue):
-        try:
-            await asyncio.sleep(1)
-            await queue.put(msg)
-        except Exception as e:
-            self.log.debug(f"Exception {e} while waiting to retry sending rate limited message")
+    def set_rate_limit_multiplier(self, multiplier: float) -> None:
+        """
+        Scales the inbound and outbound rate limits of this connection, used to give trusted peers a larger budget.
+        """
+        self.inbound_rate_limiter.set_multiplier(multiplier)
+        self.outbound_rate_limiter.set_multiplier(multiplier)
+
+    def _delay_message(self, message: Message) -> None:
+        wait: Optional[float] = self.outbound_rate_limiter.seconds_until_allowed(message)
+        if wait is None:
+            self.log.warning(
+                f"Not sending {ProtocolMessageTypes(message.type).name} of {len(message.data)} bytes to "
+                f"{self.peer_host}, it is larger than the rate limits"
+            )
             return None
+        wait = min(max(wait, MIN_RETRY_SECONDS), MAX_RETRY_SECONDS)
+        heapq.heappush(self.delayed_messages, (time.monotonic() + wait, next(self.delayed_messages_counter), message))
+        self.delayed_messages_changed.set()
+        if self.delayed_send_task is None or self.delayed_send_task.done():
+            self.delayed_send_task = asyncio.create_task(self._delayed_send_handler())
 
-    async def _send_message(self, message: Message):
+    async def _delayed_send_handler(self) -> None:
+        try:
+            while len(self.delayed_messages) > 0 and not self.closed:
+                self.delayed_messages_changed.clear()
+                wait = self.delayed_messages[0][0] - time.monotonic()
+                if wait > 0:
+                    # Wakes up early if a message with an earlier retry time is added
+                    try:
+                        await asyncio.wait_for(self.delayed_messages_changed.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                _, _, message = heapq.heappop(self.delayed_messages)
+                await self.outgoing_queue.put(message)
+        except asyncio.CancelledError:
+            pass
+
+    async def _encode_frame(self, message: Message) -> bytes:
         encoded: bytes = bytes(message)
-        size = len(encoded)
-        assert len(encoded) < (2 ** (LENGTH_BYTES * 8))
+        if self.peer_compression is None:
+            return encoded
+        assert self.compression is not None
+        if len(encoded) >= self.compression.threshold:
+            start = time.monotonic()
+            # zlib and zstd release the GIL, so large messages don't stall the event loop while compressing
+            compressed = await asyncio.get_running_loop().run_in_executor(None, self.peer_compression.compress, encoded)
+            if len(compressed) < len(encoded):
+                self.compression.stats.add_sent(
+                    ProtocolMessageTypes(message.type).name,
+                    len(encoded),
+                    len(compressed) + 1,
+                    time.monotonic() - start,
+                )
+                return bytes([self.peer_compression.frame_id]) + compressed
+        return bytes([RAW_FRAME]) + encoded
+
+    async def _decode_frame(self, data: bytes) -> Message:
+        if self.peer_compression is None:
+            return Message.from_bytes(data)
+        assert self.compression is not None
+        if data[0] == RAW_FRAME:
+            return Message.from_bytes(data[1:])
+        start = time.monotonic()
+        # Raises KeyError on an unknown frame id, and ValueError on invalid or oversized compressed data
+        algorithm = ALGORITHMS_BY_FRAME_ID[data[0]]
+        if algorithm.name not in self.compression.algorithms:
+            raise ValueError(f"Received a frame compressed with {algorithm.name}, which we do not support")
+        decompressed = await asyncio.get_running_loop().run_in_executor(None, algorithm.decompress, data[1:])
+        message = Message.from_bytes(decompressed)
+        try:
+            message_type = ProtocolMessageTypes(message.type).name
+        except Exception:
+            message_type = "Unknown"
+        self.compression.stats.add_received(message_type, len(decompressed), len(data), time.monotonic() - start)
+        return message
+
+    async def _send_message(self, message: Message):
         if not self.outbound_rate_limiter.process_msg_and_check(message):
             if not is_localhost(self.peer_host):
                 self.log.debug(
@@ -401,7 +507,7 @@ class WSTranzactConnection:
 
                 # TODO: fix this special case. This function has rate limits which are too low.
                 if ProtocolMessageTypes(message.type) != ProtocolMessageTypes.respond_peers:
-                    asyncio.create_task(self._wait_and_retry(message, self.outgoing_queue))
+                    self._delay_message(message)
 
                 return None
             else:
@@ -410,6 +516,9 @@ class WSTranzactConnection:
                     f"peer: {self.peer_host}"
                 )
 
+        encoded: bytes = await self._encode_frame(message)
+        size = len(encoded)
+        assert len(encoded) < (2 ** (LENGTH_BYTES * 8))
         await self.ws.send_bytes(encoded)
         self.log.debug(f"-> {ProtocolMessageTypes(message.type).name} to peer {self.peer_host} {self.peer_node_id}")
         self.bytes_written += size
@@ -452,7 +561,7 @@ class WSTranzactConnection:
                 return None
         elif message.type == WSMsgType.BINARY:
             data = message.data
-            full_message_loaded: Message = Message.from_bytes(data)
+            full_message_loaded: Message = await self._decode_frame(data)
             self.bytes_read += len(data)
             self.last_message_time = time.time()
             try:
@@ -1,13 +1,21 @@
 from dataclasses import dataclass
-from typing import List, Optional, Set
+from typing import Any, Dict, List, Optional, Set
 from tranzact.types.blockchain_format.coin import Coin
 from tranzact.types.blockchain_format.foliage import Foliage, FoliageTransactionBlock, TransactionsInfo
 from tranzact.types.blockchain_format.program import SerializedProgram
 from tranzact.types.blockchain_format.reward_chain_block import RewardChainBlock
+from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.types.blockchain_format.vdf import VDFProof
 from tranzact.types.end_of_slot_bundle import EndOfSubSlotBundle
-from tranzact.util.ints import uint32
-from tranzact.util.streamable import Streamable, streamable
+from tranzact.util.hash import std_hash
+from tranzact.util.ints import uint32, uint128
+from tranzact.util.streamable import (
+    Streamable,
+    get_field_offsets_function,
+    get_item_parse_function,
+    get_item_skip_function,
+    streamable,
+)
 
 
 @dataclass(frozen=True)
@@ -77,3 +85,84 @@ class FullBlock(Streamable):
         if self.challenge_chain_ip_proof.witness_type != 0 or not self.challenge_chain_ip_proof.normalized_to_identity:
             return False
         return True
+
+
+class LazyFullBlock:
+    """
+    A serialized FullBlock, which only parses the fields that are accessed. The properties and methods of FullBlock
+    can be used and parse the fields they need, while the height and header hash are read without parsing the proofs
+    and signatures around them.
+    """
+
+    _field_indexes: Dict[str, int] = {name: i for i, name in enumerate(FullBlock.__annotations__.keys())}
+
+    def __init__(self, blob: bytes):
+        self._blob: bytes = bytes(blob)
+        # Checks the layout of the whole block, without creating any of the fields
+        self._offsets: List[int] = get_field_offsets_function(FullBlock)(self._blob)
+        self._fields: Dict[str, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        index = LazyFullBlock._field_indexes.get(name)
+        if index is not None:
+            if name not in self._fields:
+                parse_f = get_item_parse_function(FullBlock.__annotations__[name])
+                value, end = parse_f(self._blob, self._offsets[index])
+                assert end == self._offsets[index + 1]
+                self._fields[name] = value
+            return self._fields[name]
+        if name.startswith("_"):
+            raise AttributeError(name)
+        # Properties and methods of FullBlock, such as is_transaction_block, work on the fields of this view
+        return getattr(FullBlock, name).__get__(self, LazyFullBlock)
+
+    def _field_bytes(self, name: str) -> bytes:
+        index = LazyFullBlock._field_indexes[name]
+        return self._blob[self._offsets[index] : self._offsets[index + 1]]
+
+    def _nested_field(self, name: str, nested_name: str) -> Any:
+        # Parses one field of a streamable field, skipping over the fields before it
+        pos = self._offsets[LazyFullBlock._field_indexes[name]]
+        for f_name, f_type in FullBlock.__annotations__[name].__annotations__.items():
+            if f_name == nested_name:
+                return get_item_parse_function(f_type)(self._blob, pos)[0]
+            pos = get_item_skip_function(f_type)(self._blob, pos)
+        raise AttributeError(nested_name)
+
+    @property
+    def prev_header_hash(self) -> bytes32:
+        return self._nested_field("foliage", "prev_block_hash")
+
+    @property
+    def height(self) -> uint32:
+        return self._nested_field("reward_chain_block", "height")
+
+    @property
+    def weight(self) -> uint128:
+        return self._nested_field("reward_chain_block", "weight")
+
+    @property
+    def total_iters(self) -> uint128:
+        return self._nested_field("reward_chain_block", "total_iters")
+
+    @property
+    def header_hash(self) -> bytes32:
+        # Same as foliage.get_hash()
+        return bytes32(std_hash(self._field_bytes("foliage")))
+
+    def __bytes__(self) -> bytes:
+        return self._blob
+
+    def full_block(self) -> FullBlock:
+        return FullBlock.from_bytes(self._blob)
+
+    def without_transactions_generator(self) -> bytes:
+        """
+        Returns the serialized block with transactions_generator set to None, as sent to peers which do not want it.
+        """
+        index = LazyFullBlock._field_indexes["transactions_generator"]
+        start = self._offsets[index]
+        end = self._offsets[index + 1]
+        if end - start == 1:
+            return self._blob
+        return self._blob[:start] + bytes([0]) + self._blob[end:]
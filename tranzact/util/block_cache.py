@@ -29,6 +29,7 @@ class BlockCache(BlockchainInterface):
         self._height_to_hash = height_to_hash
         self._sub_epoch_summaries = sub_epoch_summaries
         self._sub_epoch_segments: Dict[uint32, SubEpochSegments] = {}
+        self._weight_proof: Optional[bytes] = None
         self.log = logging.getLogger(__name__)
 
     def block_record(self, header_hash: bytes32) -> BlockRecord:
@@ -92,3 +93,9 @@ class BlockCache(BlockchainInterface):
         if segments is None:
             return None
         return segments.challenge_segments
+
+    async def persist_weight_proof(self, weight_proof_bytes: bytes):
+        self._weight_proof = weight_proof_bytes
+
+    async def get_weight_proof(self) -> Optional[bytes]:
+        return self._weight_proof
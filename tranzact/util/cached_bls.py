@@ -1,14 +1,17 @@
 import functools
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from blspy import AugSchemeMPL, G1Element, G2Element, GTElement
 
 from tranzact.types.blockchain_format.sized_bytes import bytes48
 from tranzact.util.hash import std_hash
 from tranzact.util.lru_cache import LRUCache
+from tranzact.util.shared_pairing_cache import SharedPairingCache
 
+PairingCache = Union[LRUCache, SharedPairingCache]
 
-def get_pairings(cache: LRUCache, pks: List[bytes48], msgs: List[bytes], force_cache: bool) -> List[GTElement]:
+
+def get_pairings(cache: PairingCache, pks: List[bytes48], msgs: List[bytes], force_cache: bool) -> List[GTElement]:
     pairings: List[Optional[GTElement]] = []
     missing_count: int = 0
     for pk, msg in zip(pks, msgs):
@@ -41,8 +44,14 @@ LOCAL_CACHE: LRUCache = LRUCache(50000)
 
 
 def aggregate_verify(
-    pks: List[bytes48], msgs: List[bytes], sig: G2Element, force_cache: bool = False, cache: LRUCache = LOCAL_CACHE
+    pks: List[bytes48],
+    msgs: List[bytes],
+    sig: G2Element,
+    force_cache: bool = False,
+    cache: Optional[PairingCache] = None,
 ):
+    if cache is None:
+        cache = LOCAL_CACHE
     pairings: List[GTElement] = get_pairings(cache, pks, msgs, force_cache)
     if len(pairings) == 0:
         pks_objects: List[G1Element] = [G1Element.from_bytes(pk) for pk in pks]
@@ -1,4 +1,7 @@
 import asyncio
+import contextlib
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
 
 import aiosqlite
 
@@ -6,24 +9,95 @@ import aiosqlite
 class DBWrapper:
     """
     This object handles HeaderBlocks and Blocks stored in DB used by wallet.
+
+    All writes go through db, the writer connection. Stores run their queries in reader(), which hands out one of the
+    read-only connections opened by open_readers, so reads are served on other threads than the writes. Without
+    readers (the default, and for in-memory databases) reader() uses the writer connection.
     """
 
     db: aiosqlite.Connection
     lock: asyncio.Lock
+    db_version: int
+    readers: List[aiosqlite.Connection]
+    # The number of transactions committed or rolled back on the writer connection
+    transactions_done: int
 
-    def __init__(self, connection: aiosqlite.Connection):
+    def __init__(self, connection: aiosqlite.Connection, db_version: int = 1):
         self.db = connection
         self.lock = asyncio.Lock()
+        # Version 1 stores hashes as hex text, version 2 stores them as 32 byte blobs
+        self.db_version = db_version
+        self.readers = []
+        self.transactions_done = 0
+        self._free_readers: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+        # The task which began the current transaction on the writer connection
+        self._transaction_task: Optional[asyncio.Task] = None
+
+    async def open_readers(self, db_path: Path, count: int) -> None:
+        """
+        Opens count read-only connections to the database at db_path. The database has to be in WAL mode, so the
+        readers do not block the writer, and see the last committed state while a transaction is in progress.
+        """
+        # as_uri quotes the characters of the path which have a meaning in a URI, like ? and #
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        for _ in range(count):
+            connection = await aiosqlite.connect(uri, uri=True)
+            self.readers.append(connection)
+            self._free_readers.put_nowait(connection)
+
+    async def close_readers(self) -> None:
+        for connection in self.readers:
+            await connection.close()
+        self.readers = []
+        self._free_readers = asyncio.Queue()
+
+    def _reads_from_writer(self) -> bool:
+        if len(self.readers) == 0:
+            return True
+        if not self.db.in_transaction:
+            return False
+        # The task writing has to see its own uncommitted changes. Transactions started implicitly by a write,
+        # without begin_transaction, are not tied to a task, so all reads use the writer until they are committed
+        return self._transaction_task is None or self._transaction_task is asyncio.current_task()
+
+    @contextlib.asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Yields a connection for read queries, which is only used by the caller until the context exits.
+        """
+        if self._reads_from_writer():
+            yield self.db
+            return
+        connection = await self._free_readers.get()
+        try:
+            yield connection
+        finally:
+            self._free_readers.put_nowait(connection)
+
+    def committed_state(self) -> Optional[int]:
+        """
+        Returns None while a transaction is in progress on the writer connection, and otherwise a number which changes
+        whenever a transaction ends. A value read from a reader connection can be cached if this is not None and did
+        not change during the read, since no write could have been missed.
+        """
+        if self.db.in_transaction:
+            return None
+        return self.transactions_done
 
     async def begin_transaction(self):
         cursor = await self.db.execute("BEGIN TRANSACTION")
         await cursor.close()
+        self._transaction_task = asyncio.current_task()
 
     async def rollback_transaction(self):
         # Also rolls back the coin store, since both stores must be updated at once
         if self.db.in_transaction:
             cursor = await self.db.execute("ROLLBACK")
             await cursor.close()
+        self._transaction_task = None
+        self.transactions_done += 1
 
     async def commit_transaction(self):
         await self.db.commit()
+        self._transaction_task = None
+        self.transactions_done += 1
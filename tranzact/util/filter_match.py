@@ -0,0 +1,33 @@
+from typing import Iterable, List, Tuple
+
+from chiabip158 import PyBIP158
+
+from tranzact.types.blockchain_format.sized_bytes import bytes32
+
+
+def filter_matches(tx_filter: PyBIP158, items: Iterable[bytes32]) -> List[bytes32]:
+    """
+    Returns the items that match the filter, in the order they were given. This gives the same result as calling
+    Match for each item, but MatchAny hashes and sorts the whole set in one pass over the Golomb coded filter, so
+    a set with few matches (the common case for a wallet) costs one call. Groups which match are split in halves
+    until the matching items are found.
+    """
+    item_list: List[bytes32] = list(items)
+    arrays: List[bytearray] = [bytearray(item) for item in item_list]
+    matches: List[bytes32] = []
+    # Ranges [start, end) of item_list, the last one is tested first so the results keep their order
+    stack: List[Tuple[int, int]] = [(0, len(arrays))]
+    while len(stack) > 0:
+        start, end = stack.pop()
+        if end - start == 0:
+            continue
+        if end - start == 1:
+            if tx_filter.Match(arrays[start]):
+                matches.append(item_list[start])
+            continue
+        if not tx_filter.MatchAny(arrays[start:end]):
+            continue
+        middle = (start + end) // 2
+        stack.append((middle, end))
+        stack.append((start, middle))
+    return matches
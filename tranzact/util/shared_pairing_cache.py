@@ -0,0 +1,183 @@
+import struct
+from multiprocessing import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from blspy import GTElement
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python 3.7, where the pairing cache is process local
+    shared_memory = None
+
+SHARED_MEMORY_AVAILABLE = shared_memory is not None
+
+# Slots of a bucket, a key is stored in one of the slots of the bucket given by its first bytes
+WAYS = 8
+KEY_SIZE = 32
+VALUE_SIZE = GTElement.SIZE
+# Sequence number, referenced flag, key and serialized pairing
+SLOT_FORMAT = f"!IB{KEY_SIZE}s{VALUE_SIZE}s"
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+# Hits, misses, inserts and evictions
+HEADER_FORMAT = "!4Q"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# What a worker process needs to attach to the cache of the parent process
+SharedPairingCacheHandle = Tuple[str, int, Any]
+
+
+class SharedPairingCache:
+    """
+    A bounded cache of BLS pairings by std_hash(pk + msg) in a shared memory segment, which the processes validating
+    signatures all read and add to, so a pairing computed when a transaction enters the mempool is not computed again
+    by another process for the blocks which include it. It is a hash table of fixed size slots, in buckets of WAYS
+    slots, where a new key takes an empty slot of its bucket or evicts one with the clock algorithm, which skips the
+    slots hit since the hand last passed them.
+
+    Writers hold a lock shared by all processes. Readers don't: they check the sequence number of the slot, which is
+    odd while it is written, did not change while they read it. The hit and miss counters are updated without the
+    lock, so concurrent lookups can lose a few counts.
+    """
+
+    _shm: Any
+    _lock: Any
+    _owner: bool
+    num_buckets: int
+
+    def __init__(self, shm: Any, num_buckets: int, lock: Any, owner: bool) -> None:
+        self._shm = shm
+        self._lock = lock
+        self._owner = owner
+        self.num_buckets = num_buckets
+        self._slots_start = HEADER_SIZE + num_buckets
+
+    @classmethod
+    def create(cls, capacity: int) -> "SharedPairingCache":
+        """
+        Creates the shared memory segment for at least capacity pairings, rounded up to a whole number of buckets.
+        Raises if shared memory is not available.
+        """
+        if not SHARED_MEMORY_AVAILABLE:
+            raise RuntimeError("Shared memory requires Python 3.8 or later")
+        num_buckets = max((capacity + WAYS - 1) // WAYS, 1)
+        size = HEADER_SIZE + num_buckets + num_buckets * WAYS * SLOT_SIZE
+        # A new segment is filled with zeros, which is an empty cache
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        return cls(shm, num_buckets, Lock(), True)
+
+    @classmethod
+    def attach(cls, handle: SharedPairingCacheHandle) -> "SharedPairingCache":
+        """
+        Attaches to the cache created by the parent process, from its handle(). Child processes share the resource
+        tracker of their parent, so the segment is only removed when the parent closes it, or exits.
+        """
+        name, num_buckets, lock = handle
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, num_buckets, lock, False)
+
+    def handle(self) -> SharedPairingCacheHandle:
+        """
+        Passed to a process started by this one, through the initializer of a process pool
+        """
+        return self._shm.name, self.num_buckets, self._lock
+
+    @property
+    def capacity(self) -> int:
+        return self.num_buckets * WAYS
+
+    def _bucket(self, key: bytes) -> int:
+        return int.from_bytes(key[:8], "big") % self.num_buckets
+
+    def _slot_offset(self, bucket: int, way: int) -> int:
+        return self._slots_start + (bucket * WAYS + way) * SLOT_SIZE
+
+    def _add_to_counter(self, index: int, value: int) -> None:
+        offset = index * 8
+        (count,) = struct.unpack_from("!Q", self._shm.buf, offset)
+        struct.pack_into("!Q", self._shm.buf, offset, count + value)
+
+    def get(self, key: bytes) -> Optional[GTElement]:
+        buf = self._shm.buf
+        bucket = self._bucket(key)
+        for way in range(WAYS):
+            offset = self._slot_offset(bucket, way)
+            seq, _, slot_key, value = struct.unpack_from(SLOT_FORMAT, buf, offset)
+            if seq == 0 or seq % 2 == 1 or slot_key != key:
+                continue
+            if struct.unpack_from("!I", buf, offset)[0] != seq:
+                # Written while we read it
+                continue
+            struct.pack_into("!B", buf, offset + 4, 1)
+            self._add_to_counter(0, 1)
+            return GTElement.from_bytes(value)
+        self._add_to_counter(1, 1)
+        return None
+
+    def put(self, key: bytes, value: GTElement) -> None:
+        assert len(key) == KEY_SIZE
+        value_bytes = bytes(value)
+        buf = self._shm.buf
+        bucket = self._bucket(key)
+        with self._lock:
+            target: Optional[int] = None
+            for way in range(WAYS):
+                seq, _, slot_key = struct.unpack_from(f"!IB{KEY_SIZE}s", buf, self._slot_offset(bucket, way))
+                if seq != 0 and slot_key == key:
+                    return
+                if seq == 0 and target is None:
+                    target = way
+            if target is None:
+                target = self._evict(bucket)
+                self._add_to_counter(3, 1)
+            offset = self._slot_offset(bucket, target)
+            (seq,) = struct.unpack_from("!I", buf, offset)
+            struct.pack_into("!I", buf, offset, (seq + 1) & 0xFFFFFFFF)
+            struct.pack_into(f"!B{KEY_SIZE}s{VALUE_SIZE}s", buf, offset + 4, 0, key, value_bytes)
+            # Wraps around to 2, since 0 is an empty slot
+            struct.pack_into("!I", buf, offset, max((seq + 2) & 0xFFFFFFFF, 2))
+            self._add_to_counter(2, 1)
+
+    def _evict(self, bucket: int) -> int:
+        """
+        Returns the way of the slot to replace in bucket, moving the clock hand of the bucket past it
+        """
+        buf = self._shm.buf
+        hand_offset = HEADER_SIZE + bucket
+        hand = buf[hand_offset]
+        while True:
+            referenced_offset = self._slot_offset(bucket, hand) + 4
+            if buf[referenced_offset] == 0:
+                buf[hand_offset] = (hand + 1) % WAYS
+                return hand
+            buf[referenced_offset] = 0
+            hand = (hand + 1) % WAYS
+
+    def __len__(self) -> int:
+        buf = self._shm.buf
+        return sum(
+            1
+            for slot in range(self.capacity)
+            if struct.unpack_from("!I", buf, self._slots_start + slot * SLOT_SIZE)[0] != 0
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        hits, misses, inserts, evictions = struct.unpack_from(HEADER_FORMAT, self._shm.buf, 0)
+        lookups = hits + misses
+        return {
+            "capacity": self.capacity,
+            "entries": len(self),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups > 0 else 0.0,
+            "inserts": inserts,
+            "evictions": evictions,
+        }
+
+    def close(self) -> None:
+        """
+        Detaches from the segment, and removes it if this process created it
+        """
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -5,6 +5,7 @@ from __future__ import annotations
 import dataclasses
 import io
 import pprint
+import struct
 import sys
 from enum import Enum
 from typing import Any, BinaryIO, Dict, List, Tuple, Type, Callable, Optional, Iterator
@@ -15,6 +16,7 @@ from tranzact.types.blockchain_format.sized_bytes import bytes32
 from tranzact.util.byte_types import hexstr_to_bytes
 from tranzact.util.hash import std_hash
 from tranzact.util.ints import int64, int512, uint32, uint64, uint128
+from tranzact.util.struct_stream import StructStream
 from tranzact.util.type_checking import is_type_List, is_type_SpecificOptional, is_type_Tuple, strictdataclass
 
 if sys.version_info < (3, 8):
@@ -125,6 +127,9 @@ def recurse_jsonify(d):
 
 
 PARSE_FUNCTIONS_FOR_STREAMABLE_CLASS = {}
+# Generated functions for each streamable class, see compile_parse_function and compile_stream_function
+PARSE_FROM_BYTES_FOR_STREAMABLE_CLASS: Dict[Type, Callable[[bytes, int], Tuple[Any, int]]] = {}
+STREAM_FUNCTIONS_FOR_STREAMABLE_CLASS: Dict[Type, Callable[[Any, BinaryIO], None]] = {}
 
 
 def streamable(cls: Any):
@@ -174,18 +179,22 @@ def streamable(cls: Any):
     """
 
     cls1 = strictdataclass(cls)
-    t = type(cls.__name__, (cls1, Streamable), {})
-
-    parse_functions = []
     try:
-        fields = cls1.__annotations__  # pylint: disable=no-member
+        fields = cls.__annotations__  # pylint: disable=no-member
     except Exception:
         fields = {}
+    # Since python 3.10 a class without annotations of its own has an empty __annotations__ (rather than those of
+    # its base class), so they are copied to the new class for parse, stream and the strictdataclass checks
+    t = type(cls.__name__, (cls1, Streamable), {"__annotations__": fields})
+
+    parse_functions = []
 
     for _, f_type in fields.items():
         parse_functions.append(cls.function_to_parse_one_item(f_type))
 
     PARSE_FUNCTIONS_FOR_STREAMABLE_CLASS[t] = parse_functions
+    PARSE_FROM_BYTES_FOR_STREAMABLE_CLASS[t] = compile_parse_function(t, fields)
+    STREAM_FUNCTIONS_FOR_STREAMABLE_CLASS[t] = compile_stream_function(t, fields)
     return t
 
 
@@ -257,6 +266,411 @@ def parse_str(f: BinaryIO) -> str:
     return bytes.decode(str_read_bytes, "utf-8")
 
 
+class _CodeWriter:
+    """
+    Collects the lines and the referenced objects of a generated function.
+    """
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {}
+        self.counter = 0
+
+    def line(self, indent: int, text: str) -> None:
+        self.lines.append("    " * indent + text)
+
+    def ref(self, obj: Any) -> str:
+        for name, value in self.namespace.items():
+            if value is obj:
+                return name
+        name = f"_r{len(self.namespace)}"
+        self.namespace[name] = obj
+        return name
+
+    def var(self) -> str:
+        self.counter += 1
+        return f"v{self.counter}"
+
+    def compile(self, name: str) -> Callable:
+        exec("\n".join(self.lines), self.namespace)
+        return self.namespace[name]
+
+
+def _parse_with_stream(f_type: Type, buf: bytes, pos: int) -> Tuple[Any, int]:
+    # For types which can only parse from a stream, such as Program
+    f = io.BytesIO(buf)
+    f.seek(pos)
+    item = f_type.parse(f)
+    return item, f.tell()
+
+
+def _parse_serialized_program(buf: bytes, pos: int) -> Tuple[Any, int]:
+    from tranzact.types.blockchain_format.program import SerializedProgram
+    from clvm_rs import serialized_length
+
+    length = serialized_length(buf[pos:] if pos > 0 else buf)
+    assert pos + length <= len(buf)
+    return SerializedProgram.from_bytes(buf[pos : pos + length]), pos + length
+
+
+def _write_parse_item(w: _CodeWriter, f_type: Type, target: str, indent: int) -> None:
+    """
+    Writes the code parsing one item of type f_type from buf at pos into the variable target, advancing pos. The
+    checks are in the same order as function_to_parse_one_item, and raise the same exceptions.
+    """
+    if f_type is bool:
+        w.line(indent, "assert pos < end")
+        w.line(indent, f"{target} = buf[pos]")
+        w.line(indent, "pos += 1")
+        w.line(indent, f"if {target} > 1:")
+        w.line(indent + 1, 'raise ValueError("Bool byte must be 0 or 1")')
+        w.line(indent, f"{target} = {target} == 1")
+        return
+    if is_type_SpecificOptional(f_type):
+        w.line(indent, "assert pos < end")
+        w.line(indent, "pos += 1")
+        w.line(indent, "if buf[pos - 1] == 0:")
+        w.line(indent + 1, f"{target} = None")
+        w.line(indent, "elif buf[pos - 1] == 1:")
+        _write_parse_item(w, get_args(f_type)[0], target, indent + 1)
+        w.line(indent, "else:")
+        w.line(indent + 1, 'raise ValueError("Optional must be 0 or 1")')
+        return
+    if hasattr(f_type, "parse"):
+        if f_type in PARSE_FROM_BYTES_FOR_STREAMABLE_CLASS and f_type.parse.__func__ is Streamable.parse.__func__:
+            w.line(indent, f"{target}, pos = {w.ref(PARSE_FROM_BYTES_FOR_STREAMABLE_CLASS[f_type])}(buf, pos)")
+        elif isinstance(f_type, type) and issubclass(f_type, StructStream):
+            # The value is in range by construction, so the checks in StructStream.__new__ are skipped
+            size = struct.calcsize(f_type.PACK)
+            w.line(indent, f"assert pos + {size} <= end")
+            unpack_from = w.ref(struct.Struct(f_type.PACK).unpack_from)
+            w.line(indent, f"{target} = int_new({w.ref(f_type)}, {unpack_from}(buf, pos)[0])")
+            w.line(indent, f"pos += {size}")
+        elif f_type is uint128:
+            w.line(indent, "assert pos + 16 <= end")
+            w.line(indent, f'{target} = int_new({w.ref(f_type)}, int_from_bytes(buf[pos : pos + 16], "big"))')
+            w.line(indent, "pos += 16")
+        elif isinstance(f_type, type) and issubclass(f_type, bytes) and hasattr(f_type, "SIZE"):
+            w.line(indent, f"assert pos + {f_type.SIZE} <= end")
+            w.line(indent, f"{target} = bytes_new({w.ref(f_type)}, buf[pos : pos + {f_type.SIZE}])")
+            w.line(indent, f"pos += {f_type.SIZE}")
+        elif f_type.__name__ == "SerializedProgram":
+            w.line(indent, f"{target}, pos = {w.ref(_parse_serialized_program)}(buf, pos)")
+        else:
+            w.line(indent, f"{target}, pos = {w.ref(_parse_with_stream)}({w.ref(f_type)}, buf, pos)")
+        return
+    if f_type == bytes or f_type is str:
+        size = w.var()
+        w.line(indent, "assert pos + 4 <= end")
+        w.line(indent, f"{size} = unpack_uint32(buf, pos)[0]")
+        w.line(indent, f"pos += {size} + 4")
+        w.line(indent, "assert pos <= end")
+        if f_type is str:
+            w.line(indent, f'{target} = buf[pos - {size} : pos].decode("utf-8")')
+        else:
+            w.line(indent, f"{target} = buf[pos - {size} : pos]")
+        return
+    if is_type_List(f_type):
+        size = w.var()
+        item = w.var()
+        w.line(indent, "assert pos + 4 <= end")
+        w.line(indent, f"{size} = unpack_uint32(buf, pos)[0]")
+        w.line(indent, "pos += 4")
+        w.line(indent, f"{target} = []")
+        w.line(indent, f"for _ in range({size}):")
+        _write_parse_item(w, get_args(f_type)[0], item, indent + 1)
+        w.line(indent + 1, f"{target}.append({item})")
+        return
+    if is_type_Tuple(f_type):
+        items = []
+        for inner_type in get_args(f_type):
+            items.append(w.var())
+            _write_parse_item(w, inner_type, items[-1], indent)
+        w.line(indent, f"{target} = ({', '.join(items)},)")
+        return
+    if hasattr(f_type, "from_bytes") and f_type.__name__ in size_hints:
+        size = size_hints[f_type.__name__]
+        w.line(indent, f"assert pos + {size} <= end")
+        w.line(indent, f"{target} = {w.ref(f_type)}.from_bytes(buf[pos : pos + {size}])")
+        w.line(indent, f"pos += {size}")
+        return
+    raise NotImplementedError(f"Type {f_type} does not have parse")
+
+
+def compile_parse_function(cls: Type, fields: Dict[str, Type]) -> Callable[[bytes, int], Tuple[Any, int]]:
+    """
+    Generates a function parse(buf, pos) -> (object, new pos) for a streamable class, with the parsing of all the
+    fields inlined, which reads from bytes at an offset instead of through a BinaryIO.
+    """
+    w = _CodeWriter()
+    w.namespace.update(
+        {
+            "cls": cls,
+            "object_new": object.__new__,
+            "object_setattr": object.__setattr__,
+            "int_new": int.__new__,
+            "bytes_new": bytes.__new__,
+            "int_from_bytes": int.from_bytes,
+            "unpack_uint32": struct.Struct("!L").unpack_from,
+        }
+    )
+    w.line(0, "def parse(buf, pos):")
+    w.line(1, "end = len(buf)")
+    # Create the object without calling __init__() to avoid unnecessary post-init checks in strictdataclass
+    w.line(1, "obj = object_new(cls)")
+    for name, f_type in fields.items():
+        value = w.var()
+        _write_parse_item(w, f_type, value, 1)
+        w.line(1, f"object_setattr(obj, {name!r}, {value})")
+    w.line(1, "return obj, pos")
+    return w.compile("parse")
+
+
+def _write_stream_item(w: _CodeWriter, f_type: Type, value: str, indent: int) -> None:
+    """
+    Writes the code streaming the item in the variable value, producing the same bytes as stream_one_item.
+    """
+    if is_type_SpecificOptional(f_type):
+        w.line(indent, f"if {value} is None:")
+        w.line(indent + 1, 'write(b"\\x00")')
+        w.line(indent, "else:")
+        w.line(indent + 1, 'write(b"\\x01")')
+        _write_stream_item(w, get_args(f_type)[0], value, indent + 1)
+    elif f_type == bytes:
+        w.line(indent, f"write(pack_uint32(len({value})))")
+        w.line(indent, f"write({value})")
+    elif isinstance(f_type, type) and issubclass(f_type, StructStream):
+        w.line(indent, f"write({w.ref(struct.Struct(f_type.PACK).pack)}({value}))")
+    elif isinstance(f_type, type) and issubclass(f_type, bytes) and hasattr(f_type, "SIZE"):
+        w.line(indent, f"write({value})")
+    elif hasattr(f_type, "stream"):
+        w.line(indent, f"{value}.stream(f)")
+    elif hasattr(f_type, "__bytes__"):
+        w.line(indent, f"write(bytes({value}))")
+    elif is_type_List(f_type):
+        item = w.var()
+        w.line(indent, f"write(pack_uint32(len({value})))")
+        w.line(indent, f"for {item} in {value}:")
+        _write_stream_item(w, get_args(f_type)[0], item, indent + 1)
+    elif is_type_Tuple(f_type):
+        inner_types = get_args(f_type)
+        w.line(indent, f"assert len({value}) == {len(inner_types)}")
+        for i, inner_type in enumerate(inner_types):
+            item = w.var()
+            w.line(indent, f"{item} = {value}[{i}]")
+            _write_stream_item(w, inner_type, item, indent)
+    elif f_type is str:
+        encoded = w.var()
+        w.line(indent, f'{encoded} = {value}.encode("utf-8")')
+        w.line(indent, f"write(pack_uint32(len({encoded})))")
+        w.line(indent, f"write({encoded})")
+    elif f_type is bool:
+        w.line(indent, f'write(b"\\x01" if {value} else b"\\x00")')
+    else:
+        w.line(indent, f"self.stream_one_item({w.ref(f_type)}, {value}, f)")
+
+
+def compile_stream_function(cls: Type, fields: Dict[str, Type]) -> Callable[[Any, BinaryIO], None]:
+    """
+    Generates a function stream(self, f) for a streamable class, with the streaming of all the fields inlined.
+    """
+    w = _CodeWriter()
+    w.namespace["pack_uint32"] = struct.Struct("!L").pack
+    w.line(0, "def stream(self, f):")
+    w.line(1, "write = f.write")
+    for name in fields.keys():
+        value = w.var()
+        w.line(1, f"{value} = self.{name}")
+        _write_stream_item(w, fields[name], value, 1)
+    if len(fields) == 0:
+        w.line(1, "pass")
+    return w.compile("stream")
+
+
+def _fixed_size(f_type: Type) -> Optional[int]:
+    """
+    Returns the serialized size of a type if all its values have the same size, which can then be skipped without
+    looking at the bytes.
+    """
+    if isinstance(f_type, type) and issubclass(f_type, StructStream):
+        return struct.calcsize(f_type.PACK)
+    if f_type is uint128:
+        return 16
+    if f_type is int512:
+        return 65
+    if isinstance(f_type, type) and issubclass(f_type, bytes) and hasattr(f_type, "SIZE"):
+        return f_type.SIZE
+    if not hasattr(f_type, "parse") and hasattr(f_type, "from_bytes") and f_type.__name__ in size_hints:
+        return size_hints[f_type.__name__]
+    inner_types: Tuple[Type, ...] = ()
+    if is_type_Tuple(f_type):
+        inner_types = get_args(f_type)
+    elif f_type in PARSE_FROM_BYTES_FOR_STREAMABLE_CLASS and f_type.parse.__func__ is Streamable.parse.__func__:
+        inner_types = tuple(f_type.__annotations__.values())
+    else:
+        return None
+    sizes = [_fixed_size(inner_type) for inner_type in inner_types]
+    if any(size is None for size in sizes):
+        return None
+    return sum(sizes)  # type: ignore
+
+
+def _skip_with_stream(f_type: Type, buf: bytes, pos: int) -> int:
+    return _parse_with_stream(f_type, buf, pos)[1]
+
+
+def _skip_serialized_program(buf: bytes, pos: int) -> int:
+    from clvm_rs import serialized_length
+
+    length = serialized_length(buf[pos:] if pos > 0 else buf)
+    assert pos + length <= len(buf)
+    return pos + length
+
+
+def _write_skip_item(w: _CodeWriter, f_type: Type, indent: int) -> None:
+    """
+    Writes the code advancing pos past one item of type f_type, without creating it.
+    """
+    size = _fixed_size(f_type)
+    if size is not None:
+        w.line(indent, f"pos += {size}")
+        w.line(indent, "assert pos <= end")
+    elif f_type is bool:
+        w.line(indent, "assert pos < end")
+        w.line(indent, "if buf[pos] > 1:")
+        w.line(indent + 1, 'raise ValueError("Bool byte must be 0 or 1")')
+        w.line(indent, "pos += 1")
+    elif is_type_SpecificOptional(f_type):
+        w.line(indent, "assert pos < end")
+        w.line(indent, "pos += 1")
+        w.line(indent, "if buf[pos - 1] == 1:")
+        _write_skip_item(w, get_args(f_type)[0], indent + 1)
+        w.line(indent, "elif buf[pos - 1] != 0:")
+        w.line(indent + 1, 'raise ValueError("Optional must be 0 or 1")')
+    elif f_type in PARSE_FROM_BYTES_FOR_STREAMABLE_CLASS and f_type.parse.__func__ is Streamable.parse.__func__:
+        w.line(indent, f"pos = {w.ref(get_skip_function(f_type))}(buf, pos)")
+    elif f_type.__name__ in ["Program", "SerializedProgram"]:
+        w.line(indent, f"pos = {w.ref(_skip_serialized_program)}(buf, pos)")
+    elif hasattr(f_type, "parse"):
+        w.line(indent, f"pos = {w.ref(_skip_with_stream)}({w.ref(f_type)}, buf, pos)")
+    elif f_type == bytes or f_type is str:
+        w.line(indent, "assert pos + 4 <= end")
+        w.line(indent, "pos += unpack_uint32(buf, pos)[0] + 4")
+        w.line(indent, "assert pos <= end")
+    elif is_type_List(f_type):
+        count = w.var()
+        w.line(indent, "assert pos + 4 <= end")
+        w.line(indent, f"{count} = unpack_uint32(buf, pos)[0]")
+        w.line(indent, "pos += 4")
+        inner_size = _fixed_size(get_args(f_type)[0])
+        if inner_size is not None:
+            w.line(indent, f"pos += {count} * {inner_size}")
+            w.line(indent, "assert pos <= end")
+        else:
+            w.line(indent, f"for _ in range({count}):")
+            _write_skip_item(w, get_args(f_type)[0], indent + 1)
+    elif is_type_Tuple(f_type):
+        for inner_type in get_args(f_type):
+            _write_skip_item(w, inner_type, indent)
+    else:
+        raise NotImplementedError(f"Type {f_type} does not have parse")
+
+
+SKIP_FUNCTIONS_FOR_STREAMABLE_CLASS: Dict[Type, Callable[[bytes, int], int]] = {}
+FIELD_OFFSETS_FUNCTIONS_FOR_STREAMABLE_CLASS: Dict[Type, Callable[[bytes], List[int]]] = {}
+
+
+def _new_skip_writer() -> _CodeWriter:
+    w = _CodeWriter()
+    w.namespace["unpack_uint32"] = struct.Struct("!L").unpack_from
+    return w
+
+
+def get_skip_function(cls: Type) -> Callable[[bytes, int], int]:
+    """
+    Returns a function skip(buf, pos) -> new pos, which checks the layout of a serialized object of the streamable
+    class, but creates none of its fields. These are only generated when they are first needed.
+    """
+    skip_f = SKIP_FUNCTIONS_FOR_STREAMABLE_CLASS.get(cls)
+    if skip_f is None:
+        w = _new_skip_writer()
+        w.line(0, "def skip(buf, pos):")
+        w.line(1, "end = len(buf)")
+        for f_type in cls.__annotations__.values():
+            _write_skip_item(w, f_type, 1)
+        w.line(1, "return pos")
+        skip_f = w.compile("skip")
+        SKIP_FUNCTIONS_FOR_STREAMABLE_CLASS[cls] = skip_f
+    return skip_f
+
+
+def get_field_offsets_function(cls: Type) -> Callable[[bytes], List[int]]:
+    """
+    Returns a function field_offsets(buf) -> offsets, giving the offset in a serialized object of the streamable class
+    where each of its fields starts, followed by the end of the object, which must be the end of buf.
+    """
+    offsets_f = FIELD_OFFSETS_FUNCTIONS_FOR_STREAMABLE_CLASS.get(cls)
+    if offsets_f is None:
+        w = _new_skip_writer()
+        w.line(0, "def field_offsets(buf):")
+        w.line(1, "end = len(buf)")
+        w.line(1, "pos = 0")
+        w.line(1, "offsets = []")
+        for f_type in cls.__annotations__.values():
+            w.line(1, "offsets.append(pos)")
+            _write_skip_item(w, f_type, 1)
+        w.line(1, "assert pos == end")
+        w.line(1, "offsets.append(pos)")
+        w.line(1, "return offsets")
+        offsets_f = w.compile("field_offsets")
+        FIELD_OFFSETS_FUNCTIONS_FOR_STREAMABLE_CLASS[cls] = offsets_f
+    return offsets_f
+
+
+ITEM_PARSE_FUNCTIONS: Dict[Any, Callable[[bytes, int], Tuple[Any, int]]] = {}
+ITEM_SKIP_FUNCTIONS: Dict[Any, Callable[[bytes, int], int]] = {}
+
+
+def get_item_parse_function(f_type: Type) -> Callable[[bytes, int], Tuple[Any, int]]:
+    """
+    Returns a function parse(buf, pos) -> (item, new pos) for one item of type f_type.
+    """
+    parse_f = ITEM_PARSE_FUNCTIONS.get(f_type)
+    if parse_f is None:
+        w = _CodeWriter()
+        w.namespace.update(
+            {
+                "int_new": int.__new__,
+                "bytes_new": bytes.__new__,
+                "int_from_bytes": int.from_bytes,
+                "unpack_uint32": struct.Struct("!L").unpack_from,
+            }
+        )
+        w.line(0, "def parse(buf, pos):")
+        w.line(1, "end = len(buf)")
+        _write_parse_item(w, f_type, "item", 1)
+        w.line(1, "return item, pos")
+        parse_f = w.compile("parse")
+        ITEM_PARSE_FUNCTIONS[f_type] = parse_f
+    return parse_f
+
+
+def get_item_skip_function(f_type: Type) -> Callable[[bytes, int], int]:
+    """
+    Returns a function skip(buf, pos) -> new pos for one item of type f_type.
+    """
+    skip_f = ITEM_SKIP_FUNCTIONS.get(f_type)
+    if skip_f is None:
+        w = _new_skip_writer()
+        w.line(0, "def skip(buf, pos):")
+        w.line(1, "end = len(buf)")
+        _write_skip_item(w, f_type, 1)
+        w.line(1, "return pos")
+        skip_f = w.compile("skip")
+        ITEM_SKIP_FUNCTIONS[f_type] = skip_f
+    return skip_f
+
+
 class Streamable:
     @classmethod
     def function_to_parse_one_item(cls: Type[cls.__name__], f_type: Type):  # type: ignore
@@ -292,6 +706,12 @@ class Streamable:
 
     @classmethod
     def parse(cls: Type[cls.__name__], f: BinaryIO) -> cls.__name__:  # type: ignore
+        parse_f = PARSE_FROM_BYTES_FOR_STREAMABLE_CLASS.get(cls)
+        # The generated function reads the buffer of the stream directly, which is only known for a plain BytesIO
+        if parse_f is not None and type(f) is io.BytesIO:
+            obj, pos = parse_f(f.getvalue(), f.tell())
+            f.seek(pos)
+            return obj
         # Create the object without calling __init__() to avoid unnecessary post-init checks in strictdataclass
         obj: Streamable = object.__new__(cls)
         fields: Iterator[str] = iter(getattr(cls, "__annotations__", {}))
@@ -345,6 +765,10 @@ class Streamable:
             raise NotImplementedError(f"can't stream {item}, {f_type}")
 
     def stream(self, f: BinaryIO) -> None:
+        stream_f = STREAM_FUNCTIONS_FOR_STREAMABLE_CLASS.get(type(self))
+        if stream_f is not None:
+            stream_f(self, f)
+            return
         try:
             fields = self.__annotations__  # pylint: disable=no-member
         except Exception:
@@ -357,6 +781,12 @@ class Streamable:
 
     @classmethod
     def from_bytes(cls: Any, blob: bytes) -> Any:
+        parse_f = PARSE_FROM_BYTES_FOR_STREAMABLE_CLASS.get(cls)
+        if parse_f is not None:
+            buf = blob if type(blob) is bytes else bytes(blob)
+            parsed, pos = parse_f(buf, 0)
+            assert pos == len(buf)
+            return parsed
         f = io.BytesIO(blob)
         parsed = cls.parse(f)
         assert f.read() == b""
@@ -21,6 +21,8 @@ class WalletCoinStore:
     coin_record_cache: Dict[bytes32, WalletCoinRecord]
     # unspent_coin_wallet_cache keeps ALL unspent coin records for wallet in memory [wallet_id: [record_name: record]]
     unspent_coin_wallet_cache: Dict[int, Dict[bytes32, WalletCoinRecord]]
+    # unspent_coin_names keeps the names of ALL unspent coin records, used to match them against block filters
+    unspent_coin_names: Set[bytes32]
     db_wrapper: DBWrapper
 
     @classmethod
@@ -61,6 +63,7 @@ class WalletCoinStore:
         await self.db_connection.commit()
         self.coin_record_cache = {}
         self.unspent_coin_wallet_cache = {}
+        self.unspent_coin_names = set()
         await self.rebuild_wallet_cache()
         return self
 
@@ -74,10 +77,12 @@ class WalletCoinStore:
         all_coins = await self.get_all_coins()
         self.unspent_coin_wallet_cache = {}
         self.coin_record_cache = {}
+        self.unspent_coin_names = set()
         for coin_record in all_coins:
             name = coin_record.name()
             self.coin_record_cache[name] = coin_record
             if coin_record.spent is False:
+                self.unspent_coin_names.add(name)
                 if coin_record.wallet_id not in self.unspent_coin_wallet_cache:
                     self.unspent_coin_wallet_cache[coin_record.wallet_id] = {}
                 self.unspent_coin_wallet_cache[coin_record.wallet_id][name] = coin_record
@@ -87,6 +92,10 @@ class WalletCoinStore:
         # update wallet cache
         name = record.name()
         self.coin_record_cache[name] = record
+        if record.spent:
+            self.unspent_coin_names.discard(name)
+        else:
+            self.unspent_coin_names.add(name)
         if record.wallet_id in self.unspent_coin_wallet_cache:
             if record.spent and name in self.unspent_coin_wallet_cache[record.wallet_id]:
                 self.unspent_coin_wallet_cache[record.wallet_id].pop(name)
@@ -230,11 +239,13 @@ class WalletCoinStore:
                 )
                 self.coin_record_cache[coin_record.coin.name()] = new_record
                 self.unspent_coin_wallet_cache[coin_record.wallet_id][coin_record.coin.name()] = new_record
+                self.unspent_coin_names.add(coin_record.coin.name())
             if coin_record.confirmed_block_height > height:
                 delete_queue.append(coin_record)
 
         for coin_record in delete_queue:
             self.coin_record_cache.pop(coin_record.coin.name())
+            self.unspent_coin_names.discard(coin_record.coin.name())
             if coin_record.wallet_id in self.unspent_coin_wallet_cache:
                 coin_cache = self.unspent_coin_wallet_cache[coin_record.wallet_id]
                 if coin_record.coin.name() in coin_cache:
@@ -31,6 +31,7 @@ from tranzact.types.mempool_inclusion_status import MempoolInclusionStatus
 from tranzact.util.byte_types import hexstr_to_bytes
 from tranzact.util.db_wrapper import DBWrapper
 from tranzact.util.errors import Err
+from tranzact.util.filter_match import filter_matches
 from tranzact.util.hash import std_hash
 from tranzact.util.ints import uint32, uint64, uint128
 from tranzact.util.db_synchronous import db_synchronous_on
@@ -167,7 +168,9 @@ class WalletStateManager:
             self.reorg_rollback,
             self.lock,
         )
-        self.weight_proof_handler = WeightProofHandler(self.constants, self.blockchain)
+        self.weight_proof_handler = WeightProofHandler(
+            self.constants, self.blockchain, self.config.get("weight_proof_validation_workers", 2)
+        )
 
         self.sync_mode = False
         self.sync_store = await WalletSyncStore.create()
@@ -943,16 +946,21 @@ class WalletStateManager:
         else:
             fork_h = 0
 
-        # Get all unspent coins
-        my_coin_records: Set[WalletCoinRecord] = await self.coin_store.get_unspent_coins_at_height(
-            uint32(fork_h) if fork_h >= 0 else None
-        )
+        unspent_coin_names: Set[bytes32]
+        if self.peak is not None and fork_h >= self.peak.height:
+            # The coin store is at the peak, so the unspent coins at the fork point are the current ones
+            unspent_coin_names = set(self.coin_store.unspent_coin_names)
+        else:
+            # Get all unspent coins
+            my_coin_records: Set[WalletCoinRecord] = await self.coin_store.get_unspent_coins_at_height(
+                uint32(fork_h) if fork_h >= 0 else None
+            )
 
-        # Filter coins up to and including fork point
-        unspent_coin_names: Set[bytes32] = set()
-        for coin in my_coin_records:
-            if coin.confirmed_block_height <= fork_h:
-                unspent_coin_names.add(coin.name())
+            # Filter coins up to and including fork point
+            unspent_coin_names = set()
+            for coin in my_coin_records:
+                if coin.confirmed_block_height <= fork_h:
+                    unspent_coin_names.add(coin.name())
 
         # Get all blocks after fork point up to but not including this block
         if new_block.height > 0:
@@ -979,36 +987,24 @@ class WalletStateManager:
 
         my_puzzle_hashes = self.puzzle_store.all_puzzle_hashes
 
-        removals_of_interest: bytes32 = []
-        additions_of_interest: bytes32 = []
-
         (
             trade_removals,
             trade_additions,
         ) = await self.trade_manager.get_coins_of_interest()
-        for name, trade_coin in trade_removals.items():
-            if tx_filter.Match(bytearray(trade_coin.name())):
-                removals_of_interest.append(trade_coin.name())
-
-        for name, trade_coin in trade_additions.items():
-            if tx_filter.Match(bytearray(trade_coin.puzzle_hash)):
-                additions_of_interest.append(trade_coin.puzzle_hash)
 
-        for coin_name in unspent_coin_names:
-            if tx_filter.Match(bytearray(coin_name)):
-                removals_of_interest.append(coin_name)
+        # Each set is matched against the filter in one batch, rather than one Match call per item
+        removal_candidates: List[bytes32] = [trade_coin.name() for trade_coin in trade_removals.values()]
+        removal_candidates.extend(unspent_coin_names)
+        removal_candidates.extend(await self.interested_store.get_interested_coin_ids())
 
-        for puzzle_hash in my_puzzle_hashes:
-            if tx_filter.Match(bytearray(puzzle_hash)):
-                additions_of_interest.append(puzzle_hash)
-
-        for coin_id in await self.interested_store.get_interested_coin_ids():
-            if tx_filter.Match(bytearray(coin_id)):
-                removals_of_interest.append(coin_id)
+        addition_candidates: List[bytes32] = [trade_coin.puzzle_hash for trade_coin in trade_additions.values()]
+        addition_candidates.extend(my_puzzle_hashes)
+        addition_candidates.extend(
+            puzzle_hash for puzzle_hash, _ in await self.interested_store.get_interested_puzzle_hashes()
+        )
 
-        for puzzle_hash, _ in await self.interested_store.get_interested_puzzle_hashes():
-            if tx_filter.Match(bytearray(puzzle_hash)):
-                additions_of_interest.append(puzzle_hash)
+        removals_of_interest: List[bytes32] = filter_matches(tx_filter, removal_candidates)
+        additions_of_interest: List[bytes32] = filter_matches(tx_filter, addition_candidates)
 
         return additions_of_interest, removals_of_interest
 
@@ -1061,6 +1057,8 @@ class WalletStateManager:
     async def close_all_stores(self) -> None:
         if self.blockchain is not None:
             self.blockchain.shut_down()
+        if self.weight_proof_handler is not None:
+            self.weight_proof_handler.shut_down()
         await self.db_connection.close()
 
     async def clear_all_stores(self):